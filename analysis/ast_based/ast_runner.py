@@ -6,20 +6,14 @@ import sys
 import json
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
-from cli.end_to_end_demo import collect_files, EXTENSIONS
-from feature_flag.reasoning import AnalyzerFactory
+from feature_flag.scan import scan_ast
+from ast_analysis.utils import DEFAULT_LIMITS, limits_from_args
+from feature_flag.watchdog import budget_from_args
+from feature_flag import metrics
+from cli.options import add_limit_arguments, add_budget_arguments, add_metrics_arguments
 
-def run_ast_analysis(target_dir, lang, output_path):
-    analyzer = AnalyzerFactory.get_analyzer(lang)
-    files = collect_files(target_dir, EXTENSIONS[lang])
-    dependencies = []
-    for file_path in files:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            code = f.read()
-        deps = analyzer.analyze(code)
-        for dep in deps:
-            dep['file'] = file_path
-            dependencies.append(dep)
+def run_ast_analysis(target_dir, lang, output_path, limits=DEFAULT_LIMITS, budget=None):
+    dependencies = scan_ast(target_dir, lang, limits=limits, budget=budget)
     with open(output_path, 'w') as f:
         json.dump(dependencies, f, indent=2)
     print(f"AST-based dependencies saved to {output_path}")
@@ -30,5 +24,10 @@ if __name__ == "__main__":
     parser.add_argument("target_dir", help="Directory to scan")
     parser.add_argument("lang", help="Language (python, java, etc.)")
     parser.add_argument("output_path", help="Output JSON file")
+    add_limit_arguments(parser)
+    add_budget_arguments(parser)
+    add_metrics_arguments(parser)
     args = parser.parse_args()
-    run_ast_analysis(args.target_dir, args.lang, args.output_path)
+    metrics.enable_from_args(args)
+    run_ast_analysis(args.target_dir, args.lang, args.output_path, limits_from_args(args), budget_from_args(args))
+    metrics.write_from_args(args)
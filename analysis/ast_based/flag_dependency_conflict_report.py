@@ -1,49 +1,39 @@
 """
 Enhanced summary report: show feature flag dependencies and detect conflicts (flags used in multiple contexts or with overlapping logic).
+The merged results are streamed once through the report engine; the DOT file and top-k lists
+come from the same pass when requested. With --approx the summary comes from fixed-size
+sketches instead (estimates, bounded memory); the input may then be a saved sketch.
 """
-import json
-from collections import defaultdict
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+from feature_flag.binary_results import iter_results
+from feature_flag.report import build_report, print_conflict_report, print_top
+from feature_flag.sketch import load_or_build_sketch, print_sketch_summary
+from feature_flag import metrics
+from cli.options import add_metrics_arguments
 
-with open('merged_flag_dependencies.json') as f:
-    merged = json.load(f)
+def main(merged_path='merged_flag_dependencies.json', dot_path=None, top_k=None, approx=False):
+    if approx:
+        print_sketch_summary(load_or_build_sketch(merged_path), top_k)
+        return
+    engine = build_report(iter_results(merged_path), dot_path=dot_path)
+    print_conflict_report(engine)
+    if top_k:
+        print_top(engine, top_k)
+    if dot_path:
+        print(f"\nGraphviz DOT file saved as {dot_path} (for visualization)")
 
-graph = defaultdict(set)
-flag_to_contexts = defaultdict(set)
-context_to_flags = defaultdict(set)
-
-for entry in merged:
-    dep = entry.get('dependency')
-    context = entry.get('context')
-    if dep and context:
-        graph[dep].add(context)
-        flag_to_contexts[dep].add(context)
-        context_to_flags[context].add(dep)
-
-print("Feature Flag Dependency Graph (flag -> function context):\n")
-for flag, contexts in graph.items():
-    print(f"  {flag} -> {', '.join(contexts)}")
-
-print("\nSummary Report:")
-print(f"  Total unique flags: {len(flag_to_contexts)}")
-print(f"  Total unique contexts: {len(context_to_flags)}")
-print(f"  Total flag->context edges: {sum(len(c) for c in graph.values())}")
-
-# Detect conflicts: flags used in multiple contexts
-print("\nPotential Conflicts (flags used in multiple contexts):")
-conflict_found = False
-for flag, contexts in flag_to_contexts.items():
-    if len(contexts) > 1:
-        print(f"  [CONFLICT] Flag '{flag}' is used in multiple contexts: {', '.join(contexts)}")
-        conflict_found = True
-if not conflict_found:
-    print("  No conflicts detected.")
-
-# Detect contexts with multiple flags (possible complex logic)
-print("\nContexts with multiple flags (possible complex/compound logic):")
-complex_found = False
-for ctx, flags in context_to_flags.items():
-    if len(flags) > 1:
-        print(f"  [COMPLEX] Context '{ctx}' checks multiple flags: {', '.join(flags)}")
-        complex_found = True
-if not complex_found:
-    print("  No complex/compound flag logic detected.")
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Report feature flag conflicts and compound logic.")
+    parser.add_argument("merged_path", nargs="?", default='merged_flag_dependencies.json', help="Merged results (JSON or binary)")
+    parser.add_argument("--dot", help="Also write the Graphviz DOT file from the same pass")
+    parser.add_argument("--top", type=int, help="Also print the top-k flags and contexts")
+    parser.add_argument("--approx", action="store_true",
+                        help="Sketch-based approximate summary in bounded memory (input may be a saved sketch)")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics.enable_from_args(args)
+    main(args.merged_path, args.dot, args.top, args.approx)
+    metrics.write_from_args(args)
@@ -0,0 +1,95 @@
+"""
+Sharded map/reduce runner for scanning a large repository across several machines.
+
+  map:    analyze one shard of the file list into a partial result
+  reduce: merge partial results into one result and flag graph
+  local:  run every shard as a separate local process, then reduce (for testing)
+
+Example:
+  python3 analysis/ast_based/shard_runner.py map sample_project_python python --index 0 --count 4 -o shard-0.json
+  python3 analysis/ast_based/shard_runner.py reduce shard-*.json -o reduced.json --merged-output merged_flag_dependencies.json
+  python3 analysis/ast_based/shard_runner.py local sample_project_python python --count 4 -o reduced.json
+"""
+import sys
+import json
+import os
+import subprocess
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+from feature_flag.shard import run_shard, reduce_partials
+
+def write_json(data, path):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+def run_map(args):
+    partial = run_shard(args.target_dir, args.lang, args.index, args.count, args.semgrep_rule)
+    write_json(partial, args.output)
+    print(f"Shard {args.index}/{args.count}: {len(partial['files'])} files, "
+          f"{len(partial['ast'])} AST findings -> {args.output}")
+
+def run_reduce(args):
+    partials = []
+    for path in args.partials:
+        with open(path) as f:
+            partials.append(json.load(f))
+    reduced = reduce_partials(partials, allow_missing=args.allow_missing)
+    write_json(reduced, args.output)
+    if args.merged_output:
+        write_json(reduced['merged'], args.merged_output)
+        print(f"Merged results saved to {args.merged_output}")
+    print(f"Reduced {len(partials)} partials: {len(reduced['files'])} files, "
+          f"{len(reduced['merged'])} merged findings, {len(reduced['graph']['edges'])} call edges -> {args.output}")
+
+def run_local(args):
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='ffdeps-shards-')
+    os.makedirs(work_dir, exist_ok=True)
+    partial_paths = [os.path.join(work_dir, f"shard-{i}.json") for i in range(args.count)]
+    processes = []
+    for index, path in enumerate(partial_paths):
+        cmd = [sys.executable, os.path.abspath(__file__), 'map', args.target_dir, args.lang,
+               '--index', str(index), '--count', str(args.count), '-o', path]
+        if args.semgrep_rule:
+            cmd += ['--semgrep-rule', args.semgrep_rule]
+        processes.append(subprocess.Popen(cmd))
+    failed = [i for i, p in enumerate(processes) if p.wait() != 0]
+    if failed:
+        print(f"Shards failed: {failed}")
+        sys.exit(1)
+    args.partials = partial_paths
+    args.allow_missing = False
+    run_reduce(args)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Sharded map/reduce feature flag analysis.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    map_parser = sub.add_parser("map", help="Analyze one shard into a partial result")
+    map_parser.add_argument("target_dir", help="Directory to scan")
+    map_parser.add_argument("lang", help="Language (python, java, etc.)")
+    map_parser.add_argument("--index", type=int, required=True, help="Shard index (0-based)")
+    map_parser.add_argument("--count", type=int, required=True, help="Total number of shards")
+    map_parser.add_argument("--semgrep-rule", help="Semgrep rule YAML file (omit to skip Semgrep)")
+    map_parser.add_argument("-o", "--output", required=True, help="Partial result JSON file")
+    map_parser.set_defaults(func=run_map)
+
+    reduce_parser = sub.add_parser("reduce", help="Merge partial results")
+    reduce_parser.add_argument("partials", nargs="+", help="Partial result JSON files")
+    reduce_parser.add_argument("-o", "--output", required=True, help="Reduced result JSON file")
+    reduce_parser.add_argument("--merged-output", help="Also write the merged findings list (merged_flag_dependencies.json format)")
+    reduce_parser.add_argument("--allow-missing", action="store_true", help="Reduce even if some shards are missing")
+    reduce_parser.set_defaults(func=run_reduce)
+
+    local_parser = sub.add_parser("local", help="Run all shards as local processes, then reduce")
+    local_parser.add_argument("target_dir", help="Directory to scan")
+    local_parser.add_argument("lang", help="Language (python, java, etc.)")
+    local_parser.add_argument("--count", type=int, required=True, help="Number of shards")
+    local_parser.add_argument("--semgrep-rule", help="Semgrep rule YAML file (omit to skip Semgrep)")
+    local_parser.add_argument("--work-dir", help="Directory for partial results (default: a temp dir)")
+    local_parser.add_argument("-o", "--output", required=True, help="Reduced result JSON file")
+    local_parser.add_argument("--merged-output", help="Also write the merged findings list")
+    local_parser.set_defaults(func=run_local)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -1,53 +1,39 @@
 """
 Visualize the merged feature flag dependency graph and print a summary report.
 - Shows a simple text-based graph (flag -> function context)
-- Prints counts and unique flags/contexts
-- Optionally, outputs a Graphviz DOT file for visualization
+- Prints counts, unique flags/contexts and the top-k flags/contexts
+- Outputs a Graphviz DOT file for visualization, streamed during the same single pass
+- With --approx, prints sketch-based estimates instead (bounded memory, no DOT file);
+  the input may then also be a sketch saved by `ffdeps sketch -o`
 """
-import json
-from collections import defaultdict
-
-with open('merged_flag_dependencies.json') as f:
-    merged = json.load(f)
-
-graph = defaultdict(set)
-flag_counts = defaultdict(int)
-context_counts = defaultdict(int)
-unique_flags = set()
-unique_contexts = set()
-
-for entry in merged:
-    dep = entry.get('dependency')
-    context = entry.get('context')
-    if dep and context:
-        graph[dep].add(context)
-        flag_counts[dep] += 1
-        context_counts[context] += 1
-        unique_flags.add(dep)
-        unique_contexts.add(context)
-
-print("Feature Flag Dependency Graph (flag -> function context):\n")
-for flag, contexts in graph.items():
-    print(f"  {flag} -> {', '.join(contexts)}")
-
-print("\nSummary Report:")
-print(f"  Total unique flags: {len(unique_flags)}")
-print(f"  Total unique contexts: {len(unique_contexts)}")
-print(f"  Total flag->context edges: {sum(len(c) for c in graph.values())}")
-
-print("\nTop flags by usage:")
-for flag, count in sorted(flag_counts.items(), key=lambda x: -x[1]):
-    print(f"  {flag}: {count}")
-
-print("\nTop contexts by flag checks:")
-for ctx, count in sorted(context_counts.items(), key=lambda x: -x[1]):
-    print(f"  {ctx}: {count}")
-
-# Optionally, output Graphviz DOT file
-with open('flag_dependency_graph.dot', 'w') as f:
-    f.write('digraph FeatureFlagDeps {\n')
-    for flag, contexts in graph.items():
-        for ctx in contexts:
-            f.write(f'  "{flag}" -> "{ctx}";\n')
-    f.write('}\n')
-print("\nGraphviz DOT file saved as flag_dependency_graph.dot (for visualization)")
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+from feature_flag.binary_results import iter_results
+from feature_flag.report import build_report, print_graph_summary, DEFAULT_TOP_K
+from feature_flag.sketch import load_or_build_sketch, print_sketch_summary
+from feature_flag import metrics
+from cli.options import add_metrics_arguments
+
+def main(merged_path='merged_flag_dependencies.json', dot_path='flag_dependency_graph.dot', top_k=DEFAULT_TOP_K,
+         approx=False):
+    if approx:
+        print_sketch_summary(load_or_build_sketch(merged_path), top_k)
+        return
+    engine = build_report(iter_results(merged_path), dot_path=dot_path)
+    print_graph_summary(engine, top_k)
+    print(f"\nGraphviz DOT file saved as {dot_path} (for visualization)")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Summarize and visualize the merged feature flag dependency graph.")
+    parser.add_argument("merged_path", nargs="?", default='merged_flag_dependencies.json', help="Merged results (JSON or binary)")
+    parser.add_argument("--dot", default='flag_dependency_graph.dot', help="Graphviz DOT output file")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP_K, help="Number of top flags/contexts to list")
+    parser.add_argument("--approx", action="store_true",
+                        help="Sketch-based approximate summary in bounded memory (input may be a saved sketch)")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics.enable_from_args(args)
+    main(args.merged_path, args.dot, args.top, args.approx)
+    metrics.write_from_args(args)
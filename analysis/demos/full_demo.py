@@ -1,9 +1,18 @@
 """
-Full demo: Run Semgrep-based and AST-based feature flag analysis, merge, report, and visualize in one script.
+Full demo: Run Semgrep-based, AST-based and Data Flow feature flag analysis, merge, report, and visualize in one script.
+All stages run in-process through feature_flag.pipeline: the three scans run concurrently,
+results are passed in memory, and unchanged stages are reused from the cache on rerun.
+Progress is journaled to a checkpoint; after an interruption, --resume continues from it.
 """
-import subprocess
 import sys
+import json
 import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+from feature_flag.pipeline import build_analysis_pipeline, DEFAULT_CACHE_DIR
+from feature_flag.checkpoint import checkpoint_from_args
+from feature_flag.report import print_conflict_report, print_top
+from feature_flag import metrics
+from cli.options import add_checkpoint_arguments, add_metrics_arguments
 
 # Paths
 PYTHON_PROJECT = "sample_project_python"
@@ -12,45 +21,38 @@ SEMGREP_OUTPUT = "semgrep_auto_scan_result.json"
 AST_OUTPUT = "ast_auto_scan_result.json"
 DATAFLOW_OUTPUT = "dataflow_auto_scan_result.json"
 MERGED_OUTPUT = "merged_flag_dependencies.json"
-
-# 1. Run Semgrep-based analysis
-print("[1/6] Running Semgrep-based analysis...")
-subprocess.run([
-    sys.executable, "analysis/semgrep_based/semgrep_runner.py",
-    PYTHON_PROJECT, SEMGREP_RULE, SEMGREP_OUTPUT
-], check=True)
-
-# 2. Run AST-based analysis
-print("[2/6] Running AST-based analysis...")
-subprocess.run([
-    sys.executable, "analysis/ast_based/ast_runner.py",
-    PYTHON_PROJECT, "python", AST_OUTPUT
-], check=True, env={**os.environ, "PYTHONPATH": "src"})
-
-# 3. Run Dataflow-based analysis
-print("[3/6] Running Data Flow Analysis...")
-subprocess.run([
-    sys.executable, "analysis/ast_based/dataflow_runner.py",
-    PYTHON_PROJECT, "python", DATAFLOW_OUTPUT
-], check=True, env={**os.environ, "PYTHONPATH": "src"})
-
-# 4. Merge and deduplicate results
-print("[4/6] Merging and deduplicating results...")
-subprocess.run([
-    sys.executable, "analysis/ast_based/merge_flag_results.py"
-], check=True)
-
-# 5. Generate conflict/complexity report
-print("[5/6] Generating conflict/complexity report...")
-subprocess.run([
-    sys.executable, "analysis/ast_based/flag_dependency_conflict_report.py"
-], check=True)
-
-# 6. Visualize the dependency graph
-print("[6/6] Visualizing the dependency graph...")
-subprocess.run([
-    sys.executable, "analysis/ast_based/visualize_flag_graph.py"
-], check=True)
-
-print("\nDemo complete! See outputs in:")
-print(f"- {SEMGREP_OUTPUT}\n- {AST_OUTPUT}\n- {DATAFLOW_OUTPUT}\n- {MERGED_OUTPUT}\n- flag_dependency_graph.dot\n")
+DOT_OUTPUT = "flag_dependency_graph.dot"
+
+def main(use_cache=True, checkpoint=None):
+    pipeline = build_analysis_pipeline(
+        PYTHON_PROJECT, SEMGREP_RULE, "python",
+        cache_dir=DEFAULT_CACHE_DIR if use_cache else None,
+        dot_path=DOT_OUTPUT, checkpoint=checkpoint
+    )
+    outputs = pipeline.run()
+    if checkpoint is not None:
+        checkpoint.finish()
+
+    # Keep the per-stage artifacts on disk for the step-by-step scripts and other consumers
+    for path, stage in ((SEMGREP_OUTPUT, 'semgrep'), (AST_OUTPUT, 'ast'),
+                        (DATAFLOW_OUTPUT, 'dataflow'), (MERGED_OUTPUT, 'merge')):
+        with open(path, 'w') as f:
+            json.dump(outputs[stage], f, indent=2)
+
+    print(f"\nTotal unique feature flag dependencies: {len(outputs['merge'])}\n")
+    print_conflict_report(outputs['report'])
+    print_top(outputs['report'])
+
+    print("\nDemo complete! See outputs in:")
+    print(f"- {SEMGREP_OUTPUT}\n- {AST_OUTPUT}\n- {DATAFLOW_OUTPUT}\n- {MERGED_OUTPUT}\n- {DOT_OUTPUT}\n")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the full feature flag analysis pipeline.")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute every stage, ignoring cached outputs")
+    add_checkpoint_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics.enable_from_args(args)
+    main(use_cache=not args.no_cache, checkpoint=checkpoint_from_args(args))
+    metrics.write_from_args(args)
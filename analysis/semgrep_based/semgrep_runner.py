@@ -1,10 +1,16 @@
 """
 Semgrep-based feature flag dependency analysis runner.
 Runs Semgrep with the provided rules and outputs results as JSON.
+With --parallel, only files passing a literal prefilter are scanned, in batches
+run as parallel Semgrep processes whose results are merged.
 """
 import subprocess
 import sys
 import json
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+from feature_flag import metrics
+from cli.options import add_metrics_arguments
 
 def run_semgrep(target_dir, rule_path, output_path):
     cmd = [
@@ -13,7 +19,8 @@ def run_semgrep(target_dir, rule_path, output_path):
         "--json", "-o", output_path,
         target_dir
     ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    with metrics.stage('semgrep'):
+        result = subprocess.run(cmd, capture_output=True, text=True)
     print(result.stdout)
     print(result.stderr)
     if result.returncode != 0:
@@ -21,11 +28,33 @@ def run_semgrep(target_dir, rule_path, output_path):
         sys.exit(result.returncode)
     print(f"Semgrep results saved to {output_path}")
 
+def run_semgrep_parallel(target_dir, rule_path, output_path, jobs=None, prefilter=True):
+    from feature_flag.scan import scan_semgrep_parallel
+    try:
+        output = scan_semgrep_parallel(target_dir, rule_path, jobs=jobs, prefilter=prefilter)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    with open(output_path, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"Semgrep results ({len(output['results'])} findings, {len(output['paths']['scanned'])} files scanned) "
+          f"saved to {output_path}")
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Run Semgrep for feature flag analysis.")
     parser.add_argument("target_dir", help="Directory to scan")
     parser.add_argument("rule_path", help="Semgrep rule YAML file")
     parser.add_argument("output_path", help="Output JSON file")
+    parser.add_argument("--parallel", action="store_true",
+                        help="Prefilter candidate files and run batches of them in parallel Semgrep processes")
+    parser.add_argument("--jobs", type=int, default=None, help="Parallel Semgrep processes (default: CPU count)")
+    parser.add_argument("--no-prefilter", action="store_true", help="With --parallel, scan every file")
+    add_metrics_arguments(parser)
     args = parser.parse_args()
-    run_semgrep(args.target_dir, args.rule_path, args.output_path)
+    metrics.enable_from_args(args)
+    if args.parallel:
+        run_semgrep_parallel(args.target_dir, args.rule_path, args.output_path, args.jobs, not args.no_prefilter)
+    else:
+        run_semgrep(args.target_dir, args.rule_path, args.output_path)
+    metrics.write_from_args(args)
@@ -1,11 +1,40 @@
 from abc import ABC, abstractmethod
+from .utils import DEFAULT_MAX_LINE_LENGTH
+from .sdk_profiles import compile_profiles
 
 # Abstract base class for AST analyzers
 class BaseAnalyzer(ABC):
+    # Longer lines are scanned in segments (see utils.iter_source_lines)
+    max_line_length = DEFAULT_MAX_LINE_LENGTH
+    # Also record the code regions each check guards, as 'regions' of its finding (see feature_flag.regions)
+    record_regions = False
+    # Set by each language-specific analyzer; selects its SDK profiles
+    language = None
+
+    def __init__(self, profiles=None, max_line_length=None, record_regions=None):
+        """
+        `profiles`: the sdk_profiles.SdkProfile tuple to match (DEFAULT_PROFILES when None);
+        only those of the analyzer's language are used. An analyzer keeps no state between
+        analyze() calls, so one configured instance can be shared (see AnalyzerFactory).
+        """
+        self.matcher = compile_profiles(self.language, profiles)
+        if max_line_length is not None:
+            self.max_line_length = max_line_length
+        if record_regions is not None:
+            self.record_regions = record_regions
+
     @abstractmethod
     def analyze(self, source_code):
         """
         Analyze the given source code and return feature flag dependencies.
+        `source_code` may be a string, bytes/mmap, an open file or an iterable of lines;
+        streaming inputs keep memory bounded for huge files.
         Should be implemented by language-specific analyzers.
         """
         pass
+
+    @staticmethod
+    def _attach_regions(dependencies, regions):
+        """Add lexer.Guarded regions, keyed by finding index, as [start, end, polarity] lists."""
+        for region in sorted(regions, key=lambda r: (r.key, r.start)):
+            dependencies[region.key].setdefault('regions', []).append([region.start, region.end, region.polarity])
@@ -0,0 +1,43 @@
+from .base_analyzer import BaseAnalyzer
+from .sdk_profiles import LANGUAGES
+from .utils import iter_source_lines
+import re
+
+# A literal first argument, bounded so a match never scans far past the name
+_LITERAL_ARG = re.compile(r'\s{0,16}\(\s{0,16}([\'"`])([\w\-.]{1,256})\1')
+
+
+class FallbackAnalyzer(BaseAnalyzer):
+    """
+    Cheap analyzer for quarantined files (see feature_flag.watchdog): a literal search for
+    the flag check names of the language's SDK profiles, line by line, with a bounded match for a literal first argument.
+    Time is linear in the file size; there is no lexer, so checks in comments and strings
+    are reported too, and no enclosing function is known.
+    """
+    def __init__(self, language, profiles=None, max_line_length=None):
+        if language not in LANGUAGES:
+            raise ValueError(f"Unsupported language: {language}")
+        self.language = language
+        super().__init__(profiles, max_line_length)
+        self.names = tuple(sorted(self.matcher.names))
+
+    def analyze(self, source_code):
+        dependencies = []
+        for lineno, text in iter_source_lines(source_code, self.max_line_length):
+            for name in self.names:
+                start = text.find(name)
+                while start != -1:
+                    end = start + len(name)
+                    # Whole identifiers only: `Enabled` must not match inside `IsEnabled`
+                    if not (start and (text[start - 1].isalnum() or text[start - 1] == '_')):
+                        match = _LITERAL_ARG.match(text, end)
+                        if match:
+                            dependencies.append({
+                                'type': 'fallback_' + name,
+                                'dependency': match.group(2),
+                                'lineno': lineno,
+                                'context': None,
+                                'code': text[max(0, start - 80):match.end() + 80].strip()
+                            })
+                    start = text.find(name, end)
+        return dependencies
@@ -1,26 +1,69 @@
 from .base_analyzer import BaseAnalyzer
+from .lexer import Lexer, tokenize, iter_calls, join_tokens, polarity, may_contain
 import re
 
+_FLAG_IDENT = re.compile(r'(?i)feature|flag|toggle')
+# A file without any of these words (in any case), or the profiled check names, has no flag condition
+_MENTIONS = ('feature', 'flag', 'toggle', 'enabled', 'getvariant', 'getvalue', 'variation')
+
 class GoAnalyzer(BaseAnalyzer):
+    language = 'go'
+
+    def __init__(self, profiles=None, max_line_length=None, record_regions=None):
+        super().__init__(profiles, max_line_length, record_regions)
+        self.mentions = tuple(sorted(set(_MENTIONS) | {name.lower() for name in self.matcher.names}))
+
     def analyze(self, source_code):
         """
-        Analyze Go source code to extract feature flag dependencies.
-        Attempts to extract the enclosing function as context.
+        Analyze Go source code to extract feature flag dependencies: `if` conditions that call
+        a flag check (the calls of the Go SDK profiles, see sdk_profiles) or test a flag-named
+        identifier (comments and strings do not count).
+        The flag name is taken from the first check called with a literal key.
+        Extracts the enclosing function (or method) as context.
+        With record_regions, a named check gets the lines of the block it guards.
         """
         dependencies = []
-        func_pattern = re.compile(r'^func\s+([\w_]+)\s*\(')
-        lines = source_code.split('\n')
-        current_func = None
-        for idx, line in enumerate(lines, 1):
-            func_match = func_pattern.match(line)
-            if func_match:
-                current_func = func_match.group(1)
-            if 'if' in line and ('feature' in line or 'flag' in line):
-                dependencies.append({
-                    'type': 'if_condition',
-                    'dependency': None,  # Could be improved with better parsing
-                    'lineno': idx,
-                    'context': current_func,
-                    'code': line.strip()
-                })
+        condition = None
+        if not may_contain(source_code, self.mentions, ignore_case=True):
+            return dependencies
+        lexer = Lexer('go', {'if'}, capture='block', max_line_length=self.max_line_length)
+        for token in tokenize(source_code, 'go', self.max_line_length, lexer):
+            if token is None:
+                continue
+            if condition is None:
+                if token.kind == 'ident' and token.text == 'if':
+                    condition = [token]
+                continue
+            if token.kind == 'op' and token.text == '{' and token.depth == condition[0].depth:
+                dependency, check = self._condition(condition)
+                if dependency is not False:
+                    head = condition[0]
+                    if self.record_regions and dependency is not None:
+                        before = join_tokens(condition[:condition.index(check)])
+                        lexer.watch(len(dependencies), polarity(before), token.lineno)
+                    dependencies.append({
+                        'type': 'if_condition',
+                        'dependency': dependency,
+                        'lineno': head.lineno,
+                        'context': head.context,
+                        'code': head.line.strip()
+                    })
+                condition = None
+            else:
+                condition.append(token)
+        self._attach_regions(dependencies, lexer.regions)
         return dependencies
+
+    def _condition(self, tokens):
+        """
+        (flag name, name token of its check) for an `if` condition: the name is None if unnamed,
+        False if the condition is not a flag check.
+        """
+        names = self.matcher.names
+        for call in iter_calls(iter(tokens[1:]), names):
+            key = self.matcher.key(call.name, call.args)
+            if key is not None:
+                return key[0], call.token
+        if any(t.kind == 'ident' and (t.text in names or _FLAG_IDENT.search(t.text)) for t in tokens[1:]):
+            return None, None
+        return False, None
@@ -1,35 +1,41 @@
 from .base_analyzer import BaseAnalyzer
-import re
+from .lexer import Lexer, tokenize, iter_calls, may_contain
+
+# Words that may precede a call; any other identifier before the name makes it a declaration
+_BEFORE_CALL = {'return', 'throw', 'case', 'else', 'assert', 'yield', 'new'}
 
 class JavaAnalyzer(BaseAnalyzer):
+    language = 'java'
+
     def analyze(self, source_code):
         """
-        Analyze Java source code for feature flag dependencies, e.g. FeatureFlag.isEnabled("FLAG") or isFeatureEnabled("FLAG").
+        Analyze Java source code for feature flag dependencies, e.g. FeatureFlag.isEnabled("FLAG") or isFeatureEnabled("FLAG"),
+        or the calls of any other Java SDK profile (see sdk_profiles), all in one pass.
         Extracts the enclosing method as context if possible.
         Matches all forms: optional class/object prefixes, static imports, extra args, and variable usage.
+        Uses the shared lexer, so comments, strings and the declarations of the check methods are not reported.
+        With record_regions, a check in an `if`/`while` condition gets the lines of the block it guards.
         """
         dependencies = []
-        # Regex for (optional prefix) isEnabled("flag") or isFeatureEnabled(flag_var)
-        pattern = re.compile(r"(?:[\w_]+\.)?(isEnabled|isFeatureEnabled)\s*\(([^)]*)\)")
-        method_pattern = re.compile(r'^\s*(public|private|protected)?\s*(static)?\s*[\w\<\>\[\]]+\s+([\w_]+)\s*\(')
-        lines = source_code.split('\n')
-        current_method = None
-        for idx, line in enumerate(lines, 1):
-            method_match = method_pattern.match(line)
-            if method_match:
-                current_method = method_match.group(3)
-            for match in pattern.finditer(line):
-                arg = match.group(2).split(',')[0].strip()
-                str_match = re.match(r'"([\w\-]+)"', arg)
-                if str_match:
-                    flag_name = str_match.group(1)
-                else:
-                    flag_name = arg  # variable or expression
-                dependencies.append({
-                    'type': match.group(1),
-                    'dependency': flag_name,
-                    'lineno': idx,
-                    'context': current_method,
-                    'code': line.strip()
-                })
+        names = self.matcher.names
+        if not may_contain(source_code, names):
+            return dependencies
+        lexer = Lexer('java', names, max_line_length=self.max_line_length)
+        for call in iter_calls(tokenize(source_code, 'java', self.max_line_length, lexer), names):
+            if call.prev is not None and call.prev.kind == 'ident' and call.prev.text not in _BEFORE_CALL:
+                continue  # e.g. `boolean isEnabled(String name)`
+            key = self.matcher.key(call.name, call.args)
+            if key is None:
+                continue
+            flag_name, kind = key  # a literal, or a variable or expression
+            if self.record_regions:
+                lexer.guard(len(dependencies), call.token)
+            dependencies.append({
+                'type': kind,
+                'dependency': flag_name,
+                'lineno': call.token.lineno,
+                'context': call.token.context,
+                'code': call.token.line.strip()
+            })
+        self._attach_regions(dependencies, lexer.regions)
         return dependencies
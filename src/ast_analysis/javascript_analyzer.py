@@ -1,32 +1,36 @@
 from .base_analyzer import BaseAnalyzer
-import re
+from .lexer import Lexer, tokenize, iter_calls, may_contain
 
 class JavaScriptAnalyzer(BaseAnalyzer):
+    language = 'javascript'
+
     def analyze(self, source_code):
         """
-        Analyze JavaScript source code for Unleash feature flag dependencies, e.g. unleash.isEnabled('FLAG_NAME').
-        Extracts the enclosing function as context if possible.
+        Analyze JavaScript source code for Unleash feature flag dependencies, e.g. unleash.isEnabled('FLAG_NAME'),
+        or the calls of any other JavaScript SDK profile (see sdk_profiles), all in one pass.
+        Extracts the enclosing function as context if possible (declarations, methods and named arrow functions).
+        Uses the shared lexer, so comments and strings are not matched and calls may span lines.
+        With record_regions, a check in an `if`/`while` condition gets the lines of the block it guards.
         """
         dependencies = []
-        # Regex for unleash.isEnabled('flag') or isEnabled('flag')
-        pattern = re.compile(r"(?:unleash\s*\.)?isEnabled\(['\"]([\w\-\.]+)['\"]")
-        # Regex for function declarations to extract context
-        func_pattern = re.compile(r'^\s*function\s+([\w_]+)\s*\(')
-        lines = source_code.split('\n')
-        current_func = None
-        for idx, line in enumerate(lines, 1):
-            # Check if the line defines a function and update current_func
-            func_match = func_pattern.match(line)
-            if func_match:
-                current_func = func_match.group(1)
-            # Find all matches for the unleash.isEnabled pattern in the line
-            for match in pattern.finditer(line):
-                flag_name = match.group(1)
-                dependencies.append({
-                    'type': 'unleash_isEnabled',
-                    'dependency': flag_name,
-                    'lineno': idx,
-                    'context': current_func,
-                    'code': line.strip()
-                })
+        names = self.matcher.names
+        if not may_contain(source_code, names):
+            return dependencies
+        lexer = Lexer('javascript', names, max_line_length=self.max_line_length)
+        for call in iter_calls(tokenize(source_code, 'javascript', self.max_line_length, lexer), names):
+            # Literal flag names only (by default); a template literal with substitutions is not a name
+            key = self.matcher.key(call.name, call.args)
+            if key is None:
+                continue
+            flag_name, kind = key
+            if self.record_regions:
+                lexer.guard(len(dependencies), call.token)
+            dependencies.append({
+                'type': kind,
+                'dependency': flag_name,
+                'lineno': call.token.lineno,
+                'context': call.token.context,
+                'code': call.token.line.strip()
+            })
+        self._attach_regions(dependencies, lexer.regions)
         return dependencies
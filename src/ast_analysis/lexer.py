@@ -0,0 +1,953 @@
+"""
+Shared single-pass lexer for the brace languages (Java, Go, JavaScript).
+
+One linear pass over the source, driven by a per-language table (comment markers,
+string delimiters, regex literals, function header rules), yields the significant
+tokens with their line, brace depth and enclosing function. Comments never produce
+tokens and string contents are a single token, so analyzers no longer match inside
+either; the enclosing function ends at its closing brace. The substitutions of a
+JavaScript template literal are code: `a${x}b` is the string tokens '`a${' and '}b`'
+around the tokens of x.
+
+The source is read in chunks of whole lines (iter_source_chunks), so memory stays
+bounded on minified code and there is no Python loop per line; line numbers are
+counted only where a token is produced. The lexer state (inside a comment or a
+multi-line string) carries across chunks, including the pieces of a cut line.
+
+Analyzers that look for a few names skim: only braces, comments and strings are
+followed through plain code, and tokens are produced around the trigger names.
+A call in an `if` or `while` condition can be marked as guarding the block of its
+statement (Lexer.guard); the lexer then records the lines of that block (or of the
+single statement of a braceless body), and of the `else if` and `else` clauses after
+it, in `regions`.
+
+    names = {'isEnabled'}
+    for call in iter_calls(tokenize(source, 'java', triggers=names), names):
+        call.name, call.args[0], call.token.lineno, call.token.context
+"""
+import mmap
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from .utils import iter_source_chunks, DEFAULT_MAX_LINE_LENGTH
+
+# kind: 'ident', 'string', 'number', 'regex' or 'op'; line: the text of the line it
+# starts on; depth: brace depth before the token; context: innermost enclosing named function
+Token = namedtuple('Token', 'kind text lineno line depth context')
+# A call of one of the wanted names: prev is the token before the name (None at the start)
+Call = namedtuple('Call', 'name token prev args')
+# A function body: name, first and last line
+Span = namedtuple('Span', 'name start end')
+# A block guarded by a flag check: the caller's key, the lines of its '{' and '}' (of a
+# braceless body: its statement), and polarity 1 (runs when the check succeeds) or -1 (when it fails)
+Guarded = namedtuple('Guarded', 'key start end polarity')
+
+_OPS = r'=>|->|:=|\.\.\.|&&|\|\||[=!]==?|[<>]=?|\S'
+# Tokens after which '/' starts a regex literal rather than a division (JavaScript)
+_REGEX_AFTER_OPS = set('(,=:[!&|?{};+-*%<>~^') | {'=>', '&&', '||', '==', '!=', '===', '!==', '<=', '>='}
+_REGEX_AFTER_WORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw',
+                      'yield', 'await'}
+_JS_REGEX = re.compile(r'/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*')
+# Names that precede a parenthesized group and a block without being functions
+_CONTROL = {'if', 'for', 'while', 'switch', 'catch', 'synchronized', 'try', 'return', 'new', 'else', 'do',
+            'with', 'super', 'this', 'function', 'record'}
+HISTORY_LIMIT = 256
+# Statement text kept while skimming (a function header is at its end)
+HEAD_LIMIT = 4096
+_LAST_WORD = re.compile(r'[\w$]+\Z')
+
+
+def _matching_open(history, close_index):
+    """Index of the '(' matching the ')' at `close_index`, or None."""
+    level = 0
+    for i in range(close_index, -1, -1):
+        text = history[i].text if history[i].kind == 'op' else None
+        if text == ')':
+            level += 1
+        elif text == '(':
+            level -= 1
+            if level == 0:
+                return i
+    return None
+
+
+def _is(token, kind, text=None):
+    return token is not None and token.kind == kind and (text is None or token.text == text)
+
+
+def _java_function(history):
+    """`[modifiers] Type name(params) [throws X, Y] {` -> name."""
+    end = len(history) - 1
+    # Drop a throws clause
+    for i in range(end, -1, -1):
+        if _is(history[i], 'ident', 'throws'):
+            end = i - 1
+            break
+        if not (history[i].kind == 'ident' or _is(history[i], 'op', ',') or _is(history[i], 'op', '.')):
+            break
+    if end < 0 or not _is(history[end], 'op', ')'):
+        return None
+    start = _matching_open(history, end)
+    if not start:
+        return None
+    name = history[start - 1]
+    before = history[start - 2] if start >= 2 else None
+    if name.kind != 'ident' or name.text in _CONTROL or _is(before, 'op', '.') or _is(before, 'ident', 'new'):
+        return None
+    return name.text
+
+
+def _go_function(history):
+    """`func name(...) ... {` or `func (recv T) name(...) ... {` -> name; function literals are anonymous."""
+    for i in range(len(history) - 1, -1, -1):
+        if _is(history[i], 'ident', 'func'):
+            break
+    else:
+        return None
+    following = history[i + 1:i + 2]
+    if not following:
+        return None
+    if following[0].kind == 'ident':
+        return following[0].text
+    if _is(following[0], 'op', '('):
+        # Method receiver, or the parameters of a literal
+        level = 0
+        for j in range(i + 1, len(history)):
+            if _is(history[j], 'op', '('):
+                level += 1
+            elif _is(history[j], 'op', ')'):
+                level -= 1
+                if level == 0:
+                    break
+        if j + 2 < len(history) and history[j + 1].kind == 'ident' and _is(history[j + 2], 'op', '('):
+            return history[j + 1].text
+    return None
+
+
+def _js_assigned_name(history, index):
+    """Name bound by `name = <expr>` / `name: <expr>` ending just before `index` (skipping `async`)."""
+    if index >= 0 and _is(history[index], 'ident', 'async'):
+        index -= 1
+    if index >= 1 and history[index].kind == 'op' and history[index].text in ('=', ':'):
+        target = history[index - 1]
+        if target.kind == 'ident':
+            return target.text
+        if target.kind == 'string':
+            return target.text[1:-1]
+    return None
+
+
+def _js_function(history):
+    """Function declarations/expressions, class and object methods, and named arrow functions."""
+    last = len(history) - 1
+    if last < 0:
+        return None
+    if _is(history[last], 'op', '=>'):
+        params = last - 1
+        if params >= 0 and _is(history[params], 'op', ')'):
+            params = _matching_open(history, params)
+            if params is None:
+                return None
+        return _js_assigned_name(history, params - 1)
+    if not _is(history[last], 'op', ')'):
+        return None
+    start = _matching_open(history, last)
+    if not start:
+        return None
+    name = history[start - 1]
+    if _is(name, 'ident', 'function') or _is(name, 'op', '*'):
+        keyword = start - 1 if name.text == 'function' else start - 2
+        return _js_assigned_name(history, keyword - 1)
+    if name.kind != 'ident' or name.text in _CONTROL:
+        return None
+    before = history[start - 2] if start >= 2 else None
+    if before is None or _is(before, 'ident') or (before.kind == 'op' and before.text in ('*', '{', '}', ';', ',')):
+        return name.text
+    return None
+
+
+def _string_end(delimiter, multiline, escapes):
+    """Pattern matching the rest of a string after its opening delimiter."""
+    if len(delimiter) > 1:
+        body = r'(?:[^\\]|\\.)*?' if escapes else r'.*?'
+    else:
+        # Single-line strings stop at the end of their line
+        excluded = re.escape(delimiter) + ('' if multiline else r'\n')
+        body = r'(?:[^%s\\]|\\.)*?' % excluded if escapes else r'[^%s]*?' % excluded
+    return re.compile(body + re.escape(delimiter), re.S)
+
+
+def _template_end(delimiter):
+    """Pattern matching the rest of a template literal piece: up to its closing delimiter or a `${`."""
+    quoted = re.escape(delimiter)
+    return re.compile(r'(?:[^%s$\\]|\\.|\$(?!\{))*(?:%s|\$\{)' % (quoted, quoted), re.S)
+
+
+def _language(line_comment, block_comment, strings, function_name, header_start, regex_literals=False,
+              template=None):
+    """
+    Compile a language table. strings: (delimiter, multiline, escapes); longer delimiters first.
+    header_start(text, more) -> where a function header may start in a statement's text
+    (-1: none); `more` when tokens follow the text. template: the delimiter of the strings
+    whose `${...}` substitutions are code.
+    """
+    delimiters = '|'.join(re.escape(d) for d, _, _ in sorted(strings, key=lambda s: -len(s[0])))
+    comments = r'(?P<comment>%s)|(?P<block>%s)|(?P<string>%s)' % (
+        re.escape(line_comment), re.escape(block_comment[0]), delimiters)
+    master = re.compile(r'\s*(?:%s|(?P<ident>[A-Za-z_$][\w$]*)|(?P<number>\d[\w.]*)|(?P<op>%s))' % (comments, _OPS))
+    # Skimming only stops at what changes the lexer state; plain code is passed over by the regex engine
+    skim = comments + r'|(?P<brace>[{};])' + (r'|(?P<slash>/)' if regex_literals else '')
+    return {
+        'master': master,
+        'skim': skim,
+        'block_end': block_comment[1],
+        'strings': {d: (_template_end(d) if d == template else _string_end(d, multiline, escapes), multiline)
+                    for d, multiline, escapes in strings},
+        'template': template,
+        'function_name': function_name,
+        'header_start': header_start,
+        'regex_literals': regex_literals,
+    }
+
+
+_SIGNATURE_END = re.compile(r'(?:\)|=>|\bthrows\b[\w\s.,<>]*)\s*$')
+_CONTROL_HEAD = re.compile(r'\s*(?:else\s+)?(?:if|for|while|switch|catch|synchronized|with)\b')
+_GUARD_HEAD = re.compile(r'\s*(?:else\s+)?(?:if|while)\b')
+_ELSE = re.compile(r'\s*else\s*\{?\s*\Z')
+_ELSE_IF = re.compile(r'\s*else\s+if\b')
+# A braceless else body: `else stmt`
+_ELSE_BODY = re.compile(r'\s*else\b(?!\s*\{|\s+if\b)\s*\S')
+# Whitespace and comments before a statement
+_LEADING = re.compile(r'(?:\s+|//[^\n]*|/\*.*?\*/)*', re.S)
+# Statement text ending in `!` and the qualifiers of a call: `!flags.`, `! ff.Client().`
+_NEGATED = re.compile(r'!\s*(?:[\w$]+\s*(?:\(\s*\))?\s*\.\s*)*\Z')
+_GO_FUNC = re.compile(r'\bfunc\b')
+
+
+def _has_body(text):
+    """Whether the statement `text` of an `if`/`while` (or `else`) has a body after its condition."""
+    head = _GUARD_HEAD.match(text)
+    if head is None:
+        return _ELSE_BODY.match(text) is not None
+    start = text.find('(', head.end())
+    if start == -1:
+        return False
+    level = 0
+    for i in range(start, len(text)):
+        if text[i] == '(':
+            level += 1
+        elif text[i] == ')':
+            level -= 1
+            if level == 0:
+                return bool(text[i + 1:].strip())
+    return False
+
+
+def _signature_header(text, more=False):
+    """Java/JavaScript: the whole statement, if it may end in a signature (`more`: tokens follow)."""
+    if more:
+        return 0
+    return 0 if _SIGNATURE_END.search(text) and not _CONTROL_HEAD.match(text) else -1
+
+
+def _go_header(text, more=False):
+    """Go: from the last `func` keyword."""
+    start = len(text) if more else -1
+    for match in _GO_FUNC.finditer(text):
+        start = match.start()
+    return start
+
+
+LANGUAGES = {
+    'java': _language('//', ('/*', '*/'), [('"""', True, True), ('"', False, True), ("'", False, True)],
+                      _java_function, _signature_header),
+    'go': _language('//', ('/*', '*/'), [('`', True, False), ('"', False, True), ("'", False, True)],
+                    _go_function, _go_header),
+    'javascript': _language('//', ('/*', '*/'), [('`', True, True), ('"', False, True), ("'", False, True)],
+                            _js_function, _signature_header, regex_literals=True, template='`'),
+}
+
+
+@lru_cache(maxsize=None)
+def _skim_pattern(language, triggers):
+    skim = LANGUAGES[language]['skim']
+    if triggers:
+        names = '|'.join(re.escape(name) for name in sorted(triggers, key=len, reverse=True))
+        skim += r'|(?P<trigger>(?<![\w$])(?:%s)(?![\w$]))' % names
+    return re.compile(skim)
+
+
+class Lexer:
+    """
+    Incremental lexer for one file; feed() the text in order, then read `spans`.
+    Each piece of text is one or more lines (see iter_source_chunks); the state carried
+    to the next piece is one of: code, a line or block comment, or an open string.
+
+    With `triggers` (a set of identifiers) the lexer skims: plain code is only tracked
+    for braces, comments and strings, and tokens are produced from each trigger to the
+    end of its capture, which is the balanced argument list (capture='call') or the
+    first '{' at the trigger's depth (capture='block'). Each capture is preceded by
+    None (a gap in the stream) and the token before the trigger in its statement, if
+    any. Function spans are the same as in a full pass. Token.line of a line longer
+    than `max_line_length` is the part of it around the token.
+    """
+    def __init__(self, language, triggers=None, capture='call', max_line_length=DEFAULT_MAX_LINE_LENGTH):
+        if language not in LANGUAGES:
+            raise ValueError(f"No lexer table for language: {language}")
+        if capture not in ('call', 'block'):
+            raise ValueError(f"Unknown capture: {capture}")
+        table = LANGUAGES[language]
+        self.master = table['master']
+        self.block_end = table['block_end']
+        self.strings = table['strings']
+        self.function_name = table['function_name']
+        self.header_start = table['header_start']
+        self.regex_literals = table['regex_literals']
+        self.template = table['template']
+        self.templates = []     # brace depth at each open template substitution `${`
+        self.skim = None if triggers is None else _skim_pattern(language, frozenset(triggers))
+        self.capture = capture
+        self.capturing = self.skim is None
+        self.level = None       # parenthesis level of a 'call' capture (None before the trigger)
+        self.capture_depth = 0
+        self.depth = 0
+        self.functions = []     # open named function bodies: (name, depth, start line)
+        self.history = []       # significant tokens since the last statement boundary
+        # Skimming: statement text before the first capture, and since the last one (untokenized)
+        self.prefix = ''
+        self.head = []
+        self.spans = []
+        self.guards = []        # checks in the current statement's condition: (depth, key, polarity)
+        # Open guarded blocks: (depth inside, start line, their regions' [(key, polarity)], the
+        # checks an `else` after them negates)
+        self.blocks = []
+        self.closed = None      # (depth, [(key, polarity)]) of a guarded body just ended, for an `else`
+        self.boundary = 0       # offset in the current text after the last '{', '}' or ';' 
+        self.regions = []
+        self.state = None       # None, 'block', 'line' or ('string', delimiter, text so far, start line)
+        self.lineno = None      # line number at the end of the text fed so far
+        self.prev = None
+        self.max_line_length = max_line_length
+        self.text = ''
+        self.first_lineno = None
+        # The line of the current text last looked at: number, start, end, text (None if overlong)
+        self.line = None
+
+    @property
+    def context(self):
+        return self.functions[-1][0] if self.functions else None
+
+    def _locate(self, pos):
+        """(lineno, line text) of position `pos` in the current text."""
+        text = self.text
+        if self.line is not None and self.line[1] <= pos <= self.line[2]:
+            lineno, start, end, line = self.line
+        else:
+            if self.line is None or pos < self.line[1]:
+                lineno = self.first_lineno + text.count('\n', 0, pos)
+            else:
+                lineno = self.line[0] + text.count('\n', self.line[2], pos)
+            start = text.rfind('\n', 0, pos) + 1
+            end = text.find('\n', pos)
+            if end == -1:
+                end = len(text)
+            line = text[start:end] if end - start <= self.max_line_length else None
+            self.line = (lineno, start, end, line)
+        if line is None:
+            # A minified line: the part of it around `pos`
+            left = max(start, pos - self.max_line_length // 2)
+            line = text[left:min(end, left + self.max_line_length)]
+        return lineno, line
+
+    def _token(self, kind, text, lineno, line):
+        token = Token(kind, text, lineno, line, self.depth, self.context)
+        self.prev = token
+        if len(self.history) >= HISTORY_LIMIT:
+            del self.history[:HISTORY_LIMIT // 2]
+        self.history.append(token)
+        return token
+
+    def _open_brace(self, name, lineno):
+        if self.guards or self.closed:
+            self._guarded_block(lineno)
+        self.depth += 1
+        if name:
+            self.functions.append((name, self.depth, lineno))
+
+    def _close_brace(self, lineno):
+        if self.functions and self.functions[-1][1] == self.depth:
+            name, _, start = self.functions.pop()
+            self.spans.append(Span(name, start, lineno))
+        self.guards = []
+        self.closed = None
+        if self.blocks and self.blocks[-1][0] == self.depth:
+            _, start, keys, negated = self.blocks.pop()
+            self.regions.extend(Guarded(key, start, lineno, polarity) for key, polarity in keys)
+            self.closed = (self.depth - 1, negated) if negated else None
+        self.depth = max(self.depth - 1, 0)
+
+    def _statement(self, until=None):
+        """Text of the current statement (string contents left out), up to the token `until` if given."""
+        tokens = []
+        for token in self.history:
+            if token is until:
+                break
+            tokens.append('""' if token.kind == 'string' else token.text)
+        text = self.prefix + ' ' + ' '.join(tokens)
+        return text if until is not None else text + ' ' + ''.join(self.head)
+
+    def guard(self, key, token):
+        """
+        The call named by `token`, just captured, guards the block of its statement if it is in
+        an `if` or `while` condition: the lines of that block (or of the statement, for a
+        braceless body), and of the `else if` and `else` clauses after it, are recorded in
+        `regions` under `key` once each ends. The polarity is -1 for a negated call
+        (`!flags.isEnabled(...)`) and flips for the `else if` and `else` clauses.
+        """
+        text = self._statement(until=token)
+        if _GUARD_HEAD.match(text) and text.count('(') > text.count(')'):
+            self.guards.append((self.depth, key, polarity(text)))
+
+    def watch(self, key, polarity, start):
+        """Record the block just opened (its '{' on line `start`) as guarded, as for guard()."""
+        if self.blocks and self.blocks[-1][:2] == (self.depth, start):
+            # The block of an `else if`, already guarded by the negated checks before it
+            self.blocks[-1][2].append((key, polarity))
+            self.blocks[-1][3].append((key, polarity))
+        else:
+            self.blocks.append((self.depth, start, [(key, polarity)], [(key, polarity)]))
+
+    def _clause_keys(self, text):
+        """
+        The (key, polarity) guarding the body of the statement `text`, and the checks an `else`
+        after it negates: its own checks if it is an `if`/`while`, and for an `else if` or
+        `else` those of the clauses before it, negated.
+        """
+        keys = []
+        negated = []
+        if self.closed is not None and self.closed[0] == self.depth:
+            if _ELSE_IF.match(text):
+                negated = list(self.closed[1])
+            if negated or _ELSE.match(text) or _ELSE_BODY.match(text):
+                keys = [(key, -polarity) for key, polarity in self.closed[1]]
+        if self.guards and _GUARD_HEAD.match(text):
+            own = [(key, polarity) for depth, key, polarity in self.guards if depth == self.depth]
+            keys += own
+            negated += own
+        return keys, negated
+
+    def _guarded_block(self, lineno):
+        """A '{' with guards pending: open a guarded block if it is the one of their condition, or an `else`."""
+        text = self._statement()
+        keys, negated = [], []
+        if text.count('(') == text.count(')'):
+            keys, negated = self._clause_keys(text)
+        if keys:
+            self.blocks.append((self.depth + 1, lineno, keys, negated))
+        self.guards = []
+        self.closed = None
+
+    def _end_statement(self, pos):
+        """
+        A ';' at offset `pos`: if it ends the braceless body of a guarded statement
+        (`if (check) stmt;`, `else stmt;`), record the statement's lines as its region.
+        """
+        keys = negated = None
+        if self.guards or self.closed:
+            text = self._statement()
+            if text.count('(') == text.count(')') and _has_body(text):
+                keys, negated = self._clause_keys(text)
+        if keys:
+            start = self._statement_line()
+            end = self._locate(pos)[0]
+            self.regions.extend(Guarded(key, start, end, polarity) for key, polarity in keys)
+        self.guards = []
+        self.closed = (self.depth, negated) if negated else None
+
+    def _statement_line(self):
+        """The line the current statement starts on (the first line of the text fed last, if it started before)."""
+        return self._locate(_LEADING.match(self.text, self.boundary).end())[0]
+
+    def _string(self, text, lineno, line):
+        """A completed string: a token while capturing, statement text while skimming."""
+        if not self.capturing:
+            self.head.append(text)
+            return None
+        token = self._token('string', text, lineno, line)
+        if self.skim is not None:
+            self._capture_ends(token)
+        return token
+
+    def _substitution(self, delimiter, piece):
+        """A string `piece` just lexed: if it ends at a template substitution `${`, its code follows."""
+        if delimiter == self.template and piece.endswith('${'):
+            self.templates.append(self.depth)
+
+    def _ends_substitution(self):
+        """Whether a '}' now closes a template substitution rather than a block."""
+        return bool(self.templates) and self.templates[-1] == self.depth
+
+    def _resume_template(self, text, start):
+        """
+        The '}' at `start` closes a template substitution: returns the end of the template
+        piece it starts, or None if the piece continues past the text (left open in `state`).
+        """
+        self.templates.pop()
+        closing = self.strings[self.template][0].match(text, start + 1)
+        if closing is None:
+            self.state = ('string', self.template, text[start:], self._locate(start)[0])
+            return None
+        self._substitution(self.template, text[start:closing.end()])
+        return closing.end()
+
+    def feed(self, lineno, text):
+        """Tokens of `text`, starting at line `lineno` (the same lineno again continues a cut line)."""
+        new_line = lineno != self.lineno
+        self.text = text
+        self.first_lineno = lineno
+        self.line = None
+        self.boundary = 0
+        self.lineno = lineno + text.count('\n')
+        if self.head:
+            head = ''.join(self.head) + ('\n' if new_line else '')
+            self.head = [head[-HEAD_LIMIT:]]
+        pos = 0
+        end = len(text)
+        state = self.state
+        self.state = None
+        token = None
+        if state == 'line':
+            if not new_line:
+                pos = text.find('\n')
+                if pos == -1:
+                    self.state = 'line'
+                    return
+        elif state is not None and state != 'block':
+            _, delimiter, before, start_line = state
+            pattern, multiline = self.strings[delimiter]
+            if new_line and not multiline:
+                # An unterminated single-line string ends with its line
+                token = self._string(before, start_line, self._locate(0)[1])
+            else:
+                before += '\n' if new_line else ''
+                match = pattern.match(text)
+                if match is not None:
+                    pos = match.end()
+                elif not multiline and '\n' in text:
+                    pos = text.find('\n')
+                else:
+                    self.state = ('string', delimiter, before + text, start_line)
+                    return
+                token = self._string(before + text[:pos], start_line, self._locate(0)[1])
+                self._substitution(delimiter, text[:pos])
+        elif state == 'block':
+            close = text.find(self.block_end)
+            if close == -1:
+                self.state = 'block'
+                return
+            pos = close + len(self.block_end)
+        if token is not None:
+            yield token
+        while pos < end and self.state is None:
+            if self.capturing:
+                pos = yield from self._code(text, pos)
+            else:
+                pos = self._skim(text, pos)
+                if self.capturing:
+                    yield None
+                    before = self.history[-1] if self.history else self.prev
+                    if before is not None:
+                        yield before
+
+    def _skim(self, text, pos):
+        """Pass over plain code up to the next trigger (returns its position) or the end of the text."""
+        search = self.skim.search
+        strings = self.strings
+        head = self.head
+        end = len(text)
+        while True:
+            match = search(text, pos)
+            if match is None:
+                head.append(text[pos:])
+                return end
+            group = match.lastgroup
+            start = match.start()
+            if start > pos:
+                head.append(text[pos:start])
+            pos = match.end()
+            if group == 'brace' and text[start] == '}' and self._ends_substitution():
+                pos = self._resume_template(text, start)
+                if pos is None:
+                    return end
+                head.append(text[start:pos])
+            elif group == 'brace':
+                brace = text[start]
+                if brace == '{':
+                    lineno, line = self._locate(start)
+                    self._open_brace(self._head_function(lineno, line), lineno)
+                elif brace == '}':
+                    self._close_brace(self._locate(start)[0])
+                else:
+                    self._end_statement(start)
+                self.boundary = pos
+                self.history = []
+                self.prefix = ''
+                self.head = head = []
+                self.prev = None
+            elif group == 'trigger':
+                lineno, line = self._locate(start)
+                text_before = ''.join(head)
+                if self.history:
+                    self.history.extend(self._tokens_of(text_before, lineno, line))
+                else:
+                    # Only the token before the trigger is needed now
+                    self.prefix = text_before[-HEAD_LIMIT:]
+                    self.prev = self._last_token(self.prefix, lineno, line)
+                self.head = []
+                self.capturing = True
+                self.level = None
+                self.capture_depth = self.depth
+                return start
+            elif group == 'string':
+                delimiter = match.group(group)
+                pattern, multiline = strings[delimiter]
+                closing = pattern.match(text, pos)
+                if closing is not None:
+                    pos = closing.end()
+                elif multiline or text.find('\n', pos) == -1:
+                    self.state = ('string', delimiter, text[start:], self._locate(start)[0])
+                    return end
+                else:
+                    pos = text.find('\n', pos)
+                head.append(text[start:pos])
+                self._substitution(delimiter, text[start:pos])
+            elif group == 'comment':
+                pos = text.find('\n', pos)
+                if pos == -1:
+                    self.state = 'line'
+                    return end
+            elif group == 'block':
+                close = text.find(self.block_end, pos)
+                if close == -1:
+                    self.state = 'block'
+                    return end
+                pos = close + len(self.block_end)
+                head.append(' ')
+            else:
+                literal = _JS_REGEX.match(text, start) if self._slash_starts_regex() else None
+                if literal:
+                    pos = literal.end()
+                head.append(text[start:pos])
+
+    def _slash_starts_regex(self):
+        tail = ''.join(self.head[-2:]).rstrip()
+        if not tail:
+            return self._regex_allowed()
+        if tail[-1] in _REGEX_AFTER_OPS:
+            return True
+        word = re.search(r'[\w$]+$', tail)
+        return word is not None and word.group() in _REGEX_AFTER_WORDS
+
+    def _head_function(self, lineno, line):
+        """Function name of the statement before a '{' (skimming)."""
+        text = ''.join(self.head)
+        if not self.history:
+            start = self.header_start(text)
+            if start == -1:
+                return None
+            return self.function_name(list(self._tokens_of(text[start:], lineno, line)))
+        tokens = self.history
+        if self.prefix:
+            prefix = self.prefix[self.header_start(self.prefix, more=True):]
+            tokens = list(self._tokens_of(prefix, lineno, line, None)) + tokens
+        if text:
+            tokens = tokens + list(self._tokens_of(text, lineno, line))
+        return self.function_name(tokens)
+
+    def _last_token(self, text, lineno, line):
+        """The last token of statement text, from as little of its end as possible."""
+        text = text.rstrip()
+        if not text:
+            return None
+        word = _LAST_WORD.search(text)
+        tail = word.group() if word else text[-3:] if text[-1] not in self.strings else text[-HEAD_LIMIT:]
+        tokens = list(self._tokens_of(tail, lineno, line, None))
+        return tokens[-1] if tokens else None
+
+    def _tokens_of(self, text, lineno, line, prev=False):
+        """Tokens of statement text collected while skimming (complete strings, no comments)."""
+        match_at = self.master.match
+        strings = self.strings
+        pos = 0
+        templates = []      # open template substitutions: the braces open in each
+        if prev is False:
+            prev = self.history[-1] if self.history else None
+        while True:
+            match = match_at(text, pos)
+            if match is None:
+                return
+            group = match.lastgroup
+            start = match.start(group)
+            pos = match.end()
+            if group == 'string':
+                delimiter = match.group(group)
+                closing = strings[delimiter][0].match(text, pos)
+                pos = closing.end() if closing else len(text)
+                if delimiter == self.template and closing is not None and closing.group().endswith('${'):
+                    templates.append(0)
+            elif templates and group == 'op' and text[start] in '{}':
+                if text[start] == '{':
+                    templates[-1] += 1
+                elif templates[-1]:
+                    templates[-1] -= 1
+                else:
+                    # The template literal continues after its substitution
+                    templates.pop()
+                    closing = strings[self.template][0].match(text, pos)
+                    pos = closing.end() if closing else len(text)
+                    group = 'string'
+                    if closing is not None and closing.group().endswith('${'):
+                        templates.append(0)
+            elif group == 'op' and text[start] == '/' and self.regex_literals and (
+                    prev is None or (prev.kind == 'op' and prev.text in _REGEX_AFTER_OPS)
+                    or (prev.kind == 'ident' and prev.text in _REGEX_AFTER_WORDS)):
+                literal = _JS_REGEX.match(text, start)
+                if literal:
+                    group, pos = 'regex', literal.end()
+            elif group not in ('ident', 'number', 'op'):
+                continue
+            prev = Token(group, text[start:pos], lineno, line, self.depth, self.context)
+            yield prev
+
+    def _code(self, text, pos):
+        """Tokenize from `pos`; returns where a capture ended or the end of the text."""
+        master = self.master
+        strings = self.strings
+        end = len(text)
+        while pos < end:
+            match = master.match(text, pos)
+            if match is None:
+                break
+            group = match.lastgroup
+            start = match.start(group)
+            pos = match.end()
+            if group == 'comment':
+                pos = text.find('\n', pos)
+                if pos == -1:
+                    self.state = 'line'
+                    return end
+                continue
+            if group == 'block':
+                close = text.find(self.block_end, pos)
+                if close == -1:
+                    self.state = 'block'
+                    return end
+                pos = close + len(self.block_end)
+                continue
+            lineno, line = self._locate(start)
+            if group == 'ident' or group == 'number':
+                token = self._token(group, match.group(group), lineno, line)
+            elif group == 'string':
+                delimiter = match.group(group)
+                pattern, multiline = strings[delimiter]
+                closing = pattern.match(text, pos)
+                if closing is not None:
+                    pos = closing.end()
+                elif multiline or text.find('\n', pos) == -1:
+                    self.state = ('string', delimiter, text[start:], lineno)
+                    return end
+                else:
+                    # An unterminated single-line string ends with its line
+                    pos = text.find('\n', pos)
+                token = self._token('string', text[start:pos], lineno, line)
+                self._substitution(delimiter, token.text)
+            else:
+                op = match.group(group)
+                literal = None
+                if op == '/' and self.regex_literals and self._regex_allowed():
+                    literal = _JS_REGEX.match(text, start)
+                if literal:
+                    pos = literal.end()
+                    token = self._token('regex', literal.group(), lineno, line)
+                elif op == '}' and self._ends_substitution():
+                    pos = self._resume_template(text, start)
+                    if pos is None:
+                        return end
+                    token = self._token('string', text[start:pos], lineno, line)
+                elif op == '{':
+                    if self.skim is None:
+                        name = self.function_name(self.history)
+                    else:
+                        name = self._head_function(lineno, line)
+                    token = self._token('op', op, lineno, line)
+                    self._open_brace(name, lineno)
+                    self.boundary = pos
+                    self.history = []
+                    self.prefix = ''
+                elif op == '}':
+                    self._close_brace(lineno)
+                    token = self._token('op', op, lineno, line)
+                    self.boundary = pos
+                    self.history = []
+                    self.prefix = ''
+                elif op == ';':
+                    self._end_statement(start)
+                    token = self._token('op', op, lineno, line)
+                    self.boundary = pos
+                    self.history = []
+                    self.prefix = ''
+                else:
+                    token = self._token('op', op, lineno, line)
+            yield token
+            if self.skim is not None and self._capture_ends(token):
+                return pos
+        return end
+
+    def _capture_ends(self, token):
+        text = token.text if token.kind == 'op' else None
+        if self.capture == 'block':
+            done = (text == '{' and token.depth == self.capture_depth) or self.depth < self.capture_depth
+        elif self.level is None:
+            # The trigger itself
+            self.level = 0
+            done = False
+        elif self.level == 0:
+            # A call only if the trigger is followed by its argument list
+            done = text != '('
+            self.level = 1
+        else:
+            if text == '(':
+                self.level += 1
+            elif text == ')':
+                self.level -= 1
+            done = self.level == 0
+        if done:
+            self.capturing = False
+        return done
+
+    def _regex_allowed(self):
+        prev = self.prev
+        if prev is None:
+            return True
+        if prev.kind == 'op':
+            return prev.text in _REGEX_AFTER_OPS
+        if prev.kind == 'string':
+            # The start of a template substitution
+            return prev.text.endswith('${')
+        return prev.kind == 'ident' and prev.text in _REGEX_AFTER_WORDS
+
+    def close(self):
+        """Flush an unterminated string and close the functions and guarded blocks left open at end of file."""
+        if isinstance(self.state, tuple):
+            _, _, text, start_line = self.state
+            self.state = None
+            token = self._string(text, start_line, '')
+            if token is not None:
+                yield token
+        while self.functions:
+            name, _, start = self.functions.pop()
+            self.spans.append(Span(name, start, self.lineno))
+        while self.blocks:
+            _, start, keys, _ = self.blocks.pop()
+            self.regions.extend(Guarded(key, start, self.lineno, polarity) for key, polarity in keys)
+
+
+def may_contain(source, words, ignore_case=False):
+    """
+    False only if an in-memory `source` (str, bytes or mmap) contains none of `words`;
+    lets an analyzer skip files that cannot have findings without lexing them.
+    Streamed sources are not searched ahead and always may contain them.
+    """
+    if not isinstance(source, (str, bytes, bytearray, mmap.mmap)):
+        return True
+    if ignore_case:
+        source = (source[:] if isinstance(source, mmap.mmap) else source).lower()
+        words = [word.lower() for word in words]
+    if not isinstance(source, str):
+        words = [word.encode() for word in words]
+    return any(source.find(word) != -1 for word in words)
+
+
+def tokenize(source, language, max_line_length=DEFAULT_MAX_LINE_LENGTH, lexer=None, triggers=None, capture='call'):
+    """
+    Yield the tokens of `source` (anything iter_source_lines accepts); pass `lexer` to read its spans after.
+    With `triggers`, only the captures around those names are tokenized (see Lexer).
+    """
+    lexer = lexer or Lexer(language, triggers, capture, max_line_length)
+    for lineno, text in iter_source_chunks(source, max_line_length):
+        yield from lexer.feed(lineno, text)
+    yield from lexer.close()
+
+
+def function_spans(source, language, max_line_length=DEFAULT_MAX_LINE_LENGTH):
+    """Named function bodies of `source` as Span(name, start, end), in closing order."""
+    lexer = Lexer(language, triggers=(), max_line_length=max_line_length)
+    for _ in tokenize(source, language, max_line_length, lexer):
+        pass
+    return lexer.spans
+
+
+def polarity(text):
+    """-1 if the text before a call ends in its negation (`if (!flags.`), else 1."""
+    return -1 if _NEGATED.search(text) else 1
+
+
+def string_value(token):
+    """The contents of a string token without its quotes (None for other tokens)."""
+    if token.kind != 'string':
+        return None
+    for delimiter in ('"""', '"', "'", '`'):
+        if token.text.startswith(delimiter):
+            text = token.text[len(delimiter):]
+            return text[:-len(delimiter)] if text.endswith(delimiter) else text
+    return token.text
+
+
+def iter_calls(tokens, names):
+    """
+    Calls `name(arg, ...)` of the wanted names, with the tokens of each argument;
+    yielded when the closing parenthesis is reached (arguments may span lines).
+    `tokens` may be a full or a skimmed stream (tokenize with triggers=names).
+    """
+    open_calls = []     # [name_token, prev, paren_level, args]
+    level = 0
+    prev = None
+    before = None
+    for token in tokens:
+        if token is None:
+            # A gap in a skimmed stream
+            prev = before = None
+            continue
+        text = token.text if token.kind == 'op' else None
+        if text == ',' and open_calls and open_calls[-1][2] == level:
+            open_calls[-1][3].append([])
+            for call in open_calls[:-1]:
+                call[3][-1].append(token)
+        else:
+            if text == ')' and open_calls and open_calls[-1][2] == level:
+                name_token, call_prev, _, args = open_calls.pop()
+                if not args[-1]:
+                    args.pop()
+                yield Call(name_token.text, name_token, call_prev, args)
+            for call in open_calls:
+                call[3][-1].append(token)
+            if text == '(':
+                level += 1
+                if prev is not None and prev.kind == 'ident' and prev.text in names:
+                    open_calls.append([prev, before, level, [[]]])
+            elif text == ')':
+                level = max(level - 1, 0)
+        before, prev = prev, token
+
+
+def join_tokens(tokens):
+    """Source-like text of an argument: words separated by spaces, operators attached."""
+    text = ''
+    previous = None
+    for token in tokens:
+        if previous is not None and previous.kind != 'op' and token.kind != 'op':
+            text += ' '
+        text += token.text
+        previous = token
+    return text
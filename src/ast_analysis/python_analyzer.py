@@ -1,39 +1,323 @@
 from .base_analyzer import BaseAnalyzer
+from .lexer import Guarded, may_contain
+from .utils import iter_source_chunks
+from bisect import bisect_right
+from functools import lru_cache
 import re
 
+_DEF = re.compile(r'^([ \t]*)(?:async[ \t]+)?def[ \t]+([\w_]+)\s*\(', re.M)
+_PAREN = re.compile(r'[()]')
+_HEADER_END = re.compile(r'[^:\n]*:')
+# A line starting a clause whose condition may guard a block; group 1 is its indent
+_GUARD = re.compile(r'([ \t]*)(?:if|elif|while)\b')
+_CLAUSE = re.compile(r'(elif|else)\b')
+_NEGATED = re.compile(r'\bnot\s+[\w.]*\Z')
+# Where a comment or a string starts (a triple quote before a single one)
+_STRING_START = re.compile('#|"""|\'\'\'|"|\'')
+
+
+@lru_cache(maxsize=None)
+def _dedent(indent):
+    """The next line indented by at most `indent` that is not blank or a comment."""
+    return re.compile(r'^[ \t]{0,%d}(?=[^\s#])' % indent, re.M)
+
+
+def _quote_end(text, pos, delimiter):
+    """Offset of the first `delimiter` at or after `pos` not escaped by a backslash, or -1."""
+    while True:
+        end = text.find(delimiter, pos)
+        if end == -1:
+            return -1
+        i = end
+        while i > pos and text[i - 1] == '\\':
+            i -= 1
+        if (end - i) % 2 == 0:
+            return end
+        pos = end + 1
+
+
+class _TripleStrings:
+    """
+    The insides of triple-quoted strings of a buffer, where a line at any indent (say a
+    docstring continued at column 0) neither ends a block nor starts a function. Comments and
+    one-line strings on the lines of triple quotes are stepped over, so quotes in them do not
+    count. A string still open at the end of a buffer carries over to the next buffer of the same file.
+    """
+    def __init__(self):
+        self.open = None    # delimiter of the string open at the end of the last buffer
+        self.starts = []
+        self.ends = []
+
+    def scan(self, text):
+        self.starts = []
+        self.ends = []
+        pos = 0
+        if self.open is not None:
+            pos = self._add(text, 0, self.open)
+        # Next offset of each kind of triple quote (len(text): none left), searched again once passed
+        found = {'"""': -1, "'''": -1}
+        while pos is not None:
+            for delimiter, at in found.items():
+                if at != len(text) and at < pos:
+                    at = text.find(delimiter, pos)
+                    found[delimiter] = len(text) if at == -1 else at
+            first = min(found.values())
+            if first == len(text):
+                break
+            # Comments and one-line strings end with their line: only the line of the quotes can hide them
+            pos = self._line(text, max(pos, text.rfind('\n', 0, first) + 1))
+
+    def _line(self, text, pos):
+        """Step through the rest of the line at `pos`; the offset to go on from (None: a string is open)."""
+        eol = text.find('\n', pos)
+        if eol == -1:
+            eol = len(text)
+        while True:
+            match = _STRING_START.search(text, pos, eol)
+            if match is None or match.group() == '#':
+                return eol
+            token = match.group()
+            if len(token) == 3:
+                return self._add(text, match.end(), token)
+            end = _quote_end(text, match.end(), token)
+            if end == -1 or end > eol:
+                return eol
+            pos = end + 1
+
+    def _add(self, text, start, delimiter):
+        """Record the string from `start`; the offset after it, or None if it is still open."""
+        end = _quote_end(text, start, delimiter)
+        self.starts.append(start)
+        if end == -1:
+            self.ends.append(len(text))
+            self.open = delimiter
+            return None
+        # Through the closing quotes, which may start a line of their own
+        self.ends.append(end + len(delimiter))
+        self.open = None
+        return end + len(delimiter)
+
+    def search(self, regex, text, pos, endpos=None):
+        """regex.search(text, pos, endpos), skipping matches that start inside a string."""
+        endpos = len(text) if endpos is None else endpos
+        starts, ends = self.starts, self.ends
+        while True:
+            match = regex.search(text, pos, endpos)
+            if match is None or not starts:
+                return match
+            i = bisect_right(starts, match.start()) - 1
+            if i < 0 or match.start() >= ends[i]:
+                return match
+            pos = ends[i]
+
+
+class _ContextTable:
+    """
+    Enclosing function by offset, built from one regex pass over a buffer: a function
+    spans from its `def` to the next line indented no deeper than the `def`, outside
+    triple-quoted strings. The open functions carry over to the next buffer of the same file.
+    """
+    def __init__(self, strings):
+        self.strings = strings
+        self.stack = []     # open functions: (indent, name)
+
+    @property
+    def context(self):
+        return self.stack[-1][1] if self.stack else None
+
+    def build(self, text):
+        """Sorted offsets of `text` where the context changes, and the context from each."""
+        offsets = [0]
+        contexts = [self.context]
+        pos = 0
+        end = len(text)
+        while pos < end:
+            match = self.strings.search(_DEF, text, pos)
+            limit = match.start() if match else end
+            close = self.strings.search(_dedent(self.stack[-1][0]), text, pos, limit + 1) if self.stack else None
+            if close is not None:
+                # A dedent (or a def no deeper) closes the innermost function
+                self.stack.pop()
+                offsets.append(close.start())
+                contexts.append(self.context)
+                pos = close.start()
+                if self.stack and _dedent(self.stack[-1][0]).match(text, pos):
+                    continue
+                if match is None or close.start() < match.start():
+                    pos = text.find('\n', pos) + 1 or end
+                continue
+            if match is None:
+                break
+            self.stack.append((len(match.group(1)), match.group(2)))
+            offsets.append(match.start())
+            contexts.append(match.group(2))
+            pos = self._header_end(text, match.end())
+        return offsets, contexts
+
+    @staticmethod
+    def _header_end(text, pos):
+        """Offset of the line after a def header whose '(' ends at `pos` (parameters may span lines)."""
+        level = 1
+        for paren in _PAREN.finditer(text, pos):
+            level += 1 if paren.group() == '(' else -1
+            if level == 0:
+                colon = _HEADER_END.match(text, paren.end())
+                pos = colon.end() if colon else paren.end()
+                break
+        else:
+            return len(text)
+        return text.find('\n', pos) + 1 or len(text)
+
+
+class _GuardedBlocks:
+    """
+    Blocks guarded by checks in `if`/`elif`/`while` headers, from the header line to the
+    last line of the block (a one-line body: the header line alone), and the `elif` and
+    `else` clauses of the same statement after it, with the opposite polarity. The
+    header must fit on the line of the check. A block still open at the end of a buffer
+    carries over to the next buffer of the same file (an `else` after it is not followed).
+    Lines inside triple-quoted strings do not end a block.
+    """
+    def __init__(self, strings):
+        self.strings = strings
+        self.open = []      # (indent, key, start line, polarity)
+        self.regions = []
+        self.last_line = None
+
+    def _line_of(self, text, first_lineno, newlines, pos):
+        """The last line with code before offset `pos` (or the previous buffer's)."""
+        pos -= 1
+        while pos >= 0 and text[pos].isspace():
+            pos -= 1
+        if pos < 0:
+            return self.last_line
+        return first_lineno + bisect_right(newlines, pos)
+
+    def carry(self, text, first_lineno, newlines):
+        """Close the blocks left open by the previous buffers where `text` dedents past them."""
+        still_open = []
+        for indent, key, start, polarity in self.open:
+            close = self.strings.search(_dedent(indent), text, 0)
+            if close is None:
+                still_open.append((indent, key, start, polarity))
+            else:
+                end = self._line_of(text, first_lineno, newlines, close.start())
+                self.regions.append(Guarded(key, start, max(start, end), polarity))
+        self.open = still_open
+
+    def add(self, text, first_lineno, newlines, line_start, match, key):
+        """The check `match` (on the line at `line_start`) of finding `key`, if it is in a header."""
+        header = _GUARD.match(text, line_start)
+        if header is None or text.find(':', header.end(), match.start()) != -1:
+            return
+        colon = _HEADER_END.match(text, match.end())
+        if colon is None:
+            return
+        indent = len(header.group(1))
+        polarity = -1 if _NEGATED.search(text, line_start, match.start()) else 1
+        start = first_lineno + bisect_right(newlines, match.start())
+        close = self._clause(text, first_lineno, newlines, colon.end(), indent, key, start, polarity)
+        # The `elif` clauses and the `else`, where the check failed
+        while close is not None and close.end() - close.start() == indent:
+            clause = _CLAUSE.match(text, close.end())
+            colon = clause and _HEADER_END.match(text, clause.end())
+            if colon is None:
+                break
+            start = first_lineno + bisect_right(newlines, clause.start())
+            close = self._clause(text, first_lineno, newlines, colon.end(), indent, key, start, -polarity)
+            if clause.group(1) == 'else':
+                break
+
+    def _clause(self, text, first_lineno, newlines, body, indent, key, start, polarity):
+        """
+        Record the region of the clause whose header ends at offset `body`; returns the
+        dedent match after it, None at the end of the buffer.
+        """
+        eol = text.find('\n', body)
+        if eol == -1:
+            eol = len(text)
+        close = self.strings.search(_dedent(indent), text, eol + 1) if eol < len(text) else None
+        rest = text[body:eol].strip()
+        if rest and not rest.startswith('#'):
+            self.regions.append(Guarded(key, start, start, polarity))
+        elif close is None:
+            self.open.append((indent, key, start, polarity))
+        else:
+            end = self._line_of(text, first_lineno, newlines, close.start())
+            self.regions.append(Guarded(key, start, max(start, end), polarity))
+        return close
+
+    def end_buffer(self, text, first_lineno, newlines):
+        self.last_line = self._line_of(text, first_lineno, newlines, len(text))
+
+    def finish(self):
+        """The regions, with the blocks still open closed at the last line of the file."""
+        for indent, key, start, polarity in self.open:
+            self.regions.append(Guarded(key, start, max(start, self.last_line or start), polarity))
+        self.open = []
+        return self.regions
+
+
 class PythonAnalyzer(BaseAnalyzer):
+    language = 'python'
+
     def analyze(self, source_code):
         """
-        Analyze Python source code for feature flag dependencies, e.g. is_feature_enabled("flag").
+        Analyze Python source code for feature flag dependencies, e.g. is_feature_enabled("flag"),
+        or the calls of any other Python SDK profile (see sdk_profiles), all in one regex pass:
+        is_feature_enabled('flag') or is_feature_enabled(flag_var) after any module/object prefix.
         Extracts the enclosing function as context if possible.
-        Matches all forms: module/object prefixes, extra args, and variable usage.
+        Matches all forms: module/object prefixes, extra args, variable usage, and calls spanning lines.
+        An in-memory source is scanned as one buffer; match offsets are mapped to lines by bisecting
+        the newline offsets, and to the enclosing function through a context table. A streamed
+        source is scanned in chunks of lines, where a call spanning two chunks is not matched.
+        With record_regions, a check in an `if`/`elif`/`while` header gets the lines of the block it guards.
         """
         dependencies = []
-        # Regex for (optional prefix) is_feature_enabled('flag') or is_feature_enabled(flag_var)
-        pattern = re.compile(r"(?:[\w_]+\.)*is_feature_enabled\s*\(([^)]*)\)")
-        # Regex for function definitions
-        func_pattern = re.compile(r'^\s*def\s+([\w_]+)\s*\(')
-        lines = source_code.split('\n')
-        current_func = None
-        for idx, line in enumerate(lines, 1):
-            # Check if the line defines a new function
-            func_match = func_pattern.match(line)
-            if func_match:
-                current_func = func_match.group(1)
-            # Find all feature flag usages in the line
-            for match in pattern.finditer(line):
-                arg = match.group(1).split(',')[0].strip()
-                # Try to extract string literal, else record as variable
-                str_match = re.match(r"['\"]([\w\-]+)['\"]", arg)
-                if str_match:
-                    flag_name = str_match.group(1)
-                else:
-                    flag_name = arg  # variable or expression
+        if not may_contain(source_code, self.matcher.names):
+            return dependencies
+        strings = _TripleStrings()
+        table = _ContextTable(strings)
+        blocks = _GuardedBlocks(strings) if self.record_regions else None
+        for first_lineno, text in iter_source_chunks(source_code, self.max_line_length, chunk_chars=None):
+            strings.scan(text)
+            matches = list(self.matcher.finditer(text))
+            if not matches:
+                if table.stack or 'def' in text:
+                    table.build(text)
+                if blocks is not None and blocks.open:
+                    newlines = [m.start() for m in re.finditer('\n', text)]
+                    blocks.carry(text, first_lineno, newlines)
+                    blocks.end_buffer(text, first_lineno, newlines)
+                continue
+            offsets, contexts = table.build(text)
+            newlines = [m.start() for m in re.finditer('\n', text)]
+            if blocks is not None:
+                blocks.carry(text, first_lineno, newlines)
+            for match in matches:
+                start = match.start()
+                # A string literal, else the variable or expression
+                key = self.matcher.key_text(match.group(1), match.group(2))
+                if key is None:
+                    continue
+                flag_name, kind = key
+                line = bisect_right(newlines, start)
+                line_start = newlines[line - 1] + 1 if line else 0
+                line_end = newlines[line] if line < len(newlines) else len(text)
+                if blocks is not None:
+                    blocks.add(text, first_lineno, newlines, line_start, match, len(dependencies))
+                if line_end - line_start > self.max_line_length:
+                    line_start = max(line_start, start - self.max_line_length // 2)
+                    line_end = min(line_end, line_start + self.max_line_length)
                 dependencies.append({
-                    'type': 'is_feature_enabled',
+                    'type': kind,
                     'dependency': flag_name,
-                    'lineno': idx,
-                    'context': current_func,
-                    'code': line.strip()
+                    'lineno': first_lineno + line,
+                    'context': contexts[bisect_right(offsets, start) - 1],
+                    'code': text[line_start:line_end].strip()
                 })
+            if blocks is not None:
+                blocks.end_buffer(text, first_lineno, newlines)
+        if blocks is not None:
+            self._attach_regions(dependencies, blocks.finish())
         return dependencies
@@ -0,0 +1,118 @@
+"""
+Per-module summary of Python definitions, imports and calls, for the call graph.
+
+One ast pass over a module records what feature_flag.call_graph needs to resolve
+calls across modules, as plain lists and dicts (picklable, JSON-serializable):
+- functions: [qualname, first line, last line], qualified within the module
+  (`Cart.total`, `outer.inner`);
+- classes: {qualname: [base references]}, for method lookup through base classes;
+- imports: {local name: absolute dotted target}, relative imports resolved against
+  the module's package;
+- calls: [caller qualname, reference, line] for every call made inside a function,
+  the reference being the dotted callee expression (`helper`, `mod.helper`,
+  `self.save`, `super().save`); other callees (subscripts, call results) are skipped.
+"""
+import ast
+import os
+
+
+def module_name(file_path, root):
+    """(dotted module name, is_package) of a file under `root`."""
+    rel = os.path.relpath(file_path, root)
+    if rel.startswith(os.pardir):
+        rel = os.path.basename(file_path)
+    parts = os.path.splitext(rel)[0].split(os.sep)
+    if parts[-1] == '__init__' and len(parts) > 1:
+        return '.'.join(parts[:-1]), True
+    return '.'.join(parts), False
+
+
+def _reference(node):
+    """Dotted text of a callee expression, or None."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+    elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'super':
+        parts.append('super()')
+    else:
+        return None
+    return '.'.join(reversed(parts))
+
+
+class _ModuleCollector(ast.NodeVisitor):
+    def __init__(self, module, is_package):
+        self.package = module if is_package else module.rpartition('.')[0]
+        self.scope = []         # enclosing definitions: (name, is_class)
+        self.functions = []
+        self.classes = {}
+        self.imports = {}
+        self.calls = []
+
+    def _qualname(self, name):
+        return '.'.join([n for n, _ in self.scope] + [name])
+
+    def _visit_function(self, node):
+        qualname = self._qualname(node.name)
+        self.functions.append([qualname, node.lineno, getattr(node, 'end_lineno', node.lineno)])
+        # Decorators and defaults are evaluated in the enclosing scope
+        for child in node.decorator_list + node.args.defaults + node.args.kw_defaults:
+            if child is not None:
+                self.visit(child)
+        self.scope.append((node.name, False))
+        for child in node.body:
+            self.visit(child)
+        self.scope.pop()
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    def visit_ClassDef(self, node):
+        self.classes[self._qualname(node.name)] = [ref for ref in map(_reference, node.bases) if ref]
+        for child in node.decorator_list + node.bases:
+            self.visit(child)
+        self.scope.append((node.name, True))
+        for child in node.body:
+            self.visit(child)
+        self.scope.pop()
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            if alias.asname:
+                self.imports[alias.asname] = alias.name
+            else:
+                # `import a.b` binds `a`
+                head = alias.name.split('.')[0]
+                self.imports[head] = head
+
+    def visit_ImportFrom(self, node):
+        base = node.module or ''
+        if node.level:
+            package = self.package.split('.') if self.package else []
+            package = package[:len(package) - (node.level - 1)] if node.level > 1 else package
+            base = '.'.join(package + ([base] if base else []))
+        for alias in node.names:
+            if alias.name != '*':
+                self.imports[alias.asname or alias.name] = f"{base}.{alias.name}" if base else alias.name
+
+    def visit_Call(self, node):
+        if self.scope and not self.scope[-1][1]:
+            reference = _reference(node.func)
+            if reference is not None:
+                self.calls.append(['.'.join(name for name, _ in self.scope), reference, node.lineno])
+        self.generic_visit(node)
+
+
+def module_summary(source_code, module, is_package=False):
+    """The summary of one module (see the module docstring); raises SyntaxError."""
+    collector = _ModuleCollector(module, is_package)
+    collector.visit(ast.parse(source_code))
+    return {
+        'module': module,
+        'functions': collector.functions,
+        'classes': collector.classes,
+        'imports': collector.imports,
+        'calls': collector.calls,
+    }
@@ -0,0 +1,168 @@
+"""
+Declarative flag SDK profiles, compiled into one matcher per language.
+
+A profile says how one flag SDK (or project wrapper) is called, instead of the call
+syntax living in each analyzer's analyze():
+- calls: the names of the check calls (the last identifier of the callee, so
+  `client.isEnabled(...)`, `FeatureFlag.isEnabled(...)` and `isEnabled(...)` match);
+- arg: the position of the argument holding the flag key;
+- key: 'literal' reports only string literal keys; 'any' also reports a variable or
+  expression key as its text;
+- pattern: a regex a literal key must match entirely (None: any literal); with
+  key='any', a literal that does not match is reported as text;
+- type: the 'type' of its findings (None: the call name).
+
+compile_profiles() merges the profiles of a language into one ProfileMatcher: one
+set of trigger names for the lexer (one skim pattern, see lexer.Lexer) or one regex
+alternation (Python, where finditer() locates the names by plain string search
+first), so a file is scanned once however many SDKs are profiled. It is cached, as are the analyzers built on it (see reasoning.AnalyzerFactory).
+
+Extra profiles can be kept in a JSON file, a list of objects with the fields above
+plus 'name' and 'language' (see load_profiles).
+"""
+import json
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from .lexer import string_value, join_tokens
+
+LANGUAGES = ('python', 'java', 'javascript', 'go')
+KEY_RULES = ('literal', 'any')
+
+SdkProfile = namedtuple('SdkProfile', 'name language calls arg key pattern type', defaults=(0, 'any', None, None))
+
+DEFAULT_PROFILES = (
+    SdkProfile('is_feature_enabled', 'python', ('is_feature_enabled',), pattern=r'[\w\-]+',
+               type='is_feature_enabled'),
+    SdkProfile('feature-flag', 'java', ('isEnabled', 'isFeatureEnabled'), pattern=r'[\w\-]+'),
+    SdkProfile('unleash', 'javascript', ('isEnabled',), key='literal', pattern=r'[\w\-\.]+',
+               type='unleash_isEnabled'),
+    # Unleash, CloudBees/Rox, LaunchDarkly and common wrappers; the Go analyzer reports `if`
+    # conditions, named after the first check called with a literal key
+    SdkProfile('flag-checks', 'go', ('BoolVariation', 'Enabled', 'GetValue', 'GetVariant', 'IntVariation',
+                                     'IsEnabled', 'IsFeatureEnabled', 'IsFlagEnabled', 'StringVariation'),
+               key='literal'),
+)
+
+
+def _validate(profile):
+    if profile.language not in LANGUAGES:
+        raise ValueError(f"SDK profile {profile.name!r}: unsupported language {profile.language!r}")
+    if not profile.calls or not all(re.fullmatch(r'[A-Za-z_$][\w$]*', name) for name in profile.calls):
+        raise ValueError(f"SDK profile {profile.name!r}: calls must be identifiers")
+    if not isinstance(profile.arg, int) or profile.arg < 0:
+        raise ValueError(f"SDK profile {profile.name!r}: arg must be a non-negative position")
+    if profile.key not in KEY_RULES:
+        raise ValueError(f"SDK profile {profile.name!r}: key must be one of {', '.join(KEY_RULES)}")
+    if profile.pattern is not None:
+        re.compile(profile.pattern)
+    return profile
+
+
+def profile_from_dict(data):
+    """An SdkProfile from its JSON form (`calls` may be one name or a list)."""
+    data = dict(data)
+    calls = data.get('calls')
+    data['calls'] = (calls,) if isinstance(calls, str) else tuple(calls or ())
+    try:
+        return _validate(SdkProfile(**data))
+    except TypeError as e:
+        raise ValueError(f"Invalid SDK profile {data.get('name')!r}: {e}")
+
+
+def load_profiles(path, defaults=DEFAULT_PROFILES):
+    """The profiles of a JSON file, after `defaults`, as a tuple (hashable: usable as a cache key)."""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('profiles', [])
+    return tuple(defaults) + tuple(profile_from_dict(item) for item in data)
+
+
+class ProfileMatcher:
+    """The profiles of one language: which calls to look for and how to read their keys."""
+    def __init__(self, language, profiles):
+        self.language = language
+        self.by_name = {}       # call name -> profiles calling it, in order
+        for profile in profiles:
+            for name in profile.calls:
+                self.by_name.setdefault(name, []).append(profile)
+        self.names = frozenset(self.by_name)
+        self._literals = {profile: re.compile(profile.pattern or r'.*', re.S) for profile in profiles}
+        # Python: the quoted key at the start of an argument's text
+        self._quoted = {profile: re.compile(r"['\"](%s)['\"]" % (profile.pattern or r"[^'\"]*"))
+                        for profile in profiles}
+        self._call = None
+
+    @property
+    def call_pattern(self):
+        """Regex of a call of any profiled name: group 1 the name, group 2 the argument text (Python)."""
+        if self._call is None:
+            names = '|'.join(re.escape(name) for name in sorted(self.names, key=len, reverse=True))
+            self._call = re.compile(r"(%s)\s*\(([^)]*)\)" % (names or r'(?!)'))
+        return self._call
+
+    def finditer(self, text):
+        """
+        The call_pattern matches in `text`, as call_pattern.finditer(text). With several names
+        the start of each is found by str.find, which skips ahead much faster than the regex
+        engine can through an alternation, and the pattern is only tried there.
+        """
+        pattern = self.call_pattern
+        if len(self.names) < 2:
+            yield from pattern.finditer(text)
+            return
+        starts = []
+        for name in self.names:
+            pos = text.find(name)
+            while pos != -1:
+                starts.append(pos)
+                pos = text.find(name, pos + 1)
+        end = 0
+        for pos in sorted(set(starts)):
+            if pos < end:
+                continue
+            match = pattern.match(text, pos)
+            if match is not None:
+                end = match.end()
+                yield match
+
+    def key(self, name, args):
+        """
+        (flag key, finding type) of a lexed call `name(args)` (args: token lists), or None
+        when no profile of `name` finds a key in it.
+        """
+        for profile in self.by_name.get(name, ()):
+            arg = args[profile.arg] if profile.arg < len(args) else None
+            if arg is None and (profile.arg or profile.key == 'literal'):
+                continue
+            arg = arg or []
+            value = string_value(arg[0]) if len(arg) == 1 else None
+            if value is not None and self._literals[profile].fullmatch(value):
+                return value, profile.type or name
+            if profile.key == 'any':
+                return join_tokens(arg), profile.type or name
+        return None
+
+    def key_text(self, name, args_text):
+        """(flag key, finding type) of a call `name(args_text)` matched by call_pattern, or None."""
+        parts = args_text.split(',')
+        for profile in self.by_name.get(name, ()):
+            if profile.arg >= len(parts):
+                continue
+            arg = parts[profile.arg].strip()
+            literal = self._quoted[profile].match(arg)
+            if literal:
+                return literal.group(1), profile.type or name
+            if profile.key == 'any':
+                return arg, profile.type or name
+        return None
+
+
+@lru_cache(maxsize=None)
+def compile_profiles(language, profiles=None):
+    """The cached ProfileMatcher of `language`'s profiles (DEFAULT_PROFILES when None)."""
+    if profiles is None:
+        profiles = DEFAULT_PROFILES
+    return ProfileMatcher(language, [_validate(p) for p in profiles if p.language == language])
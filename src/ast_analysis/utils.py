@@ -1 +1,197 @@
-# Shared AST utilities (placeholder)
+# Shared AST utilities
+import mmap
+import os
+import re
+
+
+# --- Bounded-memory source reading ---
+
+DEFAULT_MAX_FILE_BYTES = 5 * 1024 * 1024
+DEFAULT_MAX_LINE_LENGTH = 4096
+# Bytes sampled from the start of a file to detect minified/generated code
+SAMPLE_BYTES = 64 * 1024
+MINIFIED_AVG_LINE_LENGTH = 500
+GENERATED_MARKER = re.compile(rb'@generated|DO NOT EDIT|(?:auto|machine)[- ]generated|Code generated by', re.I)
+GENERATED_NAME = re.compile(r'(?:\.min\.js|[.-]bundle\.js|_pb2(?:_grpc)?\.py|\.pb\.go|\.generated\.\w+)$')
+# Where an overlong line may be split without cutting through a call
+_SPLIT_CHARS = ';{}'
+
+
+def _line_pieces(source, limit):
+    """
+    Yield (text, ends_line) pieces of at most `limit` characters from `source`: a str,
+    bytes/bytearray/mmap, a text or binary file object, or an iterable of lines.
+    Only one piece is held at a time (beyond an in-memory `source` itself).
+    """
+    if isinstance(source, (str, bytes, bytearray, mmap.mmap)):
+        newline = '\n' if isinstance(source, str) else b'\n'
+        start = 0
+        end = len(source)
+        while start < end:
+            stop = source.find(newline, start)
+            stop = end if stop == -1 else stop
+            while stop - start > limit:
+                yield _text(source[start:start + limit]), False
+                start += limit
+            yield _text(source[start:stop]), True
+            start = stop + 1
+        return
+    if hasattr(source, 'readline'):
+        while True:
+            piece = source.readline(limit)
+            if not piece:
+                return
+            ends_line = piece.endswith('\n' if isinstance(piece, str) else b'\n')
+            yield _text(piece[:-1] if ends_line else piece), ends_line
+        return
+    for line in source:
+        line = _text(line).rstrip('\r\n')
+        for start in range(0, max(len(line), 1), limit):
+            yield line[start:start + limit], start + limit >= len(line)
+
+
+def _text(piece):
+    return piece if isinstance(piece, str) else bytes(piece).decode('utf-8', errors='ignore')
+
+
+def iter_source_lines(source, max_line_length=DEFAULT_MAX_LINE_LENGTH):
+    """
+    Yield (lineno, text) for every line of `source` (see _line_pieces for accepted types).
+    A line longer than `max_line_length` (minified/generated code) is yielded as several
+    segments with the same lineno, split after ';', '{' or '}' where possible, so regex
+    scans stay bounded and memory never holds more than about two segments of a line.
+    """
+    lineno = 1
+    buffer = ''
+    for piece, ends_line in _line_pieces(source, max_line_length):
+        if ends_line and piece.endswith('\r'):
+            piece = piece[:-1]
+        buffer += piece
+        while len(buffer) > max_line_length:
+            cut = max(buffer.rfind(c, 0, max_line_length) for c in _SPLIT_CHARS) + 1 or max_line_length
+            yield lineno, buffer[:cut]
+            buffer = buffer[cut:]
+        if ends_line:
+            yield lineno, buffer
+            buffer = ''
+            lineno += 1
+    if buffer:
+        yield lineno, buffer
+
+
+DEFAULT_CHUNK_CHARS = 64 * 1024
+
+
+def iter_source_chunks(source, max_line_length=DEFAULT_MAX_LINE_LENGTH, chunk_chars=DEFAULT_CHUNK_CHARS):
+    """
+    Yield (lineno, text) for runs of whole lines of `source` joined by '\n', about
+    `chunk_chars` long, for scanners that count lines themselves; lineno is that of the
+    first line. A line longer than a chunk is cut after ';', '{' or '}' where possible,
+    and the next chunk starts with the same lineno. In-memory sources are sliced
+    without a per-line loop (chunk_chars=None: in one piece); other sources are
+    grouped from iter_source_lines.
+    """
+    in_memory = isinstance(source, (str, bytes, bytearray, mmap.mmap))
+    if chunk_chars is None:
+        chunk_chars = len(source) if in_memory else DEFAULT_CHUNK_CHARS
+    chunk_chars = max(chunk_chars, max_line_length)
+    if in_memory:
+        newline, splits = ('\n', _SPLIT_CHARS) if isinstance(source, str) else (b'\n', _SPLIT_CHARS.encode())
+        lineno = 1
+        start = 0
+        end = len(source)
+        while start < end:
+            stop = start + chunk_chars
+            if stop >= end:
+                # The newline ending the last line does not start another one
+                yield lineno, _text(source[start:end - 1 if source[end - 1:end] == newline else end])
+                return
+            cut = source.rfind(newline, start, stop)
+            if cut != -1:
+                # Sliced once: the slice is bytes for an mmap, which has no count()
+                chunk = source[start:cut]
+                yield lineno, _text(chunk)
+                lineno += chunk.count(newline) + 1
+                start = cut + 1
+                continue
+            # A single line longer than a chunk
+            cut = max(source.rfind(splits[i:i + 1], start, stop) for i in range(len(splits))) + 1 or stop
+            yield lineno, _text(source[start:cut])
+            start = cut
+        return
+    lines = []
+    size = 0
+    first = last = None
+    for lineno, line in iter_source_lines(source, max_line_length):
+        if size >= chunk_chars:
+            yield first, '\n'.join(lines)
+            lines = []
+            size = 0
+        if lines and lineno == last:
+            # The next segment of an overlong line
+            lines[-1] += line
+        else:
+            if not lines:
+                first = lineno
+            lines.append(line)
+        size += len(line) + 1
+        last = lineno
+    if lines:
+        yield first, '\n'.join(lines)
+
+
+class SourceLimits:
+    """
+    Size and line-length thresholds for analyzed files, and what to do with files that
+    exceed them or look minified/generated: 'skip' them, or 'analyze' them (always
+    line-bounded, see iter_source_lines).
+    """
+    def __init__(self, max_file_bytes=DEFAULT_MAX_FILE_BYTES, max_line_length=DEFAULT_MAX_LINE_LENGTH,
+                 on_too_large='skip', on_minified='analyze', on_generated='analyze'):
+        self.max_file_bytes = max_file_bytes
+        self.max_line_length = max_line_length
+        self.actions = {'too_large': on_too_large, 'minified': on_minified, 'generated': on_generated}
+
+    def __repr__(self):
+        # Stable across runs: part of the pipeline fingerprint when passed as a stage parameter
+        return (f"SourceLimits({self.max_file_bytes!r}, {self.max_line_length!r}, "
+                + ", ".join(f"on_{k}={v!r}" for k, v in self.actions.items()) + ")")
+
+    def classify(self, path, size=None, sample=None):
+        """
+        Return 'too_large', 'generated', 'minified' or None from the file size and its
+        first SAMPLE_BYTES (read from `path` unless the caller already has them).
+        """
+        if size is None:
+            size = os.path.getsize(path)
+        if self.max_file_bytes is not None and size > self.max_file_bytes:
+            return 'too_large'
+        if sample is None:
+            with open(path, 'rb') as f:
+                sample = f.read(SAMPLE_BYTES)
+        sample = sample[:SAMPLE_BYTES]
+        if GENERATED_NAME.search(path) or GENERATED_MARKER.search(sample[:4096]):
+            return 'generated'
+        lines = sample.count(b'\n') + 1
+        longest = max((len(line) for line in sample.split(b'\n')), default=0)
+        if len(sample) / lines > MINIFIED_AVG_LINE_LENGTH or longest > self.max_line_length:
+            return 'minified'
+        return None
+
+    def check(self, path, size=None, sample=None):
+        """(reason, action) for `path`; action is 'analyze' or 'skip'."""
+        reason = self.classify(path, size, sample)
+        return reason, self.actions.get(reason, 'analyze')
+
+
+DEFAULT_LIMITS = SourceLimits()
+
+
+def limits_from_args(args):
+    """SourceLimits from the options of cli.options.add_limit_arguments."""
+    max_file_bytes = DEFAULT_MAX_FILE_BYTES if args.max_file_bytes is None else args.max_file_bytes
+    max_line_length = DEFAULT_MAX_LINE_LENGTH if args.max_line_length is None else args.max_line_length
+    return SourceLimits(max_file_bytes, max_line_length,
+                        on_too_large='analyze' if args.analyze_large else 'skip',
+                        on_minified='skip' if args.skip_minified else 'analyze',
+                        on_generated='skip' if args.skip_generated else 'analyze')
@@ -1,8 +1,9 @@
 """
 End-to-end demo: Analyze feature flag dependencies in real sample projects (Python, Java, Go, JavaScript).
+The projects (or the repositories of a --manifest) are scanned concurrently by feature_flag.batch.
 """
 import os
-from feature_flag.reasoning import AnalyzerFactory, Reasoner
+from feature_flag.reasoning import Reasoner
 
 # Use absolute paths for all projects
 PROJECTS = [
@@ -29,41 +30,39 @@ def collect_files(root, exts):
                 files.append(os.path.join(dirpath, f))
     return files
 
-def main():
-    dependency_graph = {}
-    total_dependencies = 0
-    for project_path, lang in PROJECTS:
-        print(f"\nAnalyzing project: {project_path} (language: {lang})")
-        analyzer = AnalyzerFactory.get_analyzer(lang)
-        files = collect_files(project_path, EXTENSIONS[lang])
-        print(f"  Found {len(files)} source files.")
-        project_dependencies = 0
-        for file_path in files:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                code = f.read()
-            deps = analyzer.analyze(code)
-            for dep in deps:
-                flag = dep.get('flag') or dep.get('dependency')
-                context = dep.get('context')
-                if flag:
-                    key = (flag, context) if context else flag
-                    dependency_graph.setdefault(key, set())
-                    dependency_graph[key].add(flag)  # For demo: self-loop
-                    project_dependencies += 1
-        print(f"  Found {project_dependencies} feature flag dependencies.")
-        total_dependencies += project_dependencies
+def projects_to_repos(projects):
+    """PROJECTS as batch repositories: one entry per path, so a multi-language repo is walked once."""
+    repos = {}
+    for project_path, lang in projects:
+        repo = repos.setdefault(project_path, {'name': os.path.basename(project_path), 'path': project_path,
+                                               'languages': []})
+        repo['languages'].append(lang)
+    return list(repos.values())
+
+def main(manifest=None, jobs=None):
+    from feature_flag.batch import load_manifest, run_batch, build_repo_graph, shared_flags
+    repos = load_manifest(manifest) if manifest else projects_to_repos(PROJECTS)
+    findings, failures = run_batch(repos, jobs=jobs)
+    for name, error in failures.items():
+        print(f"  Skipped {name}: {error}")
+    dependency_graph = build_repo_graph(findings)
     if not dependency_graph:
         print("\nNo feature flag dependencies found in any project.")
         return
-    # Convert sets to lists
-    for k in dependency_graph:
-        dependency_graph[k] = list(dependency_graph[k])
     reasoner = Reasoner(dependency_graph)
-    print(f"\nTotal unique feature flag dependencies: {len(dependency_graph)}")
+    print(f"\nRepositories analyzed: {len(repos) - len(failures)}")
+    print(f"Total feature flag dependencies: {len(findings)}")
+    print(f"Graph nodes (repo-qualified): {len(dependency_graph)}")
     print("Cycles:", reasoner.detect_cycles())
     print("Dead flags:", reasoner.find_dead_flags())
-    if dependency_graph:
-        print("Impact of first flag:", reasoner.flag_impact(next(iter(dependency_graph))))
+    print("Flags used in several repositories:", shared_flags(findings))
+    first_flag = next(node for node in dependency_graph if len(node) == 2)
+    print(f"Impact of {first_flag}:", reasoner.flag_impact(first_flag))
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Analyze feature flag dependencies across several projects.")
+    parser.add_argument("--manifest", help="Batch manifest listing the repositories (default: PROJECTS)")
+    parser.add_argument("--jobs", type=int, help="Repositories scanned concurrently (default: CPU count)")
+    args = parser.parse_args()
+    main(args.manifest, args.jobs)
@@ -1,3 +1,443 @@
-# CLI entry point (placeholder)
+"""
+ffdeps: unified command line for the feature flag dependency analysis.
+
+    ffdeps scan TARGET [--lang python] [-o ast_auto_scan_result.json] [--semgrep-rule RULE] [--file-timeout S] [--resume]
+               [--regions [FILE]] [--sdk-profiles FILE]
+    ffdeps dataflow TARGET [-o dataflow_auto_scan_result.json] [--file-timeout S] [--resume]
+    ffdeps batch MANIFEST [-o batch_scan_result.json] [--jobs N]
+    ffdeps merge [--semgrep ...] [--ast ...] [--dataflow ...] [--output ...]
+    ffdeps report [MERGED] [--dot FILE] [--top K] [--approx]
+    ffdeps sketch TARGET [TARGET ...] [--lang L ...] [-o flag_sketch.json] [--top K]
+    ffdeps snapshot [MERGED] [-o flag_snapshot.ffsnap]
+    ffdeps diff BASE HEAD [--fail-on cycles,multi-flag,orphaned] [--json]
+    ffdeps registry EXPORT [EXPORT ...] [--results MERGED] [--fail-on undefined,archived] [--json]
+    ffdeps graph [TARGET] [--view auto|full|clustered|ego] [--focus NAME] ...
+    ffdeps query [MERGED] [--flag F] [--context C] [--file PATH] [--count] [--json]
+    ffdeps guards [REGIONS] [--file PATH (--line N | --lines A-B)] [--flag F] [--json]
+
+Every subcommand imports its dependencies only when it runs, so `ffdeps query`
+(called from hooks, possibly hundreds of times) does not pay for networkx, pyvis,
+or the analyzers. Run it as `bin/ffdeps ...` or
+`PYTHONPATH=src python -m cli.main ...`.
+"""
+import argparse
+import contextlib
+import os
+import sys
+
+if __name__ == "__main__" and not __package__:
+    # Run as a script: put src/ on the path, and drop cli/, which would shadow src/main.py (imported by `graph`)
+    _cli_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path[:] = [p for p in sys.path if os.path.abspath(p or '.') != _cli_dir]
+    sys.path.insert(0, os.path.dirname(_cli_dir))
+
+from cli.options import add_limit_arguments, add_budget_arguments, add_checkpoint_arguments, add_metrics_arguments
+
+DEFAULT_MERGED = 'merged_flag_dependencies.json'
+
+
+def _state_paths(checkpoint, budget):
+    """Files a scan writes that may be inside its target, and so must not count as inputs."""
+    return [checkpoint.path] + ([budget.quarantine] if budget is not None else [])
+
+
+def cmd_scan(args):
+    from feature_flag import metrics
+    metrics.enable_from_args(args)
+    import json
+    from ast_analysis.utils import limits_from_args
+    from feature_flag.checkpoint import checkpoint_from_args, scan_fingerprint
+    from feature_flag.scan import scan_ast
+    from feature_flag.watchdog import budget_from_args
+    limits, budget = limits_from_args(args), budget_from_args(args)
+    checkpoint = checkpoint_from_args(args)
+    regions = None
+    if args.regions is not None:
+        from feature_flag.regions import RegionIndex, regions_path
+        regions = RegionIndex()
+    profiles = None
+    if args.sdk_profiles:
+        from ast_analysis.sdk_profiles import load_profiles
+        profiles = load_profiles(args.sdk_profiles)
+    with checkpoint or contextlib.nullcontext():
+        journal = None
+        if checkpoint is not None:
+            state = _state_paths(checkpoint, budget)
+            journal = checkpoint.stage('ast', scan_fingerprint('ast', scan_ast, {
+                'target_dir': args.target_dir, 'lang': args.lang, 'limits': limits, 'budget': budget,
+                'regions': regions is not None, 'profiles': profiles}, (args.target_dir,), state))
+        dependencies = scan_ast(args.target_dir, args.lang, limits=limits, prefetch_window=args.prefetch,
+                                budget=budget, journal=journal, regions=regions, profiles=profiles)
+        with open(args.output, 'w') as f:
+            json.dump(dependencies, f, indent=2)
+        print(f"AST-based dependencies saved to {args.output}")
+        if regions is not None:
+            path = args.regions or regions_path(args.output)
+            regions.save(path)
+            print(f"{len(regions)} guarded regions saved to {path}")
+        if args.semgrep_rule:
+            from feature_flag.scan import scan_semgrep, scan_semgrep_parallel
+            fingerprint = output = None
+            if checkpoint is not None:
+                # One Semgrep run is all or nothing: it is journaled once complete
+                fingerprint = scan_fingerprint('semgrep', scan_semgrep, {
+                    'target_dir': args.target_dir, 'rule_path': args.semgrep_rule},
+                    (args.target_dir, args.semgrep_rule), state)
+                output = checkpoint.output('semgrep', fingerprint)
+            if output is None:
+                if args.parallel:
+                    output = scan_semgrep_parallel(args.target_dir, args.semgrep_rule, jobs=args.jobs)
+                else:
+                    output = scan_semgrep(args.target_dir, args.semgrep_rule)
+                if checkpoint is not None:
+                    checkpoint.complete('semgrep', fingerprint, output)
+            with open(args.semgrep_output, 'w') as f:
+                json.dump(output, f, indent=2)
+            print(f"Semgrep results saved to {args.semgrep_output}")
+    metrics.write_from_args(args)
+
+
+def cmd_dataflow(args):
+    from feature_flag import metrics
+    metrics.enable_from_args(args)
+    import json
+    from ast_analysis.utils import limits_from_args
+    from feature_flag.checkpoint import checkpoint_from_args, scan_fingerprint
+    from feature_flag.scan import scan_dataflow
+    from feature_flag.watchdog import budget_from_args
+    limits, budget = limits_from_args(args), budget_from_args(args)
+    checkpoint = checkpoint_from_args(args)
+    with checkpoint or contextlib.nullcontext():
+        journal = None
+        if checkpoint is not None:
+            journal = checkpoint.stage('dataflow', scan_fingerprint('dataflow', scan_dataflow, {
+                'target_dir': args.target_dir, 'lang': args.lang, 'limits': limits, 'budget': budget},
+                (args.target_dir,), _state_paths(checkpoint, budget)))
+        findings = scan_dataflow(args.target_dir, args.lang, limits=limits, prefetch_window=args.prefetch,
+                                 budget=budget, journal=journal)
+        with open(args.output, 'w') as f:
+            json.dump(findings, f, indent=2)
+        print(f"Data flow findings saved to {args.output}")
+    metrics.write_from_args(args)
+
+
+def cmd_batch(args):
+    from feature_flag import metrics
+    metrics.enable_from_args(args)
+    import json
+    from ast_analysis.utils import limits_from_args
+    from feature_flag.batch import load_manifest, run_batch, build_repo_graph, shared_flags
+    from feature_flag.reasoning import Reasoner
+    repos = load_manifest(args.manifest)
+    findings, failures = run_batch(repos, cache_dir=None if args.no_cache else args.cache_dir, jobs=args.jobs,
+                                   limits=limits_from_args(args))
+    with open(args.output, 'w') as f:
+        json.dump(findings, f, indent=2)
+    graph = build_repo_graph(findings)
+    print(f"{len(repos) - len(failures)}/{len(repos)} repositories, {len(findings)} findings, {len(graph)} graph nodes")
+    print(f"Cycles: {len(Reasoner(graph).detect_cycles())}")
+    print(f"Flags used in several repositories: {len(shared_flags(findings))}")
+    print(f"Batch results saved to {args.output}")
+    for name, error in failures.items():
+        print(f"ffdeps batch: {name}: {error}", file=sys.stderr)
+    metrics.write_from_args(args)
+    return 1 if failures else 0
+
+
+def cmd_merge(args):
+    from feature_flag import metrics
+    metrics.enable_from_args(args)
+    from feature_flag.merge import merge_files
+    count = merge_files(args.semgrep, args.ast, args.dataflow, args.output, run_size=args.run_size)
+    print(f"Total unique feature flag dependencies: {count}")
+    print(f"Merged results saved to {args.output}")
+    metrics.write_from_args(args)
+
+
+def cmd_report(args):
+    from feature_flag import metrics
+    metrics.enable_from_args(args)
+    if args.approx:
+        from feature_flag.sketch import load_or_build_sketch, print_sketch_summary
+        print_sketch_summary(load_or_build_sketch(args.merged_path), args.top)
+        metrics.write_from_args(args)
+        return
+    from feature_flag.binary_results import iter_results
+    from feature_flag.report import build_report, print_conflict_report, print_top
+    engine = build_report(iter_results(args.merged_path), dot_path=args.dot)
+    print_conflict_report(engine)
+    if args.top:
+        print_top(engine, args.top)
+    if args.dot:
+        print(f"\nGraphviz DOT file saved as {args.dot} (for visualization)")
+    metrics.write_from_args(args)
+
+
+def cmd_sketch(args):
+    from feature_flag import metrics
+    metrics.enable_from_args(args)
+    from ast_analysis.utils import limits_from_args
+    from cli.end_to_end_demo import EXTENSIONS
+    from feature_flag.sketch import scan_sketch, print_sketch_summary
+    from feature_flag.watchdog import budget_from_args
+    sketch = scan_sketch(args.targets, args.lang or list(EXTENSIONS), limits=limits_from_args(args),
+                         prefetch_window=args.prefetch, budget=budget_from_args(args))
+    print_sketch_summary(sketch, args.top, args.similarity)
+    if args.output:
+        sketch.save(args.output)
+        print(f"\nSketch saved to {args.output}")
+    metrics.write_from_args(args)
+
+
+def cmd_snapshot(args):
+    from feature_flag import metrics
+    metrics.enable_from_args(args)
+    from feature_flag.snapshot import snapshot_results
+    header = snapshot_results(args.merged_path, args.output)
+    print(f"Snapshot of {len(header['files'])} files, {len(header['cycles'])} flag cycles saved to {args.output}")
+    metrics.write_from_args(args)
+
+
+def cmd_diff(args):
+    from feature_flag import metrics
+    metrics.enable_from_args(args)
+    from feature_flag.snapshot import open_snapshot, diff_snapshots, gate_failures, print_diff
+    with open_snapshot(args.base) as base, open_snapshot(args.head) as head:
+        diff = diff_snapshots(base, head)
+    if args.json:
+        import json
+        json.dump(diff, sys.stdout, indent=2)
+        print()
+    else:
+        print_diff(diff)
+    failures = gate_failures(diff, args.fail_on.split(',') if args.fail_on else ())
+    for reason in failures:
+        print(f"ffdeps diff: {reason}", file=sys.stderr)
+    metrics.write_from_args(args)
+    return 1 if failures else 0
+
+
+def cmd_registry(args):
+    from feature_flag import metrics
+    metrics.enable_from_args(args)
+    from feature_flag.registry import load_registry, count_usages, join_registry, gate_failures, print_registry_report
+    report = join_registry(load_registry(args.exports), count_usages(args.results or [DEFAULT_MERGED]))
+    if args.json:
+        import json
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_registry_report(report)
+    failures = gate_failures(report, args.fail_on.split(',') if args.fail_on else ())
+    for reason in failures:
+        print(f"ffdeps registry: {reason}", file=sys.stderr)
+    metrics.write_from_args(args)
+    return 1 if failures else 0
+
+
+def cmd_graph(args):
+    from feature_flag import metrics
+    metrics.enable_from_args(args)
+    import main as analysis
+    analysis.analyze_dependencies({
+        'output_html': args.output, 'mode': args.view, 'focus': args.focus,
+        'depth': args.depth, 'group_by': args.group_by, 'max_nodes': args.max_nodes,
+    }, target_dir=args.target_dir, flag_rule=args.flag_rule, jobs=args.jobs)
+    metrics.write_from_args(args)
+
+
+def cmd_query(args):
+    from feature_flag.binary_results import BinaryResults, is_binary_results
+    criteria = {k: v for k, v in (('dependency', args.flag), ('context', args.context), ('file', args.file))
+                if v is not None}
+    if is_binary_results(args.merged_path):
+        # Filters on string ids; non-matching records are never decoded
+        with BinaryResults(args.merged_path) as results:
+            matches = list(results.select(**criteria))
+    else:
+        from feature_flag.jsonstream import iter_json_file
+        matches = [entry for entry in iter_json_file(args.merged_path)
+                   if all(entry.get(k) == v for k, v in criteria.items())]
+    if args.count:
+        print(len(matches))
+    elif args.json:
+        import json
+        json.dump(matches, sys.stdout, indent=2)
+        print()
+    else:
+        for entry in matches:
+            line = entry.get('line', entry.get('lineno'))
+            print(f"{entry.get('file')}:{line}: {entry.get('dependency')} in {entry.get('context')} [{entry.get('source')}]")
+    return 0 if matches else 1
+
+
+def cmd_guards(args):
+    from feature_flag.regions import RegionIndex, print_regions
+    if (args.line is not None or args.lines) and not args.file:
+        raise ValueError("--line and --lines need --file")
+    index = RegionIndex.load(args.regions_path)
+    if args.line is not None:
+        regions = index.guards(args.file, args.line)
+    elif args.lines:
+        start, _, end = args.lines.partition('-')
+        regions = index.overlapping(args.file, int(start), int(end or start))
+    elif args.flag is None:
+        raise ValueError("give --file with --line or --lines, or --flag")
+    else:
+        regions = index.gated(args.flag, args.file)
+    if args.flag is not None:
+        regions = [region for region in regions if region.flag == args.flag]
+    if args.json:
+        import json
+        json.dump([region._asdict() for region in regions], sys.stdout, indent=2)
+        print()
+    else:
+        print_regions(regions)
+    return 0 if regions else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='ffdeps', description="Feature flag dependency analysis.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    scan = sub.add_parser("scan", help="AST-based scan (and optionally Semgrep)")
+    scan.add_argument("target_dir", help="Directory to scan")
+    scan.add_argument("--lang", default="python", help="Language (python, java, go, javascript)")
+    scan.add_argument("-o", "--output", default='ast_auto_scan_result.json', help="AST results JSON file")
+    scan.add_argument("--semgrep-rule", help="Also run Semgrep with this rule file")
+    scan.add_argument("--semgrep-output", default='semgrep_auto_scan_result.json', help="Semgrep results JSON file")
+    scan.add_argument("--parallel", action="store_true", help="Prefiltered, batched, parallel Semgrep")
+    scan.add_argument("--jobs", type=int, help="Parallel Semgrep processes (default: CPU count)")
+    scan.add_argument("--regions", nargs="?", const="", metavar="FILE",
+                      help="Also index the code regions each flag check guards (default FILE: OUTPUT.regions.json)")
+    scan.add_argument("--sdk-profiles", metavar="FILE",
+                      help="JSON file of extra flag SDK profiles (call names, key argument, key rule), matched in the same pass")
+    scan.set_defaults(func=cmd_scan)
+
+    dataflow = sub.add_parser("dataflow", help="Data Flow Analysis")
+    dataflow.add_argument("target_dir", help="Directory to scan")
+    dataflow.add_argument("--lang", default="python", help="Language (python only)")
+    dataflow.add_argument("-o", "--output", default='dataflow_auto_scan_result.json', help="Output JSON file")
+    dataflow.set_defaults(func=cmd_dataflow)
+
+    batch = sub.add_parser("batch", help="Scan the repositories of a manifest concurrently (exit 1 if any failed)")
+    batch.add_argument("manifest", help="JSON or one-repository-per-line manifest")
+    batch.add_argument("-o", "--output", default='batch_scan_result.json', help="Repo-tagged findings JSON file")
+    batch.add_argument("--jobs", type=int, help="Repositories scanned concurrently (default: CPU count)")
+    batch.add_argument("--cache-dir", default='.ffdeps_cache', help="Per-repository caches go under DIR/repos/")
+    batch.add_argument("--no-cache", action="store_true", help="Rescan every repository")
+    batch.set_defaults(func=cmd_batch)
+
+    merge = sub.add_parser("merge", help="Merge Semgrep, AST and Data Flow results")
+    merge.add_argument("--semgrep", default='semgrep_auto_scan_result.json', help="Semgrep JSON output")
+    merge.add_argument("--ast", default='ast_auto_scan_result.json', help="AST analysis JSON output")
+    merge.add_argument("--dataflow", default='dataflow_auto_scan_result.json', help="Data Flow JSON output (optional)")
+    merge.add_argument("--output", default=DEFAULT_MERGED, help="Merged output JSON file")
+    merge.add_argument("--run-size", type=int, default=100000,
+                       help="Max entries held in memory per run when an input must be sorted externally")
+    merge.set_defaults(func=cmd_merge)
+
+    report = sub.add_parser("report", help="Conflict and compound-logic report over merged results")
+    report.add_argument("merged_path", nargs="?", default=DEFAULT_MERGED, help="Merged results (JSON or binary)")
+    report.add_argument("--dot", help="Also write the Graphviz DOT file from the same pass")
+    report.add_argument("--top", type=int, help="Also print the top-k flags and contexts")
+    report.add_argument("--approx", action="store_true",
+                        help="Sketch-based approximate summary in bounded memory (MERGED may be a saved sketch)")
+    report.set_defaults(func=cmd_report)
+
+    sketch = sub.add_parser("sketch", help="Scan into fixed-size sketches for approximate flag statistics")
+    sketch.add_argument("targets", nargs="+", help="Directories to scan; saved sketches or results files are merged in")
+    sketch.add_argument("--lang", action="append", choices=["python", "java", "go", "javascript"],
+                        help="Language to scan; repeatable (default: all)")
+    sketch.add_argument("-o", "--output", help="Save the sketch (mergeable with later scans)")
+    sketch.add_argument("--top", type=int, default=20, help="Number of top flags/contexts to list")
+    sketch.add_argument("--similarity", type=float, default=0.5,
+                        help="Jaccard threshold for listing flags checked in similar contexts")
+    sketch.set_defaults(func=cmd_sketch)
+
+    snapshot = sub.add_parser("snapshot", help="Index merged results for later diffs")
+    snapshot.add_argument("merged_path", nargs="?", default=DEFAULT_MERGED, help="Merged results (JSON or binary)")
+    snapshot.add_argument("-o", "--output", default='flag_snapshot.ffsnap', help="Snapshot file")
+    snapshot.set_defaults(func=cmd_snapshot)
+
+    diff = sub.add_parser("diff", help="Compare two snapshots (exit 1 if a --fail-on gate is violated)")
+    diff.add_argument("base", help="Base snapshot (or merged results)")
+    diff.add_argument("head", help="Head snapshot (or merged results)")
+    diff.add_argument("--fail-on", default="cycles,multi-flag,orphaned",
+                      help="Comma-separated gates: cycles, multi-flag, orphaned ('' to never fail)")
+    diff.add_argument("--json", action="store_true", help="Print the diff as JSON")
+    diff.set_defaults(func=cmd_diff)
+
+    registry = sub.add_parser("registry", help="Join code usages against flag registry exports (exit 1 on --fail-on)")
+    registry.add_argument("exports", nargs="+", help="Unleash/CloudBees export JSON files")
+    registry.add_argument("--results", action="append", help=f"Scan results, JSON or binary (default: {DEFAULT_MERGED}); repeatable")
+    registry.add_argument("--fail-on", default="undefined,archived",
+                          help="Comma-separated gates: undefined, archived, stale, dead ('' to never fail)")
+    registry.add_argument("--json", action="store_true", help="Print the report as JSON")
+    registry.set_defaults(func=cmd_registry)
+
+    graph = sub.add_parser("graph", help="Call-graph propagation, cycle detection and interactive visualization")
+    graph.add_argument("target_dir", nargs="?", help="Directory to analyze (default: sample_project_python)")
+    graph.add_argument("--flag-rule", help="Semgrep feature flag rule file")
+    graph.add_argument("--view", choices=["auto", "full", "clustered", "ego"], default="auto",
+                       help="Visualization level of detail")
+    graph.add_argument("--focus", help="Flag or function (name or name@file) to center an ego view on")
+    graph.add_argument("--depth", type=int, default=2, help="Ego view depth in call edges")
+    graph.add_argument("--group-by", choices=["file", "package"], default="file", help="Clustering key")
+    graph.add_argument("--max-nodes", type=int, default=1500, help="Node limit per page / ego view")
+    graph.add_argument("--output", default="dependency_graph.html", help="Output HTML file")
+    graph.add_argument("--jobs", type=int, help="Parallel call graph workers (default: CPU count)")
+    graph.set_defaults(func=cmd_graph)
+
+    for command in (scan, dataflow, batch, sketch):
+        add_limit_arguments(command)
+    for command, name in ((scan, 'scan'), (dataflow, 'dataflow')):
+        add_checkpoint_arguments(command, os.path.join('.ffdeps_cache', f'checkpoint-{name}.jsonl'))
+    for command in (scan, dataflow, sketch):
+        add_budget_arguments(command)
+        command.add_argument("--prefetch", type=int, default=64, metavar="N",
+                             help="Files read ahead while analyzing (0 reads each file inline)")
+    for command in (scan, dataflow, batch, merge, report, sketch, snapshot, diff, registry, graph):
+        add_metrics_arguments(command)
+
+    query = sub.add_parser("query", help="Look up findings by flag, context or file (exit 1 if none)")
+    query.add_argument("merged_path", nargs="?", default=DEFAULT_MERGED, help="Merged results (JSON or binary)")
+    query.add_argument("--flag", help="Flag name")
+    query.add_argument("--context", help="Function context")
+    query.add_argument("--file", help="File path as recorded in the results")
+    output = query.add_mutually_exclusive_group()
+    output.add_argument("--count", action="store_true", help="Print only the number of matches")
+    output.add_argument("--json", action="store_true", help="Print the matching findings as JSON")
+    query.set_defaults(func=cmd_query)
+
+    guards = sub.add_parser("guards", help="Which flags guard a line, or which lines a flag gates (exit 1 if none)")
+    guards.add_argument("regions_path", nargs="?", default='ast_auto_scan_result.regions.json',
+                        help="Region index written by `ffdeps scan --regions`")
+    guards.add_argument("--file", help="File path as recorded in the results")
+    where = guards.add_mutually_exclusive_group()
+    where.add_argument("--line", type=int, help="Flags guarding this line of --file")
+    where.add_argument("--lines", metavar="A-B", help="Guarded regions overlapping these lines of --file")
+    guards.add_argument("--flag", help="Regions gated by this flag (with --file: in that file only)")
+    guards.add_argument("--json", action="store_true", help="Print the regions as JSON")
+    guards.set_defaults(func=cmd_guards)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        status = args.func(args) or 0
+        sys.stdout.flush()
+        return status
+    except BrokenPipeError:
+        # The reader went away (`ffdeps query | head`): exit quietly, with the status of a
+        # process killed by SIGPIPE. Output still buffered, flushed at exit, goes to devnull.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 128 + 13
+    except (RuntimeError, ValueError, OSError) as e:
+        print(f"ffdeps {args.command}: {e}", file=sys.stderr)
+        return 2
+
+
 if __name__ == "__main__":
-    pass
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Command-line options shared by ffdeps and the runner scripts.
+
+Only the argparse definitions live here, importing nothing beyond the standard
+library, so that building the ffdeps parser does not import what the options
+configure. Each group is read back by the *_from_args function next to the class it
+builds, which a command imports when it runs (unset options take that class's
+defaults):
+- add_limit_arguments: ast_analysis.utils.limits_from_args (SourceLimits);
+- add_budget_arguments: feature_flag.watchdog.budget_from_args (Budget);
+- add_checkpoint_arguments: feature_flag.checkpoint.checkpoint_from_args (Checkpoint);
+- add_metrics_arguments: feature_flag.metrics.enable_from_args / write_from_args.
+"""
+import os
+
+STATE_DIR = '.ffdeps_cache'
+
+
+def add_limit_arguments(parser):
+    """Command-line options for SourceLimits."""
+    group = parser.add_argument_group('large files')
+    group.add_argument("--max-file-bytes", type=int,
+                       help="Files larger than this are too large (default: 5 MiB)")
+    group.add_argument("--max-line-length", type=int,
+                       help="Longer lines are scanned in segments (default: 4096)")
+    group.add_argument("--analyze-large", action="store_true", help="Analyze too-large files instead of skipping them")
+    group.add_argument("--skip-minified", action="store_true", help="Skip minified files")
+    group.add_argument("--skip-generated", action="store_true", help="Skip generated files")
+
+
+def add_budget_arguments(parser):
+    """Command-line options for Budget."""
+    group = parser.add_argument_group('per-file budgets')
+    group.add_argument("--file-timeout", type=float, metavar="SECONDS",
+                       help="Analyze each file in a worker, killed and the file quarantined past this time")
+    group.add_argument("--file-memory", type=int, metavar="MB",
+                       help="Address-space limit of that worker in MiB (POSIX); the file is quarantined past it")
+    group.add_argument("--quarantine", metavar="FILE",
+                       help="Quarantine list to consult and extend "
+                            f"(default with a budget: {os.path.join(STATE_DIR, 'quarantine.json')})")
+    group.add_argument("--skip-quarantined", action="store_true",
+                       help="Skip quarantined files instead of using the fallback analyzer")
+
+
+def add_checkpoint_arguments(parser, default=os.path.join(STATE_DIR, 'checkpoint.jsonl')):
+    """Command-line options for Checkpoint."""
+    group = parser.add_argument_group('checkpoints')
+    group.add_argument("--resume", action="store_true",
+                       help="Continue an interrupted run from its checkpoint journal; without it, a run "
+                            "starts a new journal and the interrupted run's progress is discarded")
+    group.add_argument("--checkpoint", default=default, metavar="FILE",
+                       help="Checkpoint journal (default: %(default)s; '' to disable)")
+
+
+def add_metrics_arguments(parser):
+    """The --metrics/--prometheus/--profile-dir/--trace-memory options."""
+    group = parser.add_argument_group('metrics')
+    group.add_argument("--metrics", metavar="PATH", help="Write per-stage metrics as JSON")
+    group.add_argument("--prometheus", metavar="PATH", help="Write per-stage metrics in Prometheus text format")
+    group.add_argument("--profile-dir", metavar="DIR", help="cProfile each stage into DIR/<stage>.*.prof")
+    group.add_argument("--trace-memory", action="store_true", help="Record peak Python allocations per stage")
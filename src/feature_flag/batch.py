@@ -0,0 +1,171 @@
+"""
+Batch scanning of many local repositories listed in a manifest.
+
+Manifest: JSON, either a list or {"repos": [...]}, of entries
+    {"path": "../billing-service", "name": "billing", "languages": ["python", "java"]}
+or plain text with one repository per line: `path [language ...]`, '#' starts a
+comment. Relative paths are resolved against the manifest's directory; `name`
+defaults to the directory name and `languages` to every supported language.
+
+Repositories are scanned concurrently in worker processes. Each repository is
+walked once for all its languages, and each has its own pipeline cache under
+<cache_dir>/repos/<name>, so an unchanged repository is not rescanned. The
+findings are tagged with their repository and aggregated into one graph whose
+nodes are repo-qualified, so equal function and flag names in different
+repositories stay distinct:
+
+    (repo, file, context) -> [(repo, flag), ...]
+"""
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from cli.end_to_end_demo import EXTENSIONS
+from ast_analysis.utils import DEFAULT_LIMITS
+from feature_flag import metrics
+from feature_flag.pipeline import Pipeline, CODE_INPUTS, DEFAULT_CACHE_DIR
+
+DEFAULT_BATCH_OUTPUT = 'batch_scan_result.json'
+
+
+def _resolve_languages(languages, where):
+    languages = list(languages or EXTENSIONS)
+    unknown = [lang for lang in languages if lang not in EXTENSIONS]
+    if unknown:
+        raise ValueError(f"{where}: unsupported language(s) {', '.join(unknown)}")
+    return languages
+
+
+def load_manifest(manifest_path):
+    """Read a manifest into a list of {'name', 'path', 'languages'} with absolute paths."""
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path) as f:
+        text = f.read()
+    if manifest_path.endswith('.json'):
+        data = json.loads(text)
+        entries = data.get('repos', []) if isinstance(data, dict) else data
+    else:
+        entries = []
+        for line in text.splitlines():
+            fields = line.split('#', 1)[0].split()
+            if fields:
+                entries.append({'path': fields[0], 'languages': fields[1:]})
+    repos = []
+    names = set()
+    for index, entry in enumerate(entries):
+        if isinstance(entry, str):
+            entry = {'path': entry}
+        where = f"{manifest_path}: entry {index + 1}"
+        if 'path' not in entry:
+            raise ValueError(f"{where}: missing 'path'")
+        path = os.path.normpath(os.path.join(base_dir, os.path.expanduser(entry['path'])))
+        name = entry.get('name') or os.path.basename(path)
+        # The name is also the cache directory and the qualifier in the graph
+        if name in names:
+            raise ValueError(f"{where}: duplicate repository name '{name}' (set 'name' to tell them apart)")
+        names.add(name)
+        repos.append({'name': name, 'path': path, 'languages': _resolve_languages(entry.get('languages'), where)})
+    return repos
+
+
+def collect_repo_files(root, languages):
+    """{language: [files]} from a single walk of `root` (same files as collect_files per language)."""
+    by_ext = {ext: lang for lang in languages for ext in EXTENSIONS[lang]}
+    files = {lang: [] for lang in languages}
+    for dirpath, _, filenames in os.walk(root):
+        for f in filenames:
+            for ext, lang in by_ext.items():
+                if f.endswith(ext):
+                    files[lang].append(os.path.join(dirpath, f))
+                    break
+    return files
+
+
+def scan_repo(target_dir, languages, limits=DEFAULT_LIMITS):
+    """AST findings for every language of one repository, each tagged with its language."""
+    from feature_flag.scan import scan_ast
+    findings = []
+    for lang, files in collect_repo_files(target_dir, languages).items():
+        if files:
+            for dep in scan_ast(target_dir, lang, files=files, limits=limits):
+                dep['language'] = lang
+                findings.append(dep)
+    return findings
+
+
+def _safe_name(name):
+    return re.sub(r'[^\w.-]', '_', name)
+
+
+def _run_repo(repo, cache_dir, limits):
+    """Worker: scan one repository through its own cached pipeline."""
+    started = time.perf_counter()
+    pipeline = Pipeline(cache_dir=os.path.join(cache_dir, 'repos', _safe_name(repo['name'])) if cache_dir else None,
+                        max_workers=1)
+    pipeline.add_stage('ast', scan_repo,
+                       params={'target_dir': repo['path'], 'languages': repo['languages'], 'limits': limits},
+                       inputs=(repo['path'],) + CODE_INPUTS)
+    findings = pipeline.run()['ast']
+    return findings, 'ast' in pipeline.skipped, time.perf_counter() - started
+
+
+def run_batch(repos, cache_dir=DEFAULT_CACHE_DIR, jobs=None, limits=DEFAULT_LIMITS):
+    """
+    Scan `repos` (see load_manifest) on `jobs` processes.
+    Returns (findings, failures): findings carry 'repo' and 'file' relative to the
+    repository root, in manifest order; failures maps repo name -> error message.
+    A failing repository does not stop the batch.
+    """
+    results = {}
+    failures = {}
+    with metrics.stage('batch') as m, ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(_run_repo, repo, cache_dir, limits): repo for repo in repos if os.path.isdir(repo['path'])}
+        for repo in repos:
+            if not os.path.isdir(repo['path']):
+                failures[repo['name']] = f"not a directory: {repo['path']}"
+        for future in as_completed(futures):
+            repo = futures[future]
+            try:
+                findings, cached, seconds = future.result()
+            except Exception as e:
+                failures[repo['name']] = f"{type(e).__name__}: {e}"
+                print(f"[batch] {repo['name']}: failed ({failures[repo['name']]})")
+                continue
+            for dep in findings:
+                dep['repo'] = repo['name']
+                dep['file'] = os.path.relpath(dep['file'], repo['path']).replace(os.sep, '/')
+            results[repo['name']] = findings
+            m.add_file(repo['name'], seconds=seconds)
+            m.count('findings', len(findings))
+            metrics.record_cache('batch', cached)
+            print(f"[batch] {repo['name']}: {len(findings)} findings{' (cached)' if cached else ''}")
+        m.count('failed', len(failures))
+    findings = [dep for repo in repos for dep in results.get(repo['name'], [])]
+    return findings, failures
+
+
+def build_repo_graph(findings):
+    """Aggregated graph for Reasoner: (repo, file, context) -> sorted [(repo, flag)]; flags are keys too."""
+    graph = {}
+    for dep in findings:
+        flag = dep.get('flag') or dep.get('dependency')
+        if not flag:
+            continue
+        flag_node = (dep['repo'], flag)
+        graph.setdefault(flag_node, [])
+        context = dep.get('context')
+        if context:
+            graph.setdefault((dep['repo'], dep['file'], context), set()).add(flag_node)
+    return {node: sorted(edges) for node, edges in graph.items()}
+
+
+def shared_flags(findings):
+    """{flag: sorted repos} for flag names used in more than one repository."""
+    repos = {}
+    for dep in findings:
+        flag = dep.get('flag') or dep.get('dependency')
+        if flag:
+            repos.setdefault(flag, set()).add(dep['repo'])
+    return {flag: sorted(names) for flag, names in sorted(repos.items()) if len(names) > 1}
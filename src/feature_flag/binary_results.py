@@ -0,0 +1,252 @@
+"""
+Compact binary format for scan results (AST, dataflow and merged findings).
+
+Every distinct string (paths, flags, contexts, code snippets, sources) is stored
+once in a string table; each finding is a fixed-width record of string ids, so a
+file can be memory-mapped and scanned record by record without deserializing it.
+
+Layout (little-endian):
+    header   magic 'FFDB', version, record size, record count, string count,
+             shapes offset, string table offset
+    records  record_count x RECORD: shape id, line, one string id per STRING_FIELDS,
+             string id of the JSON object holding any other fields (e.g. a batch scan's
+             'repo' and 'language')
+    shapes   JSON list of key tuples, so records round-trip to the exact JSON keys/order
+    strings  (string_count + 1) u64 offsets followed by the UTF-8 blob
+
+JSON import/export keeps the existing JSON consumers working:
+    PYTHONPATH=src python -m feature_flag.binary_results import merged_flag_dependencies.json merged.ffdb
+    PYTHONPATH=src python -m feature_flag.binary_results export merged.ffdb merged_flag_dependencies.json
+"""
+import json
+import mmap
+import os
+import struct
+
+from feature_flag.jsonstream import iter_json_file, write_json_array
+
+MAGIC = b'FFDB'
+VERSION = 2
+HEADER = struct.Struct('<4sHHIIQQ')
+# Integer-valued field; AST results call it 'lineno', merged results 'line'
+LINE_FIELDS = ('line', 'lineno')
+STRING_FIELDS = ('file', 'code', 'context', 'dependency', 'type', 'source', 'detail')
+RECORD = struct.Struct('<HxxI' + 'I' * (len(STRING_FIELDS) + 1))
+NONE = 0xFFFFFFFF
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def intern(self, value):
+        if value is None:
+            return NONE
+        if not isinstance(value, str):
+            raise ValueError(f"Expected a string or null, got {value!r}")
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+
+def write_binary(records, path):
+    """Write an iterable of finding dicts to `path`. Records are streamed; only unique strings are held in memory."""
+    strings = _StringTable()
+    shapes = {}
+    count = 0
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(b'\0' * HEADER.size)
+        for record in records:
+            keys = tuple(record)
+            shape_id = shapes.setdefault(keys, len(shapes))
+            line = NONE
+            extra = None
+            for key in keys:
+                if key in LINE_FIELDS:
+                    value = record[key]
+                    if value is not None and not (isinstance(value, int) and 0 <= value < NONE):
+                        raise ValueError(f"Unsupported {key} value: {value!r}")
+                    line = NONE if value is None else value
+                elif key not in STRING_FIELDS:
+                    if extra is None:
+                        extra = {}
+                    extra[key] = record[key]
+            extra_id = NONE if extra is None else strings.intern(json.dumps(extra))
+            f.write(RECORD.pack(shape_id, line, *(strings.intern(record.get(k)) for k in STRING_FIELDS), extra_id))
+            count += 1
+        shapes_offset = f.tell()
+        f.write(json.dumps([list(k) for k in sorted(shapes, key=shapes.get)]).encode('utf-8'))
+        strings_offset = f.tell()
+        encoded = [s.encode('utf-8') for s in strings.strings]
+        offset = 0
+        offsets = [0]
+        for data in encoded:
+            offset += len(data)
+            offsets.append(offset)
+        f.write(struct.pack(f'<{len(offsets)}Q', *offsets))
+        for data in encoded:
+            f.write(data)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, count, len(encoded), shapes_offset, strings_offset))
+    os.replace(tmp_path, path)
+    return count
+
+
+class BinaryResults:
+    """
+    Memory-mapped reader for the binary result format.
+    Records are decoded lazily: indexing/iteration builds dicts on demand, and
+    select() filters on string ids without decoding non-matching records.
+    """
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) else b''
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not a binary scan result file")
+        magic, version, record_size, count, string_count, shapes_offset, strings_offset = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is not a supported binary scan result file")
+        self._count = count
+        self._string_count = string_count
+        self._offsets_at = strings_offset
+        self._blob_at = strings_offset + 8 * (string_count + 1)
+        self._shapes = [tuple(k) for k in json.loads(bytes(self._map[shapes_offset:strings_offset]))]
+        self._string_cache = {}
+        self._string_ids = None
+        self._extra_cache = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __len__(self):
+        return self._count
+
+    def string(self, string_id):
+        """Decode one string from the table (cached)."""
+        if string_id == NONE:
+            return None
+        value = self._string_cache.get(string_id)
+        if value is None:
+            start, end = struct.unpack_from('<2Q', self._map, self._offsets_at + 8 * string_id)
+            value = self._string_cache[string_id] = self._map[self._blob_at + start:self._blob_at + end].decode('utf-8')
+        return value
+
+    def string_id(self, value):
+        """Return the id of `value` in the string table, or None if it never occurs."""
+        if self._string_ids is None:
+            self._string_ids = {self.string(i): i for i in range(self._string_count)}
+        return self._string_ids.get(value)
+
+    def raw_records(self):
+        """Iterate the undecoded record tuples: (shape_id, line, *string_ids, extra_id)."""
+        # unpack_from holds no buffer export between records, so close() works mid-iteration
+        unpack_from = RECORD.unpack_from
+        end = HEADER.size + RECORD.size * self._count
+        for offset in range(HEADER.size, end, RECORD.size):
+            yield unpack_from(self._map, offset)
+
+    def _extra(self, extra_id):
+        extra = self._extra_cache.get(extra_id)
+        if extra is None:
+            extra = self._extra_cache[extra_id] = json.loads(self.string(extra_id))
+        return extra
+
+    def _decode(self, raw):
+        keys = self._shapes[raw[0]]
+        values = dict(zip(STRING_FIELDS, raw[2:]))
+        record = {}
+        for key in keys:
+            if key in LINE_FIELDS:
+                record[key] = None if raw[1] == NONE else raw[1]
+            elif key in values:
+                record[key] = self.string(values[key])
+            else:
+                record[key] = self._extra(raw[-1])[key]
+        return record
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return self._decode(RECORD.unpack_from(self._map, HEADER.size + RECORD.size * index))
+
+    def __iter__(self):
+        for raw in self.raw_records():
+            yield self._decode(raw)
+
+    def select(self, **criteria):
+        """Yield records whose string fields equal the given values, e.g. select(dependency='flag_a')."""
+        wanted = []
+        for field, value in criteria.items():
+            if field not in STRING_FIELDS:
+                raise ValueError(f"Can only select on string fields: {field!r}")
+            string_id = NONE if value is None else self.string_id(value)
+            if string_id is None:
+                return
+            wanted.append((2 + STRING_FIELDS.index(field), string_id))
+        for raw in self.raw_records():
+            if all(raw[i] == string_id for i, string_id in wanted):
+                yield self._decode(raw)
+
+
+def is_binary_results(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_results(path):
+    """Load a scan result list from either the JSON or the binary format."""
+    if is_binary_results(path):
+        with BinaryResults(path) as results:
+            return list(results)
+    with open(path) as f:
+        return json.load(f)
+
+
+def iter_results(path):
+    """Stream scan result records from either format without loading the whole file."""
+    if is_binary_results(path):
+        with BinaryResults(path) as results:
+            yield from results
+    else:
+        yield from iter_json_file(path)
+
+
+def json_to_binary(json_path, binary_path):
+    """Convert a JSON result list to the binary format, streaming the input."""
+    return write_binary(iter_json_file(json_path), binary_path)
+
+
+def binary_to_json(binary_path, json_path):
+    """Export a binary result file to the JSON layout the existing scripts produce."""
+    with BinaryResults(binary_path) as results, open(json_path, 'w') as f:
+        return write_json_array(results, f)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert scan results between JSON and the compact binary format.")
+    parser.add_argument("command", choices=["import", "export"], help="import: JSON -> binary, export: binary -> JSON")
+    parser.add_argument("input_path", help="Input file")
+    parser.add_argument("output_path", help="Output file")
+    args = parser.parse_args()
+    if args.command == "import":
+        count = json_to_binary(args.input_path, args.output_path)
+    else:
+        count = binary_to_json(args.input_path, args.output_path)
+    print(f"Converted {count} records: {args.input_path} -> {args.output_path}")
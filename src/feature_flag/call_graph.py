@@ -0,0 +1,245 @@
+"""
+Python call graph built in-process from the ast, with qualified names.
+
+Each module is summarized on its own (ast_analysis.python_calls.module_summary: its
+definitions, imports and calls), in parallel worker processes; the summaries are then
+resolved together into caller -> callees edges between (qualname, file) nodes, the
+graph propagate_flags() walks. Nodes are qualified within their file (`Cart.total`,
+`outer.inner`), so equal names in different classes, functions or files stay apart.
+
+A call is resolved through, in order:
+- the enclosing functions (nested defs), then the module's top-level names;
+- `self.m()` / `cls.m()` to the enclosing class, `super().m()` to its bases, and
+  `C.m()` to class C, each looking the method up through the base classes;
+- imported names and aliases (`import a.b as c`, `from .m import f as g`), also when
+  a module re-exports a name it imported. An absolute import is looked up next to
+  the importing module first (how a script directory is searched), then from the
+  scan root, then as the unique module with that dotted suffix;
+- a class call to its `__init__`.
+Calls to anything else (builtins, libraries, attributes of unknown objects) are not
+edges; they are counted as unresolved.
+"""
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from ast_analysis.python_calls import module_name, module_summary
+from ast_analysis.utils import DEFAULT_LIMITS
+from feature_flag import metrics
+
+# Base-class and re-export chains are followed at most this deep
+MAX_DEPTH = 16
+# Fewer files than this are summarized in-process: starting workers costs more
+MIN_PARALLEL_FILES = 64
+
+
+def _summarize(file_path, root, limits):
+    """Worker: (summary or None, error or None, size, seconds) of one file."""
+    started = time.perf_counter()
+    reason, action = limits.check(file_path)
+    if action == 'skip':
+        return None, f"skipped ({reason})", 0, 0.0
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        code = f.read()
+    module, is_package = module_name(file_path, root)
+    try:
+        summary = module_summary(code, module, is_package)
+    except (SyntaxError, ValueError, RecursionError) as e:
+        return None, f"{type(e).__name__}: {e}", len(code), time.perf_counter() - started
+    summary['file'] = file_path
+    return summary, None, len(code), time.perf_counter() - started
+
+
+def _summarize_chunk(files, root, limits):
+    return [(file_path,) + _summarize(file_path, root, limits) for file_path in files]
+
+
+def summarize_modules(files, root, jobs=None, limits=DEFAULT_LIMITS):
+    """
+    Yield (file, summary, error, size, seconds) for `files`, summarized on `jobs`
+    worker processes (in-process for jobs=1 or few files), in the order of `files`.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(files) < MIN_PARALLEL_FILES:
+        yield from _summarize_chunk(files, root, limits)
+        return
+    # A few chunks per worker balance uneven file sizes without a task per file
+    size = max(1, -(-len(files) // (jobs * 4)))
+    chunks = [files[i:i + size] for i in range(0, len(files), size)]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for results in pool.map(_summarize_chunk, chunks, [root] * len(chunks), [limits] * len(chunks)):
+            yield from results
+
+
+class CallGraph:
+    """Module summaries resolved into `edges`: (qualname, file) -> {(qualname, file)}."""
+    def __init__(self):
+        self.modules = {}       # module -> summary
+        self.kinds = {}         # module -> {qualname: 'function' or 'class'}
+        self.by_suffix = defaultdict(list)
+        self.by_file = {}       # normalized file path -> module
+        self.edges = defaultdict(set)
+        self.errors = []
+        self.unresolved = 0
+        self._spans = {}        # file -> IntervalTree of (first line, last line, qualname)
+
+    def add(self, summary):
+        module = summary['module']
+        if module in self.modules:
+            # Two files with one module name (outside the root): keep the first
+            self.errors.append({'file': summary['file'], 'stage': 'calls',
+                                'message': f"module {module} already defined by {self.modules[module]['file']}"})
+            return
+        self.modules[module] = summary
+        self.by_file[os.path.normpath(summary['file'])] = module
+        kinds = self.kinds[module] = {name: 'class' for name in summary['classes']}
+        kinds.update((name, 'function') for name, _, _ in summary['functions'])
+        parts = module.split('.')
+        for i in range(1, len(parts)):
+            self.by_suffix['.'.join(parts[i:])].append(module)
+
+    def resolve(self):
+        """Resolve every call of the added modules into `edges`; returns them."""
+        for module, summary in self.modules.items():
+            file_path = summary['file']
+            for caller, reference, _ in summary['calls']:
+                target = self._call(module, caller, reference)
+                if target is None:
+                    self.unresolved += 1
+                    continue
+                callee_module, callee = target
+                self.edges[(caller, file_path)].add((callee, self.modules[callee_module]['file']))
+        return self.edges
+
+    def function_at(self, file_path, line):
+        """Qualified name of the innermost function of `file_path` containing `line`, or None."""
+        file_path = os.path.normpath(file_path)
+        tree = self._spans.get(file_path)
+        if tree is None:
+            from feature_flag.regions import IntervalTree
+            module = self.by_file.get(file_path)
+            functions = self.modules[module]['functions'] if module is not None else ()
+            tree = self._spans[file_path] = IntervalTree((start, end, name) for name, start, end in functions)
+        spans = tree.at(line)
+        # Sorted by first line: the innermost function starts last
+        return spans[-1][2] if spans else None
+
+    def _find_module(self, module, dotted):
+        """The scanned module an absolute import of `dotted` in `module` refers to, or None."""
+        package = module.rpartition('.')[0]
+        if package and f"{package}.{dotted}" in self.modules:
+            return f"{package}.{dotted}"
+        if dotted in self.modules:
+            return dotted
+        candidates = self.by_suffix.get(dotted, ())
+        return candidates[0] if len(candidates) == 1 else None
+
+    def _call(self, module, caller, reference):
+        """(module, qualname) of the function a call in `caller` runs, or None."""
+        head, _, rest = reference.partition('.')
+        kinds = self.kinds[module]
+        if head in ('self', 'cls', 'super()'):
+            cls = self._enclosing_class(module, caller)
+            if cls is None or not rest or '.' in rest:
+                return None
+            if head == 'super()':
+                return self._base_method(module, cls, rest, 0)
+            return self._method(module, cls, rest, 0)
+        # Nested definitions of the enclosing functions (class bodies are not enclosing scopes)
+        scope = caller
+        while scope:
+            if kinds.get(scope) == 'function' and f"{scope}.{head}" in kinds:
+                return self._target(self._lookup(module, f"{scope}.{reference}", 0))
+            scope = scope.rpartition('.')[0]
+        return self._target(self._lookup(module, reference, 0))
+
+    def _enclosing_class(self, module, caller):
+        scope = caller.rpartition('.')[0]
+        while scope:
+            if self.kinds[module].get(scope) == 'class':
+                return scope
+            scope = scope.rpartition('.')[0]
+        return None
+
+    def _target(self, found):
+        """A function to call from a lookup result; a class is called through its __init__."""
+        if found is None:
+            return None
+        kind, module, name = found
+        if kind == 'class':
+            return self._method(module, name, '__init__', 0)
+        return module, name
+
+    def _lookup(self, module, dotted, depth):
+        """('function' or 'class', module, qualname) that `dotted` names in `module`'s scope, or None."""
+        if depth > MAX_DEPTH:
+            return None
+        kinds = self.kinds[module]
+        parts = dotted.split('.')
+        for i in range(len(parts), 0, -1):
+            name = '.'.join(parts[:i])
+            kind = kinds.get(name)
+            if kind is None:
+                continue
+            rest = parts[i:]
+            if not rest:
+                return kind, module, name
+            if kind == 'class' and len(rest) == 1:
+                method = self._method(module, name, rest[0], depth + 1)
+                return ('function',) + method if method else None
+            return None
+        target = self.modules[module]['imports'].get(parts[0])
+        if target is None:
+            return None
+        return self._absolute(module, '.'.join([target] + parts[1:]), depth + 1)
+
+    def _absolute(self, module, dotted, depth):
+        """Lookup of an imported dotted name: the longest prefix that is a scanned module, then inside it."""
+        parts = dotted.split('.')
+        for i in range(len(parts), 0, -1):
+            found = self._find_module(module, '.'.join(parts[:i]))
+            if found is not None:
+                return self._lookup(found, '.'.join(parts[i:]), depth + 1) if i < len(parts) else None
+        return None
+
+    def _method(self, module, cls, name, depth):
+        """(module, qualname) of method `name` of class `cls`, defined there or on a base class."""
+        if self.kinds[module].get(f"{cls}.{name}") == 'function':
+            return module, f"{cls}.{name}"
+        return self._base_method(module, cls, name, depth)
+
+    def _base_method(self, module, cls, name, depth):
+        if depth > MAX_DEPTH:
+            return None
+        for base in self.modules[module]['classes'].get(cls, ()):
+            found = self._lookup(module, base, depth + 1)
+            if found is not None and found[0] == 'class':
+                method = self._method(found[1], found[2], name, depth + 1)
+                if method is not None:
+                    return method
+        return None
+
+
+def build_call_graph(target_dir, files=None, jobs=None, limits=DEFAULT_LIMITS):
+    """
+    The CallGraph of the Python files under `target_dir` (or of `files`), resolved;
+    modules are named from their path relative to `target_dir`.
+    """
+    if files is None:
+        from cli.end_to_end_demo import collect_files
+        files = collect_files(target_dir, ['.py'])
+    graph = CallGraph()
+    with metrics.stage('callgraph') as m:
+        for file_path, summary, error, size, seconds in summarize_modules(sorted(files), target_dir, jobs, limits):
+            if error is not None:
+                graph.errors.append({'file': file_path, 'stage': 'calls', 'message': error})
+                m.count('errors')
+                continue
+            graph.add(summary)
+            m.add_file(file_path, size, seconds)
+        graph.resolve()
+        m.count('functions', sum(len(kinds) for kinds in graph.kinds.values()))
+        m.count('edges', sum(len(callees) for callees in graph.edges.values()))
+        m.count('unresolved', graph.unresolved)
+    return graph
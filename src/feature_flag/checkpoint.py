@@ -0,0 +1,142 @@
+"""
+Append-only checkpoint journal for long-running scans.
+
+A scan killed partway (preemption, OOM) can be continued instead of restarted:
+every analyzed file and every completed stage output is appended to a JSON-lines
+journal as soon as it exists, and a rerun with resume=True replays it:
+- {"stage", "fp", "file", "digest", "findings"}: the findings of one analyzed file;
+  a resumed scan takes them instead of analyzing the file again, provided the file
+  still has the same content digest;
+- {"stage", "fp", "output"}: the output of a completed pipeline stage, reused as is.
+Records only count for the stage fingerprint ("fp", see pipeline.Stage.fingerprint)
+they were written under, so changed parameters, inputs or analyzer code start over,
+and a resumed run produces the same output as an uninterrupted one.
+
+Each record is flushed as it is written; the file is fsynced at most once every
+`sync_seconds` and whenever a stage completes. A torn last line (the process died
+mid-write) is dropped. A run that starts without resume truncates the journal, so the
+progress of an interrupted run is lost unless it is resumed; finish() removes the
+journal once the whole run has succeeded. The journal is not an input of the scans
+(see pipeline._hash_path), so it may live inside the scanned directory.
+"""
+import json
+import os
+import threading
+import time
+
+DEFAULT_CHECKPOINT = os.path.join('.ffdeps_cache', 'checkpoint.jsonl')
+DEFAULT_SYNC_SECONDS = 1.0
+
+
+class StageJournal:
+    """The per-file view of a Checkpoint for one stage run (one fingerprint)."""
+    def __init__(self, checkpoint, stage, fingerprint):
+        self.checkpoint = checkpoint
+        self.stage = stage
+        self.fingerprint = fingerprint
+        self.files = checkpoint.files.get((stage, fingerprint), {})
+
+    def get(self, file_path, digest):
+        """Findings journaled for this file and content, or None."""
+        return self.files.get((file_path, digest.hex()))
+
+    def record(self, file_path, digest, findings):
+        self.checkpoint.append({'stage': self.stage, 'fp': self.fingerprint, 'file': file_path,
+                                'digest': digest.hex(), 'findings': findings})
+
+
+class Checkpoint:
+    def __init__(self, path=DEFAULT_CHECKPOINT, resume=False, sync_seconds=DEFAULT_SYNC_SECONDS):
+        self.path = path
+        self.sync_seconds = sync_seconds
+        self.files = {}         # (stage, fp) -> {(file, digest): findings}
+        self.outputs = {}       # (stage, fp) -> output
+        self.replayed = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if resume and os.path.exists(path):
+            self._replay()
+        self._file = open(path, 'a' if resume else 'w')
+        self._synced = time.monotonic()
+
+    def _replay(self):
+        good = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                good += len(line)
+                key = (record['stage'], record['fp'])
+                if 'output' in record:
+                    self.outputs[key] = record['output']
+                else:
+                    self.files.setdefault(key, {})[(record['file'], record['digest'])] = record['findings']
+                self.replayed += 1
+        # Drop a torn or corrupt tail so appended records start on a line of their own
+        if good != os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(good)
+
+    def append(self, record, sync=False):
+        line = json.dumps(record) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            now = time.monotonic()
+            if sync or now - self._synced >= self.sync_seconds:
+                os.fsync(self._file.fileno())
+                self._synced = now
+
+    def stage(self, name, fingerprint):
+        return StageJournal(self, name, fingerprint)
+
+    def output(self, name, fingerprint, default=None):
+        """The journaled output of a completed stage, or `default`."""
+        return self.outputs.get((name, fingerprint), default)
+
+    def complete(self, name, fingerprint, output):
+        """Journal a completed stage's (JSON-serializable) output, durably."""
+        self.outputs[(name, fingerprint)] = output
+        self.append({'stage': name, 'fp': fingerprint, 'output': output}, sync=True)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def finish(self):
+        """The run succeeded: nothing is left to resume."""
+        self.close()
+        os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.finish()
+        else:
+            self.close()
+
+
+def scan_fingerprint(name, func, params, inputs, exclude=()):
+    """
+    Fingerprint of a scan run outside a Pipeline, computed as for a pipeline stage (plus the
+    analyzer code). `exclude`: the journal and other state files, which may be under `inputs`.
+    """
+    from feature_flag.pipeline import Stage, CODE_INPUTS
+    return Stage(name, func, params=params, inputs=tuple(inputs) + CODE_INPUTS).fingerprint({}, exclude)
+
+
+def checkpoint_from_args(args):
+    """A Checkpoint from the options, or None when disabled."""
+    if not args.checkpoint:
+        if args.resume:
+            raise ValueError("--resume needs a --checkpoint journal")
+        return None
+    return Checkpoint(args.checkpoint, resume=args.resume)
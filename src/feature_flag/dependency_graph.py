@@ -1 +1,29 @@
-# Dependency graph builder (placeholder)
+"""
+Dependency graph builder: per-function flag sets and their propagation along the call graph.
+Nodes are (function, file) tuples; the call graph maps caller -> set of callees.
+"""
+from collections import defaultdict
+
+
+def aggregate_flags_by_function(flag_usages):
+    """统计每个函数直接使用的flag集合"""
+    function_flags = defaultdict(set)
+    for usage in flag_usages:
+        if usage['function']:
+            function_flags[(usage['function'], usage['file'])].add(usage['flag'])
+    return function_flags
+
+
+def propagate_flags(call_graph, function_flags):
+    """沿调用图向上传播flag依赖"""
+    all_flags = {f: set(flags) for f, flags in function_flags.items()}
+    changed = True
+    while changed:
+        changed = False
+        for caller, callees in call_graph.items():
+            for callee in callees:
+                before = len(all_flags.get(caller, set()))
+                all_flags.setdefault(caller, set()).update(all_flags.get(callee, set()))
+                if len(all_flags[caller]) > before:
+                    changed = True
+    return all_flags
@@ -0,0 +1,249 @@
+"""
+Level-of-detail views of the function/flag dependency graph for visualization.
+
+A single pyvis page with every function node does not scale past a few thousand
+nodes, so large graphs are rendered as:
+- a clustered overview: one node per file or package (collapsed members), with
+  aggregated call edges and a layout precomputed offline (physics disabled);
+- paged cluster views: one page per cluster (split into pages of at most
+  `max_nodes` members), showing the members and their direct neighbors;
+- ego views: the neighborhood of a chosen flag or function up to a depth limit.
+
+Nodes are (function, file) tuples, as produced by propagate_flags.
+"""
+import os
+from collections import defaultdict, deque
+
+DEFAULT_MAX_NODES = 1500
+
+
+def group_of(node, group_by='file'):
+    """Cluster key of a node: its file, or its package (directory) when group_by='package'."""
+    file_path = node[1]
+    if group_by == 'package':
+        return os.path.dirname(file_path) or '.'
+    return file_path
+
+
+def graph_nodes(all_flags, call_graph):
+    nodes = set(all_flags)
+    for caller, callees in call_graph.items():
+        nodes.add(caller)
+        nodes.update(callees)
+    return nodes
+
+
+def cycle_edges(cycles):
+    """Set of (caller, callee) edges that lie on a detected cycle."""
+    edges = set()
+    for cycle in cycles:
+        for i in range(len(cycle)):
+            edges.add((cycle[i], cycle[(i + 1) % len(cycle)]))
+    return edges
+
+
+def cluster_graph(all_flags, call_graph, group_by='file'):
+    """
+    Collapse nodes into clusters.
+    Returns (clusters, edges): clusters maps key -> {'members': [...], 'flags': set},
+    edges maps (source_key, target_key) -> number of call edges between the clusters.
+    """
+    clusters = {}
+    for node in sorted(graph_nodes(all_flags, call_graph)):
+        cluster = clusters.setdefault(group_of(node, group_by), {'members': [], 'flags': set()})
+        cluster['members'].append(node)
+        cluster['flags'].update(all_flags.get(node, ()))
+    edges = defaultdict(int)
+    for caller, callees in call_graph.items():
+        for callee in callees:
+            edges[(group_of(caller, group_by), group_of(callee, group_by))] += 1
+    return clusters, edges
+
+
+def ego_nodes(all_flags, call_graph, focus, depth=2, max_nodes=DEFAULT_MAX_NODES):
+    """
+    Nodes within `depth` call edges (either direction) of the focus.
+    The focus is a flag name (seeds: functions that use it directly or transitively),
+    a function name, or 'function@file'. Expansion stops once `max_nodes` is reached.
+    """
+    neighbors = defaultdict(set)
+    for caller, callees in call_graph.items():
+        for callee in callees:
+            neighbors[caller].add(callee)
+            neighbors[callee].add(caller)
+    nodes = graph_nodes(all_flags, call_graph)
+    seeds = sorted(n for n in nodes if focus in all_flags.get(n, ()) or focus in (n[0], f"{n[0]}@{n[1]}"))
+    if not seeds:
+        raise ValueError(f"No flag or function named '{focus}' in the dependency graph")
+    selected = set(seeds[:max_nodes])
+    queue = deque((node, 0) for node in seeds[:max_nodes])
+    while queue and len(selected) < max_nodes:
+        node, dist = queue.popleft()
+        if dist >= depth:
+            continue
+        for neighbor in sorted(neighbors[node]):
+            if neighbor not in selected:
+                selected.add(neighbor)
+                queue.append((neighbor, dist + 1))
+                if len(selected) >= max_nodes:
+                    break
+    return selected
+
+
+def subgraph_edges(call_graph, nodes):
+    return [(caller, callee) for caller, callees in call_graph.items() if caller in nodes
+            for callee in callees if callee in nodes]
+
+
+def page_with_neighbors(page_nodes, adjacent, max_neighbors=DEFAULT_MAX_NODES):
+    """
+    The page's nodes plus their direct neighbors from other pages, so boundary edges stay
+    visible. At most `max_neighbors` neighbors are added, however connected a node is.
+    """
+    shown = set(page_nodes)
+    budget = max_neighbors
+    for node in sorted(page_nodes):
+        for neighbor in sorted(adjacent.get(node, ())):
+            if neighbor not in shown:
+                if not budget:
+                    return shown
+                shown.add(neighbor)
+                budget -= 1
+    return shown
+
+
+def offline_layout(nodes, edges, x_spacing=260, y_spacing=90, max_rows=40):
+    """
+    Precompute node positions (pixels) so the browser does no physics simulation.
+    Layered layout in O(nodes + edges): nodes are placed in columns by BFS depth from
+    the roots (nodes without incoming edges, else the first unplaced node); a column
+    taller than `max_rows` wraps into extra sub-columns.
+    """
+    successors = defaultdict(list)
+    has_incoming = set()
+    for source, target in edges:
+        if source != target:
+            successors[source].append(target)
+            has_incoming.add(target)
+    level = {}
+    order = [n for n in nodes if n not in has_incoming] + [n for n in nodes if n in has_incoming]
+    for start in order:
+        if start in level:
+            continue
+        level[start] = 0
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            for child in successors[node]:
+                if child not in level:
+                    level[child] = level[node] + 1
+                    queue.append(child)
+    columns = defaultdict(list)
+    for node in nodes:
+        columns[level[node]].append(node)
+    positions = {}
+    x = 0
+    for depth in sorted(columns):
+        column = columns[depth]
+        for start in range(0, len(column), max_rows):
+            chunk = column[start:start + max_rows]
+            for row, node in enumerate(chunk):
+                positions[node] = (float(x), float((row - len(chunk) / 2) * y_spacing))
+            x += x_spacing
+    return positions
+
+
+def _node_label(node, flags):
+    return f"{node[0]}\n{os.path.basename(node[1])}\nFlags: {', '.join(sorted(flags))}"
+
+
+def _new_network():
+    from pyvis.network import Network
+    return Network(height='800px', width='100%', notebook=False, directed=True)
+
+
+def render_subgraph(all_flags, call_graph, nodes, cycle_edge_set, output_html, title_links=None, show=False):
+    """Render the given function nodes with a precomputed layout; neighbors outside the page link to their page."""
+    net = _new_network()
+    edges = subgraph_edges(call_graph, nodes)
+    positions = offline_layout(sorted(nodes), edges)
+    for node in sorted(nodes):
+        flags = all_flags.get(node, set())
+        x, y = positions.get(node, (0.0, 0.0))
+        title = (title_links or {}).get(node)
+        net.add_node(str(node), label=_node_label(node, flags), color='red' if len(flags) > 1 else 'lightblue',
+                     x=x, y=y, physics=False, **({'title': title} if title else {}))
+    for caller, callee in edges:
+        if (caller, callee) in cycle_edge_set:
+            net.add_edge(str(caller), str(callee), color='orange', width=3)
+        else:
+            net.add_edge(str(caller), str(callee))
+    net.toggle_physics(False)
+    if show:
+        net.show(output_html)
+    else:
+        net.write_html(output_html)
+    return output_html
+
+
+def render_clustered(all_flags, call_graph, cycles, output_html, group_by='file', max_nodes=DEFAULT_MAX_NODES):
+    """
+    Render the clustered overview to `output_html` and one page per cluster (paged by
+    `max_nodes`) under '<output stem>_pages/'. Returns the list of written pages.
+    """
+    clusters, edges = cluster_graph(all_flags, call_graph, group_by)
+    cycle_edge_set = cycle_edges(cycles)
+    stem = os.path.splitext(output_html)[0]
+    pages_dir = stem + '_pages'
+    os.makedirs(pages_dir, exist_ok=True)
+    rel_pages_dir = os.path.basename(pages_dir)
+
+    # Assign every cluster member to a page
+    page_of = {}
+    cluster_pages = {}
+    for index, key in enumerate(sorted(clusters)):
+        members = clusters[key]['members']
+        pages = []
+        for start in range(0, len(members), max_nodes):
+            page = f"cluster{index:05d}_{start // max_nodes}.html"
+            pages.append(page)
+            for node in members[start:start + max_nodes]:
+                page_of[node] = page
+        cluster_pages[key] = pages
+
+    adjacent = defaultdict(set)
+    for caller, callees in call_graph.items():
+        for callee in callees:
+            adjacent[caller].add(callee)
+            adjacent[callee].add(caller)
+
+    written = []
+    for key, pages in cluster_pages.items():
+        members = clusters[key]['members']
+        for number, page in enumerate(pages):
+            page_nodes = set(members[number * max_nodes:(number + 1) * max_nodes])
+            shown = page_with_neighbors(page_nodes, adjacent, max_nodes)
+            links = {node: f'<a href="{page_of[node]}">{group_of(node, group_by)}</a>'
+                     for node in shown - page_nodes}
+            written.append(render_subgraph(all_flags, call_graph, shown, cycle_edge_set,
+                                           os.path.join(pages_dir, page), title_links=links))
+
+    net = _new_network()
+    positions = offline_layout(sorted(clusters), [e for e in edges if e[0] != e[1]])
+    for key, cluster in clusters.items():
+        x, y = positions.get(key, (0.0, 0.0))
+        size = len(cluster['members'])
+        pages = ' '.join(f'<a href="{rel_pages_dir}/{p}">page {i + 1}</a>' for i, p in enumerate(cluster_pages[key]))
+        net.add_node(key, label=f"{key}\n{size} functions, {len(cluster['flags'])} flags",
+                     title=f"{key}<br>{pages}", shape='box',
+                     color='red' if len(cluster['flags']) > 1 else 'lightblue',
+                     value=size, x=x, y=y, physics=False)
+    on_cycle = {(group_of(a, group_by), group_of(b, group_by)) for a, b in cycle_edge_set}
+    for (source, target), count in sorted(edges.items()):
+        if source == target:
+            continue
+        options = {'color': 'orange', 'width': 3} if (source, target) in on_cycle else {'value': count}
+        net.add_edge(source, target, title=f"{count} calls", **options)
+    net.toggle_physics(False)
+    net.show(output_html)
+    return [output_html] + written
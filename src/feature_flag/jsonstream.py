@@ -0,0 +1,129 @@
+"""
+Incremental JSON array reading and writing.
+- iter_json_array yields the elements of a top-level JSON array (or of the array
+  stored under a top-level object key, e.g. Semgrep's "results") one at a time,
+  so memory is bounded by the largest element rather than by the whole document.
+- write_json_array streams elements out in the same layout as json.dump(..., indent=2).
+"""
+import codecs
+import json
+import re
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = re.compile(r'[-+0-9.eE]*')
+
+
+class _Reader:
+    def __init__(self, fp, chunk_size):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.bytes_decoder = None
+
+    def fill(self, size=None):
+        """Append the next chunk to the unread part of the buffer; False at EOF."""
+        while not self.eof:
+            chunk = self.fp.read(size or self.chunk_size)
+            if not chunk:
+                self.eof = True
+            if isinstance(chunk, bytes):
+                # Binary streams (e.g. subprocess pipes) are decoded incrementally
+                if self.bytes_decoder is None:
+                    self.bytes_decoder = codecs.getincrementaldecoder('utf-8')()
+                chunk = self.bytes_decoder.decode(chunk, final=self.eof)
+            if chunk:
+                self.buf = self.buf[self.pos:] + chunk
+                self.pos = 0
+                return True
+        return False
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it ('' at EOF)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf) or not self.fill():
+                return self.buf[self.pos] if self.pos < len(self.buf) else ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' in JSON stream, found '{found or 'EOF'}'")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value, reading more input as needed."""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill(size):
+                    raise
+                # Grow reads for large values so re-decoding stays linear overall
+                size *= 2
+                continue
+            # A number that runs to the end of the buffer may continue in the next chunk (also
+            # when only its prefix decodes: '-1.' of '-1.5')
+            if isinstance(obj, (int, float)) and _NUMBER_CHARS.match(self.buf, self.pos).end() == len(self.buf):
+                if self.fill(size):
+                    continue
+            self.pos = end
+            return obj
+
+
+def iter_json_array(fp, key=None, chunk_size=65536):
+    """
+    Yield the elements of the JSON array in `fp` one at a time.
+    If `key` is given, the document must be an object and the array under that
+    top-level key is streamed (other keys before it are decoded and discarded).
+    """
+    reader = _Reader(fp, chunk_size)
+    if key is not None:
+        reader.expect('{')
+        while True:
+            if reader.peek() == '}':
+                return
+            name = reader.value()
+            reader.expect(':')
+            if name == key:
+                break
+            reader.value()
+            if reader.peek() == ',':
+                reader.pos += 1
+        if reader.peek() == 'n':
+            reader.value()  # "key": null
+            return
+    reader.expect('[')
+    if reader.peek() == ']':
+        reader.pos += 1
+        return
+    while True:
+        yield reader.value()
+        char = reader.peek()
+        reader.pos += 1
+        if char == ']':
+            return
+        if char != ',':
+            raise ValueError(f"Expected ',' or ']' in JSON array, found '{char or 'EOF'}'")
+
+
+def iter_json_file(path, key=None):
+    """Stream the array elements of a JSON file (see iter_json_array)."""
+    with open(path) as f:
+        yield from iter_json_array(f, key)
+
+
+def write_json_array(items, fp):
+    """Write `items` as a JSON array, formatted like json.dump(items, fp, indent=2). Returns the count."""
+    count = 0
+    for item in items:
+        fp.write('[\n  ' if count == 0 else ',\n  ')
+        fp.write(json.dumps(item, indent=2).replace('\n', '\n  '))
+        count += 1
+    fp.write('\n]' if count else '[]')
+    return count
@@ -0,0 +1,233 @@
+"""
+Merge and deduplicate Semgrep, AST-based and Data Flow feature flag results.
+
+Streaming k-way merge engine: every source is turned into a stream of entries
+sorted by (file, line, code digest), and the streams are merged with heapq so
+that entries with equal keys arrive together and are combined on the fly
+(`source` provenance joined with '+', the last non-empty `detail` kept).
+Keys hash the code line instead of holding the full string. A source that is
+not already sorted is sorted externally in bounded-size runs spilled to disk,
+so memory stays bounded by the run size rather than by the scan size.
+"""
+import hashlib
+import heapq
+import json
+import os
+import re
+import tempfile
+from itertools import islice
+from operator import itemgetter
+
+from feature_flag.jsonstream import iter_json_file, write_json_array
+from feature_flag import metrics
+
+# Entries held in memory per sorted run when a source needs an external sort
+DEFAULT_RUN_SIZE = 100000
+
+
+def load_json(path, default=None):
+    """Load a JSON file, returning `default` if it does not exist (when given)."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        if default is None:
+            raise
+        return default
+
+
+def semgrep_entries(semgrep_data):
+    """Normalize raw Semgrep JSON output (or an iterable of its results) into merge entries."""
+    results = semgrep_data.get('results', []) if isinstance(semgrep_data, dict) else semgrep_data
+    for finding in results:
+        file = finding.get('path')
+        line = finding.get('start', {}).get('line')
+        code = finding.get('extra', {}).get('lines')
+        yield {'file': file, 'line': line, 'code': code, 'source': 'semgrep'}
+
+
+def ast_entries(ast_data):
+    """
+    Normalize AST analyzer output into merge entries.
+    Filters out function definitions (e.g., code starts with 'def is_feature_enabled') for parity with Semgrep.
+    """
+    for dep in ast_data:
+        code = dep.get('code')
+        if re.match(r'^def is_feature_enabled', code):
+            continue
+        yield {
+            'file': dep.get('file'),
+            'line': dep.get('lineno'),
+            'code': code,
+            'context': dep.get('context'),
+            'dependency': dep.get('dependency'),
+            'source': 'ast'
+        }
+
+
+def dataflow_entries(dataflow_data):
+    """Normalize Data Flow Analysis output into merge entries."""
+    for dep in dataflow_data:
+        yield {
+            'file': dep.get('file'),
+            'line': dep.get('line'),
+            'code': dep.get('code'),
+            'context': dep.get('context'),
+            'dependency': dep.get('dependency'),
+            'source': 'dataflow_analysis',
+            'detail': dep.get('detail')
+        }
+
+
+def merge_key(entry):
+    """Sort/dedup key: (file, line, 8-byte digest of the code line)."""
+    code = entry['code']
+    digest = hashlib.blake2b(code.encode('utf-8'), digest_size=8).digest() if code is not None else b''
+    line = entry['line']
+    return (entry['file'] or '', line if line is not None else -1, digest)
+
+
+def _is_sorted(entries):
+    previous = None
+    for entry in entries:
+        key = merge_key(entry)
+        if previous is not None and key < previous:
+            return False
+        previous = key
+    return True
+
+
+def _spill_run(run, tmp_dir):
+    fd, path = tempfile.mkstemp(suffix='.jsonl', dir=tmp_dir)
+    with os.fdopen(fd, 'w') as f:
+        for entry in run:
+            f.write(json.dumps(entry))
+            f.write('\n')
+    return path
+
+
+def _iter_run(path):
+    with open(path) as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def external_sort(entries, run_size=DEFAULT_RUN_SIZE, tmp_dir=None):
+    """
+    Sort entries by merge_key holding at most `run_size` entries in memory.
+    Sorted runs are spilled to JSON-lines files and merged back lazily; the
+    sort is stable, so duplicates within a source keep their original order.
+    """
+    entries = iter(entries)
+    first = list(islice(entries, run_size))
+    first.sort(key=merge_key)
+    second = list(islice(entries, run_size))
+    if not second:
+        yield from first
+        return
+    with tempfile.TemporaryDirectory(prefix='ffdeps-merge-', dir=tmp_dir) as run_dir:
+        paths = [_spill_run(first, run_dir)]
+        del first
+        run = second
+        while run:
+            run.sort(key=merge_key)
+            paths.append(_spill_run(run, run_dir))
+            run = list(islice(entries, run_size))
+        yield from heapq.merge(*(_iter_run(p) for p in paths), key=merge_key)
+
+
+def sorted_source(open_entries, run_size=DEFAULT_RUN_SIZE, tmp_dir=None):
+    """
+    Return a sorted entry stream for a source.
+    `open_entries` is a zero-argument callable returning a fresh iterator over the
+    source (e.g. re-opening a file). Pre-sorted sources are verified in one
+    constant-memory pass and then streamed as-is; others are sorted externally.
+    """
+    if _is_sorted(open_entries()):
+        return open_entries()
+    return external_sort(open_entries(), run_size, tmp_dir)
+
+
+def merge_sorted(*sources):
+    """
+    k-way merge of sorted entry streams, combining entries with equal keys.
+    Sources are given in priority order: on equal keys the entry from the earlier
+    source is kept and later ones contribute their `source` and `detail`.
+    """
+    current = None
+    current_key = None
+    keyed = [((merge_key(entry), entry) for entry in source) for source in sources]
+    for key, entry in heapq.merge(*keyed, key=itemgetter(0)):
+        if current is not None and key == current_key and entry['code'] == current['code']:
+            # Merge sources
+            if entry['source'] not in current['source']:
+                current['source'] = current['source'] + '+' + entry['source']
+            # Merge detail if present
+            if 'detail' in entry and entry['detail']:
+                current['detail'] = entry['detail']
+            continue
+        if current is not None:
+            yield current
+        current, current_key = entry, key
+    if current is not None:
+        yield current
+
+
+def iter_merged(semgrep_source, ast_source, dataflow_source=None, run_size=DEFAULT_RUN_SIZE, tmp_dir=None):
+    """
+    Stream merged entries from the three raw stage outputs.
+    Each argument is a zero-argument callable returning a fresh iterator of the
+    stage's raw records (Semgrep results, AST dependencies, dataflow findings).
+    """
+    sources = [
+        sorted_source(lambda: semgrep_entries(semgrep_source()), run_size, tmp_dir),
+        sorted_source(lambda: ast_entries(ast_source()), run_size, tmp_dir),
+    ]
+    if dataflow_source is not None:
+        sources.append(sorted_source(lambda: dataflow_entries(dataflow_source()), run_size, tmp_dir))
+    return merge_sorted(*sources)
+
+
+def merge_results(semgrep_data, ast_data, dataflow_data=None):
+    """Merge the three in-memory stage outputs into the unified finding list."""
+    semgrep_results = semgrep_data.get('results', []) if isinstance(semgrep_data, dict) else semgrep_data
+    dataflow_data = dataflow_data or []
+    with metrics.stage('merge') as m:
+        merged = list(iter_merged(
+            lambda: iter(semgrep_results),
+            lambda: iter(ast_data),
+            lambda: iter(dataflow_data)
+        ))
+        m.count('entries', len(merged))
+    return merged
+
+
+def merge_files(semgrep_path, ast_path, dataflow_path, output_path, run_size=DEFAULT_RUN_SIZE, on_entry=None):
+    """
+    Stream-merge the stage output files into `output_path` without loading them.
+    A missing dataflow file is treated as empty. Returns the number of merged entries.
+    """
+    dataflow_source = None
+    if os.path.exists(dataflow_path):
+        dataflow_source = lambda: iter_json_file(dataflow_path)
+    merged = iter_merged(
+        lambda: iter_json_file(semgrep_path, key='results'),
+        lambda: iter_json_file(ast_path),
+        dataflow_source,
+        run_size=run_size
+    )
+    if on_entry is not None:
+        merged = _tap(merged, on_entry)
+    # Write to a temporary file first so a failed merge never truncates the previous output
+    tmp_path = output_path + '.tmp'
+    with metrics.stage('merge') as m, open(tmp_path, 'w') as f:
+        count = write_json_array(merged, f)
+        m.count('entries', count)
+    os.replace(tmp_path, output_path)
+    return count
+
+
+def _tap(entries, callback):
+    for entry in entries:
+        callback(entry)
+        yield entry
@@ -0,0 +1,287 @@
+"""
+Per-stage instrumentation: wall and CPU time, files/sec, bytes/sec, peak RSS,
+cache hit rates and the slowest files, written as JSON and/or Prometheus text.
+
+Instrumented code wraps its work in `stage()` and reports what it processed:
+
+    with metrics.stage('ast') as m:
+        for path in files:
+            started = time.perf_counter()
+            ...
+            m.add_file(path, size, time.perf_counter() - started)
+
+Collection is off until `enable()` is called (the runners do it for --metrics /
+--prometheus); until then `stage()` yields a no-op recorder. Stages may run
+concurrently on threads: CPU time is per thread, RSS is the process peak.
+Opt-in hooks per stage: cProfile (one .prof file per stage run; skipped when
+another profiler is already active) and tracemalloc (peak traced bytes; the
+tracer is process-wide, so concurrent stages share it). Both are imported only
+when enabled, keeping this module cheap to import for short-lived commands.
+"""
+import contextlib
+import heapq
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_SLOWEST = 10
+PROMETHEUS_PREFIX = 'ffdeps'
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _children_cpu():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class StageRecorder:
+    """Collects the work done during one run of a stage."""
+    def __init__(self, slowest=DEFAULT_SLOWEST):
+        self.files = 0
+        self.bytes = 0
+        self.counts = {}
+        self.slowest = []
+        self._slowest_n = slowest
+
+    def add_file(self, path, size=0, seconds=None):
+        self.files += 1
+        self.bytes += size
+        if seconds is not None:
+            entry = (seconds, path)
+            if len(self.slowest) < self._slowest_n:
+                heapq.heappush(self.slowest, entry)
+            elif entry > self.slowest[0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def count(self, kind, n=1):
+        """Count arbitrary items, e.g. count('findings', len(results))."""
+        self.counts[kind] = self.counts.get(kind, 0) + n
+
+
+class _NullRecorder:
+    def add_file(self, path, size=0, seconds=None):
+        pass
+
+    def count(self, kind, n=1):
+        pass
+
+
+_NULL_RECORDER = _NullRecorder()
+
+
+class Metrics:
+    def __init__(self, profile_dir=None, trace_memory=False, slowest=DEFAULT_SLOWEST):
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self.slowest = slowest
+        self.stages = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def _record(self, name):
+        record = self.stages.get(name)
+        if record is None:
+            record = self.stages[name] = {
+                'runs': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'child_cpu_seconds': 0.0,
+                'files': 0, 'bytes': 0, 'cache_hits': 0, 'cache_misses': 0,
+                'peak_rss_bytes': None, 'traced_peak_bytes': None, 'counts': {}, 'slowest_files': [],
+            }
+        return record
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        recorder = StageRecorder(self.slowest)
+        profiler = self._start_profiler()
+        if self.trace_memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        child_cpu = _children_cpu()
+        try:
+            yield recorder
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.thread_time() - cpu
+            child_cpu = _children_cpu() - child_cpu
+            traced_peak = None
+            if self.trace_memory:
+                import tracemalloc
+                traced_peak = tracemalloc.get_traced_memory()[1]
+            profile_path = self._stop_profiler(profiler, name)
+            with self._lock:
+                record = self._record(name)
+                record['runs'] += 1
+                record['wall_seconds'] += wall
+                record['cpu_seconds'] += cpu
+                record['child_cpu_seconds'] += child_cpu
+                record['files'] += recorder.files
+                record['bytes'] += recorder.bytes
+                record['peak_rss_bytes'] = peak_rss_bytes()
+                if traced_peak is not None:
+                    record['traced_peak_bytes'] = max(record['traced_peak_bytes'] or 0, traced_peak)
+                for kind, n in recorder.counts.items():
+                    record['counts'][kind] = record['counts'].get(kind, 0) + n
+                slowest = [(s, p) for p, s in record['slowest_files']] + recorder.slowest
+                record['slowest_files'] = [[p, s] for s, p in heapq.nlargest(self.slowest, slowest)]
+                if profile_path:
+                    record.setdefault('profiles', []).append(profile_path)
+
+    def _start_profiler(self):
+        if not self.profile_dir:
+            return None
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another stage on a concurrent thread holds the profiler
+            return None
+        return profiler
+
+    def _stop_profiler(self, profiler, name):
+        if profiler is None:
+            return None
+        profiler.disable()
+        os.makedirs(self.profile_dir, exist_ok=True)
+        safe_name = re.sub(r'[^\w.-]', '_', name)
+        path = os.path.join(self.profile_dir, f"{safe_name}.{os.getpid()}.{threading.get_ident()}.{time.time_ns()}.prof")
+        profiler.dump_stats(path)
+        return path
+
+    def record_cache(self, name, hit):
+        with self._lock:
+            record = self._record(name)
+            record['cache_hits' if hit else 'cache_misses'] += 1
+
+    def to_dict(self):
+        with self._lock:
+            stages = {}
+            for name, record in self.stages.items():
+                stage = json.loads(json.dumps(record))
+                wall = record['wall_seconds']
+                lookups = record['cache_hits'] + record['cache_misses']
+                stage['files_per_second'] = record['files'] / wall if wall else None
+                stage['bytes_per_second'] = record['bytes'] / wall if wall else None
+                stage['cache_hit_rate'] = record['cache_hits'] / lookups if lookups else None
+                stages[name] = stage
+        return {'started': self.started, 'elapsed_seconds': time.time() - self.started,
+                'peak_rss_bytes': peak_rss_bytes(), 'stages': stages}
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def to_prometheus(self):
+        data = self.to_dict()
+        series = (
+            ('stage_runs_total', 'counter', 'Stage executions', 'runs'),
+            ('stage_wall_seconds', 'gauge', 'Wall-clock time spent in the stage', 'wall_seconds'),
+            ('stage_cpu_seconds', 'gauge', 'CPU time of the thread running the stage', 'cpu_seconds'),
+            ('stage_child_cpu_seconds', 'gauge', 'CPU time of subprocesses reaped during the stage', 'child_cpu_seconds'),
+            ('stage_files_total', 'counter', 'Files processed', 'files'),
+            ('stage_bytes_total', 'counter', 'Bytes processed', 'bytes'),
+            ('stage_files_per_second', 'gauge', 'Files processed per wall-clock second', 'files_per_second'),
+            ('stage_bytes_per_second', 'gauge', 'Bytes processed per wall-clock second', 'bytes_per_second'),
+            ('stage_cache_hits_total', 'counter', 'Stage outputs reused from the cache', 'cache_hits'),
+            ('stage_cache_misses_total', 'counter', 'Stage outputs recomputed', 'cache_misses'),
+            ('stage_cache_hit_ratio', 'gauge', 'Cache hits / lookups', 'cache_hit_rate'),
+            ('stage_peak_rss_bytes', 'gauge', 'Process peak RSS when the stage finished', 'peak_rss_bytes'),
+            ('stage_traced_peak_bytes', 'gauge', 'Peak Python allocations traced during the stage', 'traced_peak_bytes'),
+        )
+        lines = []
+        for metric, kind, help_text, key in series:
+            samples = [(name, stage[key]) for name, stage in sorted(data['stages'].items()) if stage[key] is not None]
+            if not samples:
+                continue
+            lines.append(f"# HELP {PROMETHEUS_PREFIX}_{metric} {help_text}")
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{metric} {kind}")
+            lines.extend(f'{PROMETHEUS_PREFIX}_{metric}{{stage="{_label(name)}"}} {value}' for name, value in samples)
+        items = [(name, kind, n) for name, stage in sorted(data['stages'].items())
+                 for kind, n in sorted(stage['counts'].items())]
+        if items:
+            lines.append(f"# HELP {PROMETHEUS_PREFIX}_stage_items_total Items counted by the stage")
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_stage_items_total counter")
+            lines.extend(f'{PROMETHEUS_PREFIX}_stage_items_total{{stage="{_label(name)}",kind="{_label(kind)}"}} {n}'
+                         for name, kind, n in items)
+        if data['peak_rss_bytes'] is not None:
+            lines.append(f"# HELP {PROMETHEUS_PREFIX}_peak_rss_bytes Process peak RSS")
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_peak_rss_bytes gauge")
+            lines.append(f"{PROMETHEUS_PREFIX}_peak_rss_bytes {data['peak_rss_bytes']}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        with open(path, 'w') as f:
+            f.write(self.to_prometheus())
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+_active = None
+
+
+def enable(profile_dir=None, trace_memory=False, slowest=DEFAULT_SLOWEST):
+    """Start collecting metrics for this process and return the collector."""
+    global _active
+    _active = Metrics(profile_dir, trace_memory, slowest)
+    return _active
+
+
+def active():
+    """The enabled collector, or None."""
+    return _active
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Measure a stage on the enabled collector; a no-op recorder when metrics are off."""
+    if _active is None:
+        yield _NULL_RECORDER
+    else:
+        with _active.stage(name) as recorder:
+            yield recorder
+
+
+def record_cache(name, hit):
+    if _active is not None:
+        _active.record_cache(name, hit)
+
+
+def enable_from_args(args):
+    if args.metrics or args.prometheus or args.profile_dir or args.trace_memory:
+        return enable(args.profile_dir, args.trace_memory)
+    return None
+
+
+def write_from_args(args):
+    """Write the outputs requested on the command line (call once the run is over)."""
+    if _active is None:
+        return
+    if args.metrics:
+        _active.write_json(args.metrics)
+        print(f"Metrics saved to {args.metrics}")
+    if args.prometheus:
+        _active.write_prometheus(args.prometheus)
+        print(f"Prometheus metrics saved to {args.prometheus}")
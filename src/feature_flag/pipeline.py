@@ -0,0 +1,229 @@
+"""
+In-process DAG pipeline for the feature flag analysis stages.
+
+Stages are plain callables that receive their upstream outputs as keyword
+arguments. Independent stages run concurrently on a thread pool (Semgrep is a
+subprocess, so it overlaps with the Python analyzers). Each cacheable stage is
+fingerprinted from its parameters, input files and upstream fingerprints, and an
+unchanged stage is loaded from the cache directory instead of being recomputed.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from feature_flag import metrics
+
+DEFAULT_CACHE_DIR = '.ffdeps_cache'
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Analyzer code is an input of every analysis stage: editing it must invalidate cached outputs
+CODE_INPUTS = (os.path.join(SRC_DIR, 'ast_analysis'), os.path.join(SRC_DIR, 'feature_flag'))
+
+# Never fingerprinted: bytecode, and the cache directory other runs write to
+_SKIPPED_DIRS = frozenset(('__pycache__', os.path.basename(DEFAULT_CACHE_DIR)))
+
+_MISSING = object()
+
+
+def _hash_path(path, h, exclude=frozenset()):
+    """
+    Feed the (path, size, mtime) of a file or of every file under a directory into `h`.
+    Cache directories and the `exclude` paths (absolute) are skipped: ffdeps' own state
+    (a checkpoint journal, a quarantine) may live under a scanned directory, and writing
+    it must not change the fingerprint of that scan.
+    """
+    if os.path.isdir(path):
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(d for d in dirnames
+                                 if d not in _SKIPPED_DIRS and not _excluded(dirpath, d, exclude))
+            for name in sorted(filenames):
+                if not name.endswith('.pyc') and not _excluded(dirpath, name, exclude):
+                    _hash_file_stat(os.path.join(dirpath, name), h)
+    elif os.path.exists(path):
+        _hash_file_stat(path, h)
+    else:
+        h.update(f"missing:{path}\0".encode())
+
+
+def _excluded(dirpath, name, exclude):
+    return bool(exclude) and os.path.abspath(os.path.join(dirpath, name)) in exclude
+
+
+def _hash_file_stat(path, h):
+    st = os.stat(path)
+    h.update(f"{path}\0{st.st_size}\0{st.st_mtime_ns}\0".encode())
+
+
+class Stage:
+    """
+    A pipeline stage.
+    - deps: upstream stage names, or a {kwarg: stage_name} mapping, passed to `func` as keyword arguments.
+    - params: extra keyword arguments for `func`; part of the fingerprint.
+    - inputs: files/directories whose contents determine the output; part of the fingerprint.
+    - cache: whether the (JSON-serializable) output may be reused across runs.
+    - resumable: `func` takes a `journal` (checkpoint.StageJournal) to journal its progress per file.
+    """
+    def __init__(self, name, func, deps=(), params=None, inputs=(), cache=True, resumable=False):
+        self.name = name
+        self.func = func
+        self.deps = dict(deps) if isinstance(deps, dict) else {d: d for d in deps}
+        self.params = dict(params or {})
+        self.inputs = tuple(inputs)
+        self.cache = cache
+        self.resumable = resumable
+
+    def fingerprint(self, dep_fingerprints, exclude=()):
+        """Hash of the stage's setup; `exclude`: state files and directories that are not inputs."""
+        exclude = frozenset(os.path.abspath(p) for p in exclude)
+        h = hashlib.sha256()
+        h.update(f"{self.name}\0{self.func.__module__}.{self.func.__qualname__}\0".encode())
+        h.update(json.dumps(self.params, sort_keys=True, default=str).encode())
+        for kwarg, dep in sorted(self.deps.items()):
+            h.update(f"{kwarg}={dep_fingerprints[dep]}\0".encode())
+        for path in self.inputs:
+            _hash_path(path, h, exclude)
+        return h.hexdigest()
+
+    def execute(self, outputs, journal=None):
+        kwargs = {kwarg: outputs[dep] for kwarg, dep in self.deps.items()}
+        kwargs.update(self.params)
+        if journal is not None:
+            kwargs['journal'] = journal
+        return self.func(**kwargs)
+
+
+class Pipeline:
+    """
+    Runs stages in dependency order, concurrently where possible.
+    Set cache_dir=None to disable fingerprint caching. With a checkpoint.Checkpoint,
+    completed stage outputs and the per-file progress of resumable stages are journaled,
+    and a resumed checkpoint supplies what an interrupted run had already done.
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_workers=None, checkpoint=None):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.checkpoint = checkpoint
+        self.stages = {}
+        self.fingerprints = {}
+        self.skipped = []
+
+    def add_stage(self, name, func, deps=(), params=None, inputs=(), cache=True, resumable=False):
+        stage = Stage(name, func, deps, params, inputs, cache, resumable)
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        # Dependencies must be registered first, which keeps the graph acyclic
+        for dep in stage.deps.values():
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self.stages[name] = stage
+        return stage
+
+    def _cache_path(self, name):
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    def _load_cached(self, stage, fingerprint):
+        if not (self.cache_dir and stage.cache):
+            return _MISSING
+        try:
+            with open(self._cache_path(stage.name)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return _MISSING
+        if entry.get('fingerprint') != fingerprint:
+            return _MISSING
+        return entry['output']
+
+    def _store_cached(self, stage, fingerprint, output):
+        if not (self.cache_dir and stage.cache):
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._cache_path(stage.name)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'fingerprint': fingerprint, 'output': output}, f)
+        os.replace(tmp_path, path)
+
+    def run(self):
+        """Run all stages and return {stage_name: output}."""
+        outputs = {}
+        self.fingerprints = {}
+        self.skipped = []
+        pending = dict(self.stages)
+        running = {}
+        # The pipeline's own cache and journal, wherever they are, are not inputs of its stages
+        state = [path for path in (self.cache_dir, self.checkpoint and self.checkpoint.path) if path]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                # Schedule every stage whose dependencies are satisfied; cache hits may unblock more
+                progressed = True
+                while progressed:
+                    progressed = False
+                    for name, stage in list(pending.items()):
+                        if not all(dep in outputs for dep in stage.deps.values()):
+                            continue
+                        del pending[name]
+                        fingerprint = stage.fingerprint(self.fingerprints, state)
+                        self.fingerprints[name] = fingerprint
+                        cached = self._load_cached(stage, fingerprint)
+                        if self.cache_dir and stage.cache:
+                            metrics.record_cache(name, cached is not _MISSING)
+                        if cached is not _MISSING:
+                            print(f"[pipeline] {name}: unchanged, using cached output")
+                            outputs[name] = cached
+                            self.skipped.append(name)
+                            progressed = True
+                            continue
+                        if self.checkpoint is not None and stage.cache:
+                            journaled = self.checkpoint.output(name, fingerprint, _MISSING)
+                            if journaled is not _MISSING:
+                                print(f"[pipeline] {name}: completed before the interruption, using the checkpoint")
+                                outputs[name] = journaled
+                                self._store_cached(stage, fingerprint, journaled)
+                                self.skipped.append(name)
+                                progressed = True
+                                continue
+                        journal = None
+                        if self.checkpoint is not None and stage.resumable:
+                            journal = self.checkpoint.stage(name, fingerprint)
+                            if journal.files:
+                                print(f"[pipeline] {name}: resuming after {len(journal.files)} journaled files")
+                        print(f"[pipeline] {name}: running")
+                        running[pool.submit(stage.execute, dict(outputs), journal)] = stage
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    outputs[stage.name] = future.result()
+                    self._store_cached(stage, self.fingerprints[stage.name], outputs[stage.name])
+                    if self.checkpoint is not None and stage.cache:
+                        self.checkpoint.complete(stage.name, self.fingerprints[stage.name], outputs[stage.name])
+        return outputs
+
+
+def build_analysis_pipeline(target_dir, semgrep_rule, lang='python', cache_dir=DEFAULT_CACHE_DIR, max_workers=None,
+                            dot_path='flag_dependency_graph.dot', checkpoint=None):
+    """
+    The standard pipeline: Semgrep, AST and Data Flow scans run concurrently, then
+    merge and the single-pass report engine consume the merged findings in memory.
+    """
+    from feature_flag.scan import scan_semgrep, scan_ast, scan_dataflow
+    from feature_flag.merge import merge_results
+    from feature_flag.report import build_report
+
+    pipeline = Pipeline(cache_dir=cache_dir, max_workers=max_workers, checkpoint=checkpoint)
+    pipeline.add_stage('semgrep', scan_semgrep,
+                       params={'target_dir': target_dir, 'rule_path': semgrep_rule},
+                       inputs=(target_dir, semgrep_rule) + CODE_INPUTS)
+    pipeline.add_stage('ast', scan_ast,
+                       params={'target_dir': target_dir, 'lang': lang},
+                       inputs=(target_dir,) + CODE_INPUTS, resumable=True)
+    pipeline.add_stage('dataflow', scan_dataflow,
+                       params={'target_dir': target_dir, 'lang': lang},
+                       inputs=(target_dir,) + CODE_INPUTS, resumable=True)
+    pipeline.add_stage('merge', merge_results,
+                       deps={'semgrep_data': 'semgrep', 'ast_data': 'ast', 'dataflow_data': 'dataflow'},
+                       inputs=CODE_INPUTS)
+    # The report engine also writes the DOT file, so it always runs
+    pipeline.add_stage('report', build_report, deps={'entries': 'merge'}, params={'dot_path': dot_path}, cache=False)
+    return pipeline
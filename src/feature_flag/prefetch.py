@@ -0,0 +1,150 @@
+"""
+Overlapped file reading for the analysis stages.
+
+On network filesystems reading files one by one is bound by I/O latency, not CPU.
+prefetch() reads ahead on a thread pool, driven by an asyncio loop in a background
+thread, while the caller analyzes the files already read:
+
+    for path, data in prefetch(paths, read_file):
+        analyze(data)
+
+- Results are delivered through a queue in input order, so output is identical to
+  a sequential read.
+- Backpressure: at most `window` files are in flight or waiting to be consumed,
+  and no new read starts while `max_bytes` or more of read data is waiting (the
+  budget is checked between reads, so it can be exceeded by what is in flight).
+  A slot is freed only when the consumer takes its item.
+- A read error is re-raised to the consumer at that file's position.
+- Closing the generator early cancels the reads that have not started.
+"""
+import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WINDOW = 64
+DEFAULT_WORKERS = 16
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_DONE = object()
+
+
+def _size_of(value):
+    """Buffered size of a read result: the length of the bytes/str it carries, if any."""
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if isinstance(value, tuple):
+        return sum(len(v) for v in value if isinstance(v, (bytes, str)))
+    return 0
+
+
+class _Prefetcher:
+    def __init__(self, paths, read, window, workers, max_bytes):
+        self.paths = paths
+        self.read = read
+        self.window = window
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.out = queue.Queue()
+        self.loop = None
+        self.started = threading.Event()
+        self.closed = False
+
+    async def _produce(self):
+        self.loop = asyncio.get_running_loop()
+        self.slots = asyncio.Semaphore(self.window)
+        self.budget = asyncio.Condition()
+        self.buffered = 0
+        self.started.set()
+        pending = {}
+        next_index = 0
+        tasks = set()
+
+        async def fetch(index, path):
+            nonlocal next_index
+            try:
+                result = (path, await self.loop.run_in_executor(pool, self.read, path), None)
+            except Exception as e:
+                result = (path, None, e)
+            size = _size_of(result[1])
+            async with self.budget:
+                self.buffered += size
+            pending[index] = result + (size,)
+            # Deliver in input order
+            while next_index in pending:
+                self.out.put(pending.pop(next_index))
+                next_index += 1
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            try:
+                for index, path in enumerate(self.paths):
+                    await self.slots.acquire()
+                    async with self.budget:
+                        await self.budget.wait_for(lambda: self.buffered < self.max_bytes or self.closed)
+                    if self.closed:
+                        break
+                    task = asyncio.ensure_future(fetch(index, path))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                if tasks:
+                    await asyncio.gather(*tasks)
+            finally:
+                self.out.put(_DONE)
+
+    def _consumed(self, size):
+        # Runs on the loop thread
+        self.slots.release()
+        self.buffered -= size
+        if size:
+            asyncio.ensure_future(self._notify())
+
+    async def _notify(self):
+        async with self.budget:
+            self.budget.notify_all()
+
+    def _close(self):
+        self.closed = True
+        self.slots.release()
+        asyncio.ensure_future(self._notify())
+
+    def _call(self, callback, *args):
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # The producer has finished and its loop is closed: nothing left to unblock
+            pass
+
+    def __iter__(self):
+        thread = threading.Thread(target=asyncio.run, args=(self._produce(),), daemon=True)
+        thread.start()
+        self.started.wait()
+        finished = False
+        try:
+            while True:
+                item = self.out.get()
+                if item is _DONE:
+                    finished = True
+                    return
+                path, data, error, size = item
+                self._call(self._consumed, size)
+                if error is not None:
+                    raise error
+                yield path, data
+        finally:
+            if not finished:
+                self._call(self._close)
+                # Drain so in-flight reads can complete and the loop can exit
+                while self.out.get() is not _DONE:
+                    self._call(self._consumed, 0)
+            thread.join()
+
+
+def prefetch(paths, read, window=DEFAULT_WINDOW, workers=DEFAULT_WORKERS, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Yield (path, read(path)) for every path, in order, reading up to `window` files
+    ahead on `workers` threads. With window 0 (or 1 path) files are read inline.
+    """
+    paths = list(paths)
+    if not window or len(paths) <= 1:
+        return ((path, read(path)) for path in paths)
+    return iter(_Prefetcher(paths, read, window, workers, max_bytes))
@@ -1,4 +1,5 @@
 # Static reasoning algorithms (placeholder)
+from feature_flag import metrics
 
 class Reasoner:
     """
@@ -25,8 +26,10 @@ class Reasoner:
                 visit(neighbor, path + [node])
             stack.remove(node)
 
-        for node in self.graph:
-            visit(node, [])
+        with metrics.stage('reasoning') as m:
+            for node in self.graph:
+                visit(node, [])
+            m.count('cycles', len(cycles))
         return cycles
 
     def find_dead_flags(self):
@@ -54,28 +57,43 @@ class AnalyzerFactory:
     """
     Factory to select the correct analyzer based on language.
     Extend this to support more languages (Python, Java, Go, JavaScript, etc).
+    Analyzers are memoized per configuration: they keep no state between files, so
+    every caller asking for the same one shares an instance (and its compiled SDK profiles).
     """
+    _analyzers = {}
+
     @staticmethod
-    def get_analyzer(language):
-        """
-        Returns the appropriate analyzer instance for the given language.
-        Supported: python, java, go, javascript.
-        """
+    def _analyzer_class(language):
         if language == 'python':
             from ast_analysis.python_analyzer import PythonAnalyzer
-            return PythonAnalyzer()
+            return PythonAnalyzer
         elif language == 'java':
             from ast_analysis.java_analyzer import JavaAnalyzer
-            return JavaAnalyzer()
+            return JavaAnalyzer
         elif language == 'go':
             from ast_analysis.go_analyzer import GoAnalyzer
-            return GoAnalyzer()
+            return GoAnalyzer
         elif language == 'javascript':
             from ast_analysis.javascript_analyzer import JavaScriptAnalyzer
-            return JavaScriptAnalyzer()
+            return JavaScriptAnalyzer
         else:
             raise ValueError(f"Unsupported language: {language}")
 
+    @staticmethod
+    def get_analyzer(language, profiles=None, max_line_length=None, record_regions=None):
+        """
+        Returns the appropriate analyzer instance for the given language.
+        Supported: python, java, go, javascript.
+        `profiles` is a tuple of sdk_profiles.SdkProfile (the defaults when None). The
+        instance is shared: configure it through these arguments, never by setting attributes.
+        """
+        key = (language, profiles, max_line_length, record_regions)
+        analyzer = AnalyzerFactory._analyzers.get(key)
+        if analyzer is None:
+            analyzer = AnalyzerFactory._analyzer_class(language)(profiles, max_line_length, record_regions)
+            AnalyzerFactory._analyzers[key] = analyzer
+        return analyzer
+
 # --- Example usage ---
 if __name__ == "__main__":
     # Example: Run reasoning on a sample dependency graph
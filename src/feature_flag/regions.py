@@ -0,0 +1,209 @@
+"""
+Index of flag-guarded code regions, for line-level queries without rescanning.
+
+A scan with regions recorded (iter_ast(..., regions=RegionIndex())) keeps, for each
+flag check in an `if`/`elif`/`while` condition, the lines it gates: for Python from
+the header to the last line of the block, for Java, JavaScript and Go from the '{'
+of the block to its '}'. The `else` block of the same statement is gated too, with
+the opposite polarity: 1 means the region runs when the check succeeds, -1 when it
+fails (`if not is_feature_enabled(...)`, and the `else` of a plain check).
+
+The regions of each file are kept in an IntervalTree: the intervals sorted by start,
+with every node of the implicit binary tree over that array holding the largest end
+in its subtree, so "which flags guard line N of file F" and "which regions overlap
+lines A-B" take O(log n + k) for n regions in the file and k answers. A flag ->
+regions map answers "which lines does flag X gate".
+
+The index is saved next to the scan results (see regions_path) as JSON, each file's
+regions already in tree order, so loading is linear.
+
+    PYTHONPATH=src python -m feature_flag.regions ast_auto_scan_result.regions.json FILE LINE
+"""
+import json
+import os
+import sys
+from collections import namedtuple
+
+REGIONS_FORMAT = 'ffdeps-regions'
+REGIONS_VERSION = 1
+# Subtrees this small are scanned linearly
+_LEAF_LEVEL = 3
+
+GuardedRegion = namedtuple('GuardedRegion', 'file start end flag polarity')
+
+
+def regions_path(results_path):
+    """Where the region index of a results file is saved: `<results>.regions.json`."""
+    return os.path.splitext(results_path)[0] + '.regions.json'
+
+
+class IntervalTree:
+    """
+    Static interval tree over closed line ranges (start, end, ...): a sorted array and,
+    for the implicit binary tree over it (node i sits at the level of its trailing one
+    bits), the largest end in each subtree.
+    """
+    def __init__(self, intervals):
+        self.intervals = sorted(intervals)
+        self.starts = [interval[0] for interval in self.intervals]
+        self.ends = [interval[1] for interval in self.intervals]
+        self.maxes, self.levels = self._augment(self.ends)
+
+    @staticmethod
+    def _augment(ends):
+        n = len(ends)
+        maxes = list(ends)
+        if not n:
+            return maxes, -1
+        # The rightmost node and its subtree maximum, for right children past the end of the array
+        last_i = (n - 1) & ~1
+        last = ends[last_i]
+        k = 1
+        while 1 << k <= n:
+            x = 1 << (k - 1)
+            for i in range((x << 1) - 1, n, x << 2):
+                right = maxes[i + x] if i + x < n else last
+                maxes[i] = max(ends[i], maxes[i - x], right)
+            last_i = last_i - x if last_i >> k & 1 else last_i + x
+            if last_i < n and maxes[last_i] > last:
+                last = maxes[last_i]
+            k += 1
+        return maxes, k - 1
+
+    def overlapping(self, start, end):
+        """The intervals sharing a line with start..end, in sorted order."""
+        starts, ends, maxes = self.starts, self.ends, self.maxes
+        n = len(starts)
+        found = []
+        if not n:
+            return found
+        # (node, level, left subtree done)
+        stack = [((1 << self.levels) - 1, self.levels, False)]
+        while stack:
+            x, k, left_done = stack.pop()
+            if k <= _LEAF_LEVEL:
+                i = x >> k << k
+                stop = min(i + (1 << (k + 1)) - 1, n)
+                while i < stop and starts[i] <= end:
+                    if ends[i] >= start:
+                        found.append(i)
+                    i += 1
+            elif not left_done:
+                left = x - (1 << (k - 1))
+                stack.append((x, k, True))
+                if left >= n or maxes[left] >= start:
+                    stack.append((left, k - 1, False))
+            elif x < n and starts[x] <= end:
+                if ends[x] >= start:
+                    found.append(x)
+                stack.append((x + (1 << (k - 1)), k - 1, False))
+        return [self.intervals[i] for i in found]
+
+    def at(self, line):
+        return self.overlapping(line, line)
+
+    def __len__(self):
+        return len(self.intervals)
+
+
+class RegionIndex:
+    """Guarded regions by file (an IntervalTree each, built on first query) and by flag."""
+    def __init__(self):
+        self.files = {}         # file -> {(start, end, flag, polarity)}
+        self._trees = {}
+        self._flags = None
+
+    def add(self, file_path, start, end, flag, polarity):
+        self.files.setdefault(file_path, set()).add((start, end, flag, polarity))
+        self._trees.pop(file_path, None)
+        self._flags = None
+
+    def extract(self, file_path, findings):
+        """Index the 'regions' of findings from a region-recording analyzer; the findings without them."""
+        stripped = []
+        for finding in findings:
+            if 'regions' in finding:
+                finding = dict(finding)
+                flag = finding['dependency']
+                for start, end, polarity in finding.pop('regions'):
+                    if flag is not None:
+                        self.add(file_path, start, end, flag, polarity)
+            stripped.append(finding)
+        return stripped
+
+    def merge(self, other):
+        for file_path, regions in other.files.items():
+            for region in regions:
+                self.add(file_path, *region)
+
+    def tree(self, file_path):
+        tree = self._trees.get(file_path)
+        if tree is None:
+            tree = self._trees[file_path] = IntervalTree(self.files.get(file_path, ()))
+        return tree
+
+    def guards(self, file_path, line):
+        """The regions of `file_path` containing `line`: which flags guard it, and how."""
+        return [GuardedRegion(file_path, *region) for region in self.tree(file_path).at(line)]
+
+    def overlapping(self, file_path, start, end):
+        """The regions of `file_path` sharing a line with start..end."""
+        return [GuardedRegion(file_path, *region) for region in self.tree(file_path).overlapping(start, end)]
+
+    def gated(self, flag, file_path=None):
+        """The regions gated by `flag` (in `file_path` only, if given), by file and line."""
+        if self._flags is None:
+            self._flags = {}
+            for path in sorted(self.files):
+                for region in self.tree(path).intervals:
+                    self._flags.setdefault(region[2], []).append(GuardedRegion(path, *region))
+        regions = self._flags.get(flag, [])
+        return [region for region in regions if region.file == file_path] if file_path is not None else regions
+
+    def __len__(self):
+        return sum(len(regions) for regions in self.files.values())
+
+    def to_dict(self):
+        flags = sorted({region[2] for regions in self.files.values() for region in regions})
+        ids = {flag: i for i, flag in enumerate(flags)}
+        return {
+            'format': REGIONS_FORMAT,
+            'version': REGIONS_VERSION,
+            'flags': flags,
+            'files': {path: [[start, end, ids[flag], polarity] for start, end, flag, polarity in self.tree(path).intervals]
+                      for path in sorted(self.files)},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('format') != REGIONS_FORMAT or data.get('version') != REGIONS_VERSION:
+            raise ValueError("not a region index (or an unsupported version)")
+        index = cls()
+        flags = data['flags']
+        for path, rows in data['files'].items():
+            index.files[path] = {(start, end, flags[flag], polarity) for start, end, flag, polarity in rows}
+            # Saved in tree order: the sort in IntervalTree is a linear pass
+            index._trees[path] = IntervalTree((start, end, flags[flag], polarity) for start, end, flag, polarity in rows)
+        return index
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def print_regions(regions):
+    for region in regions:
+        sign = '+' if region.polarity > 0 else '-'
+        print(f"{region.file}:{region.start}-{region.end}: {sign}{region.flag}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print("Usage: python -m feature_flag.regions REGIONS FILE LINE")
+        sys.exit(2)
+    print_regions(RegionIndex.load(sys.argv[1]).guards(sys.argv[2], int(sys.argv[3])))
@@ -0,0 +1,195 @@
+"""
+Join code usages against a flag registry export (Unleash, CloudBees) on disk.
+
+The export is loaded into a hashed index (name -> state); the usages are streamed
+once from scan results (JSON or binary) and counted per flag, and the two sides
+are joined on the flag name:
+- dead: defined in the registry, never referenced in code;
+- undefined: referenced in code, unknown to the registry;
+- archived: archived in the registry but still checked in code;
+- stale: marked stale in the registry but still checked in code.
+
+Accepted exports (JSON):
+- Unleash state/feature exports and admin API listings: {"features": [{"name", "archived"
+  or "archivedAt", "stale", "project"}, ...]}; {"archive": [...]} lists are archived;
+- CloudBees Feature Management flag listings: a list of {"name", ...} or
+  {"flags": [...]}, with "archived"/"isArchived"/"status": "archived" when present.
+Several exports can be combined; a flag archived in any of them is archived.
+
+    PYTHONPATH=src python -m feature_flag.registry unleash-export.json merged_flag_dependencies.json
+"""
+import json
+from collections import Counter
+from operator import itemgetter
+
+from feature_flag import metrics
+
+# Findings whose 'dependency' is not a flag name (tainted variables)
+NON_FLAG_SOURCES = ('dataflow_analysis',)
+GATES = ('undefined', 'archived', 'stale', 'dead')
+
+
+def _is_archived(item):
+    status = item.get('status')
+    return bool(item.get('archived') or item.get('archivedAt') or item.get('isArchived')
+                or (isinstance(status, str) and status.lower() == 'archived'))
+
+
+def _export_items(data, path):
+    """(item, archived_list) pairs of an export document."""
+    if isinstance(data, list):
+        return [(item, False) for item in data]
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: not a flag registry export")
+    items = []
+    for key, archived in (('features', False), ('flags', False), ('archive', True), ('archivedFeatures', True)):
+        value = data.get(key)
+        if isinstance(value, list):
+            items.extend((item, archived) for item in value)
+    if not items and not any(key in data for key in ('features', 'flags', 'archive')):
+        raise ValueError(f"{path}: no 'features' or 'flags' list found")
+    return items
+
+
+class FlagRegistry:
+    """Hashed index of the flags known to the flag service: name -> {'archived', 'stale', 'project', 'export'}."""
+    def __init__(self):
+        self.flags = {}
+
+    def add(self, name, archived=False, stale=False, project=None, export=None):
+        entry = self.flags.get(name)
+        if entry is None:
+            self.flags[name] = {'archived': archived, 'stale': stale, 'project': project, 'export': export}
+        else:
+            entry['archived'] = entry['archived'] or archived
+            entry['stale'] = entry['stale'] or stale
+        return self
+
+    def load(self, path):
+        """Add the flags of one export file."""
+        with open(path) as f:
+            data = json.load(f)
+        for item, archived in _export_items(data, path):
+            if isinstance(item, str):
+                self.add(item, archived, export=path)
+                continue
+            name = item.get('name') or item.get('key')
+            if not name:
+                continue
+            self.add(name, archived or _is_archived(item), bool(item.get('stale')), item.get('project'), path)
+        return self
+
+    def __len__(self):
+        return len(self.flags)
+
+    def __contains__(self, name):
+        return name in self.flags
+
+
+def load_registry(paths):
+    registry = FlagRegistry()
+    for path in paths:
+        registry.load(path)
+    return registry
+
+
+def count_usages(results_paths):
+    """
+    {flag: [count, first_file, first_line]} over scan results, in one streaming pass.
+    Binary results are counted on string ids; only one record per flag is decoded.
+    """
+    from feature_flag.binary_results import BinaryResults, is_binary_results, iter_results, STRING_FIELDS
+    usages = {}
+    with metrics.stage('registry_usages') as m:
+        for path in results_paths:
+            if is_binary_results(path):
+                with BinaryResults(path) as results:
+                    key = itemgetter(2 + STRING_FIELDS.index('dependency'), 2 + STRING_FIELDS.index('source'))
+                    counts = Counter(map(key, results.raw_records()))
+                    m.count('records', len(results))
+                    first = {}
+                    if counts:
+                        for index, raw in enumerate(results.raw_records()):
+                            first.setdefault(key(raw), index)
+                            if len(first) == len(counts):
+                                break
+                    for (dep_id, source_id), n in counts.items():
+                        if results.string(source_id) in NON_FLAG_SOURCES:
+                            continue
+                        flag = results.string(dep_id)
+                        if not flag:
+                            continue
+                        if flag in usages:
+                            usages[flag][0] += n
+                            continue
+                        record = results[first[(dep_id, source_id)]]
+                        usages[flag] = [n, record.get('file'), record.get('line', record.get('lineno'))]
+                continue
+            for entry in iter_results(path):
+                m.count('records')
+                flag = entry.get('dependency') or entry.get('flag')
+                if not flag or entry.get('source') in NON_FLAG_SOURCES:
+                    continue
+                usage = usages.get(flag)
+                if usage is None:
+                    usages[flag] = [1, entry.get('file'), entry.get('line', entry.get('lineno'))]
+                else:
+                    usage[0] += 1
+        m.count('flags', len(usages))
+    return usages
+
+
+def join_registry(registry, usages):
+    """Join the registry index with per-flag usage counts (see count_usages)."""
+    def used(flag):
+        count, file, line = usages[flag]
+        return {'flag': flag, 'usages': count, 'file': file, 'line': line}
+
+    with metrics.stage('registry_join'):
+        defined = registry.flags
+        return {
+            'registry_flags': len(defined),
+            'referenced_flags': len(usages),
+            'dead': sorted(flag for flag, state in defined.items() if flag not in usages and not state['archived']),
+            'undefined': [used(flag) for flag in sorted(usages) if flag not in defined],
+            'archived': [used(flag) for flag in sorted(usages) if flag in defined and defined[flag]['archived']],
+            'stale': [used(flag) for flag in sorted(usages)
+                      if flag in defined and defined[flag]['stale'] and not defined[flag]['archived']],
+        }
+
+
+def gate_failures(report, gates=('undefined', 'archived')):
+    reasons = []
+    if 'undefined' in gates:
+        reasons += [f"flag {u['flag']} is not defined in the registry ({u['file']}:{u['line']})" for u in report['undefined']]
+    if 'archived' in gates:
+        reasons += [f"archived flag {u['flag']} is still checked ({u['file']}:{u['line']})" for u in report['archived']]
+    if 'stale' in gates:
+        reasons += [f"stale flag {u['flag']} is still checked ({u['file']}:{u['line']})" for u in report['stale']]
+    if 'dead' in gates:
+        reasons += [f"flag {flag} is defined but never referenced" for flag in report['dead']]
+    return reasons
+
+
+def print_registry_report(report):
+    print(f"Registry flags: {report['registry_flags']}, flags referenced in code: {report['referenced_flags']}")
+    print(f"\nDefined but never referenced: {len(report['dead'])}")
+    for flag in report['dead']:
+        print(f"  {flag}")
+    for title, key in (("Referenced but undefined", 'undefined'), ("Archived but still checked", 'archived'),
+                       ("Stale but still checked", 'stale')):
+        print(f"\n{title}: {len(report[key])}")
+        for u in report[key]:
+            print(f"  {u['flag']}: {u['usages']} usage(s), first at {u['file']}:{u['line']}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description="Join code usages against a flag registry export.")
+    parser.add_argument("export", help="Registry export JSON (Unleash or CloudBees)")
+    parser.add_argument("results", nargs="+", help="Scan results (JSON or binary)")
+    args = parser.parse_args()
+    result = join_registry(load_registry([args.export]), count_usages(args.results))
+    print_registry_report(result)
+    sys.exit(1 if gate_failures(result) else 0)
@@ -0,0 +1,124 @@
+"""
+Single-pass report engine over merged feature flag findings.
+
+One streaming pass over the findings fills the shared aggregates (flag -> contexts,
+context -> flags, usage counts) and, optionally, writes each new flag -> context
+edge of the Graphviz DOT file as it is discovered. The conflict report, the
+compound-logic list, the graph summary and the top-k flags/contexts (heap-based,
+bounded k) are all answered from those aggregates without re-reading the input.
+"""
+import heapq
+from collections import defaultdict
+
+from feature_flag import metrics
+
+DEFAULT_TOP_K = 20
+
+
+class ReportEngine:
+    def __init__(self):
+        self.flag_to_contexts = defaultdict(set)
+        self.context_to_flags = defaultdict(set)
+        self.flag_counts = defaultdict(int)
+        self.context_counts = defaultdict(int)
+        self.edge_count = 0
+
+    def consume(self, entries, dot_file=None):
+        """Aggregate an iterable of findings; stream new edges to an open DOT file if given."""
+        for entry in entries:
+            dep = entry.get('dependency')
+            context = entry.get('context')
+            if not (dep and context):
+                continue
+            self.flag_counts[dep] += 1
+            self.context_counts[context] += 1
+            contexts = self.flag_to_contexts[dep]
+            if context not in contexts:
+                contexts.add(context)
+                self.context_to_flags[context].add(dep)
+                self.edge_count += 1
+                if dot_file is not None:
+                    dot_file.write(f'  "{dep}" -> "{context}";\n')
+        return self
+
+    @property
+    def graph(self):
+        """flag -> function contexts"""
+        return self.flag_to_contexts
+
+    def conflicts(self):
+        """Flags used in multiple contexts."""
+        return [(flag, contexts) for flag, contexts in self.flag_to_contexts.items() if len(contexts) > 1]
+
+    def compound_contexts(self):
+        """Contexts checking multiple flags (possible complex/compound logic)."""
+        return [(ctx, flags) for ctx, flags in self.context_to_flags.items() if len(flags) > 1]
+
+    def top_flags(self, k=DEFAULT_TOP_K):
+        return heapq.nlargest(k, self.flag_counts.items(), key=lambda x: x[1])
+
+    def top_contexts(self, k=DEFAULT_TOP_K):
+        return heapq.nlargest(k, self.context_counts.items(), key=lambda x: x[1])
+
+
+def build_report(entries, dot_path=None):
+    """Run the single pass over `entries`, streaming the DOT file to `dot_path` when given."""
+    engine = ReportEngine()
+    with metrics.stage('report') as m:
+        if dot_path is None:
+            engine.consume(entries)
+        else:
+            with open(dot_path, 'w') as f:
+                f.write('digraph FeatureFlagDeps {\n')
+                engine.consume(entries, dot_file=f)
+                f.write('}\n')
+        m.count('edges', engine.edge_count)
+    return engine
+
+
+def print_graph(engine):
+    print("Feature Flag Dependency Graph (flag -> function context):\n")
+    for flag, contexts in engine.graph.items():
+        print(f"  {flag} -> {', '.join(contexts)}")
+
+
+def print_summary_counts(engine):
+    print("\nSummary Report:")
+    print(f"  Total unique flags: {len(engine.flag_to_contexts)}")
+    print(f"  Total unique contexts: {len(engine.context_to_flags)}")
+    print(f"  Total flag->context edges: {engine.edge_count}")
+
+
+def print_conflict_report(engine):
+    print_graph(engine)
+    print_summary_counts(engine)
+
+    print("\nPotential Conflicts (flags used in multiple contexts):")
+    conflicts = engine.conflicts()
+    for flag, contexts in conflicts:
+        print(f"  [CONFLICT] Flag '{flag}' is used in multiple contexts: {', '.join(contexts)}")
+    if not conflicts:
+        print("  No conflicts detected.")
+
+    print("\nContexts with multiple flags (possible complex/compound logic):")
+    compound = engine.compound_contexts()
+    for ctx, flags in compound:
+        print(f"  [COMPLEX] Context '{ctx}' checks multiple flags: {', '.join(flags)}")
+    if not compound:
+        print("  No complex/compound flag logic detected.")
+
+
+def print_graph_summary(engine, top_k=DEFAULT_TOP_K):
+    print_graph(engine)
+    print_summary_counts(engine)
+    print_top(engine, top_k)
+
+
+def print_top(engine, top_k=DEFAULT_TOP_K):
+    print(f"\nTop flags by usage (top {top_k}):")
+    for flag, count in engine.top_flags(top_k):
+        print(f"  {flag}: {count}")
+
+    print(f"\nTop contexts by flag checks (top {top_k}):")
+    for ctx, count in engine.top_contexts(top_k):
+        print(f"  {ctx}: {count}")
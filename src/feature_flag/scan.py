@@ -0,0 +1,531 @@
+"""
+In-process scan stages: Semgrep, AST-based analysis and Data Flow Analysis.
+Each stage returns plain Python objects so callers (runner scripts, the pipeline)
+decide whether and where to persist them.
+"""
+import ast
+import contextlib
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cli.end_to_end_demo import collect_files, EXTENSIONS
+from feature_flag.reasoning import AnalyzerFactory
+from ast_analysis.dataflow_analysis import FeatureFlagDataFlowAnalyzer
+from ast_analysis.utils import DEFAULT_LIMITS
+from feature_flag.jsonstream import iter_json_array
+from feature_flag import metrics
+from feature_flag.prefetch import prefetch, DEFAULT_WINDOW
+
+
+# Directories Semgrep skips by default; the prefilter does not descend into them either
+SEMGREP_SKIP_DIRS = {'.git', '.hg', '.svn', 'node_modules', '__pycache__', '.tox', '.venv', '.ffdeps_cache'}
+DEFAULT_BATCH_FILES = 500
+# Stay far below ARG_MAX (which also has to hold the environment); Windows command lines stop at 32K
+DEFAULT_ARG_BYTES = 30000 if sys.platform == 'win32' else min(os.sysconf('SC_ARG_MAX') // 4, 100000)
+_PATTERN_KEY = re.compile(r'^(\s*)(?:-\s+)?(pattern|pattern-regex|pattern-either|patterns|pattern-[\w-]+):\s*(.*)$')
+_CALLEE = re.compile(r'(?<![\w$])([A-Za-z_]\w*)\s*\(')
+_LANGUAGES_KEY = re.compile(r'^(\s*)(?:-\s+)?languages:\s*(.*)$')
+# Semgrep language names (and aliases) -> file extensions
+SEMGREP_EXTENSIONS = dict(EXTENSIONS, py=EXTENSIONS['python'], golang=EXTENSIONS['go'], js=EXTENSIONS['javascript'],
+                          typescript=['.ts', '.tsx'], ts=['.ts', '.tsx'])
+
+
+def scan_semgrep(target_dir, rule_path, files=None, extra_args=(), max_ok_returncode=1):
+    """
+    Run Semgrep with the given rules and return its parsed JSON output.
+    If `files` is given, only those files (rather than all of `target_dir`) are scanned.
+    Exit codes up to `max_ok_returncode` are success (1: Semgrep found results).
+    """
+    if files is not None and not files:
+        return {'results': [], 'errors': []}
+    cmd = [
+        "semgrep",
+        "--config", rule_path,
+        "--json"
+    ] + list(extra_args) + (list(files) if files is not None else [target_dir])
+    with metrics.stage('semgrep') as m:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode > max_ok_returncode:
+            raise RuntimeError(f"Semgrep failed with exit code {result.returncode}: {result.stderr}")
+        try:
+            output = json.loads(result.stdout)
+        except ValueError as e:
+            raise RuntimeError(f"Semgrep failed with exit code {result.returncode}: "
+                               f"could not parse JSON output ({e}) {result.stderr}")
+        for path in output.get('paths', {}).get('scanned', []):
+            m.add_file(path, _file_size(path))
+        m.count('findings', len(output.get('results', [])))
+    return output
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def rule_literals(rule_path):
+    """
+    Literal function/method names one of which must appear in a file for any rule to match,
+    taken from the callee of every `pattern:` in the rule file. Returns None when some
+    pattern has no literal callee (e.g. `$FUNC(...)`, `pattern-regex`), i.e. no prefilter is safe.
+    """
+    with open(rule_path) as f:
+        lines = f.read().splitlines()
+    literals = set()
+    i = 0
+    while i < len(lines):
+        match = _PATTERN_KEY.match(lines[i])
+        i += 1
+        if not match:
+            continue
+        indent, key, value = match.groups()
+        if key == 'pattern-regex':
+            return None
+        if key != 'pattern':
+            continue
+        if value.strip() in ('|', '>', '|-', '>-'):
+            block = []
+            while i < len(lines) and (not lines[i].strip() or len(lines[i]) - len(lines[i].lstrip()) > len(indent)):
+                block.append(lines[i])
+                i += 1
+            value = '\n'.join(block)
+        callee = _CALLEE.search(value)
+        if not callee:
+            return None
+        literals.add(callee.group(1))
+    return sorted(literals) or None
+
+
+def rule_extensions(rule_path):
+    """
+    File extensions of the languages the rules target, or None when some rule targets a
+    language without known extensions (see SEMGREP_EXTENSIONS): any file may be scanned.
+    """
+    with open(rule_path) as f:
+        lines = f.read().splitlines()
+    found = set()
+    i = 0
+    while i < len(lines):
+        match = _LANGUAGES_KEY.match(lines[i])
+        i += 1
+        if not match:
+            continue
+        indent, value = match.groups()
+        if value.strip():
+            names = value.strip().strip('[]').split(',')
+        else:
+            names = []
+            while i < len(lines) and lines[i].lstrip().startswith('-') and lines[i].startswith(indent):
+                names.append(lines[i].strip()[1:])
+                i += 1
+        for name in names:
+            extensions = SEMGREP_EXTENSIONS.get(name.strip().strip('\'"').lower())
+            if extensions is None:
+                return None
+            found.update(extensions)
+    return tuple(sorted(found)) or None
+
+
+def _ignore_patterns(target_dir):
+    """
+    The ignore patterns Semgrep applies under `target_dir`: its .semgrepignore (with the
+    files it `:include`s), else its .gitignore. Semgrep does not apply them to files named
+    on its command line, so the prefilter does.
+    """
+    def read(path):
+        patterns = []
+        try:
+            with open(path) as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return patterns
+        for line in lines:
+            line = line.strip()
+            if line.startswith(':include '):
+                patterns.extend(read(os.path.join(target_dir, line[len(':include '):].strip())))
+            elif line and not line.startswith('#'):
+                patterns.append(line)
+        return patterns
+    semgrepignore = os.path.join(target_dir, '.semgrepignore')
+    return read(semgrepignore if os.path.exists(semgrepignore) else os.path.join(target_dir, '.gitignore'))
+
+
+def _ignored(relpath, is_dir, patterns):
+    """Whether `relpath` (relative to the scan root, '/'-separated) matches the gitignore-style patterns."""
+    ignored = False
+    for pattern in patterns:
+        negated = pattern.startswith('!')
+        pattern = pattern.lstrip('!')
+        if pattern.endswith('/'):
+            if not is_dir:
+                continue
+            pattern = pattern.rstrip('/')
+        if '/' in pattern:
+            # Anchored at the root; `**/` also matches no directory
+            pattern = pattern.lstrip('/')
+            matched = fnmatch.fnmatchcase(relpath, pattern) or (
+                pattern.startswith('**/') and fnmatch.fnmatchcase(relpath, pattern[3:]))
+        else:
+            matched = fnmatch.fnmatchcase(relpath.rpartition('/')[2], pattern)
+        if matched:
+            ignored = not negated
+    return ignored
+
+
+def prefilter_files(target_dir, literals, extensions=None):
+    """
+    Files under `target_dir` that Semgrep would scan (outside SEMGREP_SKIP_DIRS and the
+    ignore files, with one of `extensions` when given) containing at least one of the
+    literals (a cheap byte search, no parsing); literals=None keeps every such file unread.
+    """
+    needles = [literal.encode('utf-8') for literal in literals or ()]
+    patterns = _ignore_patterns(target_dir)
+    candidates = []
+    with metrics.stage('semgrep_prefilter') as m:
+        for dirpath, dirnames, filenames in os.walk(target_dir):
+            rel = os.path.relpath(dirpath, target_dir).replace(os.sep, '/')
+            rel = '' if rel == '.' else rel + '/'
+            dirnames[:] = sorted(d for d in dirnames
+                                 if d not in SEMGREP_SKIP_DIRS and not _ignored(rel + d, True, patterns))
+            for name in sorted(filenames):
+                if extensions is not None and not name.endswith(extensions):
+                    continue
+                if _ignored(rel + name, False, patterns):
+                    continue
+                path = os.path.join(dirpath, name)
+                if literals is None:
+                    candidates.append(path)
+                    continue
+                try:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                except OSError:
+                    continue
+                m.add_file(path, len(data))
+                if any(needle in data for needle in needles):
+                    candidates.append(path)
+        m.count('candidates', len(candidates))
+    return candidates
+
+
+def semgrep_batches(files, max_files=DEFAULT_BATCH_FILES, max_arg_bytes=DEFAULT_ARG_BYTES):
+    """Split `files` into batches whose command-line arguments stay under `max_arg_bytes`."""
+    batches = []
+    batch = []
+    size = 0
+    for path in files:
+        path_size = len(os.fsencode(path)) + 1
+        if batch and (len(batch) >= max_files or size + path_size > max_arg_bytes):
+            batches.append(batch)
+            batch = []
+            size = 0
+        batch.append(path)
+        size += path_size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def merge_semgrep_outputs(outputs):
+    """
+    Concatenate several Semgrep JSON outputs as if they came from one run: results are
+    de-duplicated on (check_id, path, start offset, end offset) and sorted by location.
+    paths.scanned is the union of the batches, i.e. only the files actually given to Semgrep.
+    """
+    results = {}
+    errors = {}
+    scanned = set()
+    merged = {}
+    for output in outputs:
+        if 'version' in output:
+            merged.setdefault('version', output['version'])
+        for result in output.get('results', []):
+            key = (result.get('check_id'), result.get('path'),
+                   result.get('start', {}).get('offset'), result.get('end', {}).get('offset'))
+            results.setdefault(key, result)
+        for error in output.get('errors', []):
+            errors.setdefault(json.dumps(error, sort_keys=True), error)
+        scanned.update(output.get('paths', {}).get('scanned', []))
+    merged['results'] = [results[k] for k in sorted(results, key=lambda k: (k[1] or '', k[2] or 0, k[3] or 0, k[0] or ''))]
+    merged['errors'] = list(errors.values())
+    merged['paths'] = {'scanned': sorted(scanned)}
+    return merged
+
+
+def scan_semgrep_parallel(target_dir, rule_path, jobs=None, prefilter=True, max_files=DEFAULT_BATCH_FILES,
+                          max_arg_bytes=DEFAULT_ARG_BYTES):
+    """
+    Run Semgrep over candidate files only: a literal prefilter (see rule_literals) picks
+    the files of the rules' languages that can match, they are split into argument-length-safe
+    batches, and the batches run as parallel Semgrep processes whose outputs are merged.
+    Falls back to every file of those languages when the rules have no usable literal.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    literals = rule_literals(rule_path) if prefilter else None
+    files = prefilter_files(target_dir, literals, rule_extensions(rule_path))
+    if not files:
+        return merge_semgrep_outputs([])
+    # At least one batch per worker, so small candidate sets still spread over the pool
+    per_batch = max(1, min(max_files, -(-len(files) // jobs)))
+    batches = semgrep_batches(files, per_batch, max_arg_bytes)
+    # Each process gets one core; the parallelism comes from the batches
+    extra_args = ('--jobs', '1') if jobs > 1 else ()
+    with metrics.stage('semgrep_parallel') as m, ThreadPoolExecutor(max_workers=jobs) as pool:
+        m.count('batches', len(batches))
+        outputs = list(pool.map(lambda batch: scan_semgrep(target_dir, rule_path, batch, extra_args), batches))
+    return merge_semgrep_outputs(outputs)
+
+
+def iter_semgrep_results(target_dir, rule_path, files=None, max_ok_returncode=0):
+    """
+    Run Semgrep and yield its result objects one at a time, decoded incrementally
+    from the stdout pipe, so peak memory does not depend on the number of findings.
+    Raises RuntimeError once the stream ends if Semgrep exited with a code above
+    `max_ok_returncode` or its output could not be parsed.
+    """
+    if files is not None and not files:
+        return
+    cmd = [
+        "semgrep",
+        "--config", rule_path,
+        "--json"
+    ] + (list(files) if files is not None else [target_dir])
+    # stderr goes to a temp file: a full stderr pipe would block Semgrep while we read stdout.
+    # The stage's wall time includes the time the consumer spends between results.
+    with metrics.stage('semgrep') as m, tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+        parse_error = None
+        finished = False
+        try:
+            try:
+                for result in iter_json_array(proc.stdout, key='results'):
+                    m.count('findings')
+                    yield result
+            except ValueError as e:
+                parse_error = e
+            # Drain the remaining keys (errors, paths, ...) so Semgrep can exit
+            while proc.stdout.read(65536):
+                pass
+            finished = True
+        finally:
+            if not finished:
+                proc.kill()
+            proc.stdout.close()
+            returncode = proc.wait()
+        if returncode > max_ok_returncode or parse_error is not None:
+            stderr.seek(0)
+            message = stderr.read().decode('utf-8', errors='replace')
+            if parse_error is not None:
+                message = f"could not parse JSON output ({parse_error}) {message}"
+            raise RuntimeError(f"Semgrep failed with exit code {returncode}: {message}")
+
+
+# Files up to this size are read whole by the prefetcher; larger ones are streamed by the analyzer
+PREFETCH_FILE_BYTES = 1024 * 1024
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def _content_digest(file_path, data):
+    """SHA-1 of the file contents (hashed in chunks when the file was not read whole)."""
+    h = hashlib.sha1()
+    if data is not None:
+        h.update(data)
+    else:
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+                h.update(chunk)
+    return h.digest()
+
+
+def _load_source(file_path, limits):
+    """
+    Stat, classify, hash and (if small enough) read one file: (reason, action, size, data, digest).
+    data is None for skipped files and for files to be streamed from disk.
+    """
+    size = os.path.getsize(file_path)
+    data = None
+    if size <= PREFETCH_FILE_BYTES:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    reason, action = limits.check(file_path, size, data)
+    if action == 'skip':
+        return reason, action, size, None, None
+    return reason, action, size, data, _content_digest(file_path, data)
+
+
+def _iter_sources(files, limits, m, window):
+    """
+    (file_path, size, data, digest, findings, duplicate) for every admitted file, read
+    ahead `window` files; counts skips. Files are grouped by content: `findings` is the
+    list shared by all byte-identical files, filled by the caller for the first of them
+    (duplicate=False) and reused for the others. Analyzers never see the path, so
+    the findings of one copy hold for every copy.
+    """
+    blobs = {}
+    for file_path, (reason, action, size, data, digest) in prefetch(files, lambda path: _load_source(path, limits), window):
+        if reason:
+            m.count(reason)
+        if action == 'skip':
+            m.count('skipped')
+            continue
+        if digest in blobs:
+            m.count('duplicates')
+            yield file_path, size, None, digest, blobs[digest], True
+        else:
+            blobs[digest] = []
+            yield file_path, size, data, digest, blobs[digest], False
+
+
+def _fan_out(findings, file_path):
+    return [dict(finding, file=file_path) for finding in findings]
+
+
+def _guard(stage, budget):
+    """A watchdog.Guard for `stage` under `budget`, or a no-op context yielding None."""
+    if budget is None:
+        return contextlib.nullcontext()
+    from feature_flag.watchdog import Guard
+    return Guard(stage, budget)
+
+
+def _analyze_file(analyzer, file_path, data):
+    """Findings in file contents already read, or in the file streamed from disk."""
+    if data is not None:
+        return analyzer.analyze(data)
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        return analyzer.analyze(f)
+
+
+def _ast_findings(lang, max_line_length, record_regions, profiles, file_path, data):
+    """AST findings of one file; runs in the budget worker (see watchdog.Guard)."""
+    analyzer = AnalyzerFactory.get_analyzer(lang, profiles, max_line_length, record_regions)
+    return _analyze_file(analyzer, file_path, data)
+
+
+def _fallback_findings(lang, max_line_length, record_regions, profiles, file_path, data):
+    from ast_analysis.fallback_analyzer import FallbackAnalyzer
+    return _analyze_file(FallbackAnalyzer(lang, profiles, max_line_length), file_path, data)
+
+
+def iter_ast(target_dir, lang, files=None, limits=DEFAULT_LIMITS, prefetch_window=DEFAULT_WINDOW, budget=None,
+             journal=None, regions=None, profiles=None):
+    """
+    Run the AST-based analyzer for `lang` over every matching file in `target_dir`
+    (or only over `files`, when given), yielding each finding as its file is analyzed.
+    Files are read ahead on a thread pool (`prefetch_window` files, 0 to read inline)
+    so I/O overlaps analysis; large files are streamed line by line. Byte-identical
+    files are analyzed once. `limits` decides which huge, minified or generated
+    files are skipped. With a watchdog.Budget, each file is analyzed under its time
+    and memory limits, and quarantined files get the fallback analyzer. With a
+    checkpoint.StageJournal, the findings of every analyzed file are journaled, and
+    files journaled by an interrupted run are not analyzed again. With a
+    regions.RegionIndex, the code regions guarded by each check are added to it.
+    `profiles` (a tuple of sdk_profiles.SdkProfile, the defaults when None) are the
+    flag SDK calls looked for, all in the same pass.
+    """
+    args = (lang, limits.max_line_length, regions is not None, profiles)
+    if files is None:
+        files = collect_files(target_dir, EXTENSIONS[lang])
+    with metrics.stage('ast') as m, _guard('ast', budget) as guard:
+        for file_path, size, data, digest, blob_findings, duplicate in _iter_sources(files, limits, m, prefetch_window):
+            started = time.perf_counter()
+            journaled = journal.get(file_path, digest) if journal is not None and not duplicate else None
+            if duplicate:
+                deps = _fan_out(blob_findings, file_path)
+            elif journaled is not None:
+                deps = journaled
+                m.count('resumed')
+            elif guard is not None:
+                deps = guard.analyze(m, file_path, digest, _ast_findings, args + (file_path, data),
+                                     fallback=lambda: _fallback_findings(*args, file_path, data))
+            else:
+                deps = _ast_findings(*args, file_path, data)
+            if not duplicate:
+                for dep in deps:
+                    dep['file'] = file_path
+                blob_findings.extend(deps)
+                if journal is not None and journaled is None:
+                    journal.record(file_path, digest, deps)
+            if regions is not None:
+                deps = regions.extract(file_path, deps)
+            m.add_file(file_path, size, time.perf_counter() - started)
+            m.count('findings', len(deps))
+            yield from deps
+
+
+def scan_ast(target_dir, lang, files=None, limits=DEFAULT_LIMITS, prefetch_window=DEFAULT_WINDOW, budget=None,
+             journal=None, regions=None, profiles=None):
+    """The findings of iter_ast as a list."""
+    return list(iter_ast(target_dir, lang, files, limits, prefetch_window, budget, journal, regions, profiles))
+
+
+def _dataflow_findings(file_path, data):
+    """Taint flows to sensitive operations in one file; runs in the budget worker (see watchdog.Guard)."""
+    if data is not None:
+        code = data.decode('utf-8', errors='ignore')
+    else:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            code = f.read()
+    analyzer = FeatureFlagDataFlowAnalyzer()
+    analyzer.visit(ast.parse(code))
+    # Collect all taint flows to sensitive operations
+    findings = []
+    for sink_func, tainted_var, node in analyzer.taint_to_sensitive:
+        findings.append({
+            'file': file_path,
+            'line': getattr(node, 'lineno', None),
+            'code': getattr(node, 'source', code.splitlines()[node.lineno-1] if hasattr(node, 'lineno') else ''),
+            'context': None,
+            'dependency': tainted_var,
+            'source': 'dataflow_analysis',
+            'detail': f"Taint flows to sensitive op '{sink_func}'"
+        })
+    return findings
+
+
+def scan_dataflow(target_dir, lang, files=None, limits=DEFAULT_LIMITS, prefetch_window=DEFAULT_WINDOW, budget=None,
+                  journal=None):
+    """
+    Run Data Flow Analysis and return taint flows reaching sensitive operations.
+    If `files` is given, only those files are analyzed. Files are read ahead and
+    byte-identical files analyzed once, as in scan_ast. The analysis parses whole files, so `limits` is what keeps huge or
+    generated sources out of memory, and a watchdog.Budget what bounds each parse; quarantined
+    files have no data flow fallback and are skipped. A checkpoint.StageJournal is used as in iter_ast.
+    """
+    if lang != 'python':
+        raise NotImplementedError('Only Python is supported for dataflow analysis prototype.')
+    if files is None:
+        files = collect_files(target_dir, EXTENSIONS[lang])
+    findings = []
+    with metrics.stage('dataflow') as m, _guard('dataflow', budget) as guard:
+        for file_path, size, data, digest, blob_findings, duplicate in _iter_sources(files, limits, m, prefetch_window):
+            started = time.perf_counter()
+            if duplicate:
+                findings.extend(_fan_out(blob_findings, file_path))
+                m.add_file(file_path, size, time.perf_counter() - started)
+                continue
+            journaled = journal.get(file_path, digest) if journal is not None else None
+            if journaled is not None:
+                file_findings = journaled
+                m.count('resumed')
+            elif guard is not None:
+                file_findings = guard.analyze(m, file_path, digest, _dataflow_findings, (file_path, data))
+            else:
+                file_findings = _dataflow_findings(file_path, data)
+            if journal is not None and journaled is None:
+                journal.record(file_path, digest, file_findings)
+            findings.extend(file_findings)
+            blob_findings.extend(file_findings)
+            m.add_file(file_path, size, time.perf_counter() - started)
+        m.count('findings', len(findings))
+    return findings
@@ -0,0 +1,164 @@
+"""
+Sharded map/reduce scanning for repositories too large for one machine.
+
+Map: the file list from the walker is split into N shards by a stable hash of each
+file's path relative to the scan root, so every machine computes the same split.
+A shard runs the AST analyzer, Data Flow Analysis, Semgrep and call extraction on
+its files only and returns a self-describing partial result.
+
+Reduce: partials are validated and merged deterministically (sorted by shard, file
+and line). Each shard records the call graph summary of its Python modules
+(definitions, imports, calls; see feature_flag.call_graph), and the summaries of all
+shards are resolved together, so calls into functions defined in another shard
+become graph edges too.
+"""
+import hashlib
+import os
+from collections import defaultdict
+
+from cli.end_to_end_demo import collect_files, EXTENSIONS
+from feature_flag.scan import scan_semgrep, scan_ast, scan_dataflow
+from feature_flag.merge import merge_results, ast_entries
+from feature_flag.dependency_graph import propagate_flags
+from feature_flag.call_graph import CallGraph, summarize_modules
+
+PARTIAL_FORMAT = 'ffdeps-shard-partial'
+REDUCED_FORMAT = 'ffdeps-shard-reduced'
+FORMAT_VERSION = 2
+
+
+def relative_path(path, target_dir):
+    """Path relative to the scan root with '/' separators, identical on every machine."""
+    return os.path.relpath(path, target_dir).replace(os.sep, '/')
+
+
+def shard_of(rel_path, shard_count):
+    """Stable shard index for a relative path (independent of PYTHONHASHSEED and platform)."""
+    digest = hashlib.sha1(rel_path.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+
+def shard_files(target_dir, lang, shard_index, shard_count):
+    """Files of `lang` under `target_dir` that belong to the given shard, in sorted order."""
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"Shard index {shard_index} out of range for {shard_count} shards")
+    files = collect_files(target_dir, EXTENSIONS[lang])
+    return sorted(f for f in files if shard_of(relative_path(f, target_dir), shard_count) == shard_index)
+
+
+def _summarize_modules(target_dir, files):
+    modules = []
+    errors = []
+    for file_path, summary, error, _, _ in summarize_modules(files, target_dir):
+        if error is not None:
+            errors.append({'file': file_path, 'stage': 'calls', 'message': error})
+        else:
+            modules.append(summary)
+    return modules, errors
+
+
+def run_shard(target_dir, lang, shard_index, shard_count, semgrep_rule=None):
+    """Map step: analyze one shard and return its partial result."""
+    files = shard_files(target_dir, lang, shard_index, shard_count)
+    partial = {
+        'format': PARTIAL_FORMAT,
+        'version': FORMAT_VERSION,
+        'shard': {
+            'index': shard_index,
+            'count': shard_count,
+            'target_dir': target_dir,
+            'lang': lang,
+            'semgrep_rule': semgrep_rule,
+            'files_digest': hashlib.sha1('\n'.join(relative_path(f, target_dir) for f in files).encode('utf-8')).hexdigest(),
+        },
+        'files': files,
+        'ast': scan_ast(target_dir, lang, files=files),
+        'dataflow': [],
+        'semgrep': {'results': [], 'errors': []},
+        'modules': [],
+        'errors': [],
+    }
+    if lang == 'python':
+        partial['dataflow'] = scan_dataflow(target_dir, lang, files=files)
+        partial['modules'], partial['errors'] = _summarize_modules(target_dir, files)
+    if semgrep_rule:
+        partial['semgrep'] = scan_semgrep(target_dir, semgrep_rule, files=files)
+    return partial
+
+
+def _check_partials(partials, allow_missing):
+    if not partials:
+        raise ValueError("No partial results to reduce")
+    for partial in partials:
+        if partial.get('format') != PARTIAL_FORMAT or partial.get('version') != FORMAT_VERSION:
+            raise ValueError("Not a shard partial result (format/version mismatch)")
+    first = partials[0]['shard']
+    for partial in partials:
+        shard = partial['shard']
+        for field in ('count', 'target_dir', 'lang', 'semgrep_rule'):
+            if shard[field] != first[field]:
+                raise ValueError(f"Partials disagree on '{field}': {shard[field]!r} != {first[field]!r}")
+    indices = [p['shard']['index'] for p in partials]
+    if len(set(indices)) != len(indices):
+        raise ValueError(f"Duplicate shard partials: {sorted(indices)}")
+    missing = sorted(set(range(first['count'])) - set(indices))
+    if missing and not allow_missing:
+        raise ValueError(f"Missing shard partials: {missing}")
+    return first, missing
+
+
+def reduce_partials(partials, allow_missing=False):
+    """Reduce step: merge shard partials into one deterministic result with the flag graph."""
+    partials = sorted(partials, key=lambda p: p['shard']['index'])
+    shard, missing = _check_partials(partials, allow_missing)
+    ast_deps = sorted((d for p in partials for d in p['ast']),
+                      key=lambda d: (d['file'], d['lineno'] or 0))
+    dataflow = sorted((d for p in partials for d in p['dataflow']),
+                      key=lambda d: (d['file'], d['line'] or 0))
+    semgrep_results = sorted((r for p in partials for r in p['semgrep'].get('results', [])),
+                             key=lambda r: (r['path'], r['start'].get('offset', 0), r.get('check_id', '')))
+    semgrep_errors = [e for p in partials for e in p['semgrep'].get('errors', [])]
+    merged = merge_results({'results': semgrep_results}, ast_deps, dataflow)
+
+    graph = CallGraph()
+    for summary in sorted((s for p in partials for s in p['modules']), key=lambda s: s['file']):
+        graph.add(summary)
+    call_graph = graph.resolve()
+    # Function flags come from the AST findings, not the deduplicated merge, which
+    # keeps only one entry per line when a line checks several flags. They are keyed
+    # by the qualified name of the enclosing function, like the call graph nodes
+    function_flags = defaultdict(set)
+    for entry in ast_entries(ast_deps):
+        if entry.get('context') and entry.get('dependency'):
+            function = graph.function_at(entry['file'], entry['line']) if entry.get('line') else None
+            function_flags[(function or entry['context'], entry['file'])].add(entry['dependency'])
+    all_flags = propagate_flags(call_graph, function_flags)
+    nodes = sorted(set(all_flags) | set(call_graph) | {c for cs in call_graph.values() for c in cs})
+
+    return {
+        'format': REDUCED_FORMAT,
+        'version': FORMAT_VERSION,
+        'shards': {
+            'count': shard['count'],
+            'missing': missing,
+            'target_dir': shard['target_dir'],
+            'lang': shard['lang'],
+            'semgrep_rule': shard['semgrep_rule'],
+        },
+        'files': sorted(f for p in partials for f in p['files']),
+        'ast': ast_deps,
+        'dataflow': dataflow,
+        'semgrep': {'results': semgrep_results, 'errors': semgrep_errors},
+        'merged': merged,
+        'graph': {
+            'nodes': [{
+                'function': func,
+                'file': file_path,
+                'flags': sorted(function_flags.get((func, file_path), ())),
+                'all_flags': sorted(all_flags.get((func, file_path), ())),
+            } for func, file_path in nodes],
+            'edges': sorted([caller[0], caller[1], callee[0], callee[1]]
+                            for caller, callees in call_graph.items() for callee in callees),
+        },
+        'errors': [e for p in partials for e in p['errors']] + graph.errors,
+    }
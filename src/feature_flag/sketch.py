@@ -0,0 +1,483 @@
+"""
+Approximate flag statistics from one streaming pass, in memory that does not grow
+with the number of findings.
+
+The exact report engine keeps every flag -> context edge; over enormous codebases
+(or many repositories at once) the summary numbers are all that is needed, and
+fixed-size sketches answer them:
+- HyperLogLog: distinct flags, contexts and flag -> context edges overall, and the
+  distinct contexts of each flag (relative standard error 1.04 / sqrt(2^precision));
+- Count-Min: usage counts of flags and contexts, never under-estimated and
+  over-estimated by at most e / width of all usages with probability 1 - e^-depth;
+  a bounded candidate set tracks the heavy hitters for the top-k lists;
+- MinHash (one-permutation hashing, `minhash_size` buckets): a signature of the
+  contexts of each flag, whose agreement estimates the Jaccard similarity of two
+  flags; LSH banding finds the similar pairs without comparing every pair.
+
+A flag costs 2^flag_precision + 8 * minhash_size bytes whatever its usage; the global
+sketches are allocated once. Sketches built from separate scans (e.g. one per
+repository) merge into the sketch of the combined scan, and are saved as small JSON
+documents instead of result files.
+
+    PYTHONPATH=src python -m feature_flag.sketch merged_flag_dependencies.json
+"""
+import base64
+import hashlib
+import json
+import math
+import sys
+from array import array
+from functools import lru_cache
+from itertools import combinations
+
+from feature_flag import metrics
+
+SKETCH_FORMAT = 'ffdeps-sketch'
+SKETCH_VERSION = 1
+DEFAULT_PRECISION = 14          # global HyperLogLogs: 16 KiB each, ~0.8% error
+DEFAULT_FLAG_PRECISION = 8      # per flag: 256 bytes, ~6.5% error
+DEFAULT_WIDTH = 1 << 14
+DEFAULT_DEPTH = 4
+DEFAULT_MINHASH_SIZE = 64
+DEFAULT_CANDIDATES = 256
+DEFAULT_SIMILARITY = 0.5
+# Distinct (flag, context) pairs counted in memory before they are applied to the sketches
+BATCH_PAIRS = 1 << 16
+HASH_CACHE_SIZE = 1 << 16
+_EMPTY = (1 << 64) - 1
+
+
+@lru_cache(maxsize=HASH_CACHE_SIZE)
+def _hash(value):
+    """64-bit hash, stable across processes (so saved sketches merge)."""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8', 'surrogatepass'), digest_size=8).digest(), 'little')
+
+
+def _mix(a, b):
+    """64-bit hash of a pair of hashes (splitmix64 finalizer)."""
+    z = (a ^ (b * 0x9e3779b97f4a7c15)) & _EMPTY
+    z = ((z ^ (z >> 30)) * 0xbf58476d1ce4e5b9) & _EMPTY
+    z = ((z ^ (z >> 27)) * 0x94d049bb133111eb) & _EMPTY
+    return z ^ (z >> 31)
+
+
+def _encode(values):
+    if sys.byteorder == 'big' and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return base64.b64encode(values.tobytes()).decode('ascii')
+
+
+def _decode(typecode, text):
+    values = array(typecode)
+    values.frombytes(base64.b64decode(text))
+    if sys.byteorder == 'big' and values.itemsize > 1:
+        values.byteswap()
+    return values
+
+
+class HyperLogLog:
+    """Distinct count estimate over 2^p one-byte registers."""
+    def __init__(self, p=DEFAULT_PRECISION, registers=None):
+        if not 4 <= p <= 18:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 18, not {p}")
+        self.p = p
+        self.registers = bytearray(1 << p) if registers is None else bytearray(registers)
+        self._shift = 64 - p
+        self._mask = (1 << self._shift) - 1
+
+    def add_hash(self, h):
+        index = h >> self._shift
+        rank = self._shift - (h & self._mask).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        m = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if zeros and estimate <= 2.5 * m:
+            # Small range: linear counting over the empty registers is more accurate
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError(f"cannot merge HyperLogLogs of precision {self.p} and {other.p}")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+
+class CountMinSketch:
+    """Frequency estimates in `depth` rows of `width` counters (Kirsch-Mitzenmacher double hashing)."""
+    def __init__(self, width=DEFAULT_WIDTH, depth=DEFAULT_DEPTH, rows=None):
+        self.width = width
+        self.depth = depth
+        self.rows = rows if rows is not None else [array('Q', bytes(8 * width)) for _ in range(depth)]
+        self.total = 0
+
+    def _cells(self, h):
+        h1 = h & 0xffffffff
+        h2 = (h >> 32) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add_hash(self, h, n=1):
+        """Add `n` occurrences; returns the new estimate."""
+        self.total += n
+        estimate = None
+        for row, cell in zip(self.rows, self._cells(h)):
+            row[cell] += n
+            if estimate is None or row[cell] < estimate:
+                estimate = row[cell]
+        return estimate
+
+    def estimate_hash(self, h):
+        return min(row[cell] for row, cell in zip(self.rows, self._cells(h)))
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("cannot merge Count-Min sketches of different dimensions")
+        self.rows = [array('Q', map(int.__add__, mine, theirs)) for mine, theirs in zip(self.rows, other.rows)]
+        self.total += other.total
+        return self
+
+
+class _HeavyHitters:
+    """
+    At most `capacity` candidate keys with their latest Count-Min estimate. A key
+    enters once its estimate beats the smallest candidate, which it then evicts.
+    """
+    def __init__(self, capacity=DEFAULT_CANDIDATES):
+        self.capacity = capacity
+        self.estimates = {}
+        self.floor = 0
+
+    def offer(self, key, estimate):
+        estimates = self.estimates
+        if key in estimates or len(estimates) < self.capacity:
+            estimates[key] = estimate
+        elif estimate > self.floor:
+            smallest = min(estimates, key=estimates.get)
+            if estimate > estimates[smallest]:
+                del estimates[smallest]
+                estimates[key] = estimate
+            self.floor = min(estimates.values())
+
+    def top(self, k, sketch):
+        """The k keys with the largest current estimates in `sketch`."""
+        ranked = sorted(((key, sketch.estimate_hash(_hash(key))) for key in self.estimates),
+                        key=lambda item: (-item[1], item[0]))
+        return ranked[:k]
+
+
+class MinHash:
+    """One-permutation MinHash: each hash lands in one of `size` buckets, which keep their minimum."""
+    def __init__(self, size=DEFAULT_MINHASH_SIZE, values=None):
+        self.values = values if values is not None else array('Q', [_EMPTY]) * size
+
+    def add_hash(self, h):
+        bucket = h % len(self.values)
+        value = h // len(self.values)
+        if value < self.values[bucket]:
+            self.values[bucket] = value
+
+    def jaccard(self, other):
+        """Estimated Jaccard similarity of the two sets (buckets empty in both are not counted)."""
+        used = equal = 0
+        for mine, theirs in zip(self.values, other.values):
+            if mine == _EMPTY and theirs == _EMPTY:
+                continue
+            used += 1
+            equal += mine == theirs
+        return equal / used if used else 0.0
+
+    def merge(self, other):
+        self.values = array('Q', map(min, self.values, other.values))
+        return self
+
+
+class FlagSketch:
+    """
+    Sketch-based counterpart of report.ReportEngine: consumes the same findings
+    (entries with both a 'dependency' and a 'context') and answers the same summary
+    questions approximately.
+    """
+    def __init__(self, precision=DEFAULT_PRECISION, flag_precision=DEFAULT_FLAG_PRECISION, width=DEFAULT_WIDTH,
+                 depth=DEFAULT_DEPTH, minhash_size=DEFAULT_MINHASH_SIZE, candidates=DEFAULT_CANDIDATES):
+        self.params = {'precision': precision, 'flag_precision': flag_precision, 'width': width, 'depth': depth,
+                       'minhash_size': minhash_size, 'candidates': candidates}
+        self.flags = HyperLogLog(precision)
+        self.contexts = HyperLogLog(precision)
+        self.edges = HyperLogLog(precision)
+        self.flag_usage = CountMinSketch(width, depth)
+        self.context_usage = CountMinSketch(width, depth)
+        self.heavy_flags = _HeavyHitters(candidates)
+        self.heavy_contexts = _HeavyHitters(candidates)
+        self.per_flag = {}      # flag -> (HyperLogLog of its contexts, MinHash of its contexts)
+        self.findings = 0
+
+    def add(self, flag, context, n=1):
+        """Record `n` findings of `flag` checked in `context`."""
+        self._apply({(flag, context): n})
+
+    def consume(self, entries):
+        """
+        Stream findings into the sketch. Up to BATCH_PAIRS distinct (flag, context) pairs are
+        counted before being applied, so repeated pairs, flags and contexts are hashed and
+        counted once per batch.
+        """
+        pending = {}
+        for entry in entries:
+            dep = entry.get('dependency')
+            context = entry.get('context')
+            if dep and context:
+                key = (dep, context)
+                pending[key] = pending.get(key, 0) + 1
+                if len(pending) >= BATCH_PAIRS:
+                    self._apply(pending)
+                    pending = {}
+        self._apply(pending)
+        return self
+
+    def _apply(self, pairs):
+        flag_counts = {}
+        context_counts = {}
+        for (flag, context), n in pairs.items():
+            flag_counts[flag] = flag_counts.get(flag, 0) + n
+            context_counts[context] = context_counts.get(context, 0) + n
+            self.findings += n
+        for names, hll, usage, heavy in ((flag_counts, self.flags, self.flag_usage, self.heavy_flags),
+                                         (context_counts, self.contexts, self.context_usage, self.heavy_contexts)):
+            for name, n in names.items():
+                h = _hash(name)
+                hll.add_hash(h)
+                heavy.offer(name, usage.add_hash(h, n))
+        per_flag = self.per_flag
+        for flag, context in pairs:
+            flag_hash = _hash(flag)
+            context_hash = _hash(context)
+            self.edges.add_hash(_mix(flag_hash, context_hash))
+            sketches = per_flag.get(flag)
+            if sketches is None:
+                sketches = per_flag[flag] = (HyperLogLog(self.params['flag_precision']),
+                                             MinHash(self.params['minhash_size']))
+            sketches[0].add_hash(context_hash)
+            sketches[1].add_hash(context_hash)
+
+    def merge(self, other):
+        if other.params != self.params:
+            raise ValueError(f"cannot merge sketches built with different parameters: {self.params} != {other.params}")
+        self.flags.merge(other.flags)
+        self.contexts.merge(other.contexts)
+        self.edges.merge(other.edges)
+        self.flag_usage.merge(other.flag_usage)
+        self.context_usage.merge(other.context_usage)
+        for mine, theirs, usage in ((self.heavy_flags, other.heavy_flags, self.flag_usage),
+                                    (self.heavy_contexts, other.heavy_contexts, self.context_usage)):
+            for key in list(mine.estimates) + list(theirs.estimates):
+                mine.offer(key, usage.estimate_hash(_hash(key)))
+        for flag, (hll, minhash) in other.per_flag.items():
+            sketches = self.per_flag.get(flag)
+            if sketches is None:
+                self.per_flag[flag] = (hll, minhash)
+            else:
+                sketches[0].merge(hll)
+                sketches[1].merge(minhash)
+        self.findings += other.findings
+        return self
+
+    def unique_flags(self):
+        return self.flags.count()
+
+    def unique_contexts(self):
+        return self.contexts.count()
+
+    @property
+    def edge_count(self):
+        return self.edges.count()
+
+    def flag_contexts(self, flag):
+        """Estimated number of distinct contexts checking `flag`."""
+        sketches = self.per_flag.get(flag)
+        return sketches[0].count() if sketches else 0
+
+    def conflicts(self):
+        """(flag, estimated contexts) for the flags estimated to be used in multiple contexts."""
+        estimates = ((flag, hll.count()) for flag, (hll, _) in self.per_flag.items())
+        return sorted(((flag, n) for flag, n in estimates if n > 1), key=lambda item: (-item[1], item[0]))
+
+    def top_flags(self, k):
+        return self.heavy_flags.top(k, self.flag_usage)
+
+    def top_contexts(self, k):
+        return self.heavy_contexts.top(k, self.context_usage)
+
+    def similar_pairs(self, threshold=DEFAULT_SIMILARITY, bands=16):
+        """
+        (flag, flag, estimated Jaccard similarity of their contexts) for the pairs at or above
+        `threshold`, most similar first. Only pairs whose signatures agree on a whole band
+        are compared.
+        """
+        rows = max(1, self.params['minhash_size'] // bands)
+        buckets = {}
+        for flag, (_, minhash) in self.per_flag.items():
+            values = minhash.values
+            for start in range(0, len(values) - rows + 1, rows):
+                band = tuple(values[start:start + rows])
+                if any(value != _EMPTY for value in band):
+                    buckets.setdefault((start, band), []).append(flag)
+        candidates = set()
+        for flags in buckets.values():
+            candidates.update(combinations(sorted(flags), 2))
+        pairs = []
+        for a, b in candidates:
+            similarity = self.per_flag[a][1].jaccard(self.per_flag[b][1])
+            if similarity >= threshold:
+                pairs.append((a, b, similarity))
+        return sorted(pairs, key=lambda pair: (-pair[2], pair[0], pair[1]))
+
+    def to_dict(self):
+        return {
+            'format': SKETCH_FORMAT,
+            'version': SKETCH_VERSION,
+            'params': self.params,
+            'findings': self.findings,
+            'flags': _encode(array('B', self.flags.registers)),
+            'contexts': _encode(array('B', self.contexts.registers)),
+            'edges': _encode(array('B', self.edges.registers)),
+            'flag_usage': [self.flag_usage.total] + [_encode(row) for row in self.flag_usage.rows],
+            'context_usage': [self.context_usage.total] + [_encode(row) for row in self.context_usage.rows],
+            'heavy_flags': sorted(self.heavy_flags.estimates),
+            'heavy_contexts': sorted(self.heavy_contexts.estimates),
+            'per_flag': {flag: [_encode(array('B', hll.registers)), _encode(minhash.values)]
+                         for flag, (hll, minhash) in sorted(self.per_flag.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('format') != SKETCH_FORMAT or data.get('version') != SKETCH_VERSION:
+            raise ValueError("not a flag sketch (or an unsupported version)")
+        params = data['params']
+        sketch = cls(**params)
+        sketch.findings = data['findings']
+        sketch.flags.registers = bytearray(_decode('B', data['flags']))
+        sketch.contexts.registers = bytearray(_decode('B', data['contexts']))
+        sketch.edges.registers = bytearray(_decode('B', data['edges']))
+        for usage, heavy, key in ((sketch.flag_usage, sketch.heavy_flags, 'flag_usage'),
+                                  (sketch.context_usage, sketch.heavy_contexts, 'context_usage')):
+            usage.total = data[key][0]
+            usage.rows = [_decode('Q', row) for row in data[key][1:]]
+            for name in data['heavy_' + key.split('_')[0] + 's']:
+                heavy.offer(name, usage.estimate_hash(_hash(name)))
+        for flag, (registers, values) in data['per_flag'].items():
+            sketch.per_flag[flag] = (HyperLogLog(params['flag_precision'], _decode('B', registers)),
+                                     MinHash(values=_decode('Q', values)))
+        return sketch
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def is_sketch(path):
+    """True if `path` holds a saved FlagSketch rather than findings."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(64)
+    except OSError:
+        return False
+    return head.startswith(b'{"format": "' + SKETCH_FORMAT.encode() + b'"')
+
+
+def build_sketch(entries, **params):
+    """Stream `entries` once into a new FlagSketch."""
+    sketch = FlagSketch(**params)
+    with metrics.stage('sketch') as m:
+        sketch.consume(entries)
+        m.count('findings', sketch.findings)
+        m.count('flags', len(sketch.per_flag))
+    return sketch
+
+
+def load_or_build_sketch(path, **params):
+    """The saved sketch at `path`, or a sketch of the findings (JSON or binary results) there."""
+    if is_sketch(path):
+        return FlagSketch.load(path)
+    from feature_flag.binary_results import iter_results
+    return build_sketch(iter_results(path), **params)
+
+
+def scan_sketch(targets, languages, limits=None, prefetch_window=None, budget=None, sketch=None, **params):
+    """
+    Scan every directory in `targets` for `languages` and stream the AST findings
+    straight into a sketch (no result file, no findings list). Files among `targets`
+    are saved sketches or scan results, merged in.
+    """
+    import os
+    from feature_flag.batch import collect_repo_files
+    from feature_flag.scan import iter_ast
+    from ast_analysis.utils import DEFAULT_LIMITS
+    from feature_flag.prefetch import DEFAULT_WINDOW
+    sketch = sketch if sketch is not None else FlagSketch(**params)
+    for target in targets:
+        if not os.path.isdir(target):
+            sketch.merge(load_or_build_sketch(target, **sketch.params))
+            continue
+        for lang, files in collect_repo_files(target, languages).items():
+            if files:
+                sketch.consume(iter_ast(target, lang, files=files, limits=limits or DEFAULT_LIMITS,
+                                        prefetch_window=DEFAULT_WINDOW if prefetch_window is None else prefetch_window,
+                                        budget=budget))
+    return sketch
+
+
+def print_sketch_summary(sketch, top_k=None, similarity=DEFAULT_SIMILARITY):
+    p = sketch.params
+    print("Approximate Summary Report (sketches):")
+    print(f"  Findings: {sketch.findings}")
+    print(f"  Unique flags: ~{sketch.unique_flags()}")
+    print(f"  Unique contexts: ~{sketch.unique_contexts()}")
+    print(f"  Flag->context edges: ~{sketch.edge_count}")
+    print(f"  (distinct counts +/-{104 / math.sqrt(1 << p['precision']):.1f}%, per-flag contexts "
+          f"+/-{104 / math.sqrt(1 << p['flag_precision']):.1f}%; usage counts over by at most "
+          f"{math.ceil(math.e / p['width'] * sketch.flag_usage.total)})")
+
+    print("\nPotential Conflicts (flags estimated in multiple contexts):")
+    conflicts = sketch.conflicts()
+    for flag, n in conflicts:
+        print(f"  [CONFLICT] Flag '{flag}' is used in ~{n} contexts")
+    if not conflicts:
+        print("  No conflicts detected.")
+
+    print(f"\nFlag pairs checked in similar contexts (Jaccard >= {similarity:.2f}):")
+    pairs = sketch.similar_pairs(similarity)
+    for a, b, jaccard in pairs:
+        print(f"  {a} ~ {b}: {jaccard:.2f}")
+    if not pairs:
+        print("  None.")
+
+    if top_k:
+        print(f"\nTop flags by usage (top {top_k}, estimated):")
+        for flag, count in sketch.top_flags(top_k):
+            print(f"  {flag}: ~{count}")
+        print(f"\nTop contexts by flag checks (top {top_k}, estimated):")
+        for ctx, count in sketch.top_contexts(top_k):
+            print(f"  {ctx}: ~{count}")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Approximate flag statistics from scan results or saved sketches.")
+    parser.add_argument("inputs", nargs="+", help="Scan results (JSON or binary) or saved sketches; merged together")
+    parser.add_argument("--top", type=int, default=20, help="Number of top flags/contexts to list")
+    args = parser.parse_args()
+    combined = load_or_build_sketch(args.inputs[0])
+    for path in args.inputs[1:]:
+        combined.merge(load_or_build_sketch(path))
+    print_sketch_summary(combined, args.top)
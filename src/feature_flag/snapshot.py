@@ -0,0 +1,395 @@
+"""
+Scan snapshots and a change-proportional diff for CI gating.
+
+A snapshot indexes merged findings (JSON or binary) per file:
+- usages: hashed finding keys (file, context, flag, code without surrounding
+  whitespace) with their multiplicity, sorted. Line numbers are kept for display
+  only, so edits that merely shift lines do not show up as changes;
+- the flag graph contribution of the file: an edge A -> B when a function checks
+  flag A before flag B (A guards B). A cycle means flags are nested in opposite
+  orders in different places;
+- a fingerprint over both.
+
+Layout: one JSON header line (format, per-file [fingerprint, offset], flag usage
+counts, graph edges with counts, cycles), then one JSON line per file; offsets
+are relative to the end of the header. `diff` compares the headers, then decodes
+only the files whose fingerprints differ, so its cost follows the size of the
+change rather than the size of the repository.
+
+    PYTHONPATH=src python -m feature_flag.snapshot save merged_flag_dependencies.json base.ffsnap
+    PYTHONPATH=src python -m feature_flag.snapshot diff base.ffsnap head.ffsnap
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections import Counter
+from itertools import groupby
+
+from feature_flag import metrics
+
+SNAPSHOT_FORMAT = 'ffdeps-snapshot'
+FORMAT_VERSION = 1
+# What `diff --fail-on` can gate on
+GATES = ('cycles', 'multi-flag', 'orphaned')
+
+
+def finding_key(entry):
+    """8-byte hex digest of what identifies a usage within its file."""
+    code = (entry.get('code') or '').strip()
+    raw = '\0'.join((entry.get('context') or '', entry.get('dependency') or '', code))
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _line(entry):
+    line = entry.get('line', entry.get('lineno'))
+    return line if line is not None else -1
+
+
+def _index_file(path, entries):
+    """The body record of one file."""
+    usages = {}
+    checks = {}
+    for entry in sorted(entries, key=_line):
+        key = finding_key(entry)
+        usage = usages.get(key)
+        if usage is None:
+            usages[key] = [key, 1, entry.get('dependency'), entry.get('context'), entry.get('code'),
+                           _line(entry), entry.get('source')]
+        else:
+            usage[1] += 1
+        if entry.get('dependency') and entry.get('context'):
+            flags = checks.setdefault(entry['context'], [])
+            if entry['dependency'] not in flags:
+                flags.append(entry['dependency'])
+    edges = Counter((a, b) for flags in checks.values() for a, b in zip(flags, flags[1:]))
+    record = {
+        'file': path,
+        'usages': sorted(usages.values()),
+        'edges': sorted([a, b, n] for (a, b), n in edges.items()),
+        'contexts': {context: sorted(flags) for context, flags in sorted(checks.items())},
+    }
+    fingerprint = hashlib.sha1(json.dumps(
+        [[u[0], u[1]] for u in record['usages']] + [record['edges']]).encode('utf-8')).hexdigest()
+    return fingerprint, record
+
+
+def _adjacency(edges):
+    graph = {}
+    for a, b in edges:
+        graph.setdefault(a, set()).add(b)
+        graph.setdefault(b, set())
+    return graph
+
+
+def strongly_connected(graph):
+    """Cycles of `graph` as sorted member lists (strongly connected components with more than one node)."""
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    cycles = []
+    counter = 0
+    for root in sorted(graph):
+        if root in index:
+            continue
+        # Iterative Tarjan: (node, iterator over its successors)
+        work = [(root, iter(sorted(graph[root])))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, successors = work[-1]
+            advanced = False
+            for succ in successors:
+                if succ not in index:
+                    index[succ] = low[succ] = counter
+                    counter += 1
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(sorted(graph[succ]))))
+                    advanced = True
+                    break
+                if succ in on_stack:
+                    low[node] = min(low[node], index[succ])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                members = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    members.append(member)
+                    if member == node:
+                        break
+                if len(members) > 1:
+                    cycles.append(sorted(members))
+    return sorted(cycles)
+
+
+def save_snapshot(entries, path):
+    """
+    Write the snapshot of `entries` (merged findings, grouped by file as the merge
+    output is) to `path`. Returns the header.
+    """
+    files = {}
+    flags = Counter()
+    edges = Counter()
+    seen = set()
+    with metrics.stage('snapshot') as m, tempfile.TemporaryFile('w+b') as body:
+        offset = 0
+        for file_path, group in groupby(entries, key=lambda e: e.get('file') or ''):
+            if file_path in seen:
+                raise ValueError(f"Findings of {file_path} are not contiguous; snapshot merged (sorted) results")
+            seen.add(file_path)
+            group = list(group)
+            fingerprint, record = _index_file(file_path, group)
+            line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+            body.write(line)
+            files[file_path] = [fingerprint, offset]
+            offset += len(line)
+            flags.update(e['dependency'] for e in group if e.get('dependency'))
+            edges.update({(a, b): n for a, b, n in record['edges']})
+            m.add_file(file_path, len(line))
+        graph = _adjacency(edges)
+        header = {
+            'format': SNAPSHOT_FORMAT, 'version': FORMAT_VERSION,
+            'files': files,
+            'flags': dict(sorted(flags.items())),
+            'edges': sorted([a, b, n] for (a, b), n in edges.items()),
+            'cycles': strongly_connected(graph),
+        }
+        m.count('cycles', len(header['cycles']))
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write((json.dumps(header, separators=(',', ':')) + '\n').encode('utf-8'))
+            body.seek(0)
+            shutil.copyfileobj(body, f)
+        os.replace(tmp_path, path)
+    return header
+
+
+def snapshot_results(merged_path, path):
+    """Snapshot a merged results file (JSON or binary); unsorted files are sorted externally first."""
+    from feature_flag.binary_results import iter_results
+    from feature_flag.merge import sorted_source
+    return save_snapshot(sorted_source(lambda: iter_results(merged_path)), path)
+
+
+class Snapshot:
+    """A stored snapshot: the header is loaded, file records are decoded on demand."""
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, 'rb')
+        try:
+            header = json.loads(self._f.readline())
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get('format') != SNAPSHOT_FORMAT:
+            self._f.close()
+            raise ValueError(f"{path}: not a snapshot")
+        if header.get('version') != FORMAT_VERSION:
+            self._f.close()
+            raise ValueError(f"{path}: unsupported snapshot version {header.get('version')}")
+        self.header = header
+        self.body_offset = self._f.tell()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._f.close()
+
+    @property
+    def files(self):
+        return self.header['files']
+
+    def record(self, file_path):
+        """The body record of `file_path` (an empty one if the file has no findings)."""
+        entry = self.files.get(file_path)
+        if entry is None:
+            return {'file': file_path, 'usages': [], 'edges': [], 'contexts': {}}
+        self._f.seek(self.body_offset + entry[1])
+        return json.loads(self._f.readline())
+
+
+def is_snapshot(path):
+    with open(path, 'rb') as f:
+        return f.read(32).startswith(b'{"format":"' + SNAPSHOT_FORMAT.encode() + b'"')
+
+
+def open_snapshot(path):
+    """Open a stored snapshot, or snapshot merged results (JSON or binary) on the fly."""
+    if is_snapshot(path):
+        return Snapshot(path)
+    fd, tmp_path = tempfile.mkstemp(suffix='.ffsnap')
+    os.close(fd)
+    try:
+        snapshot_results(path, tmp_path)
+        snapshot = Snapshot(tmp_path)
+    finally:
+        # The open handle keeps the data readable (POSIX); elsewhere the file is left for the OS
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+    return snapshot
+
+
+def _reach(graph, start):
+    seen = set()
+    todo = list(graph.get(start, ()))
+    while todo:
+        node = todo.pop()
+        if node not in seen:
+            seen.add(node)
+            todo.extend(graph.get(node, ()))
+    seen.discard(start)
+    return seen
+
+
+def _reverse(graph):
+    reverse = {}
+    for a, successors in graph.items():
+        for b in successors:
+            reverse.setdefault(b, set()).add(a)
+    return reverse
+
+
+def diff_snapshots(base, head):
+    """
+    Compare two snapshots. Only files with different fingerprints are decoded, and
+    impact sets are recomputed only for flags upstream of a changed graph edge.
+    """
+    with metrics.stage('diff') as m:
+        base_files, head_files = base.files, head.files
+        changed = sorted(f for f in base_files.keys() | head_files.keys()
+                         if base_files.get(f, (None,))[0] != head_files.get(f, (None,))[0])
+        added, removed, multi_flag = [], [], []
+        for file_path in changed:
+            old, new = base.record(file_path), head.record(file_path)
+            m.add_file(file_path)
+            old_usages = {u[0]: u for u in old['usages']}
+            new_usages = {u[0]: u for u in new['usages']}
+            for key in old_usages.keys() | new_usages.keys():
+                before = old_usages[key][1] if key in old_usages else 0
+                after = new_usages[key][1] if key in new_usages else 0
+                usage = new_usages.get(key) or old_usages[key]
+                item = {'file': file_path, 'dependency': usage[2], 'context': usage[3], 'code': usage[4],
+                        'line': usage[5], 'source': usage[6], 'count': abs(after - before)}
+                if after > before:
+                    added.append(item)
+                elif after < before:
+                    removed.append(item)
+            for context, flags in new['contexts'].items():
+                if len(flags) > 1 and len(old['contexts'].get(context, ())) <= 1:
+                    multi_flag.append({'file': file_path, 'context': context, 'flags': flags})
+        order = lambda item: (item['file'], item['line'], item['dependency'] or '', item['code'] or '')
+        added.sort(key=order)
+        removed.sort(key=order)
+
+        base_flags, head_flags = base.header['flags'], head.header['flags']
+        base_cycles = {tuple(c) for c in base.header['cycles']}
+        head_cycles = {tuple(c) for c in head.header['cycles']}
+        base_edges = {(a, b) for a, b, _ in base.header['edges']}
+        head_edges = {(a, b) for a, b, _ in head.header['edges']}
+        changed_edges = base_edges ^ head_edges
+        base_graph, head_graph = _adjacency(base_edges), _adjacency(head_edges)
+        # A flag's impact set can only change if it reaches the source of a changed edge
+        upstream = set()
+        for graph in (base_graph, head_graph):
+            reverse = _reverse(graph)
+            for a, _ in changed_edges:
+                upstream.add(a)
+                upstream |= _reach(reverse, a)
+        impact = {}
+        for flag in sorted(upstream):
+            before, after = _reach(base_graph, flag), _reach(head_graph, flag)
+            if before != after:
+                impact[flag] = {'added': sorted(after - before), 'removed': sorted(before - after)}
+        m.count('changed_files', len(changed))
+    return {
+        'changed_files': changed,
+        'added_usages': added,
+        'removed_usages': removed,
+        'new_cycles': sorted(list(c) for c in head_cycles - base_cycles),
+        'broken_cycles': sorted(list(c) for c in base_cycles - head_cycles),
+        'new_multi_flag_contexts': multi_flag,
+        'new_flags': sorted(f for f in head_flags if f not in base_flags),
+        'orphaned_flags': sorted(f for f in base_flags if f not in head_flags),
+        'added_edges': sorted(list(e) for e in head_edges - base_edges),
+        'removed_edges': sorted(list(e) for e in base_edges - head_edges),
+        'impact_changes': impact,
+    }
+
+
+def gate_failures(diff, gates=GATES):
+    """Human-readable reasons `diff` violates the selected gates."""
+    reasons = []
+    if 'cycles' in gates:
+        reasons += [f"new flag cycle: {' <-> '.join(c)}" for c in diff['new_cycles']]
+    if 'multi-flag' in gates:
+        reasons += [f"new multi-flag context: {c['context']} ({c['file']}) checks {', '.join(c['flags'])}"
+                    for c in diff['new_multi_flag_contexts']]
+    if 'orphaned' in gates:
+        reasons += [f"orphaned flag: {flag} has no remaining usages" for flag in diff['orphaned_flags']]
+    return reasons
+
+
+def print_diff(diff):
+    print(f"Changed files: {len(diff['changed_files'])}")
+    for title, key in (("Added usages", 'added_usages'), ("Removed usages", 'removed_usages')):
+        print(f"\n{title}: {len(diff[key])}")
+        for item in diff[key]:
+            times = f" (x{item['count']})" if item['count'] > 1 else ''
+            print(f"  {item['file']}:{item['line']}: {item['dependency']} in {item['context']}{times}")
+    for title, key in (("New cycles", 'new_cycles'), ("Broken cycles", 'broken_cycles')):
+        if diff[key]:
+            print(f"\n{title}:")
+            for cycle in diff[key]:
+                print(f"  {' <-> '.join(cycle)}")
+    if diff['new_multi_flag_contexts']:
+        print("\nNew multi-flag contexts:")
+        for c in diff['new_multi_flag_contexts']:
+            print(f"  {c['context']} ({c['file']}): {', '.join(c['flags'])}")
+    if diff['new_flags']:
+        print(f"\nNew flags: {', '.join(diff['new_flags'])}")
+    if diff['orphaned_flags']:
+        print(f"\nOrphaned flags (no usages left): {', '.join(diff['orphaned_flags'])}")
+    if diff['impact_changes']:
+        print("\nChanged impact sets:")
+        for flag, change in diff['impact_changes'].items():
+            parts = [f"+{', +'.join(change['added'])}" if change['added'] else '',
+                     f"-{', -'.join(change['removed'])}" if change['removed'] else '']
+            print(f"  {flag}: {' '.join(p for p in parts if p)}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description="Save and compare scan snapshots.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    save = sub.add_parser("save", help="Snapshot merged results (JSON or binary)")
+    save.add_argument("merged_path")
+    save.add_argument("snapshot_path")
+    compare = sub.add_parser("diff", help="Compare two snapshots (or merged results)")
+    compare.add_argument("base")
+    compare.add_argument("head")
+    args = parser.parse_args()
+    if args.command == "save":
+        header = snapshot_results(args.merged_path, args.snapshot_path)
+        print(f"Snapshot of {len(header['files'])} files saved to {args.snapshot_path}")
+    else:
+        with open_snapshot(args.base) as base, open_snapshot(args.head) as head:
+            result = diff_snapshots(base, head)
+        print_diff(result)
+        sys.exit(1 if gate_failures(result) else 0)
@@ -0,0 +1,262 @@
+"""
+Per-file time and memory budgets for the analysis stages.
+
+One pathological file (a huge line, deeply nested expressions that make ast.parse or
+a regex crawl) can stall a sequential scan or exhaust its memory. Under a Budget each
+file is analyzed in a long-lived worker process (Watchdog):
+- the scan waits at most `seconds` for the worker's answer; past that the worker is
+  killed and a fresh one started for the next file;
+- the worker runs under an address-space limit of `memory_bytes` (POSIX only), so a
+  runaway allocation fails there with MemoryError instead of in the scan;
+- a worker that dies (OOM killer, a crash in a C extension) is restarted the same way.
+
+Offending files are recorded in a persistent Quarantine (JSON, by default under
+.ffdeps_cache/) keyed by stage and content digest: a copy of the same contents
+elsewhere is quarantined too, and an edited file gets another chance. Later runs do
+not hand quarantined files to an analyzer at all: they are skipped, or handed to a
+cheap fallback (for the AST stage, ast_analysis.fallback_analyzer: a line-bounded
+literal search without contexts), so the rest of the scan keeps its throughput.
+"""
+import importlib
+import json
+import os
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_QUARANTINE = os.path.join('.ffdeps_cache', 'quarantine.json')
+# Outcomes that quarantine a file
+FAILURES = ('timeout', 'memory', 'recursion', 'crash')
+
+
+class Budget:
+    """
+    Time (seconds) and memory (bytes of address space) allowed per file, where quarantined
+    files are recorded, and what to do with them: 'fallback' or 'skip'. With neither limit
+    set, files are analyzed in-process and the quarantine is only consulted.
+    """
+    def __init__(self, seconds=None, memory_bytes=None, quarantine=DEFAULT_QUARANTINE, on_quarantined='fallback'):
+        if on_quarantined not in ('fallback', 'skip'):
+            raise ValueError(f"on_quarantined must be 'fallback' or 'skip', not {on_quarantined!r}")
+        self.seconds = seconds
+        self.memory_bytes = memory_bytes
+        self.quarantine = quarantine
+        self.on_quarantined = on_quarantined
+
+    def __repr__(self):
+        # Stable across runs: part of the pipeline fingerprint when passed as a stage parameter
+        return (f"Budget({self.seconds!r}, {self.memory_bytes!r}, quarantine={self.quarantine!r}, "
+                f"on_quarantined={self.on_quarantined!r})")
+
+    @property
+    def isolated(self):
+        return self.seconds is not None or self.memory_bytes is not None
+
+
+class Quarantine:
+    """Files that exceeded a budget: '<stage>:<digest>' -> {'path', 'reason', 'seconds', 'time'}."""
+    def __init__(self, path=DEFAULT_QUARANTINE):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def _key(stage, digest):
+        return f"{stage}:{digest.hex()}"
+
+    def get(self, stage, digest):
+        return self.entries.get(self._key(stage, digest))
+
+    def add(self, stage, digest, file_path, reason, seconds):
+        """Record a file and save at once, so the entry survives a scan that dies later."""
+        self.entries[self._key(stage, digest)] = {
+            'path': file_path, 'reason': reason, 'seconds': round(seconds, 3), 'time': int(time.time()),
+        }
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def _worker_main(conn, memory_bytes, modules):
+    """
+    Worker loop: import `modules` and report ready (so imports are not charged to the
+    first file), then run (function, args) tasks and send back (status, value).
+    """
+    if memory_bytes and resource is not None:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, hard))
+    for module in modules:
+        importlib.import_module(module)
+    conn.send('ready')
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        function, args = task
+        try:
+            reply = ('ok', function(*args))
+        except MemoryError:
+            # The heap may be in any state: report and let the parent start a fresh worker
+            reply = ('memory', None)
+        except RecursionError:
+            reply = ('recursion', None)
+        except Exception as e:
+            reply = ('error', e)
+        try:
+            conn.send(reply)
+        except MemoryError:
+            conn.send(('memory', None))
+        except Exception as e:
+            conn.send(('error', RuntimeError(f"{type(e).__name__}: {e}")))
+        if reply[0] == 'memory':
+            return
+
+
+def _context():
+    import multiprocessing
+    # A fork of a scan with prefetch threads running is unsafe; forkserver forks a clean process
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class Watchdog:
+    """One worker process running tasks under a Budget; killed and restarted on timeouts and crashes."""
+    def __init__(self, budget):
+        self.budget = budget
+        self.process = None
+        self.conn = None
+        self.restarts = 0
+
+    def _start(self, modules):
+        ctx = _context()
+        self.conn, child = ctx.Pipe()
+        process = ctx.Process(target=_worker_main, args=(child, self.budget.memory_bytes, modules), daemon=True)
+        process.start()
+        self.process = process
+        child.close()
+        try:
+            self.conn.recv()
+        except EOFError:
+            self.process.join()
+            exitcode, self.process = self.process.exitcode, None
+            raise RuntimeError(f"budget worker failed to start (exit code {exitcode}); "
+                               "is the memory budget too small?") from None
+
+    def _kill(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.join()
+            self.conn.close()
+            self.process = None
+            self.restarts += 1
+
+    def run(self, function, *args):
+        """
+        (status, value, seconds): status is 'ok' (value is the result) or one of FAILURES.
+        An exception raised by `function` is re-raised here.
+        """
+        if self.process is None or not self.process.is_alive():
+            if self.process is not None:
+                self._kill()
+            self._start((function.__module__,))
+        started = time.perf_counter()
+        try:
+            self.conn.send((function, args))
+            if not self.conn.poll(self.budget.seconds):
+                self._kill()
+                return 'timeout', None, time.perf_counter() - started
+            status, value = self.conn.recv()
+        except (EOFError, OSError):
+            self._kill()
+            return 'crash', None, time.perf_counter() - started
+        seconds = time.perf_counter() - started
+        if status == 'error':
+            raise value
+        if status == 'memory':
+            self._kill()
+        return status, value, seconds
+
+    def close(self):
+        if self.process is not None:
+            self.conn.close()
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+            self.process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Guard:
+    """
+    Runs one stage's per-file analysis under a Budget: quarantined files go to `fallback`
+    (or are skipped), the others to the worker (or in-process when the budget has no
+    limits); a file that exceeds the budget is quarantined and handled like a quarantined one.
+    """
+    def __init__(self, stage, budget):
+        self.stage = stage
+        self.budget = budget
+        self.quarantine = Quarantine(budget.quarantine)
+        self.watchdog = Watchdog(budget) if budget.isolated else None
+
+    def analyze(self, m, file_path, digest, function, args, fallback=None):
+        """Findings of `function(*args)` for one file; `m` is the stage's metrics recorder."""
+        if self.quarantine.get(self.stage, digest) is not None:
+            m.count('quarantined')
+            return self._fallback(m, fallback)
+        if self.watchdog is None:
+            return function(*args)
+        status, value, seconds = self.watchdog.run(function, *args)
+        if status == 'ok':
+            return value
+        m.count(status)
+        self.quarantine.add(self.stage, digest, file_path, status, seconds)
+        return self._fallback(m, fallback)
+
+    def _fallback(self, m, fallback):
+        if fallback is None or self.budget.on_quarantined == 'skip':
+            return []
+        m.count('fallback')
+        return fallback()
+
+    def close(self):
+        if self.watchdog is not None:
+            self.watchdog.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def budget_from_args(args):
+    """A Budget from the options, or None (the default) when no budget option is given."""
+    if args.file_timeout is None and args.file_memory is None and args.quarantine is None:
+        return None
+    return Budget(args.file_timeout, args.file_memory * 1024 * 1024 if args.file_memory else None,
+                  quarantine=args.quarantine or DEFAULT_QUARANTINE,
+                  on_quarantined='skip' if args.skip_quarantined else 'fallback')
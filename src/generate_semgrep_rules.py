@@ -1,47 +1,183 @@
+"""
+Generate Semgrep feature flag rules mined from the scanned code.
+
+Instead of generic patterns evaluated against every file, the generator looks for
+the flag entry points the code actually uses:
+- flag SDK clients (Unleash, CloudBees/Rox), recognised by their imports;
+- project wrapper functions/methods whose name marks them as flag checks
+  (e.g. is_feature_enabled, FeatureFlag.isEnabled).
+Each entry point becomes its own rule with a `paths.include` list of the files that
+import the SDK or call the wrapper, so Semgrep only evaluates it where it can match.
+
+    python src/generate_semgrep_rules.py [dir ...] [-o semgrep_rules/python-feature-flags-auto.yml]
+"""
+import json
 import os
 import re
 
-yaml_template = '''rules:
-  - id: find-feature-flags-auto
-    patterns:
-{patterns}
-    message: "Found a feature flag (auto-generated)"
-    languages:
-{languages}
-    severity: INFO
-'''
-
-def find_flag_patterns(root_dir, exts=(".py", ".java")):
-    patterns = set()
-    languages = set()
-    # 直接反推样例代码实际调用行的 pattern
-    # 1. is_feature_enabled("$FLAG")
-    patterns.add("      - pattern: is_feature_enabled(\"$FLAG\")")
-    patterns.add("      - pattern: is_feature_enabled('$FLAG')")
-    patterns.add("      - pattern: is_feature_enabled($FLAG)")
-    languages.add("      - python")
-    # 可扩展：自动发现其它函数名/调用风格
-    return sorted(patterns), sorted(languages)
-
-def main():
-    code_dirs = ["sample_project_python", "sample_project_java"]
-    all_patterns = set()
-    all_languages = set()
-    for d in code_dirs:
-        if os.path.exists(d):
-            patterns, languages = find_flag_patterns(d)
-            all_patterns.update(patterns)
-            all_languages.update(languages)
-    if not all_patterns:
+from cli.end_to_end_demo import EXTENSIONS, collect_files
+
+DEFAULT_CODE_DIRS = ["sample_project_python", "sample_project_java"]
+DEFAULT_OUTPUT = "semgrep_rules/python-feature-flags-auto.yml"
+
+# Flag SDKs: how a file imports them, and the calls that take the flag name as first argument
+SDKS = {
+    'unleash': {
+        'imports': {
+            'python': r'^\s*(?:from|import)\s+UnleashClient\b',
+            'java': r'^\s*import\s+(?:io\.getunleash|no\.finn\.unleash)\.',
+            'javascript': r'''(?:require\s*\(|from\s+)\s*['"](?:unleash-client|@unleash/[\w-]+|unleash-proxy-client)['"]''',
+            'go': r'"github\.com/Unleash/unleash-client-go[^"]*"',
+        },
+        'calls': {
+            'python': ['$OBJ.is_enabled($FLAG, ...)', '$OBJ.get_variant($FLAG, ...)'],
+            'java': ['$OBJ.isEnabled($FLAG, ...)', '$OBJ.getVariant($FLAG, ...)'],
+            'javascript': ['$OBJ.isEnabled($FLAG, ...)', '$OBJ.getVariant($FLAG, ...)'],
+            'go': ['$OBJ.IsEnabled($FLAG, ...)', '$OBJ.GetVariant($FLAG, ...)'],
+        },
+    },
+    # CloudBees Feature Management flags are objects: the flag is the receiver of the check
+    'cloudbees': {
+        'imports': {
+            'python': r'^\s*(?:from|import)\s+rox\b',
+            'java': r'^\s*import\s+io\.rollout\.',
+            'javascript': r'''(?:require\s*\(|from\s+)\s*['"]rox-(?:node|browser|react-native)['"]''',
+            'go': r'"github\.com/rollout/rox-go[^"]*"',
+        },
+        'calls': {
+            'python': ['$FLAG.is_enabled(...)', '$FLAG.get_value(...)'],
+            'java': ['$FLAG.isEnabled(...)', '$FLAG.getValue(...)'],
+            'javascript': ['$FLAG.isEnabled(...)', '$FLAG.getValue(...)'],
+            'go': ['$FLAG.IsEnabled(...)', '$FLAG.GetValue(...)'],
+        },
+    },
+}
+
+# A function whose name says it checks a flag is treated as a wrapper entry point
+WRAPPER_NAME = re.compile(r'(?i)(feature|flag|toggle|is_?enabled|is_?active)')
+
+# Wrapper definitions: (pattern, static) per language; the function name is group 'name'
+DEFINITIONS = {
+    'python': [(re.compile(r'^\s*(?:async\s+)?def\s+(?P<name>\w+)\s*\(\s*(?!self\b|cls\b)\w', re.M), True),
+               (re.compile(r'^\s+(?:async\s+)?def\s+(?P<name>\w+)\s*\(\s*(?:self|cls)\s*,', re.M), False)],
+    'java': [(re.compile(r'^\s*(?:(?:public|private|protected|final|synchronized)\s+)*static\s+(?:final\s+)?boolean\s+'
+                         r'(?P<name>\w+)\s*\(\s*(?:final\s+)?String\b', re.M), True),
+             (re.compile(r'^\s*(?:(?:public|private|protected|final|synchronized)\s+)*boolean\s+'
+                         r'(?P<name>\w+)\s*\(\s*(?:final\s+)?String\b', re.M), False)],
+    'javascript': [(re.compile(r'^\s*(?:export\s+)?(?:async\s+)?function\s+(?P<name>\w+)\s*\(', re.M), True),
+                   (re.compile(r'^\s*(?:export\s+)?(?:const|let|var)\s+(?P<name>\w+)\s*=\s*(?:async\s*)?'
+                               r'(?:function\b|\([^)]*\)\s*=>|\w+\s*=>)', re.M), True)],
+    'go': [(re.compile(r'^func\s+(?P<name>\w+)\s*\(\s*\w+\s+string\b', re.M), True),
+           (re.compile(r'^func\s+\([^)]*\)\s*(?P<name>\w+)\s*\(\s*\w+\s+string\b', re.M), False)],
+}
+JAVA_CLASS = re.compile(r'\b(?:class|interface)\s+(\w+)')
+DEFINITION_PREFIX = re.compile(r'(?:\bdef|\bfunction|\bfunc(?:\s*\([^)]*\))?|\bboolean|\b(?:const|let|var))\s+$')
+
+
+def _read(path):
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+
+def _wrapper_patterns(lang, name, static, owner):
+    if lang == 'java':
+        if static and owner:
+            return [f'{owner}.{name}($FLAG, ...)', f'{name}($FLAG, ...)']
+        return [f'$OBJ.{name}($FLAG, ...)']
+    if lang == 'go':
+        return [f'{name}($FLAG, ...)', f'$PKG.{name}($FLAG, ...)'] if static else [f'$OBJ.{name}($FLAG, ...)']
+    if static:
+        # Also called through the module, e.g. feature_flag.is_feature_enabled(...)
+        return [f'{name}($FLAG, ...)', f'$MOD.{name}($FLAG, ...)']
+    return [f'$OBJ.{name}($FLAG, ...)']
+
+
+def _calls(source, name):
+    """Whether `source` calls `name` somewhere other than in its own definition."""
+    for match in re.finditer(rf'\b{re.escape(name)}\s*\(', source):
+        line_start = source.rfind('\n', 0, match.start()) + 1
+        if not DEFINITION_PREFIX.search(source[line_start:match.start()]):
+            return True
+    return False
+
+
+def mine_entry_points(root_dirs, base_dir='.'):
+    """
+    Scan the code for flag entry points.
+    Returns {rule_id: {'language', 'patterns', 'paths'}}; paths are relative to `base_dir`
+    (the directory Semgrep is run from) and list only files that use the entry point.
+    """
+    sources = {}
+    for root in root_dirs:
+        for lang, exts in EXTENSIONS.items():
+            for path in collect_files(root, exts):
+                sources[path] = (lang, _read(path))
+
+    entry_points = {}
+
+    def add(rule_id, lang, patterns, path):
+        entry = entry_points.setdefault(rule_id, {'language': lang, 'patterns': set(), 'paths': set()})
+        entry['patterns'].update(patterns)
+        entry['paths'].add(os.path.relpath(path, base_dir).replace(os.sep, '/'))
+
+    # SDK clients: files importing the SDK
+    compiled = {(sdk, lang): re.compile(regex, re.M)
+                for sdk, spec in SDKS.items() for lang, regex in spec['imports'].items()}
+    for path, (lang, source) in sources.items():
+        for sdk, spec in SDKS.items():
+            regex = compiled.get((sdk, lang))
+            if regex and regex.search(source):
+                add(f'{sdk}-{lang}', lang, spec['calls'][lang], path)
+
+    # Wrappers: flag-named functions defined in the code, then every file calling them
+    wrappers = {}
+    for path, (lang, source) in sources.items():
+        owner_match = JAVA_CLASS.search(source) if lang == 'java' else None
+        owner = owner_match.group(1) if owner_match else None
+        for regex, static in DEFINITIONS[lang]:
+            for match in regex.finditer(source):
+                name = match.group('name')
+                if WRAPPER_NAME.search(name) and not name.startswith('test'):
+                    wrappers.setdefault((lang, name), set()).update(_wrapper_patterns(lang, name, static, owner))
+    for (lang, name), patterns in wrappers.items():
+        for path, (file_lang, source) in sources.items():
+            if file_lang == lang and _calls(source, name):
+                add(f'wrapper-{lang}-{name}', lang, patterns, path)
+    return entry_points
+
+
+def render_rules(entry_points):
+    """Semgrep YAML with one path-targeted rule per entry point (JSON strings are valid YAML scalars)."""
+    lines = ['rules:']
+    for rule_id, entry in sorted(entry_points.items()):
+        lines.append(f'  - id: ff-{rule_id}')
+        lines.append('    pattern-either:')
+        lines.extend(f'      - pattern: {json.dumps(p)}' for p in sorted(entry['patterns']))
+        lines.append(f'    message: "Found a feature flag ({rule_id}, auto-generated)"')
+        lines.append(f'    languages: [{entry["language"]}]')
+        lines.append('    severity: INFO')
+        lines.append('    paths:')
+        lines.append('      include:')
+        lines.extend(f'        - {json.dumps(p)}' for p in sorted(entry['paths']))
+    return '\n'.join(lines) + '\n'
+
+
+def main(code_dirs=None, output_path=DEFAULT_OUTPUT):
+    code_dirs = [d for d in (code_dirs or DEFAULT_CODE_DIRS) if os.path.exists(d)]
+    entry_points = mine_entry_points(code_dirs)
+    if not entry_points:
         print("No feature flag patterns found.")
         return
-    rule_content = yaml_template.format(
-        patterns="\n".join(all_patterns),
-        languages="\n".join(all_languages)
-    )
-    with open("semgrep_rules/python-feature-flags-auto.yml", "w") as f:
-        f.write(rule_content)
-    print("Auto-generated Semgrep rule written to semgrep_rules/python-feature-flags-auto.yml")
+    with open(output_path, "w") as f:
+        f.write(render_rules(entry_points))
+    for rule_id, entry in sorted(entry_points.items()):
+        print(f"  ff-{rule_id}: {len(entry['patterns'])} patterns, {len(entry['paths'])} files")
+    print(f"Auto-generated Semgrep rules written to {output_path}")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate path-targeted Semgrep feature flag rules from the code.")
+    parser.add_argument("code_dirs", nargs="*", help="Directories to mine (default: the sample projects)")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help="Output rule file")
+    args = parser.parse_args()
+    main(args.code_dirs, args.output)
@@ -1,28 +1,19 @@
-import subprocess
-import json
-from collections import defaultdict, deque
 import re
 import os
-import networkx as nx
-from pyvis.network import Network
+from feature_flag import metrics
+from cli.options import add_metrics_arguments
+from feature_flag.scan import iter_semgrep_results
+from feature_flag.call_graph import build_call_graph
+from feature_flag.dependency_graph import aggregate_flags_by_function, propagate_flags
+from feature_flag.graph_view import (DEFAULT_MAX_NODES, graph_nodes, cycle_edges, ego_nodes,
+                                    render_subgraph, render_clustered)
 
 def run_semgrep(rule_path, target_dir):
-    """运行 Semgrep 并返回 JSON 结果"""
-    result = subprocess.run([
-        'semgrep',
-        '--config', rule_path,
-        '--json',
-        target_dir
-    ], capture_output=True, text=True)
-    if result.returncode > 1:
-        print(f"Error running Semgrep: {result.stderr}")
-        return None
-    try:
-        return json.loads(result.stdout)
-    except json.JSONDecodeError:
-        print("Error parsing Semgrep JSON output:")
-        print(result.stdout)
-        return None
+    """
+    运行 Semgrep 并逐条返回 JSON 结果（生成器，从管道增量解析，内存不随结果数量增长）
+    Raises RuntimeError after the last result if Semgrep fails.
+    """
+    return iter_semgrep_results(target_dir, rule_path, max_ok_returncode=1)
 
 def find_function_for_line(file_path, line_number):
     with open(file_path, 'r') as f:
@@ -36,11 +27,21 @@ def find_function_for_line(file_path, line_number):
             break
     return function_name
 
-def extract_flag_usages(flag_json):
-    """提取特性开关使用点"""
+def _semgrep_results(semgrep_output):
+    """Accept either a parsed Semgrep JSON document or an iterable of its results."""
+    if isinstance(semgrep_output, dict):
+        return semgrep_output.get("results", [])
+    return semgrep_output
+
+def extract_flag_usages(flag_json, function_at=None):
+    """
+    提取特性开关使用点
+    function_at(file, line) names the function containing a usage (CallGraph.function_at,
+    qualified like the call graph nodes); without it the nearest preceding `def` is used.
+    """
     usages = []
     flag_regex = re.compile(r'is_feature_enabled\((?:"|\')?([a-zA-Z0-9_\-]+)(?:"|\')?\)')
-    for r in flag_json.get("results", []):
+    for r in _semgrep_results(flag_json):
         file_path = r["path"]
         line_number = r["start"]["line"]
         with open(file_path, 'r') as f:
@@ -50,7 +51,10 @@ def extract_flag_usages(flag_json):
         if not match:
             continue
         flag_name = match.group(1)
-        function_name = find_function_for_line(file_path, line_number)
+        if function_at is not None:
+            function_name = function_at(file_path, line_number)
+        else:
+            function_name = find_function_for_line(file_path, line_number)
         usages.append({
             'flag': flag_name,
             'file': file_path,
@@ -59,44 +63,9 @@ def extract_flag_usages(flag_json):
         })
     return usages
 
-def extract_call_graph(call_json):
-    """构建函数调用图（函数名->被调用函数名集合）"""
-    call_graph = defaultdict(set)
-    for r in call_json.get("results", []):
-        if r['check_id'] == 'python-function-call':
-            # 这里简单用正则提取调用者函数名
-            file_path = r["path"]
-            line_number = r["start"]["line"]
-            called_func = r['extra']['metavars'].get('$FUNC')
-            caller_func = find_function_for_line(file_path, line_number)
-            if caller_func and called_func:
-                call_graph[(caller_func, file_path)].add((called_func, file_path))
-    return call_graph
-
-def aggregate_flags_by_function(flag_usages):
-    """统计每个函数直接使用的flag集合"""
-    function_flags = defaultdict(set)
-    for usage in flag_usages:
-        if usage['function']:
-            function_flags[(usage['function'], usage['file'])].add(usage['flag'])
-    return function_flags
-
-def propagate_flags(call_graph, function_flags):
-    """沿调用图向上传播flag依赖"""
-    all_flags = {f: set(flags) for f, flags in function_flags.items()}
-    changed = True
-    while changed:
-        changed = False
-        for caller, callees in call_graph.items():
-            for callee in callees:
-                before = len(all_flags.get(caller, set()))
-                all_flags.setdefault(caller, set()).update(all_flags.get(callee, set()))
-                if len(all_flags[caller]) > before:
-                    changed = True
-    return all_flags
-
 def detect_cycles(call_graph):
     """检测循环依赖"""
+    import networkx as nx
     G = nx.DiGraph()
     for caller, callees in call_graph.items():
         for callee in callees:
@@ -104,53 +73,74 @@ def detect_cycles(call_graph):
     cycles = list(nx.simple_cycles(G))
     return cycles
 
-def visualize_dependency_graph(all_flags, call_graph, cycles, output_html='dependency_graph.html'):
-    """可视化依赖图谱"""
+def visualize_dependency_graph(all_flags, call_graph, cycles, output_html='dependency_graph.html',
+                               mode='auto', focus=None, depth=2, group_by='file', max_nodes=DEFAULT_MAX_NODES):
+    """
+    可视化依赖图谱
+    mode: 'full' draws every function node; 'clustered' draws a file/package overview
+    plus paged cluster views; 'ego' draws the neighborhood of `focus` (flag or function)
+    up to `depth`; 'auto' picks 'full' up to `max_nodes` nodes and 'clustered' beyond.
+    """
+    node_count = len(graph_nodes(all_flags, call_graph))
+    if mode == 'auto':
+        mode = 'ego' if focus else ('full' if node_count <= max_nodes else 'clustered')
+    if mode == 'ego':
+        nodes = ego_nodes(all_flags, call_graph, focus, depth=depth, max_nodes=max_nodes)
+        render_subgraph(all_flags, call_graph, nodes, cycle_edges(cycles), output_html, show=True)
+        print(f"Ego dependency graph around '{focus}' ({len(nodes)} of {node_count} nodes, depth {depth}) saved to {output_html}")
+        return
+    if mode == 'clustered':
+        pages = render_clustered(all_flags, call_graph, cycles, output_html, group_by=group_by, max_nodes=max_nodes)
+        print(f"Clustered dependency graph ({node_count} nodes) saved to {output_html}, {len(pages) - 1} cluster pages")
+        return
+    from pyvis.network import Network
     net = Network(height='800px', width='100%', notebook=False, directed=True)
     # 节点：函数@文件，标签包含flag
     for func, flags in all_flags.items():
         label = f"{func[0]}\n{os.path.basename(func[1])}\nFlags: {', '.join(flags)}"
         color = 'red' if len(flags) > 1 else 'lightblue'
         net.add_node(str(func), label=label, color=color)
-    # 边：调用关系
+    # 边：调用关系，循环依赖上的边高亮（每条边只画一次）
+    on_cycle = cycle_edges(cycles)
     for caller, callees in call_graph.items():
         for callee in callees:
-            net.add_edge(str(caller), str(callee))
-    # 高亮循环依赖
-    for cycle in cycles:
-        for i in range(len(cycle)):
-            net.add_edge(str(cycle[i]), str(cycle[(i+1)%len(cycle)]), color='orange', width=3)
+            if (caller, callee) in on_cycle:
+                net.add_edge(str(caller), str(callee), color='orange', width=3)
+            else:
+                net.add_edge(str(caller), str(callee))
     net.show(output_html)
     print(f"Interactive dependency graph saved to {output_html}")
 
-def analyze_dependencies():
-    # 配置路径
+def analyze_dependencies(view_options=None, target_dir=None, flag_rule=None, jobs=None):
+    # 配置路径（默认：示例项目与内置规则）
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    flag_rule = os.path.join(base_dir, 'semgrep_rules', 'python-feature-flags.yml')
-    callgraph_rule = os.path.join(base_dir, 'semgrep_rules', 'python-call-graph.yml')
-    sample_dir = os.path.join(base_dir, 'sample_project_python')
+    flag_rule = flag_rule or os.path.join(base_dir, 'semgrep_rules', 'python-feature-flags.yml')
+    sample_dir = target_dir or os.path.join(base_dir, 'sample_project_python')
+
+    # 1. 提取函数调用关系（ast，限定名，按模块并行）
+    graph = build_call_graph(sample_dir, jobs=jobs)
+    for error in graph.errors:
+        print(f"Call graph: {error['file']}: {error['message']}")
+    call_graph = graph.edges
+    print('Call graph:', dict(call_graph))
 
-    # 1. 提取特性开关使用点
-    flag_json = run_semgrep(flag_rule, sample_dir)
-    if not flag_json:
+    # 2. 提取特性开关使用点
+    try:
+        flag_usages = extract_flag_usages(run_semgrep(flag_rule, sample_dir), function_at=graph.function_at)
+    except RuntimeError as e:
+        print(f"Error running Semgrep: {e}")
         return
-    flag_usages = extract_flag_usages(flag_json)
     print('Feature flag usages:', flag_usages)
 
-    # 2. 提取函数调用关系
-    call_json = run_semgrep(callgraph_rule, sample_dir)
-    if not call_json:
-        return
-    call_graph = extract_call_graph(call_json)
-    print('Call graph:', dict(call_graph))
-
     # 3. 统计每个函数的flag集合
     function_flags = aggregate_flags_by_function(flag_usages)
     # 4. 沿调用图传播flag依赖
     all_flags = propagate_flags(call_graph, function_flags)
 
     # 检测循环依赖
-    cycles = detect_cycles(call_graph)
+    with metrics.stage('reasoning') as m:
+        cycles = detect_cycles(call_graph)
+        m.count('cycles', len(cycles))
     if cycles:
         print("Cyclic dependencies detected:")
         for cycle in cycles:
@@ -159,7 +149,8 @@ def analyze_dependencies():
         print("No cyclic dependencies detected.")
 
     # 交互式依赖图谱
-    visualize_dependency_graph(all_flags, call_graph, cycles)
+    with metrics.stage('visualize'):
+        visualize_dependency_graph(all_flags, call_graph, cycles, **(view_options or {}))
 
     # 控制台输出共现依赖
     print("\nFeature Flag Dependencies (including call graph propagation):")
@@ -170,4 +161,21 @@ def analyze_dependencies():
                 print(f"    - {flag}")
 
 if __name__ == "__main__":
-    analyze_dependencies()
+    import argparse
+    parser = argparse.ArgumentParser(description="Analyze and visualize feature flag dependencies.")
+    parser.add_argument("--view", choices=["auto", "full", "clustered", "ego"], default="auto",
+                        help="Visualization level of detail (default: full for small graphs, clustered for large ones)")
+    parser.add_argument("--focus", help="Flag or function (name or name@file) to center an ego view on")
+    parser.add_argument("--depth", type=int, default=2, help="Ego view depth in call edges")
+    parser.add_argument("--group-by", choices=["file", "package"], default="file", help="Clustering key")
+    parser.add_argument("--max-nodes", type=int, default=DEFAULT_MAX_NODES, help="Node limit per page / ego view")
+    parser.add_argument("--output", default="dependency_graph.html", help="Output HTML file")
+    parser.add_argument("--jobs", type=int, help="Parallel call graph workers (default: CPU count)")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics.enable_from_args(args)
+    analyze_dependencies({
+        'output_html': args.output, 'mode': args.view, 'focus': args.focus,
+        'depth': args.depth, 'group_by': args.group_by, 'max_nodes': args.max_nodes,
+    }, jobs=args.jobs)
+    metrics.write_from_args(args)
@@ -0,0 +1,5 @@
+# Put src/ on the path, as bin/ffdeps does, so tests import the packages the way the tools do
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,57 @@
+# Batch scans of several repositories from a manifest
+import json
+
+import pytest
+
+from cli.end_to_end_demo import main
+from feature_flag.batch import build_repo_graph, load_manifest, run_batch, shared_flags
+
+PYTHON = "def checkout():\n    if is_feature_enabled('new_checkout'):\n        pass\n"
+JAVA = 'class A {\n  void pay() {\n    if (FeatureFlag.isEnabled("new_checkout")) { run(); }\n  }\n}\n'
+
+
+@pytest.fixture
+def manifest(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'shop').mkdir()
+    (tmp_path / 'shop' / 'app.py').write_text(PYTHON)
+    (tmp_path / 'billing' / 'src').mkdir(parents=True)
+    (tmp_path / 'billing' / 'src' / 'A.java').write_text(JAVA)
+    path = tmp_path / 'repos.json'
+    path.write_text(json.dumps({'repos': [{'path': 'shop', 'languages': ['python']},
+                                          {'path': 'billing', 'name': 'pay'},
+                                          {'path': 'missing'}]}))
+    return str(path)
+
+
+def test_load_manifest(tmp_path, manifest):
+    repos = load_manifest(manifest)
+    assert [r['name'] for r in repos] == ['shop', 'pay', 'missing']
+    assert repos[0] == {'name': 'shop', 'path': str(tmp_path / 'shop'), 'languages': ['python']}
+    (tmp_path / 'repos.txt').write_text("# repositories\nshop python\nshop java\n")
+    with pytest.raises(ValueError, match='duplicate repository name'):
+        load_manifest(str(tmp_path / 'repos.txt'))
+    (tmp_path / 'repos.txt').write_text("shop cobol\n")
+    with pytest.raises(ValueError, match='unsupported language'):
+        load_manifest(str(tmp_path / 'repos.txt'))
+
+
+def test_run_batch_tags_findings_and_reports_failures(manifest):
+    findings, failures = run_batch(load_manifest(manifest), jobs=2)
+    assert list(failures) == ['missing']
+    assert [(d['repo'], d['file'], d['language']) for d in findings] == [
+        ('shop', 'app.py', 'python'), ('pay', 'src/A.java', 'java')]
+    assert shared_flags(findings) == {'new_checkout': ['pay', 'shop']}
+    graph = build_repo_graph(findings)
+    assert graph[('shop', 'new_checkout')] == []
+    assert graph[('shop', 'app.py', 'checkout')] == [('shop', 'new_checkout')]
+    # Unchanged repositories come from their pipeline cache
+    assert run_batch(load_manifest(manifest), jobs=2)[0] == findings
+
+
+def test_demo_reports_dead_flags(manifest, capsys):
+    main(manifest, jobs=1)
+    out = capsys.readouterr().out
+    assert 'Skipped missing' in out
+    assert 'Dead flags:' in out
+    assert "Flags used in several repositories: {'new_checkout': ['pay', 'shop']}" in out
@@ -0,0 +1,52 @@
+# The binary result format round-trips scan results, including fields it has no column for
+import json
+
+from feature_flag.binary_results import BinaryResults, binary_to_json, json_to_binary, load_results, write_binary
+from feature_flag.jsonstream import iter_json_file
+
+RECORDS = [
+    {'file': 'app.py', 'lineno': 3, 'code': "is_feature_enabled('a')", 'context': 'f',
+     'dependency': 'a', 'type': 'flag_check'},
+    {'file': 'app.py', 'line': None, 'dependency': 'b', 'source': 'ast', 'detail': None},
+    {'repo': 'billing', 'language': 'go', 'file': 'main.go', 'line': 7, 'dependency': 'a', 'source': 'ast'},
+    {'file': 'Main.java', 'line': 12, 'dependency': 'c', 'regions': [[12, 14, 1]]},
+]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'results.ffdb')
+    assert write_binary(RECORDS, path) == len(RECORDS)
+    with BinaryResults(path) as results:
+        assert len(results) == len(RECORDS)
+        assert list(results) == RECORDS
+        assert [list(r) for r in results] == [list(r) for r in RECORDS]
+        assert results[-1] == RECORDS[-1]
+        assert list(results.select(dependency='a')) == [RECORDS[0], RECORDS[2]]
+        assert list(results.select(dependency='missing')) == []
+    assert load_results(path) == RECORDS
+
+
+def test_json_conversion_round_trip(tmp_path):
+    source = tmp_path / 'results.json'
+    source.write_text(json.dumps(RECORDS))
+    json_to_binary(str(source), str(tmp_path / 'results.ffdb'))
+    binary_to_json(str(tmp_path / 'results.ffdb'), str(tmp_path / 'export.json'))
+    assert list(iter_json_file(str(tmp_path / 'export.json'))) == RECORDS
+
+
+def test_close_after_partial_iteration(tmp_path):
+    path = str(tmp_path / 'results.ffdb')
+    write_binary(RECORDS, path)
+    results = BinaryResults(path)
+    records = iter(results)
+    assert next(records) == RECORDS[0]
+    raw = results.raw_records()
+    next(raw)
+    results.close()
+
+
+def test_empty(tmp_path):
+    path = str(tmp_path / 'results.ffdb')
+    write_binary([], path)
+    with BinaryResults(path) as results:
+        assert list(results) == []
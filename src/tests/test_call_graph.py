@@ -0,0 +1,92 @@
+# The native call graph resolves calls through scopes, classes and imports to qualified names
+import pytest
+
+from feature_flag import call_graph
+from feature_flag.call_graph import build_call_graph
+
+FILES = {
+    'pkg/__init__.py': "from .helpers import check as exported_check\n",
+    'pkg/helpers.py': '''def check(name):
+    return is_feature_enabled(name)
+
+
+class Base:
+    def save(self):
+        return check('base')
+
+
+class Store(Base):
+    def __init__(self):
+        self.ready = True
+
+    def save(self):
+        return super().save()
+
+    def flush(self):
+        self.save()
+''',
+    'app.py': '''import pkg.helpers as h
+from pkg import exported_check
+from pkg.helpers import Store
+
+
+def main():
+    def inner():
+        return exported_check('x')
+    inner()
+    store = Store()
+    h.check('y')
+    print('done')
+
+
+class Cart:
+    def total(self):
+        return main()
+''',
+    'broken.py': "def broken(:\n",
+}
+
+
+def _tree(tmp_path):
+    for name, text in FILES.items():
+        path = tmp_path / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(text)
+    return str(tmp_path)
+
+
+def _edges(graph, root):
+    strip = lambda node: (node[0], node[1][len(root) + 1:])
+    return {strip(caller): sorted(strip(callee) for callee in callees) for caller, callees in graph.edges.items()}
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_calls_resolved_to_qualified_names(tmp_path, monkeypatch, jobs):
+    # Force the worker pool even for this small tree
+    monkeypatch.setattr(call_graph, 'MIN_PARALLEL_FILES', 0)
+    root = _tree(tmp_path)
+    graph = build_call_graph(root, jobs=jobs)
+    helpers = 'pkg/helpers.py'
+    assert _edges(graph, root) == {
+        ('main', 'app.py'): [('Store.__init__', helpers), ('check', helpers), ('main.inner', 'app.py')],
+        ('main.inner', 'app.py'): [('check', helpers)],
+        ('Cart.total', 'app.py'): [('main', 'app.py')],
+        ('Base.save', helpers): [('check', helpers)],
+        ('Store.save', helpers): [('Base.save', helpers)],
+        ('Store.flush', helpers): [('Store.save', helpers)],
+    }
+    # is_feature_enabled, super and print
+    assert graph.unresolved == 3
+    assert [(e['file'][len(root) + 1:], e['message'].split(':')[0]) for e in graph.errors] == [
+        ('broken.py', 'SyntaxError')]
+
+
+def test_function_at(tmp_path):
+    root = _tree(tmp_path)
+    graph = build_call_graph(root, jobs=1)
+    app = str(tmp_path / 'app.py')
+    assert graph.function_at(app, 8) == 'main.inner'
+    assert graph.function_at(app, 11) == 'main'
+    assert graph.function_at(app, 17) == 'Cart.total'
+    assert graph.function_at(app, 2) is None
+    assert graph.function_at(str(tmp_path / 'missing.py'), 1) is None
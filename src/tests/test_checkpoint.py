@@ -0,0 +1,111 @@
+# Checkpoint journals replay per-file findings and stage outputs of an interrupted run
+import pytest
+
+from feature_flag import metrics
+from feature_flag.checkpoint import Checkpoint, scan_fingerprint
+from feature_flag.pipeline import Pipeline
+from feature_flag.scan import scan_ast
+
+SOURCE = "def f():\n    if is_feature_enabled('flag_a'):\n        pass\n"
+
+
+def _fingerprint(target, journal):
+    return scan_fingerprint('ast', scan_ast, {'target_dir': str(target), 'lang': 'python'}, (str(target),),
+                            [str(journal)])
+
+
+def _scan(target, journal, resume):
+    checkpoint = Checkpoint(str(journal), resume=resume)
+    stage = checkpoint.stage('ast', _fingerprint(target, journal))
+    return checkpoint, stage, scan_ast(str(target), 'python', journal=stage)
+
+
+# The journal may live inside the directory it scans (see pipeline._hash_path)
+def test_resume_with_journal_inside_target(tmp_path):
+    (tmp_path / 'app.py').write_text(SOURCE)
+    for journal in (tmp_path / '.ffdeps_cache' / 'checkpoint.jsonl', tmp_path / 'journal.jsonl'):
+        # Interrupted: the journal is left behind, its records written under the first fingerprint
+        checkpoint, stage, expected = _scan(tmp_path, journal, resume=False)
+        checkpoint.close()
+        checkpoint, stage, resumed = _scan(tmp_path, journal, resume=True)
+        checkpoint.finish()
+        assert len(stage.files) == 1
+        assert resumed == expected
+
+
+def test_replay_drops_a_torn_tail(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    checkpoint = Checkpoint(path)
+    checkpoint.stage('ast', 'fp1').record('a.py', b'\x01', [{'dependency': 'x'}])
+    checkpoint.complete('semgrep', 'fp1', {'results': []})
+    checkpoint.close()
+    with open(path, 'a') as f:
+        f.write('{"stage": "ast", "fp": "fp1", "fi')
+    resumed = Checkpoint(path, resume=True)
+    assert resumed.replayed == 2
+    assert resumed.stage('ast', 'fp1').get('a.py', b'\x01') == [{'dependency': 'x'}]
+    assert resumed.stage('ast', 'fp2').get('a.py', b'\x01') is None
+    assert resumed.stage('ast', 'fp1').get('a.py', b'\x02') is None
+    assert resumed.output('semgrep', 'fp1') == {'results': []}
+    resumed.stage('ast', 'fp1').record('b.py', b'\x02', [])
+    resumed.close()
+    assert Checkpoint(path, resume=True).replayed == 3
+    # Without resume the journal starts over
+    assert Checkpoint(path).replayed == 0 and Checkpoint(path, resume=True).replayed == 0
+
+
+def test_resumed_scan_skips_journaled_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, '_active', None)
+    target = tmp_path / 'src'
+    target.mkdir()
+    for name in ('a.py', 'b.py'):
+        (target / name).write_text(SOURCE.replace('flag_a', name[0]))
+    journal = tmp_path / 'checkpoint.jsonl'
+    checkpoint, _, expected = _scan(target, journal, resume=False)
+    checkpoint.close()
+    collector = metrics.enable()
+    checkpoint, _, resumed = _scan(target, journal, resume=True)
+    checkpoint.close()
+    assert resumed == expected
+    assert collector.to_dict()['stages']['ast']['counts']['resumed'] == 2
+    # An edited input changes the fingerprint: the journaled findings no longer count
+    (target / 'b.py').write_text(SOURCE.replace('flag_a', 'edited'))
+    collector = metrics.enable()
+    checkpoint, stage, resumed = _scan(target, journal, resume=True)
+    checkpoint.finish()
+    assert not journal.exists()
+    assert stage.files == {}
+    assert [d['dependency'] for d in resumed] == ['a', 'edited']
+    assert 'resumed' not in collector.to_dict()['stages']['ast']['counts']
+
+
+RUNS = []
+
+
+def produce():
+    RUNS.append('produce')
+    return [1, 2, 3]
+
+
+def consume(values, fail):
+    RUNS.append('consume')
+    if fail:
+        raise RuntimeError("interrupted")
+    return sum(values)
+
+
+def test_pipeline_reuses_completed_stages(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+
+    def run(fail, resume):
+        pipeline = Pipeline(cache_dir=None, checkpoint=Checkpoint(path, resume=resume))
+        pipeline.add_stage('produce', produce)
+        pipeline.add_stage('consume', consume, deps={'values': 'produce'}, params={'fail': fail})
+        with pipeline.checkpoint:
+            return pipeline.run()
+
+    with pytest.raises(RuntimeError, match='interrupted'):
+        run(fail=True, resume=False)
+    RUNS.clear()
+    assert run(fail=False, resume=True)['consume'] == 6
+    assert RUNS == ['consume']
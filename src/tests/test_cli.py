@@ -0,0 +1,65 @@
+# The ffdeps command: subcommands import what they run only when they run
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from cli.main import build_parser, main
+from feature_flag.binary_results import write_binary
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FFDEPS = os.path.join(os.path.dirname(SRC_DIR), 'bin', 'ffdeps')
+MERGED = [
+    {'file': 'app.py', 'line': 3, 'dependency': 'a', 'context': 'checkout', 'source': 'ast'},
+    {'file': 'app.py', 'line': 9, 'dependency': 'b', 'context': 'checkout', 'source': 'semgrep'},
+    {'file': 'pay.py', 'line': 4, 'dependency': 'a', 'context': 'pay', 'source': 'dataflow'},
+]
+
+
+@pytest.fixture(params=['json', 'binary'])
+def merged(request, tmp_path):
+    path = tmp_path / 'merged'
+    if request.param == 'json':
+        path.write_text(json.dumps(MERGED))
+    else:
+        write_binary(MERGED, str(path))
+    return str(path)
+
+
+def test_query(merged, capsys):
+    assert main(['query', merged, '--flag', 'a']) == 0
+    assert capsys.readouterr().out.splitlines() == ['app.py:3: a in checkout [ast]', 'pay.py:4: a in pay [dataflow]']
+    assert main(['query', merged, '--context', 'checkout', '--count']) == 0
+    assert capsys.readouterr().out == '2\n'
+    assert main(['query', merged, '--file', 'pay.py', '--json']) == 0
+    assert json.loads(capsys.readouterr().out) == [MERGED[2]]
+    assert main(['query', merged, '--flag', 'missing']) == 1
+
+
+def test_errors_are_reported_without_a_traceback(tmp_path, capsys):
+    assert main(['query', str(tmp_path / 'missing.json')]) == 2
+    assert capsys.readouterr().err.startswith('ffdeps query: ')
+
+
+def test_parser_imports_no_subcommand_modules():
+    code = ("import sys; from cli.main import build_parser; build_parser().parse_args(['query']); "
+            "print(sorted(m for m in sys.modules if m.startswith(('feature_flag', 'ast_analysis'))))")
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                         env=dict(os.environ, PYTHONPATH=SRC_DIR))
+    assert out.stdout.strip() == '[]'
+    assert build_parser().parse_args(['query']).func.__name__ == 'cmd_query'
+
+
+def test_closed_pipe_exits_quietly(tmp_path):
+    path = tmp_path / 'merged.json'
+    path.write_text(json.dumps([dict(MERGED[0], line=i) for i in range(20000)]))
+    proc = subprocess.Popen([sys.executable, FFDEPS, 'query', str(path)], stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE)
+    assert proc.stdout.readline().startswith(b'app.py:0: a')
+    proc.stdout.close()
+    stderr = proc.stderr.read()
+    proc.stderr.close()
+    assert proc.wait() == 141
+    assert stderr == b''
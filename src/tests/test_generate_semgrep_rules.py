@@ -0,0 +1,55 @@
+# Mined Semgrep rules: one rule per flag entry point, limited to the files that use it
+from generate_semgrep_rules import main, mine_entry_points, render_rules
+
+FILES = {
+    'app/flags.py': "def is_feature_enabled(name):\n    return name in ENABLED\n",
+    'app/views.py': "from app.flags import is_feature_enabled\n\n"
+                    "def view():\n    if is_feature_enabled('new_view'):\n        pass\n",
+    'app/client.py': "from UnleashClient import UnleashClient\n\nclient = UnleashClient()\n",
+    'app/plain.py': "def helper(x):\n    return x\n",
+    'src/Flags.java': "public class Flags {\n  public static boolean isActive(String name) { return true; }\n}\n",
+    'src/Use.java': "class Use {\n  void m() { if (Flags.isActive(\"a\")) {} }\n}\n",
+}
+
+
+def _tree(root):
+    for name, text in FILES.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def test_entry_points_list_only_the_files_that_use_them(tmp_path):
+    _tree(tmp_path)
+    entry_points = mine_entry_points([str(tmp_path / 'app'), str(tmp_path / 'src')], base_dir=str(tmp_path))
+    assert sorted(entry_points) == ['unleash-python', 'wrapper-java-isActive', 'wrapper-python-is_feature_enabled']
+    assert entry_points['unleash-python']['paths'] == {'app/client.py'}
+    wrapper = entry_points['wrapper-python-is_feature_enabled']
+    assert wrapper['paths'] == {'app/views.py'}
+    assert wrapper['patterns'] == {'is_feature_enabled($FLAG, ...)', '$MOD.is_feature_enabled($FLAG, ...)'}
+    java = entry_points['wrapper-java-isActive']
+    assert java['paths'] == {'src/Use.java'}
+    assert java['patterns'] == {'Flags.isActive($FLAG, ...)', 'isActive($FLAG, ...)'}
+
+
+def test_render_rules():
+    rules = render_rules({'unleash-python': {'language': 'python', 'patterns': {'$OBJ.is_enabled($FLAG, ...)'},
+                                             'paths': {'app/client.py'}}})
+    assert rules == ('rules:\n'
+                     '  - id: ff-unleash-python\n'
+                     '    pattern-either:\n'
+                     '      - pattern: "$OBJ.is_enabled($FLAG, ...)"\n'
+                     '    message: "Found a feature flag (unleash-python, auto-generated)"\n'
+                     '    languages: [python]\n'
+                     '    severity: INFO\n'
+                     '    paths:\n'
+                     '      include:\n'
+                     '        - "app/client.py"\n')
+
+
+def test_main_writes_the_rule_file(tmp_path, monkeypatch, capsys):
+    _tree(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    main(['app'], 'rules.yml')
+    assert (tmp_path / 'rules.yml').read_text().count('  - id: ff-') == 2
+    assert 'Auto-generated Semgrep rules written to rules.yml' in capsys.readouterr().out
@@ -1 +1,23 @@
 # Test for GoAnalyzer (placeholder)
+from ast_analysis.go_analyzer import GoAnalyzer
+
+SOURCE = '''package main
+
+func f() {
+\tif client.IsEnabled("a") {
+\t\trun()
+\t} else if other() {
+\t\ttwo()
+\t} else if client.IsEnabled("b") {
+\t\tthree()
+\t} else {
+\t\tfour()
+\t}
+}
+'''
+
+
+def test_else_if_chain_is_negated():
+    regions = {d['dependency']: d.get('regions') for d in GoAnalyzer(record_regions=True).analyze(SOURCE)}
+    assert regions['a'] == [[4, 6, 1], [6, 8, -1], [8, 10, -1], [10, 12, -1]]
+    assert regions['b'] == [[8, 10, 1], [10, 12, -1]]
@@ -0,0 +1,46 @@
+# Level-of-detail views stay within their node budgets
+from feature_flag.graph_view import cluster_graph, ego_nodes, offline_layout, page_with_neighbors
+
+A = ('a', 'pkg/one.py')
+B = ('b', 'pkg/one.py')
+C = ('c', 'pkg/two.py')
+D = ('d', 'lib/three.py')
+CALL_GRAPH = {A: {B, C}, B: {C}, C: {D}}
+ALL_FLAGS = {A: {'flag_x'}, B: {'flag_x'}, C: {'flag_x', 'flag_y'}, D: {'flag_y'}}
+
+
+def test_cluster_graph_groups_by_file_and_package():
+    clusters, edges = cluster_graph(ALL_FLAGS, CALL_GRAPH)
+    assert clusters['pkg/one.py']['members'] == [A, B]
+    assert clusters['pkg/two.py']['flags'] == {'flag_x', 'flag_y'}
+    assert edges[('pkg/one.py', 'pkg/two.py')] == 2
+    assert edges[('pkg/one.py', 'pkg/one.py')] == 1
+    clusters, edges = cluster_graph(ALL_FLAGS, CALL_GRAPH, group_by='package')
+    assert sorted(clusters) == ['lib', 'pkg']
+    assert edges[('pkg', 'lib')] == 1
+
+
+def test_ego_nodes_respects_depth_and_budget():
+    assert ego_nodes(ALL_FLAGS, CALL_GRAPH, 'a', depth=1) == {A, B, C}
+    assert ego_nodes(ALL_FLAGS, CALL_GRAPH, 'd@lib/three.py', depth=2) == {A, B, C, D}
+    assert ego_nodes(ALL_FLAGS, CALL_GRAPH, 'flag_y', depth=0) == {C, D}
+    assert len(ego_nodes(ALL_FLAGS, CALL_GRAPH, 'flag_x', depth=3, max_nodes=2)) == 2
+
+
+def test_page_neighbors_are_capped_for_hub_nodes():
+    hub = ('hub', 'hub.py')
+    callers = [(f'f{i}', f'm{i}.py') for i in range(100)]
+    adjacent = {hub: set(callers)}
+    shown = page_with_neighbors({hub}, adjacent, max_neighbors=10)
+    assert hub in shown
+    assert len(shown) == 11
+    assert page_with_neighbors({hub}, adjacent, max_neighbors=0) == {hub}
+    # Neighbors on the page itself do not count against the budget
+    assert page_with_neighbors({hub, callers[0]}, adjacent, max_neighbors=1) == {hub, callers[0], callers[1]}
+
+
+def test_offline_layout_places_every_node_by_depth():
+    nodes = [A, B, C, D]
+    positions = offline_layout(nodes, [(A, B), (B, C), (C, D), (D, A)], x_spacing=10, max_rows=1)
+    assert sorted(positions) == sorted(nodes)
+    assert [positions[n][0] for n in nodes] == [0.0, 10.0, 20.0, 30.0]
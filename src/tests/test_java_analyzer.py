@@ -1 +1,35 @@
 # Test for JavaAnalyzer (placeholder)
+from ast_analysis.java_analyzer import JavaAnalyzer
+
+SOURCE = '''class A {
+  void m() {
+    if (FeatureFlag.isEnabled("a"))
+      run();
+    else
+      other();
+    if (!FeatureFlag.isEnabled("b")) skip();
+    if (FeatureFlag.isEnabled("c")) {
+      one();
+    } else if (ready()) {
+      two();
+    } else {
+      three();
+    }
+    after();
+  }
+}
+'''
+
+
+def _regions():
+    return {d['dependency']: d.get('regions') for d in JavaAnalyzer(record_regions=True).analyze(SOURCE)}
+
+
+def test_braceless_bodies_are_regions():
+    regions = _regions()
+    assert regions['a'] == [[3, 4, 1], [5, 6, -1]]
+    assert regions['b'] == [[7, 7, -1]]
+
+
+def test_else_if_chain_is_negated():
+    assert _regions()['c'] == [[8, 10, 1], [10, 12, -1], [12, 14, -1]]
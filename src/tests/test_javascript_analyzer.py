@@ -0,0 +1,20 @@
+# Tests for JavaScriptAnalyzer
+from ast_analysis.javascript_analyzer import JavaScriptAnalyzer
+
+SOURCE = '''function f() {
+  if (unleash.isEnabled('a')) run();
+  else if (x) { y(); }
+  else z();
+  if (unleash.isEnabled('b')) {
+    run();
+  } else {
+    no();
+  }
+}
+'''
+
+
+def test_braceless_if_and_else_chain():
+    regions = {d['dependency']: d.get('regions') for d in JavaScriptAnalyzer(record_regions=True).analyze(SOURCE)}
+    assert regions['a'] == [[2, 2, 1], [3, 3, -1], [4, 4, -1]]
+    assert regions['b'] == [[5, 7, 1], [7, 9, -1]]
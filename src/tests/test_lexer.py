@@ -0,0 +1,64 @@
+# The shared lexer of the brace languages: comments, strings, function spans and calls
+import pytest
+
+from ast_analysis.lexer import function_spans, iter_calls, Span, string_value, tokenize
+
+NAMES = {'isEnabled'}
+JAVASCRIPT = '''function render(user) {
+  // unleash.isEnabled('commented')
+  const a = `Hello ${user.name}, {not a brace} isEnabled('quoted')`;
+  const b = `${unleash.isEnabled('banner') ? `<b>${label({x: 1})}</b>` : ''}`;
+  const c = `multi
+line ${unleash.isEnabled(
+  'multi')} end
+`;
+  if (unleash.isEnabled(`plain`)) { show(); }
+  return /[}`]/.test(`${/x/.source}`);
+}
+function after() { unleash.isEnabled(`flag_${name}`); }
+'''
+
+
+def _calls(source, language, skim):
+    tokens = tokenize(source, language, triggers=NAMES if skim else None)
+    return [(c.token.lineno, c.token.context, [[t.text for t in arg] for arg in c.args])
+            for c in iter_calls(tokens, NAMES)]
+
+
+@pytest.mark.parametrize('skim', [False, True], ids=['full', 'skim'])
+def test_template_substitutions_are_code(skim):
+    assert _calls(JAVASCRIPT, 'javascript', skim) == [
+        (4, 'render', [["'banner'"]]),
+        (6, 'render', [["'multi'"]]),
+        (9, 'render', [['`plain`']]),
+        (12, 'after', [['`flag_${', 'name', '}`']]),
+    ]
+
+
+def test_template_pieces_are_string_tokens():
+    tokens = [(t.kind, t.text) for t in tokenize(JAVASCRIPT, 'javascript') if t.lineno == 3]
+    assert tokens[3:8] == [('string', '`Hello ${'), ('ident', 'user'), ('op', '.'), ('ident', 'name'),
+                           ('string', "}, {not a brace} isEnabled('quoted')`")]
+    regexes = [t.text for t in tokenize(JAVASCRIPT, 'javascript') if t.kind == 'regex']
+    assert regexes == ['/[}`]/', '/x/']
+
+
+def test_function_spans_ignore_braces_in_strings_and_comments():
+    assert sorted(function_spans(JAVASCRIPT, 'javascript')) == [Span('after', 12, 12), Span('render', 1, 11)]
+    java = 'class A {\n  /* } */\n  void m() {\n    String s = "}";\n  }\n  int n() { return 1; }\n}\n'
+    assert sorted(function_spans(java, 'java')) == [Span('m', 3, 5), Span('n', 6, 6)]
+    go = 'package main\n\nfunc (s *S) Run() {\n\tx := `}\n`\n}\n\nfunc main() { go func() {}() }\n'
+    assert sorted(function_spans(go, 'go')) == [Span('Run', 3, 6), Span('main', 8, 8)]
+
+
+@pytest.mark.parametrize('skim', [False, True], ids=['full', 'skim'])
+def test_calls_span_lines_and_skip_comments(skim):
+    java = 'class A {\n  void m() {\n    // isEnabled("no")\n    if (isEnabled(\n        "a", ctx)) {}\n  }\n}\n'
+    assert _calls(java, 'java', skim) == [(4, 'm', [['"a"'], ['ctx']])]
+    go = 'package main\n\nfunc f() {\n\ts := `isEnabled("no")`\n\tclient.isEnabled("b")\n}\n'
+    assert _calls(go, 'go', skim) == [(5, 'f', [['"b"']])]
+
+
+def test_string_value():
+    tokens = list(tokenize('x = "a" + \'b\' + `c`', 'javascript'))
+    assert [string_value(t) for t in tokens] == [None, None, 'a', None, 'b', None, 'c']
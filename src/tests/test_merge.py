@@ -0,0 +1,92 @@
+# Streaming merge: incremental JSON arrays, external sort and the k-way merge of the three sources
+import io
+import json
+
+import pytest
+
+from feature_flag.jsonstream import iter_json_array, write_json_array
+from feature_flag.merge import external_sort, merge_files, merge_key, merge_results, merge_sorted
+
+SEMGREP = {'errors': [], 'results': [
+    {'path': 'b.py', 'start': {'line': 4}, 'extra': {'lines': "if is_feature_enabled('x'):"}},
+    {'path': 'a.py', 'start': {'line': 2}, 'extra': {'lines': "if is_feature_enabled('y'):"}},
+], 'paths': {'scanned': ['a.py', 'b.py']}}
+AST = [
+    {'file': 'a.py', 'lineno': 2, 'code': "if is_feature_enabled('y'):", 'context': 'f', 'dependency': 'y'},
+    {'file': 'a.py', 'lineno': 1, 'code': "def is_feature_enabled(name):", 'context': None, 'dependency': None},
+    {'file': 'c.py', 'lineno': 7, 'code': "flag = is_feature_enabled('z')", 'context': 'g', 'dependency': 'z'},
+]
+DATAFLOW = [
+    {'file': 'a.py', 'line': 2, 'code': "if is_feature_enabled('y'):", 'context': 'f', 'dependency': 'y',
+     'detail': 'guards call h'},
+]
+MERGED = [
+    {'file': 'a.py', 'line': 2, 'code': "if is_feature_enabled('y'):", 'source': 'semgrep+ast+dataflow_analysis',
+     'detail': 'guards call h'},
+    {'file': 'b.py', 'line': 4, 'code': "if is_feature_enabled('x'):", 'source': 'semgrep'},
+    {'file': 'c.py', 'line': 7, 'code': "flag = is_feature_enabled('z')", 'context': 'g', 'dependency': 'z',
+     'source': 'ast'},
+]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 65536])
+def test_iter_json_array_streams_in_chunks(chunk_size):
+    document = json.dumps(SEMGREP)
+    assert list(iter_json_array(io.StringIO(document), key='results', chunk_size=chunk_size)) == SEMGREP['results']
+    items = [{'text': '] , [ "\\u00e9 é'}, 12345678901234567890, -1.5e3, None, [[]]]
+    assert list(iter_json_array(io.StringIO(json.dumps(items)), chunk_size=chunk_size)) == items
+    # Binary streams (subprocess pipes) are decoded incrementally, even mid-character
+    encoded = io.BytesIO(json.dumps(items, ensure_ascii=False).encode('utf-8'))
+    assert list(iter_json_array(encoded, chunk_size=chunk_size)) == items
+
+
+def test_iter_json_array_edge_cases():
+    assert list(iter_json_array(io.StringIO(' [ ] '))) == []
+    assert list(iter_json_array(io.StringIO('{"results": null}'), key='results')) == []
+    assert list(iter_json_array(io.StringIO('{"errors": []}'), key='results')) == []
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('[1, 2')))
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('{"results": [1]}')))
+
+
+@pytest.mark.parametrize('items', [[], MERGED])
+def test_write_json_array_matches_json_dump(items):
+    out = io.StringIO()
+    assert write_json_array(iter(items), out) == len(items)
+    assert out.getvalue() == json.dumps(items, indent=2)
+
+
+def test_external_sort_spills_runs_and_is_stable(tmp_path):
+    entries = [{'file': f'f{i % 7}.py', 'line': i % 5, 'code': 'same', 'n': i} for i in range(50)]
+    result = list(external_sort(entries, run_size=4, tmp_dir=str(tmp_path)))
+    assert result == sorted(entries, key=merge_key)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_merge_sorted_combines_equal_keys_in_priority_order():
+    first = [{'file': 'a.py', 'line': 1, 'code': 'x', 'source': 'semgrep'}]
+    second = [{'file': 'a.py', 'line': 1, 'code': 'x', 'source': 'ast', 'detail': None},
+              {'file': 'a.py', 'line': 1, 'code': 'y', 'source': 'ast'}]
+    merged = merge_sorted(iter(first), iter(sorted(second, key=merge_key)))
+    assert sorted(merged, key=lambda entry: entry['code']) == [
+        {'file': 'a.py', 'line': 1, 'code': 'x', 'source': 'semgrep+ast'},
+        {'file': 'a.py', 'line': 1, 'code': 'y', 'source': 'ast'},
+    ]
+
+
+def test_merge_results_and_files_agree(tmp_path):
+    assert merge_results(SEMGREP, AST, DATAFLOW) == MERGED
+    paths = {}
+    for name, data in (('semgrep', SEMGREP), ('ast', AST), ('dataflow', DATAFLOW)):
+        paths[name] = str(tmp_path / f'{name}.json')
+        with open(paths[name], 'w') as f:
+            json.dump(data, f)
+    output = str(tmp_path / 'merged.json')
+    assert merge_files(paths['semgrep'], paths['ast'], paths['dataflow'], output, run_size=1) == len(MERGED)
+    with open(output) as f:
+        assert json.load(f) == MERGED
+    # A missing dataflow file is empty
+    merge_files(paths['semgrep'], paths['ast'], str(tmp_path / 'missing.json'), output)
+    with open(output) as f:
+        assert [entry['source'] for entry in json.load(f)] == ['semgrep+ast', 'semgrep', 'ast']
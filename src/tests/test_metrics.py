@@ -0,0 +1,63 @@
+# Per-stage metrics: off by default, aggregated per stage when enabled
+import json
+
+import pytest
+
+from feature_flag import metrics
+from feature_flag.metrics import Metrics
+
+
+@pytest.fixture(autouse=True)
+def _disabled(monkeypatch):
+    monkeypatch.setattr(metrics, '_active', None)
+
+
+def test_stages_are_no_ops_until_enabled():
+    with metrics.stage('ast') as m:
+        m.add_file('a.py', 10, 0.5)
+        m.count('findings')
+    metrics.record_cache('ast', True)
+    assert metrics.active() is None
+
+
+def test_stage_runs_are_aggregated():
+    collector = metrics.enable(slowest=2)
+    assert metrics.active() is collector
+    for files in (['a.py', 'b.py'], ['c.py']):
+        with metrics.stage('ast') as m:
+            for index, path in enumerate(files):
+                m.add_file(path, 100, seconds=len(files) - index + 0.5)
+            m.count('findings', 3)
+    metrics.record_cache('ast', True)
+    metrics.record_cache('ast', False)
+    metrics.record_cache('ast', False)
+    stage = collector.to_dict()['stages']['ast']
+    assert (stage['runs'], stage['files'], stage['bytes']) == (2, 3, 300)
+    assert stage['counts'] == {'findings': 6}
+    assert stage['slowest_files'] == [['a.py', 2.5], ['c.py', 1.5]]
+    assert stage['cache_hit_rate'] == pytest.approx(1 / 3)
+    assert stage['wall_seconds'] >= 0
+
+
+def test_exceptions_still_record_the_run():
+    collector = Metrics()
+    with pytest.raises(RuntimeError):
+        with collector.stage('semgrep'):
+            raise RuntimeError("failed")
+    assert collector.to_dict()['stages']['semgrep']['runs'] == 1
+
+
+def test_outputs(tmp_path):
+    collector = Metrics(profile_dir=str(tmp_path / 'profiles'), trace_memory=True)
+    with collector.stage('merge "all"') as m:
+        m.count('entries', 4)
+        sum(range(1000))
+    collector.write_json(str(tmp_path / 'metrics.json'))
+    data = json.loads((tmp_path / 'metrics.json').read_text())
+    stage = data['stages']['merge "all"']
+    assert stage['traced_peak_bytes'] is not None
+    assert len(stage['profiles']) == 1 and stage['profiles'][0].startswith(str(tmp_path / 'profiles'))
+    text = collector.to_prometheus()
+    assert '# TYPE ffdeps_stage_runs_total counter\nffdeps_stage_runs_total{stage="merge \\"all\\""} 1\n' in text
+    assert 'ffdeps_stage_items_total{stage="merge \\"all\\"",kind="entries"} 4\n' in text
+    assert 'cache_hit_ratio' not in text
@@ -0,0 +1,50 @@
+# Analyzers accept mmap sources (see BaseAnalyzer.analyze); scan.py maps large files
+import mmap
+
+import pytest
+
+from ast_analysis.go_analyzer import GoAnalyzer
+from ast_analysis.java_analyzer import JavaAnalyzer
+from ast_analysis.javascript_analyzer import JavaScriptAnalyzer
+from ast_analysis.python_analyzer import PythonAnalyzer
+
+SOURCES = {
+    PythonAnalyzer: "def f():\n    if is_feature_enabled('flag_a'):\n        pass\n",
+    JavaAnalyzer: 'class A {\n  void m() {\n    if (FeatureFlag.isEnabled("flag_a")) { run(); }\n  }\n}\n',
+    JavaScriptAnalyzer: "function f() {\n  if (unleash.isEnabled('flag_a')) { run(); }\n}\n",
+    GoAnalyzer: 'package main\n\nfunc f() {\n\tif client.IsEnabled("flag_a") {\n\t\trun()\n\t}\n}\n',
+}
+
+
+def _mapped(tmp_path, text):
+    path = tmp_path / 'source'
+    path.write_text(text)
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+@pytest.mark.parametrize('analyzer_class', list(SOURCES), ids=lambda c: c.__name__)
+def test_mmap_source_matches_str(tmp_path, analyzer_class):
+    text = SOURCES[analyzer_class]
+    analyzer = analyzer_class()
+    expected = analyzer.analyze(text)
+    assert [d['dependency'] for d in expected] == ['flag_a']
+    source = _mapped(tmp_path, text)
+    try:
+        assert analyzer.analyze(source) == expected
+    finally:
+        source.close()
+
+
+def test_mmap_chunks_count_lines(tmp_path):
+    from ast_analysis.utils import iter_source_chunks
+    text = ''.join(f"line {i}\n" for i in range(20000))
+    source = _mapped(tmp_path, text)
+    try:
+        chunks = list(iter_source_chunks(source, 1024, 4096))
+    finally:
+        source.close()
+    assert len(chunks) > 1
+    assert chunks == [(lineno, chunk) for lineno, chunk in iter_source_chunks(text, 1024, 4096)]
+    for lineno, chunk in chunks:
+        assert chunk.split('\n', 1)[0] == f"line {lineno - 1}"
@@ -0,0 +1,106 @@
+# Pipeline stages run after their dependencies and are reused while their fingerprint holds
+import threading
+
+import pytest
+
+from feature_flag.pipeline import Pipeline
+
+CALLS = []
+_lock = threading.Lock()
+
+
+def _record(name):
+    with _lock:
+        CALLS.append(name)
+
+
+def load(path):
+    _record('load')
+    with open(path) as f:
+        return f.read().split()
+
+
+def count(words, minimum):
+    _record('count')
+    return len([w for w in words if len(w) >= minimum])
+
+
+def upper(words):
+    _record('upper')
+    return [w.upper() for w in words]
+
+
+def combine(total, shouted):
+    _record('combine')
+    return {'total': total, 'shouted': shouted}
+
+
+@pytest.fixture(autouse=True)
+def _reset_calls():
+    CALLS.clear()
+
+
+def _pipeline(tmp_path, minimum=1, cache_dir='cache'):
+    source = tmp_path / 'words.txt'
+    pipeline = Pipeline(cache_dir=cache_dir and str(tmp_path / cache_dir))
+    pipeline.add_stage('load', load, params={'path': str(source)}, inputs=(str(source),))
+    pipeline.add_stage('count', count, deps={'words': 'load'}, params={'minimum': minimum})
+    pipeline.add_stage('upper', upper, deps={'words': 'load'})
+    pipeline.add_stage('combine', combine, deps={'total': 'count', 'shouted': 'upper'}, cache=False)
+    return pipeline
+
+
+def test_stages_run_after_their_dependencies(tmp_path):
+    (tmp_path / 'words.txt').write_text('a bb ccc')
+    outputs = _pipeline(tmp_path, minimum=2).run()
+    assert outputs['combine'] == {'total': 2, 'shouted': ['A', 'BB', 'CCC']}
+    assert CALLS[0] == 'load' and CALLS[-1] == 'combine'
+    assert sorted(CALLS[1:3]) == ['count', 'upper']
+
+
+def test_unchanged_stages_are_loaded_from_the_cache(tmp_path):
+    (tmp_path / 'words.txt').write_text('a bb ccc')
+    first = _pipeline(tmp_path).run()
+    CALLS.clear()
+    pipeline = _pipeline(tmp_path)
+    assert pipeline.run() == first
+    # Only the uncached stage runs again
+    assert CALLS == ['combine']
+    assert sorted(pipeline.skipped) == ['count', 'load', 'upper']
+
+
+def test_changed_params_invalidate_the_stage_and_its_dependents(tmp_path):
+    (tmp_path / 'words.txt').write_text('a bb ccc')
+    _pipeline(tmp_path, minimum=1).run()
+    CALLS.clear()
+    pipeline = _pipeline(tmp_path, minimum=3)
+    assert pipeline.run()['combine']['total'] == 1
+    assert sorted(CALLS) == ['combine', 'count']
+    assert sorted(pipeline.skipped) == ['load', 'upper']
+
+
+def test_changed_input_file_invalidates_downstream_stages(tmp_path):
+    source = tmp_path / 'words.txt'
+    source.write_text('a bb ccc')
+    _pipeline(tmp_path).run()
+    CALLS.clear()
+    source.write_text('dddd eeeee')
+    outputs = _pipeline(tmp_path).run()
+    assert outputs['combine'] == {'total': 2, 'shouted': ['DDDD', 'EEEEE']}
+    assert sorted(CALLS) == ['combine', 'count', 'load', 'upper']
+
+
+def test_without_a_cache_dir_every_stage_runs(tmp_path):
+    (tmp_path / 'words.txt').write_text('a')
+    _pipeline(tmp_path, cache_dir=None).run()
+    _pipeline(tmp_path, cache_dir=None).run()
+    assert sorted(CALLS) == sorted(['load', 'count', 'upper', 'combine'] * 2)
+
+
+def test_duplicate_and_unknown_stages_are_rejected(tmp_path):
+    pipeline = Pipeline(cache_dir=None)
+    pipeline.add_stage('load', load, params={'path': str(tmp_path / 'words.txt')})
+    with pytest.raises(ValueError):
+        pipeline.add_stage('load', load)
+    with pytest.raises(ValueError):
+        pipeline.add_stage('count', count, deps={'words': 'missing'})
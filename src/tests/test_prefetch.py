@@ -0,0 +1,54 @@
+# prefetch() yields reads in input order, bounds read-ahead and surfaces read errors in place
+import threading
+
+import pytest
+
+from feature_flag.prefetch import prefetch
+
+
+def test_results_in_input_order():
+    paths = [f'f{i}' for i in range(50)]
+    assert list(prefetch(paths, str.upper, window=8, workers=4)) == [(p, p.upper()) for p in paths]
+
+
+@pytest.mark.parametrize('paths', [[], ['only']])
+def test_inline_reads(paths):
+    assert list(prefetch(paths, str.upper, window=0)) == [(p, p.upper()) for p in paths]
+    assert list(prefetch(paths, str.upper)) == [(p, p.upper()) for p in paths]
+
+
+def test_window_bounds_read_ahead():
+    lock = threading.Lock()
+    started = []
+
+    def read(path):
+        with lock:
+            started.append(path)
+        return path
+
+    results = prefetch(range(100), read, window=4, workers=2)
+    assert next(results) == (0, 0)
+    # The consumer holds one item: no more than `window` reads have started
+    with lock:
+        assert len(started) <= 4 + 1
+    assert [path for path, _ in results] == list(range(1, 100))
+
+
+def test_read_error_raised_at_its_position():
+    def read(path):
+        if path == 'bad':
+            raise OSError('unreadable')
+        return path
+
+    results = prefetch(['a', 'bad', 'c'], read, window=4)
+    assert next(results) == ('a', 'a')
+    with pytest.raises(OSError, match='unreadable'):
+        next(results)
+
+
+def test_close_early_stops_reading():
+    read = []
+    results = prefetch(range(1000), lambda p: read.append(p) or p, window=4, workers=2)
+    assert next(results) == (0, 0)
+    results.close()
+    assert len(read) < 1000
@@ -1 +1,68 @@
 # Test for PythonAnalyzer (placeholder)
+import io
+
+from ast_analysis.python_analyzer import PythonAnalyzer
+
+# Docstring lines at column 0, one looking like a def, inside f
+DOCSTRING = '''def f():
+    """
+Usage:
+def fake(x):
+    """
+    if is_feature_enabled("a"):
+        s = \'\'\'
+not code
+\'\'\'
+        run()
+    done()
+'''
+
+
+def test_triple_quoted_lines_do_not_end_the_function():
+    found = PythonAnalyzer(record_regions=True).analyze(DOCSTRING)
+    assert [(d['dependency'], d['context']) for d in found] == [('a', 'f')]
+    assert found[0]['regions'] == [[6, 10, 1]]
+
+
+def test_triple_quoted_string_across_streamed_chunks():
+    # Long enough for a streamed source to be read in several chunks, the string among them
+    filler = ''.join(f"    x{i} = {i}\n" for i in range(6000))
+    text = ("def f():\n" + filler + '    s = """\n' + ''.join(f"col0 text {i}\n" for i in range(6000))
+            + '"""\n    return is_feature_enabled("a")\n')
+    for source in (text, io.StringIO(text)):
+        assert [(d['dependency'], d['context']) for d in PythonAnalyzer().analyze(source)] == [('a', 'f')]
+
+
+def test_elif_and_else_clauses_are_negated():
+    source = ('def f():\n    if is_feature_enabled("a"):\n        run()\n    elif other():\n        two()\n'
+              '    else:\n        three()\n    done()\n')
+    found = PythonAnalyzer(record_regions=True).analyze(source)
+    assert found[0]['regions'] == [[2, 3, 1], [4, 5, -1], [6, 7, -1]]
+
+
+CONTEXTS = '''import flags
+
+async def handler():
+    if is_feature_enabled(
+            "multi"):
+        pass
+
+def outer():
+    def inner():
+        return is_feature_enabled("in")
+    return is_feature_enabled("out")
+
+top = is_feature_enabled("module")
+'''
+
+
+def test_function_context_and_line_mapping():
+    found = PythonAnalyzer().analyze(CONTEXTS)
+    assert [(d['dependency'], d['lineno'], d['context']) for d in found] == [
+        ('multi', 4, 'handler'), ('in', 10, 'inner'), ('out', 11, 'outer'), ('module', 13, None)]
+    assert found[1]['code'] == 'return is_feature_enabled("in")'
+    assert [d for d in PythonAnalyzer().analyze(io.StringIO(CONTEXTS))] == found
+
+
+def test_files_without_flag_checks():
+    assert PythonAnalyzer().analyze("def f():\n    return is_enabled('a')\n") == []
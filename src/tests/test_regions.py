@@ -0,0 +1,64 @@
+# Guarded-region index: interval tree queries agree with a linear scan and survive save/load
+import random
+
+import pytest
+
+from feature_flag.regions import GuardedRegion, IntervalTree, RegionIndex, regions_path
+from feature_flag.scan import scan_ast
+
+SOURCE = '''def f():
+    if is_feature_enabled("a"):
+        if not is_feature_enabled("b"):
+            run()
+        else:
+            walk()
+    done()
+'''
+
+
+@pytest.mark.parametrize('n', [0, 1, 2, 7, 8, 9, 100, 257])
+def test_interval_tree_matches_linear_scan(n):
+    rng = random.Random(n)
+    intervals = []
+    for i in range(n):
+        start = rng.randint(1, 500)
+        intervals.append((start, start + rng.choice([0, 1, 5, 40, 300]), f'flag{i}'))
+    tree = IntervalTree(intervals)
+    assert len(tree) == n
+    for start in range(0, 900, 7):
+        end = start + rng.choice([0, 3, 50])
+        expected = sorted(iv for iv in intervals if iv[0] <= end and iv[1] >= start)
+        assert tree.overlapping(start, end) == expected
+    assert tree.at(-1) == []
+
+
+def test_index_from_scan(tmp_path):
+    (tmp_path / 'app.py').write_text(SOURCE)
+    index = RegionIndex()
+    findings = scan_ast(str(tmp_path), 'python', regions=index)
+    assert all('regions' not in finding for finding in findings)
+    path = str(tmp_path / 'app.py')
+    assert index.guards(path, 4) == [GuardedRegion(path, 2, 6, 'a', 1), GuardedRegion(path, 3, 4, 'b', -1)]
+    assert index.guards(path, 6) == [GuardedRegion(path, 2, 6, 'a', 1), GuardedRegion(path, 5, 6, 'b', 1)]
+    assert index.guards(path, 7) == []
+    assert [(r.start, r.end) for r in index.gated('b')] == [(3, 4), (5, 6)]
+    assert index.gated('a', file_path='other.py') == []
+    assert [r.flag for r in index.overlapping(path, 1, 3)] == ['a', 'b']
+
+
+def test_save_load_and_merge(tmp_path):
+    index = RegionIndex()
+    index.add('a.py', 10, 20, 'x', 1)
+    index.add('a.py', 12, 14, 'y', -1)
+    other = RegionIndex()
+    other.add('b.go', 3, 9, 'x', 1)
+    index.merge(other)
+    path = regions_path(str(tmp_path / 'results.json'))
+    assert path == str(tmp_path / 'results.regions.json')
+    index.save(path)
+    loaded = RegionIndex.load(path)
+    assert loaded.files == index.files and len(loaded) == 3
+    assert [r.file for r in loaded.gated('x')] == ['a.py', 'b.go']
+    assert loaded.guards('a.py', 13) == index.guards('a.py', 13)
+    with pytest.raises(ValueError, match='not a region index'):
+        RegionIndex.from_dict({'format': 'ffdeps-snapshot'})
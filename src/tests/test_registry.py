@@ -0,0 +1,84 @@
+# Registry exports joined against code usages from JSON and binary scan results
+import json
+
+import pytest
+
+from feature_flag.binary_results import write_binary
+from feature_flag.registry import count_usages, gate_failures, join_registry, load_registry
+
+UNLEASH = {
+    'features': [
+        {'name': 'checkout', 'project': 'shop'},
+        {'name': 'legacy_banner', 'stale': True},
+        {'name': 'never_used'},
+        {'name': 'retired', 'archivedAt': '2024-01-01'},
+    ],
+    'archive': [{'name': 'gone'}],
+}
+CLOUDBEES = [{'name': 'beta', 'status': 'Archived'}, {'name': 'checkout'}]
+
+RESULTS = [
+    {'file': 'a.py', 'line': 4, 'dependency': 'checkout', 'source': 'ast'},
+    {'file': 'a.py', 'line': 9, 'dependency': 'legacy_banner', 'source': 'ast'},
+    {'file': 'b.py', 'line': 2, 'dependency': 'checkout', 'source': 'ast'},
+    {'file': 'b.py', 'line': 5, 'dependency': 'gone', 'source': 'ast'},
+    {'file': 'c.py', 'line': 1, 'dependency': 'typo_flag', 'source': 'ast'},
+    {'file': 'c.py', 'line': 3, 'dependency': 'tainted_var', 'source': 'dataflow_analysis'},
+    {'file': 'd.py', 'line': 7, 'dependency': 'beta', 'source': 'semgrep'},
+]
+
+
+def _write_json(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+def test_load_exports(tmp_path):
+    registry = load_registry([_write_json(tmp_path, 'unleash.json', UNLEASH),
+                              _write_json(tmp_path, 'cloudbees.json', CLOUDBEES)])
+    assert len(registry) == 6
+    assert 'gone' in registry and registry.flags['gone']['archived']
+    assert registry.flags['beta']['archived']
+    assert registry.flags['legacy_banner']['stale']
+    assert registry.flags['checkout']['project'] == 'shop'
+
+
+def test_rejects_unknown_export(tmp_path):
+    with pytest.raises(ValueError, match='not a flag registry export'):
+        load_registry([_write_json(tmp_path, 'bad.json', 'checkout')])
+    with pytest.raises(ValueError, match="no 'features' or 'flags' list"):
+        load_registry([_write_json(tmp_path, 'bad.json', {'name': 'checkout'})])
+
+
+@pytest.mark.parametrize('binary', [False, True], ids=['json', 'binary'])
+def test_count_usages(tmp_path, binary):
+    if binary:
+        path = str(tmp_path / 'results.ffdb')
+        write_binary(RESULTS, path)
+    else:
+        path = _write_json(tmp_path, 'results.json', RESULTS)
+    assert count_usages([path]) == {
+        'checkout': [2, 'a.py', 4],
+        'legacy_banner': [1, 'a.py', 9],
+        'gone': [1, 'b.py', 5],
+        'typo_flag': [1, 'c.py', 1],
+        'beta': [1, 'd.py', 7],
+    }
+
+
+def test_join_and_gates(tmp_path):
+    registry = load_registry([_write_json(tmp_path, 'unleash.json', UNLEASH),
+                              _write_json(tmp_path, 'cloudbees.json', CLOUDBEES)])
+    report = join_registry(registry, count_usages([_write_json(tmp_path, 'results.json', RESULTS)]))
+    assert (report['registry_flags'], report['referenced_flags']) == (6, 5)
+    assert report['dead'] == ['never_used']
+    assert [u['flag'] for u in report['undefined']] == ['typo_flag']
+    assert [u['flag'] for u in report['archived']] == ['beta', 'gone']
+    assert report['stale'] == [{'flag': 'legacy_banner', 'usages': 1, 'file': 'a.py', 'line': 9}]
+    assert gate_failures(report) == [
+        "flag typo_flag is not defined in the registry (c.py:1)",
+        "archived flag beta is still checked (d.py:7)",
+        "archived flag gone is still checked (b.py:5)",
+    ]
+    assert gate_failures(report, ('dead',)) == ["flag never_used is defined but never referenced"]
@@ -0,0 +1,47 @@
+# One pass over merged findings answers the conflict report, the summary and the DOT graph
+from feature_flag.report import build_report, print_conflict_report, print_graph_summary, ReportEngine
+
+ENTRIES = [
+    {'dependency': 'a', 'context': 'checkout'},
+    {'dependency': 'a', 'context': 'checkout'},
+    {'dependency': 'a', 'context': 'pay'},
+    {'dependency': 'b', 'context': 'checkout'},
+    {'dependency': 'c', 'context': 'refund'},
+    {'dependency': None, 'context': 'pay'},
+    {'code': 'no flag'},
+]
+
+
+def test_aggregates():
+    engine = ReportEngine().consume(iter(ENTRIES))
+    assert engine.edge_count == 4
+    assert engine.conflicts() == [('a', {'checkout', 'pay'})]
+    assert engine.compound_contexts() == [('checkout', {'a', 'b'})]
+    assert engine.top_flags(2) == [('a', 3), ('b', 1)]
+    assert engine.top_contexts(1) == [('checkout', 3)]
+
+
+def test_dot_file_has_each_edge_once(tmp_path):
+    dot_path = tmp_path / 'graph.dot'
+    engine = build_report(iter(ENTRIES), dot_path=str(dot_path))
+    assert dot_path.read_text() == ('digraph FeatureFlagDeps {\n'
+                                    '  "a" -> "checkout";\n'
+                                    '  "a" -> "pay";\n'
+                                    '  "b" -> "checkout";\n'
+                                    '  "c" -> "refund";\n'
+                                    '}\n')
+    assert engine.edge_count == 4
+
+
+def test_printed_reports(capsys):
+    engine = build_report(ENTRIES)
+    print_conflict_report(engine)
+    out = capsys.readouterr().out
+    assert "Total flag->context edges: 4" in out
+    assert "[CONFLICT] Flag 'a' is used in multiple contexts" in out
+    assert "[COMPLEX] Context 'checkout' checks multiple flags" in out
+    print_graph_summary(engine, top_k=1)
+    out = capsys.readouterr().out
+    assert "Top flags by usage (top 1):\n  a: 3\n" in out
+    print_conflict_report(build_report([]))
+    assert "No conflicts detected." in capsys.readouterr().out
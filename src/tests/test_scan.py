@@ -0,0 +1,98 @@
+# scan_semgrep runs the `semgrep` on PATH; a stand-in script plays Semgrep here
+import json
+import os
+import sys
+
+import pytest
+
+from feature_flag import metrics
+from feature_flag.scan import iter_semgrep_results, scan_ast, scan_dataflow, scan_semgrep
+
+OUTPUT = {'results': [{'check_id': 'find-feature-flags', 'path': 'app.py'}], 'errors': []}
+
+
+def _fake_semgrep(tmp_path, monkeypatch, returncode, stdout, stderr='semgrep stderr'):
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    script = bin_dir / 'semgrep'
+    script.write_text(f"#!{sys.executable}\nimport sys\nsys.stderr.write({stderr!r})\n"
+                      f"sys.stdout.write({stdout!r})\nsys.exit({returncode})\n")
+    script.chmod(0o755)
+    monkeypatch.setenv('PATH', str(bin_dir) + os.pathsep + os.environ.get('PATH', ''))
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="the stand-in Semgrep is a shebang script")
+@pytest.mark.parametrize('returncode', [0, 1])
+def test_findings_exit_code_is_success(tmp_path, monkeypatch, returncode):
+    _fake_semgrep(tmp_path, monkeypatch, returncode, json.dumps(OUTPUT))
+    assert scan_semgrep(str(tmp_path), 'rule.yaml')['results'] == OUTPUT['results']
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="the stand-in Semgrep is a shebang script")
+def test_failure_exit_code_raises(tmp_path, monkeypatch):
+    _fake_semgrep(tmp_path, monkeypatch, 2, json.dumps(OUTPUT))
+    with pytest.raises(RuntimeError, match='exit code 2: semgrep stderr'):
+        scan_semgrep(str(tmp_path), 'rule.yaml')
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="the stand-in Semgrep is a shebang script")
+def test_unparsable_output_raises(tmp_path, monkeypatch):
+    _fake_semgrep(tmp_path, monkeypatch, 1, 'Traceback (most recent call last)')
+    with pytest.raises(RuntimeError, match='could not parse JSON output'):
+        scan_semgrep(str(tmp_path), 'rule.yaml')
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="the stand-in Semgrep is a shebang script")
+def test_streamed_results(tmp_path, monkeypatch):
+    results = [{'check_id': 'find-feature-flags', 'path': f'f{i}.py', 'extra': {'lines': 'x' * 100}}
+               for i in range(2000)]
+    # More output than a pipe holds, after more stderr than a pipe holds
+    _fake_semgrep(tmp_path, monkeypatch, 1, json.dumps({'results': results, 'errors': [], 'paths': {}}),
+                  stderr='warning\n' * 100000)
+    stream = iter_semgrep_results(str(tmp_path), 'rule.yaml', max_ok_returncode=1)
+    assert next(stream) == results[0]
+    assert list(stream) == results[1:]
+    with pytest.raises(RuntimeError, match='exit code 1'):
+        list(iter_semgrep_results(str(tmp_path), 'rule.yaml'))
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="the stand-in Semgrep is a shebang script")
+def test_streamed_results_fail_after_the_last_result(tmp_path, monkeypatch):
+    _fake_semgrep(tmp_path, monkeypatch, 0, '{"results": [{"path": "a.py"}, {"path": ')
+    stream = iter_semgrep_results(str(tmp_path), 'rule.yaml')
+    assert next(stream) == {'path': 'a.py'}
+    with pytest.raises(RuntimeError, match='could not parse JSON output'):
+        next(stream)
+    assert list(iter_semgrep_results(str(tmp_path), 'rule.yaml', files=[])) == []
+
+
+FLAG_SOURCE = "def f():\n    if is_feature_enabled('flag_a'):\n        pass\n"
+TAINT_SOURCE = "my_flag = load()\nprint(my_flag)\n"
+
+
+def _copies(tmp_path, text, names):
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        path.write_text(text)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize('prefetch_window', [0, 4])
+def test_identical_files_analyzed_once(tmp_path, monkeypatch, prefetch_window):
+    monkeypatch.setattr(metrics, '_active', None)
+    collector = metrics.enable()
+    files = _copies(tmp_path, FLAG_SOURCE, ['a.py', 'b.py', 'c.py'])
+    files += _copies(tmp_path, FLAG_SOURCE + "# edited\n", ['d.py'])
+    findings = scan_ast(str(tmp_path), 'python', files=files, prefetch_window=prefetch_window)
+    assert [(f['file'], f['dependency'], f['lineno']) for f in findings] == [(path, 'flag_a', 2) for path in files]
+    assert collector.to_dict()['stages']['ast']['counts']['duplicates'] == 2
+
+
+def test_identical_files_dataflow(tmp_path):
+    files = _copies(tmp_path, TAINT_SOURCE, ['a.py', 'b.py'])
+    findings = scan_dataflow(str(tmp_path), 'python', files=files)
+    assert [(f['file'], f['dependency'], f['line']) for f in findings] == [(path, 'my_flag', 2) for path in files]
+    # Each copy gets its own finding objects
+    assert findings[0] is not findings[1]
@@ -0,0 +1,73 @@
+# SDK profiles: validation, JSON loading, matching in the analyzers and memoized analyzers
+import json
+
+import pytest
+
+from ast_analysis.fallback_analyzer import FallbackAnalyzer
+from ast_analysis.sdk_profiles import DEFAULT_PROFILES, SdkProfile, compile_profiles, load_profiles, profile_from_dict
+from feature_flag.reasoning import AnalyzerFactory
+from feature_flag.scan import scan_ast
+
+PROFILES = DEFAULT_PROFILES + (
+    SdkProfile('launchdarkly', 'python', ('variation',), arg=1, key='literal'),
+    SdkProfile('launchdarkly', 'java', ('boolVariation',)),
+    SdkProfile('hooks', 'javascript', ('useFlag',), pattern=r'[a-z]+'),
+)
+
+
+@pytest.mark.parametrize('data, message', [
+    ({'name': 'p', 'language': 'ruby', 'calls': 'enabled?'}, 'unsupported language'),
+    ({'name': 'p', 'language': 'go', 'calls': ['a.b']}, 'calls must be identifiers'),
+    ({'name': 'p', 'language': 'go', 'calls': 'On', 'arg': -1}, 'non-negative'),
+    ({'name': 'p', 'language': 'go', 'calls': 'On', 'key': 'maybe'}, 'key must be one of'),
+    ({'name': 'p', 'language': 'go', 'calls': 'On', 'color': 'red'}, 'Invalid SDK profile'),
+])
+def test_invalid_profiles(data, message):
+    with pytest.raises(ValueError, match=message):
+        profile_from_dict(data)
+
+
+def test_load_profiles(tmp_path):
+    path = tmp_path / 'profiles.json'
+    path.write_text(json.dumps({'profiles': [{'name': 'ld', 'language': 'python', 'calls': 'variation', 'arg': 1}]}))
+    profiles = load_profiles(str(path))
+    assert profiles[:len(DEFAULT_PROFILES)] == DEFAULT_PROFILES
+    assert profiles[-1] == SdkProfile('ld', 'python', ('variation',), arg=1)
+    assert compile_profiles('python', profiles) is compile_profiles('python', profiles)
+    assert compile_profiles('python', profiles).names == {'is_feature_enabled', 'variation'}
+
+
+def test_profiles_in_the_analyzers():
+    python = AnalyzerFactory.get_analyzer('python', PROFILES).analyze(
+        'def f(ctx):\n    if client.variation(ctx, "new-ui", False):\n        pass\n'
+        '    if client.variation(ctx, key):\n        pass\n    return is_feature_enabled(name)\n')
+    assert [(d['dependency'], d['type'], d['lineno']) for d in python] == [
+        ('new-ui', 'variation', 2), ('name', 'is_feature_enabled', 6)]
+    java = AnalyzerFactory.get_analyzer('java', PROFILES).analyze(
+        'class A {\n  void m() {\n    if (ld.boolVariation(KEY, ctx)) { run(); }\n'
+        '    if (FeatureFlag.isEnabled("old")) { run(); }\n  }\n}\n')
+    assert [(d['dependency'], d['type'], d['context']) for d in java] == [
+        ('KEY', 'boolVariation', 'm'), ('old', 'isEnabled', 'm')]
+    javascript = AnalyzerFactory.get_analyzer('javascript', PROFILES).analyze(
+        'function f() {\n  if (useFlag("Bad-Key")) { run(); }\n  if (useFlag("good")) { run(); }\n}\n')
+    # A literal the pattern rejects is reported as text
+    assert [d['dependency'] for d in javascript] == ['"Bad-Key"', 'good']
+
+
+def test_analyzers_are_memoized():
+    analyzer = AnalyzerFactory.get_analyzer('go', PROFILES, 4096)
+    assert AnalyzerFactory.get_analyzer('go', PROFILES, 4096) is analyzer
+    assert AnalyzerFactory.get_analyzer('go', PROFILES, 1024) is not analyzer
+    assert AnalyzerFactory.get_analyzer('go') is not analyzer
+    with pytest.raises(ValueError, match='Unsupported language'):
+        AnalyzerFactory.get_analyzer('cobol')
+
+
+def test_scan_and_fallback_use_the_profiles(tmp_path):
+    source = 'def f(ctx):\n    return client.variation(ctx, "new-ui")\n'
+    (tmp_path / 'app.py').write_text(source)
+    assert [d['dependency'] for d in scan_ast(str(tmp_path), 'python', profiles=PROFILES)] == ['new-ui']
+    assert scan_ast(str(tmp_path), 'python') == []
+    # The fallback only reads a literal first argument
+    fallback = FallbackAnalyzer('python', PROFILES).analyze('x = variation("beta", ctx)\n' + source)
+    assert [(d['dependency'], d['lineno'], d['context']) for d in fallback] == [('beta', 1, None)]
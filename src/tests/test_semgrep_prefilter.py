@@ -0,0 +1,92 @@
+# The parallel Semgrep prefilter picks the files a plain `semgrep --config RULE TARGET` would scan
+import os
+
+from feature_flag.scan import merge_semgrep_outputs, prefilter_files, rule_extensions, rule_literals, semgrep_batches
+
+RULE = """rules:
+  - id: find-feature-flags
+    patterns:
+      - pattern: is_feature_enabled("$FLAG")
+    message: "Found a feature flag"
+    languages:
+      - python
+    severity: INFO
+"""
+REGEX_RULE = """rules:
+  - id: any-flag
+    pattern-regex: flag_\\w+
+    message: "Flag-like name"
+    languages: [python]
+    severity: INFO
+"""
+
+
+def _tree(root, files):
+    for name, text in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def _relative(root, paths):
+    return sorted(os.path.relpath(path, root).replace(os.sep, '/') for path in paths)
+
+
+def test_prefilter_applies_ignore_files_and_rule_languages(tmp_path):
+    check = "if is_feature_enabled('a'):\n    pass\n"
+    _tree(tmp_path, {
+        '.semgrepignore': "# vendored code\nvendor/\n*_pb2.py\n!keep_pb2.py\n/build\n",
+        'app.py': check, 'plain.py': "x = 1\n", 'notes.txt': check, 'Main.java': check,
+        'vendor/lib.py': check, 'pkg/vendor/lib.py': check, 'msg_pb2.py': check, 'keep_pb2.py': check,
+        'build/out.py': check, 'pkg/build/kept.py': check,
+    })
+    rule = tmp_path / 'rule.yml'
+    rule.write_text(RULE)
+    assert rule_extensions(str(rule)) == ('.py',)
+    files = prefilter_files(str(tmp_path), rule_literals(str(rule)), rule_extensions(str(rule)))
+    assert _relative(tmp_path, files) == ['app.py', 'keep_pb2.py', 'pkg/build/kept.py']
+
+
+def test_prefilter_without_literals_keeps_every_file_of_the_languages(tmp_path):
+    _tree(tmp_path, {'.gitignore': "dist/\n", 'a.py': "x = 1\n", 'b.js': "x = 1\n", 'dist/c.py': "x = 1\n"})
+    rule = tmp_path / 'rule.yml'
+    rule.write_text(REGEX_RULE)
+    assert rule_literals(str(rule)) is None
+    files = prefilter_files(str(tmp_path), None, rule_extensions(str(rule)))
+    assert _relative(tmp_path, files) == ['a.py']
+
+
+def test_rule_literals_are_the_pattern_callees(tmp_path):
+    rule = tmp_path / 'rule.yml'
+    rule.write_text(RULE.replace('      - pattern: is_feature_enabled("$FLAG")',
+                                 '      - pattern-either:\n'
+                                 '          - pattern: is_feature_enabled("$FLAG")\n'
+                                 '          - pattern: $CLIENT.is_enabled($FLAG, ...)'))
+    assert rule_literals(str(rule)) == ['is_enabled', 'is_feature_enabled']
+
+
+def test_batches_respect_file_and_argument_limits():
+    files = [f'src/module_{i:03d}.py' for i in range(10)]
+    assert semgrep_batches(files, max_files=4) == [files[:4], files[4:8], files[8:]]
+    # 18 bytes per path and its separator
+    assert semgrep_batches(files, max_arg_bytes=40) == [files[i:i + 2] for i in range(0, 10, 2)]
+    assert semgrep_batches(['a' * 100], max_arg_bytes=10) == [['a' * 100]]
+    assert semgrep_batches([]) == []
+
+
+def test_batch_outputs_merge_like_one_run():
+    def result(path, start, check='find-feature-flags'):
+        return {'check_id': check, 'path': path, 'start': {'offset': start}, 'end': {'offset': start + 5}}
+    error = {'message': 'timeout', 'path': 'big.py'}
+    merged = merge_semgrep_outputs([
+        {'version': '1.0', 'results': [result('b.py', 10), result('a.py', 3)], 'errors': [error],
+         'paths': {'scanned': ['b.py', 'a.py']}},
+        {'version': '1.0', 'results': [result('a.py', 3), result('a.py', 1)], 'errors': [dict(error)],
+         'paths': {'scanned': ['c.py']}},
+    ])
+    assert merged == {
+        'version': '1.0',
+        'results': [result('a.py', 1), result('a.py', 3), result('b.py', 10)],
+        'errors': [error],
+        'paths': {'scanned': ['a.py', 'b.py', 'c.py']},
+    }
@@ -0,0 +1,60 @@
+# Sharded scans reduce to the same result as one shard, including calls across shards
+import pytest
+
+from feature_flag.shard import reduce_partials, run_shard, shard_files, shard_of
+
+FILES = {
+    'app/a.py': "from lib.b import pay\n\n\ndef checkout():\n    if is_feature_enabled('new_checkout'):\n"
+                "        pay()\n",
+    'lib/b.py': "def pay():\n    if is_feature_enabled('new_pay'):\n        return 1\n",
+    'lib/c.py': "def unused():\n    return is_feature_enabled('old')\n",
+}
+
+
+@pytest.fixture
+def target(tmp_path):
+    for name, text in FILES.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return str(tmp_path)
+
+
+def test_shards_partition_the_files(target):
+    assert shard_of('app/a.py', 4) == shard_of('app/a.py', 4) == 0
+    shards = [shard_files(target, 'python', index, 4) for index in range(4)]
+    assert sorted(f for files in shards for f in files) == shard_files(target, 'python', 0, 1)
+    with pytest.raises(ValueError):
+        shard_files(target, 'python', 4, 4)
+
+
+def _without_shard_info(reduced):
+    return {key: value for key, value in reduced.items() if key != 'shards'}
+
+
+def test_reduce_matches_a_single_shard(target):
+    single = reduce_partials([run_shard(target, 'python', 0, 1)])
+    # a.py and b.py land in different shards (see shard_of), c.py with b.py
+    partials = [run_shard(target, 'python', index, 4) for index in (3, 1, 0, 2)]
+    reduced = reduce_partials(partials)
+    assert _without_shard_info(reduced) == _without_shard_info(single)
+    assert reduced['shards']['missing'] == []
+    flags = {node['file'][len(target) + 1:]: node['all_flags'] for node in reduced['graph']['nodes']}
+    assert flags['app/a.py'] == ['new_checkout', 'new_pay']
+    assert [edge[1][len(target) + 1:] + ' -> ' + edge[3][len(target) + 1:] for edge in reduced['graph']['edges']] == [
+        'app/a.py -> lib/b.py']
+    assert [entry['dependency'] for entry in reduced['merged']] == ['new_checkout', 'new_pay', 'old']
+
+
+def test_reduce_validates_partials(target):
+    partials = [run_shard(target, 'python', index, 2) for index in range(2)]
+    with pytest.raises(ValueError, match='Missing shard partials: \\[1\\]'):
+        reduce_partials(partials[:1])
+    assert reduce_partials(partials[:1], allow_missing=True)['shards']['missing'] == [1]
+    with pytest.raises(ValueError, match='Duplicate'):
+        reduce_partials([partials[0], partials[0], partials[1]])
+    other = run_shard(target, 'java', 1, 2)
+    with pytest.raises(ValueError, match="disagree on 'lang'"):
+        reduce_partials([partials[0], other])
+    with pytest.raises(ValueError, match='format'):
+        reduce_partials([dict(partials[0], version=0)])
@@ -0,0 +1,68 @@
+# Sketch estimates stay close to the exact counts, merge like the combined scan and round-trip
+import pytest
+
+from feature_flag.sketch import (CountMinSketch, FlagSketch, HyperLogLog, _hash, build_sketch, is_sketch,
+                                 load_or_build_sketch)
+
+
+def _entries():
+    # flag_i is checked in contexts ctx_0 .. ctx_i; 'twin' shares the contexts of flag_40
+    for i in range(50):
+        for j in range(i + 1):
+            yield {'dependency': f'flag_{i}', 'context': f'ctx_{j}'}
+    for j in range(41):
+        yield {'dependency': 'twin', 'context': f'ctx_{j}'}
+    yield {'dependency': 'no_context'}
+
+
+def test_hyperloglog_estimate():
+    hll = HyperLogLog(12)
+    for i in range(20000):
+        hll.add_hash(_hash(f'item {i}'))
+    assert hll.count() == pytest.approx(20000, rel=0.05)
+    small = HyperLogLog(12)
+    for i in range(10):
+        small.add_hash(_hash(f'item {i}'))
+    assert small.count() == pytest.approx(10, abs=1)
+
+
+def test_count_min_never_underestimates():
+    sketch = CountMinSketch(width=64, depth=4)
+    for i in range(200):
+        sketch.add_hash(_hash(f'key {i}'), i + 1)
+    assert all(sketch.estimate_hash(_hash(f'key {i}')) >= i + 1 for i in range(200))
+
+
+def test_flag_statistics():
+    sketch = build_sketch(_entries())
+    assert sketch.findings == sum(range(1, 51)) + 41
+    assert sketch.unique_flags() == pytest.approx(51, abs=2)
+    assert sketch.unique_contexts() == pytest.approx(50, abs=2)
+    assert sketch.flag_contexts('flag_49') == pytest.approx(50, rel=0.15)
+    assert sketch.flag_contexts('missing') == 0
+    assert [flag for flag, _ in sketch.top_flags(2)] == ['flag_49', 'flag_48']
+    assert sketch.top_contexts(1)[0][0] == 'ctx_0'
+    assert 'flag_0' not in dict(sketch.conflicts())
+    assert ('flag_40', 'twin', 1.0) in sketch.similar_pairs(0.9)
+
+
+def test_merge_matches_combined_scan():
+    entries = list(_entries())
+    combined = build_sketch(entries)
+    merged = build_sketch(entries[::2]).merge(build_sketch(entries[1::2]))
+    assert merged.findings == combined.findings
+    assert merged.to_dict()['flags'] == combined.to_dict()['flags']
+    assert merged.to_dict()['per_flag'] == combined.to_dict()['per_flag']
+    assert merged.top_flags(3) == combined.top_flags(3)
+    with pytest.raises(ValueError, match='different parameters'):
+        combined.merge(FlagSketch(width=128))
+
+
+def test_save_and_load(tmp_path):
+    sketch = build_sketch(_entries())
+    path = str(tmp_path / 'flags.ffsketch')
+    sketch.save(path)
+    assert is_sketch(path)
+    loaded = load_or_build_sketch(path)
+    assert loaded.to_dict() == sketch.to_dict()
+    assert loaded.similar_pairs(0.9) == sketch.similar_pairs(0.9)
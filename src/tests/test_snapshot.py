@@ -0,0 +1,91 @@
+# Snapshots index merged findings per file; diffs ignore line shifts and gate on new cycles
+import json
+
+import pytest
+
+from feature_flag.snapshot import (Snapshot, diff_snapshots, gate_failures, open_snapshot, save_snapshot,
+                                   strongly_connected)
+
+
+def _usage(file, line, flag, context, code=None):
+    return {'file': file, 'line': line, 'dependency': flag, 'context': context,
+            'code': code or f"is_enabled('{flag}')", 'source': 'ast'}
+
+
+BASE = [
+    _usage('a.py', 3, 'x', 'f'),
+    _usage('a.py', 5, 'y', 'f'),
+    _usage('b.py', 1, 'old', 'g'),
+    _usage('c.py', 9, 'z', 'h'),
+]
+
+
+def _save(tmp_path, name, entries):
+    path = str(tmp_path / name)
+    save_snapshot(entries, path)
+    return Snapshot(path)
+
+
+def test_header_and_records(tmp_path):
+    with _save(tmp_path, 'base.ffsnap', BASE) as snapshot:
+        assert sorted(snapshot.files) == ['a.py', 'b.py', 'c.py']
+        assert snapshot.header['flags'] == {'old': 1, 'x': 1, 'y': 1, 'z': 1}
+        assert snapshot.header['edges'] == [['x', 'y', 1]]
+        record = snapshot.record('a.py')
+        assert record['contexts'] == {'f': ['x', 'y']}
+        assert sorted((u[2], u[1], u[5]) for u in record['usages']) == [('x', 1, 3), ('y', 1, 5)]
+        assert snapshot.record('missing.py')['usages'] == []
+
+
+def test_line_shifts_are_not_changes(tmp_path):
+    shifted = [dict(entry, line=entry['line'] + 10) for entry in BASE]
+    with _save(tmp_path, 'base.ffsnap', BASE) as base, _save(tmp_path, 'head.ffsnap', shifted) as head:
+        diff = diff_snapshots(base, head)
+    assert diff['changed_files'] == []
+    assert diff['added_usages'] == diff['removed_usages'] == []
+
+
+def test_diff(tmp_path):
+    head_entries = [
+        _usage('a.py', 3, 'x', 'f'),
+        _usage('a.py', 5, 'y', 'f'),
+        _usage('a.py', 8, 'y', 'k'),
+        _usage('a.py', 9, 'x', 'k'),
+        _usage('c.py', 9, 'z', 'h'),
+        _usage('c.py', 12, 'new', 'h'),
+    ]
+    with _save(tmp_path, 'base.ffsnap', BASE) as base, _save(tmp_path, 'head.ffsnap', head_entries) as head:
+        diff = diff_snapshots(base, head)
+    assert diff['changed_files'] == ['a.py', 'b.py', 'c.py']
+    assert [(u['file'], u['dependency'], u['context']) for u in diff['added_usages']] == [
+        ('a.py', 'y', 'k'), ('a.py', 'x', 'k'), ('c.py', 'new', 'h')]
+    assert [(u['file'], u['dependency']) for u in diff['removed_usages']] == [('b.py', 'old')]
+    assert diff['new_cycles'] == [['x', 'y']]
+    assert diff['new_flags'] == ['new']
+    assert diff['orphaned_flags'] == ['old']
+    assert diff['added_edges'] == [['y', 'x'], ['z', 'new']]
+    assert [c['context'] for c in diff['new_multi_flag_contexts']] == ['k', 'h']
+    assert diff['impact_changes'] == {'y': {'added': ['x'], 'removed': []},
+                                      'z': {'added': ['new'], 'removed': []}}
+    assert gate_failures(diff, ('cycles',)) == ['new flag cycle: x <-> y']
+    assert len(gate_failures(diff)) == 1 + 2 + 1
+
+
+def test_findings_must_be_grouped_by_file(tmp_path):
+    with pytest.raises(ValueError, match='not contiguous'):
+        save_snapshot([BASE[0], BASE[2], BASE[1]], str(tmp_path / 'bad.ffsnap'))
+
+
+def test_open_snapshot_of_merged_results(tmp_path):
+    merged = tmp_path / 'merged.json'
+    merged.write_text(json.dumps([BASE[2], BASE[0], BASE[3], BASE[1]]))
+    with open_snapshot(str(merged)) as snapshot:
+        assert sorted(snapshot.files) == ['a.py', 'b.py', 'c.py']
+    with pytest.raises(ValueError, match='not a snapshot'):
+        Snapshot(str(merged))
+
+
+def test_strongly_connected():
+    graph = {'a': {'b'}, 'b': {'c'}, 'c': {'a'}, 'd': {'e'}, 'e': {'d'}, 'f': {'a'}}
+    assert strongly_connected(graph) == [['a', 'b', 'c'], ['d', 'e']]
+    assert strongly_connected({'a': {'b'}, 'b': set()}) == []
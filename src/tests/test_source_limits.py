@@ -0,0 +1,65 @@
+# Sources are read line-bounded, and huge, minified or generated files follow the limits
+import io
+
+import pytest
+
+from ast_analysis.javascript_analyzer import JavaScriptAnalyzer
+from ast_analysis.utils import iter_source_lines, SourceLimits
+from feature_flag.scan import scan_ast
+
+TEXT = "a = 1\r\nb = 2\n\nlast"
+
+
+@pytest.mark.parametrize('source', [
+    TEXT, TEXT.encode(), io.StringIO(TEXT, newline=''), io.BytesIO(TEXT.encode()), TEXT.splitlines(True),
+], ids=['str', 'bytes', 'text file', 'binary file', 'lines'])
+def test_source_types(source):
+    assert list(iter_source_lines(source)) == [(1, 'a = 1'), (2, 'b = 2'), (3, ''), (4, 'last')]
+
+
+def test_long_lines_are_segmented_after_statement_ends():
+    line = 'x();' * 10 + 'y' * 12
+    segments = list(iter_source_lines(line + '\nz\n', max_line_length=10))
+    assert all(len(text) <= 10 for _, text in segments)
+    assert ''.join(text for lineno, text in segments if lineno == 1) == line
+    assert segments[0] == (1, 'x();x();')
+    assert segments[-1] == (2, 'z')
+
+
+def test_classify(tmp_path):
+    limits = SourceLimits(max_file_bytes=1000, max_line_length=200)
+    files = {
+        'plain.js': "function f() {\n  return 1;\n}\n",
+        'big.js': "x = 1;\n" * 200,
+        'app.min.js': "x=1;",
+        'gen.js': "// @generated by protoc\nx = 1;\n",
+        'bundle.js': "x=1;" * 100,
+    }
+    for name, text in files.items():
+        (tmp_path / name).write_text(text)
+    assert {name: limits.classify(str(tmp_path / name)) for name in files} == {
+        'plain.js': None, 'big.js': 'too_large', 'app.min.js': 'generated', 'gen.js': 'generated',
+        'bundle.js': 'minified'}
+    assert limits.check(str(tmp_path / 'big.js')) == ('too_large', 'skip')
+    assert SourceLimits(on_minified='skip').check(str(tmp_path / 'bundle.js'))[1] == 'analyze'
+    assert SourceLimits(max_line_length=200, on_minified='skip').check(str(tmp_path / 'bundle.js')) == (
+        'minified', 'skip')
+
+
+def test_scan_applies_the_limits(tmp_path):
+    check = "if (unleash.isEnabled('a')) { run(); }\n"
+    (tmp_path / 'app.js').write_text(check)
+    (tmp_path / 'big.js').write_text(check * 100)
+    (tmp_path / 'min.js').write_text("var x=1;" * 100 + check)
+    limits = SourceLimits(max_file_bytes=1000, max_line_length=300)
+    found = sorted(d['file'][len(str(tmp_path)) + 1:] for d in scan_ast(str(tmp_path), 'javascript', limits=limits))
+    assert found == ['app.js', 'min.js']
+    limits = SourceLimits(max_file_bytes=1000, max_line_length=300, on_too_large='analyze', on_minified='skip')
+    found = [d['file'][len(str(tmp_path)) + 1:] for d in scan_ast(str(tmp_path), 'javascript', limits=limits)]
+    assert sorted(set(found)) == ['app.js', 'big.js'] and len(found) == 101
+
+
+def test_analyzers_read_files_line_by_line():
+    source = io.StringIO("function f() {\n" + "  x = 1;" * 2000 + " unleash.isEnabled('a');\n}\n")
+    found = JavaScriptAnalyzer().analyze(source)
+    assert [(d['dependency'], d['lineno'], d['context']) for d in found] == [('a', 2, 'f')]
@@ -0,0 +1,74 @@
+# Per-file budgets: the worker is killed past its time, offending files are quarantined by content
+import hashlib
+import math
+import os
+import sys
+import time
+
+import pytest
+
+from feature_flag import metrics
+from feature_flag.scan import scan_ast
+from feature_flag.watchdog import Budget, Guard, Quarantine, Watchdog
+
+posix_only = pytest.mark.skipif(sys.platform == 'win32', reason="the worker is killed and restarted via POSIX signals")
+
+SOURCE = "def f():\n    if is_feature_enabled('flag_a'):\n        pass\n"
+
+
+def test_budget():
+    assert not Budget().isolated
+    assert Budget(seconds=1).isolated and Budget(memory_bytes=1 << 30).isolated
+    assert repr(Budget(2, quarantine='q.json')) == "Budget(2, None, quarantine='q.json', on_quarantined='fallback')"
+    with pytest.raises(ValueError, match="on_quarantined"):
+        Budget(on_quarantined='ignore')
+
+
+def test_quarantine_persists(tmp_path):
+    path = str(tmp_path / 'cache' / 'quarantine.json')
+    digest = hashlib.sha1(b'contents').digest()
+    Quarantine(path).add('ast', digest, 'big.py', 'timeout', 2.00049)
+    entry = Quarantine(path).get('ast', digest)
+    assert (entry['path'], entry['reason'], entry['seconds']) == ('big.py', 'timeout', 2.0)
+    assert Quarantine(path).get('dataflow', digest) is None
+
+
+@posix_only
+def test_watchdog_outcomes():
+    with Watchdog(Budget(seconds=1)) as watchdog:
+        assert watchdog.run(math.factorial, 5)[:2] == ('ok', 120)
+        assert watchdog.run(time.sleep, 10)[0] == 'timeout'
+        assert watchdog.run(os._exit, 3)[0] == 'crash'
+        assert watchdog.restarts == 2
+        with pytest.raises(ValueError):
+            watchdog.run(int, 'not a number')
+        assert watchdog.run(math.factorial, 3)[:2] == ('ok', 6)
+
+
+@posix_only
+def test_guard_quarantines_timeouts(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, '_active', None)
+    budget = Budget(seconds=0.5, quarantine=str(tmp_path / 'quarantine.json'))
+    digest = hashlib.sha1(b'slow').digest()
+    with metrics.stage('ast') as m, Guard('ast', budget) as guard:
+        assert guard.analyze(m, 'slow.py', digest, time.sleep, (10,), fallback=lambda: ['fallback']) == ['fallback']
+        # Quarantined: not run again
+        assert guard.analyze(m, 'copy.py', digest, time.sleep, (10,), fallback=lambda: ['again']) == ['again']
+    assert Quarantine(budget.quarantine).get('ast', digest)['reason'] == 'timeout'
+
+
+@pytest.mark.parametrize('on_quarantined', ['fallback', 'skip'])
+def test_quarantined_files_in_a_scan(tmp_path, on_quarantined):
+    (tmp_path / 'bad.py').write_text(SOURCE)
+    (tmp_path / 'good.py').write_text(SOURCE + "# edited\n")
+    quarantine = str(tmp_path / 'quarantine.json')
+    Quarantine(quarantine).add('ast', hashlib.sha1(SOURCE.encode()).digest(), 'bad.py', 'timeout', 1)
+    findings = scan_ast(str(tmp_path), 'python', budget=Budget(quarantine=quarantine, on_quarantined=on_quarantined))
+    by_file = {}
+    for finding in findings:
+        by_file.setdefault(os.path.basename(finding['file']), []).append(finding)
+    assert [f['context'] for f in by_file['good.py']] == ['f']
+    if on_quarantined == 'skip':
+        assert 'bad.py' not in by_file
+    else:
+        assert [(f['dependency'], f['lineno'], f['context']) for f in by_file['bad.py']] == [('flag_a', 2, None)]